@@ -0,0 +1,9 @@
+-- 合规事项实例按 (客户, 模板, 申报期间) 唯一，批量生成实例时据此去重（INSERT ... ON CONFLICT DO NOTHING）
+-- 执行前先检查是否存在重复实例：
+-- SELECT kehu_id, heguishixiang_moban_id, shenbao_qijian, COUNT(*)
+-- FROM heguishixiang_shili
+-- GROUP BY kehu_id, heguishixiang_moban_id, shenbao_qijian
+-- HAVING COUNT(*) > 1;
+
+ALTER TABLE heguishixiang_shili
+    ADD CONSTRAINT uq_heguishixiang_shili_qijian UNIQUE (kehu_id, heguishixiang_moban_id, shenbao_qijian);
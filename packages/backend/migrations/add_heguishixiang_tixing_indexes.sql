@@ -0,0 +1,7 @@
+-- 合规事项提醒调度器按时间窗口加载提醒：
+-- 按截止时间范围查询合规事项实例，按计划发送时间范围查询已有提醒记录
+CREATE INDEX IF NOT EXISTS ix_heguishixiang_shili_jihua_jieshu_shijian
+    ON heguishixiang_shili (jihua_jieshu_shijian);
+
+CREATE INDEX IF NOT EXISTS ix_tixing_jilu_jihua_fasong_shijian
+    ON tixing_jilu (jihua_fasong_shijian);
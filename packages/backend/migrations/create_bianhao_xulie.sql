@@ -0,0 +1,13 @@
+-- 创建编号序列表 bianhao_xulie（core/sequence.py 使用）
+-- 无需回填：某个 (业务表, 前缀日期) 首次分配时按业务表中当天已有的最大编号初始化
+
+CREATE TABLE IF NOT EXISTS bianhao_xulie (
+    xulie_jian VARCHAR(100) PRIMARY KEY,
+    dangqian_zhi BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP NOT NULL DEFAULT NOW()
+);
+
+COMMENT ON TABLE bianhao_xulie IS '编号序列表';
+COMMENT ON COLUMN bianhao_xulie.xulie_jian IS '序列键：业务表名:前缀日期，如 xiansuo:XS20250101';
+COMMENT ON COLUMN bianhao_xulie.dangqian_zhi IS '已分配的最大序号';
+COMMENT ON COLUMN bianhao_xulie.updated_at IS '更新时间';
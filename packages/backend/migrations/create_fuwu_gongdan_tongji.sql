@@ -0,0 +1,55 @@
+-- 创建服务工单统计汇总表 fuwu_gongdan_tongji，并按现有工单回填
+-- 回填完成后设置 FUWU_GONGDAN_ROLLUP_ENABLED=true，此后由应用在工单变更时增量维护
+
+CREATE TABLE IF NOT EXISTS fuwu_gongdan_tongji (
+    weidu_leixing VARCHAR(20) NOT NULL,
+    weidu_id VARCHAR(36) NOT NULL,
+    gongdan_zhuangtai VARCHAR(20) NOT NULL,
+    gongdan_shuliang INTEGER NOT NULL DEFAULT 0,
+    wancheng_tianshu_zonghe INTEGER NOT NULL DEFAULT 0,
+    wancheng_jishu INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (weidu_leixing, weidu_id, gongdan_zhuangtai)
+);
+
+COMMENT ON TABLE fuwu_gongdan_tongji IS '服务工单统计汇总表';
+COMMENT ON COLUMN fuwu_gongdan_tongji.weidu_leixing IS '汇总维度：zhixing_ren-执行人，kehu-客户';
+COMMENT ON COLUMN fuwu_gongdan_tongji.weidu_id IS '维度ID（执行人ID或客户ID）';
+COMMENT ON COLUMN fuwu_gongdan_tongji.gongdan_zhuangtai IS '工单状态';
+COMMENT ON COLUMN fuwu_gongdan_tongji.gongdan_shuliang IS '工单数量';
+COMMENT ON COLUMN fuwu_gongdan_tongji.wancheng_tianshu_zonghe IS '完成天数合计（仅统计有实际开始、结束时间的工单）';
+COMMENT ON COLUMN fuwu_gongdan_tongji.wancheng_jishu IS '参与完成天数统计的工单数量';
+COMMENT ON COLUMN fuwu_gongdan_tongji.updated_at IS '更新时间';
+
+-- 回填（可重复执行）
+BEGIN;
+
+DELETE FROM fuwu_gongdan_tongji;
+
+INSERT INTO fuwu_gongdan_tongji
+    (weidu_leixing, weidu_id, gongdan_zhuangtai, gongdan_shuliang, wancheng_tianshu_zonghe, wancheng_jishu, updated_at)
+SELECT
+    d.weidu_leixing,
+    d.weidu_id,
+    g.gongdan_zhuangtai,
+    COUNT(*),
+    COALESCE(SUM(FLOOR(EXTRACT(EPOCH FROM g.shiji_jieshu_shijian - g.shiji_kaishi_shijian) / 86400)) FILTER (
+        WHERE g.gongdan_zhuangtai = 'completed'
+          AND g.shiji_kaishi_shijian IS NOT NULL
+          AND g.shiji_jieshu_shijian IS NOT NULL
+    ), 0),
+    COUNT(*) FILTER (
+        WHERE g.gongdan_zhuangtai = 'completed'
+          AND g.shiji_kaishi_shijian IS NOT NULL
+          AND g.shiji_jieshu_shijian IS NOT NULL
+    ),
+    NOW()
+FROM fuwu_gongdan g
+CROSS JOIN LATERAL (
+    VALUES ('zhixing_ren', g.zhixing_ren_id), ('kehu', g.kehu_id)
+) AS d (weidu_leixing, weidu_id)
+WHERE g.is_deleted = 'N'
+  AND d.weidu_id IS NOT NULL
+GROUP BY d.weidu_leixing, d.weidu_id, g.gongdan_zhuangtai;
+
+COMMIT;
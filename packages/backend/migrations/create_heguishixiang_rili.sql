@@ -0,0 +1,59 @@
+-- 创建合规日历分桶表 heguishixiang_rili，并按现有合规事项实例回填
+-- 回填完成后设置 HEGUISHIXIANG_RILI_ENABLED=true，此后由应用在实例、客户、模板变更时增量维护
+
+CREATE TABLE IF NOT EXISTS heguishixiang_rili (
+    nian INTEGER NOT NULL,
+    yue INTEGER NOT NULL,
+    kehu_id VARCHAR(36) NOT NULL,
+    shixiang_shuliang INTEGER NOT NULL DEFAULT 0,
+    shixiang_liebiao TEXT NOT NULL DEFAULT '[]',
+    updated_at TIMESTAMP NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (nian, yue, kehu_id)
+);
+
+COMMENT ON TABLE heguishixiang_rili IS '合规日历分桶表';
+COMMENT ON COLUMN heguishixiang_rili.nian IS '年份（按计划结束时间）';
+COMMENT ON COLUMN heguishixiang_rili.yue IS '月份（按计划结束时间）';
+COMMENT ON COLUMN heguishixiang_rili.kehu_id IS '客户ID';
+COMMENT ON COLUMN heguishixiang_rili.shixiang_shuliang IS '事项数量';
+COMMENT ON COLUMN heguishixiang_rili.shixiang_liebiao IS '日历条目列表（JSON数组，按计划结束时间排序）';
+COMMENT ON COLUMN heguishixiang_rili.updated_at IS '更新时间';
+
+-- 回填（可重复执行）
+BEGIN;
+
+DELETE FROM heguishixiang_rili;
+
+INSERT INTO heguishixiang_rili (nian, yue, kehu_id, shixiang_shuliang, shixiang_liebiao, updated_at)
+SELECT
+    EXTRACT(YEAR FROM s.jihua_jieshu_shijian)::INTEGER,
+    EXTRACT(MONTH FROM s.jihua_jieshu_shijian)::INTEGER,
+    s.kehu_id,
+    COUNT(*),
+    json_agg(
+        json_build_object(
+            'id', s.id,
+            'shili_bianhao', s.shili_bianhao,
+            'shili_mingcheng', s.shili_mingcheng,
+            'shenbao_qijian', s.shenbao_qijian,
+            'shili_zhuangtai', s.shili_zhuangtai,
+            'jihua_jieshu_shijian', to_char(s.jihua_jieshu_shijian, 'YYYY-MM-DD"T"HH24:MI:SS'),
+            'kehu_mingcheng', k.gongsi_mingcheng,
+            'shixiang_leixing', m.shixiang_leixing,
+            'shixiang_mingcheng', m.shixiang_mingcheng,
+            'fengxian_dengji', s.fengxian_dengji,
+            'yuqi_tianshu', s.yuqi_tianshu,
+            'wancheng_jindu', s.wancheng_jindu
+        )
+        ORDER BY s.jihua_jieshu_shijian, s.id
+    )::TEXT,
+    NOW()
+FROM heguishixiang_shili s
+JOIN heguishixiang_moban m ON m.id = s.heguishixiang_moban_id
+JOIN kehu k ON k.id = s.kehu_id
+WHERE s.is_deleted = 'N'
+  AND m.is_deleted = 'N'
+  AND k.is_deleted = 'N'
+GROUP BY 1, 2, s.kehu_id;
+
+COMMIT;
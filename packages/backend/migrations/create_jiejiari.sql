@@ -0,0 +1,20 @@
+-- 创建节假日日历表 jiejiari，供合规事项截止日期遇节假日顺延
+-- 只需登记法定节假日（shifou_gongzuori = FALSE）与调休上班的周末（shifou_gongzuori = TRUE），
+-- 未登记的日期按周一至周五为工作日处理
+
+CREATE TABLE IF NOT EXISTS jiejiari (
+    riqi DATE PRIMARY KEY,
+    shifou_gongzuori BOOLEAN NOT NULL DEFAULT FALSE,
+    mingcheng VARCHAR(50)
+);
+
+COMMENT ON TABLE jiejiari IS '节假日日历表';
+COMMENT ON COLUMN jiejiari.riqi IS '日期';
+COMMENT ON COLUMN jiejiari.shifou_gongzuori IS '是否工作日：False-法定节假日，True-调休工作日（周末上班）';
+COMMENT ON COLUMN jiejiari.mingcheng IS '节假日名称，如 春节、国庆节';
+
+-- 示例：
+-- INSERT INTO jiejiari (riqi, shifou_gongzuori, mingcheng) VALUES
+--     ('2025-10-01', FALSE, '国庆节'),
+--     ('2025-09-28', TRUE, '国庆节调休')
+-- ON CONFLICT (riqi) DO UPDATE SET shifou_gongzuori = EXCLUDED.shifou_gongzuori, mingcheng = EXCLUDED.mingcheng;
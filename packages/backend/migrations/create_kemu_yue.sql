@@ -0,0 +1,104 @@
+-- 创建科目余额表 kemu_yue、账簿结账记录表 zhangbu_jiezhang，并按现有账簿明细回填科目余额
+-- 此后由凭证过账服务（services/caiwu_zhangwu/zhangbu_guozhang_service.py）增量维护
+
+CREATE TABLE IF NOT EXISTS kemu_yue (
+    kehu_id VARCHAR(36) NOT NULL,
+    kemu_bianma VARCHAR(20) NOT NULL,
+    kuaiji_qijian VARCHAR(7) NOT NULL,
+    kuaiji_kemu VARCHAR(100) NOT NULL,
+    yue_fangxiang VARCHAR(10) NOT NULL,
+    qichu_yue NUMERIC(15, 2) NOT NULL DEFAULT 0,
+    benqi_jiefang NUMERIC(15, 2) NOT NULL DEFAULT 0,
+    benqi_daifang NUMERIC(15, 2) NOT NULL DEFAULT 0,
+    qimo_yue NUMERIC(15, 2) NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (kehu_id, kemu_bianma, kuaiji_qijian)
+);
+
+COMMENT ON TABLE kemu_yue IS '科目余额表';
+COMMENT ON COLUMN kemu_yue.kehu_id IS '客户ID';
+COMMENT ON COLUMN kemu_yue.kemu_bianma IS '科目编码';
+COMMENT ON COLUMN kemu_yue.kuaiji_qijian IS '会计期间（YYYY-MM）';
+COMMENT ON COLUMN kemu_yue.kuaiji_kemu IS '会计科目';
+COMMENT ON COLUMN kemu_yue.yue_fangxiang IS '余额方向：jie-借方，dai-贷方';
+COMMENT ON COLUMN kemu_yue.qichu_yue IS '期初余额（上一期间结账时结转）';
+COMMENT ON COLUMN kemu_yue.benqi_jiefang IS '本期借方发生额';
+COMMENT ON COLUMN kemu_yue.benqi_daifang IS '本期贷方发生额';
+COMMENT ON COLUMN kemu_yue.qimo_yue IS '期末余额（按余额方向：期初 + 本期同向发生额 - 本期反向发生额）';
+COMMENT ON COLUMN kemu_yue.updated_at IS '更新时间';
+
+CREATE TABLE IF NOT EXISTS zhangbu_jiezhang (
+    kuaiji_qijian VARCHAR(7) PRIMARY KEY,
+    jiezhang_shijian TIMESTAMP NOT NULL,
+    jiezhang_ren_id VARCHAR(36)
+);
+
+COMMENT ON TABLE zhangbu_jiezhang IS '账簿结账记录表';
+COMMENT ON COLUMN zhangbu_jiezhang.kuaiji_qijian IS '会计期间（YYYY-MM）';
+COMMENT ON COLUMN zhangbu_jiezhang.jiezhang_shijian IS '结账时间';
+COMMENT ON COLUMN zhangbu_jiezhang.jiezhang_ren_id IS '结账人ID';
+
+-- 明细账、科目余额结转按客户+科目+期间查询；过账按状态领取待过账凭证
+CREATE INDEX IF NOT EXISTS ix_zhangbu_kehu_kemu_qijian ON zhangbu (kehu_id, kemu_bianma, kuaiji_qijian);
+CREATE INDEX IF NOT EXISTS ix_pingzheng_zhuangtai_riqi ON pingzheng (pingzheng_zhuangtai, pingzheng_riqi);
+
+-- 回填（可重复执行）：每个科目从首次发生的期间起，到全部明细账的最后一个期间，每期一行余额
+BEGIN;
+
+DELETE FROM kemu_yue;
+
+INSERT INTO kemu_yue
+    (kehu_id, kemu_bianma, kuaiji_qijian, kuaiji_kemu, yue_fangxiang,
+     qichu_yue, benqi_jiefang, benqi_daifang, qimo_yue, updated_at)
+WITH fasheng AS (
+    SELECT kehu_id, kemu_bianma, kuaiji_qijian,
+           MAX(kuaiji_kemu) AS kuaiji_kemu,
+           MAX(yue_fangxiang) AS yue_fangxiang,
+           SUM(COALESCE(jiebie_jine, 0)) AS jiefang,
+           SUM(COALESCE(daifang_jine, 0)) AS daifang
+    FROM zhangbu
+    WHERE is_deleted = 'N'
+    GROUP BY kehu_id, kemu_bianma, kuaiji_qijian
+),
+qijian AS (
+    SELECT to_char(yuefen, 'YYYY-MM') AS kuaiji_qijian
+    FROM generate_series(
+        (SELECT to_date(MIN(kuaiji_qijian), 'YYYY-MM') FROM fasheng),
+        (SELECT to_date(MAX(kuaiji_qijian), 'YYYY-MM') FROM fasheng),
+        INTERVAL '1 month'
+    ) AS yuefen
+),
+kemu AS (
+    SELECT kehu_id, kemu_bianma,
+           MAX(kuaiji_kemu) AS kuaiji_kemu,
+           MAX(yue_fangxiang) AS yue_fangxiang,
+           MIN(kuaiji_qijian) AS shouqi
+    FROM fasheng
+    GROUP BY kehu_id, kemu_bianma
+),
+quanbu AS (
+    SELECT k.kehu_id, k.kemu_bianma, q.kuaiji_qijian, k.kuaiji_kemu, k.yue_fangxiang,
+           COALESCE(f.jiefang, 0) AS jiefang,
+           COALESCE(f.daifang, 0) AS daifang,
+           CASE WHEN k.yue_fangxiang = 'jie'
+                THEN COALESCE(f.jiefang, 0) - COALESCE(f.daifang, 0)
+                ELSE COALESCE(f.daifang, 0) - COALESCE(f.jiefang, 0)
+           END AS zengliang
+    FROM kemu k
+    JOIN qijian q ON q.kuaiji_qijian >= k.shouqi
+    LEFT JOIN fasheng f
+      ON f.kehu_id = k.kehu_id AND f.kemu_bianma = k.kemu_bianma AND f.kuaiji_qijian = q.kuaiji_qijian
+)
+SELECT kehu_id, kemu_bianma, kuaiji_qijian, kuaiji_kemu, yue_fangxiang,
+       SUM(zengliang) OVER w - zengliang,
+       jiefang,
+       daifang,
+       SUM(zengliang) OVER w,
+       NOW()
+FROM quanbu
+WINDOW w AS (PARTITION BY kehu_id, kemu_bianma ORDER BY kuaiji_qijian ROWS UNBOUNDED PRECEDING);
+
+COMMIT;
+
+-- 回填后，已完成结账的历史期间需写入 zhangbu_jiezhang，例如：
+-- INSERT INTO zhangbu_jiezhang (kuaiji_qijian, jiezhang_shijian) VALUES ('2024-12', NOW()) ON CONFLICT DO NOTHING;
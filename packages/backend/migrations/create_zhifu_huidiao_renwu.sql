@@ -0,0 +1,45 @@
+-- 创建支付回调处理队列表 zhifu_huidiao_renwu
+-- 支付回调接口验签后写入本表即返回成功，由后台 worker 批量更新订单与流水；无需回填
+
+CREATE TABLE IF NOT EXISTS zhifu_huidiao_renwu (
+    id VARCHAR(36) PRIMARY KEY,
+    mideng_jian VARCHAR(200) NOT NULL UNIQUE,
+    huidiao_rizhi_id VARCHAR(36),
+    zhifu_pingtai VARCHAR(20) NOT NULL,
+    dingdan_hao VARCHAR(100) NOT NULL,
+    disanfang_dingdan_hao VARCHAR(100),
+    jiaoyi_jine NUMERIC(10, 2) NOT NULL,
+    zhifu_zhanghu VARCHAR(100),
+    huidiao_shuju TEXT,
+    jieshou_shijian TIMESTAMP NOT NULL,
+    renwu_zhuangtai VARCHAR(20) NOT NULL DEFAULT 'daichuli',
+    chongshi_cishu INTEGER NOT NULL DEFAULT 0,
+    cuowu_xinxi TEXT,
+    chuli_shijian TIMESTAMP,
+    created_at TIMESTAMP NOT NULL DEFAULT NOW(),
+    updated_at TIMESTAMP NOT NULL DEFAULT NOW(),
+    created_by VARCHAR(36),
+    updated_by VARCHAR(36),
+    is_deleted VARCHAR(1) NOT NULL DEFAULT 'N',
+    remark VARCHAR(500)
+);
+
+CREATE INDEX IF NOT EXISTS ix_zhifu_huidiao_renwu_zhuangtai ON zhifu_huidiao_renwu (renwu_zhuangtai, created_at);
+
+COMMENT ON TABLE zhifu_huidiao_renwu IS '支付回调处理队列表';
+COMMENT ON COLUMN zhifu_huidiao_renwu.mideng_jian IS '幂等键（平台:商户订单号:第三方订单号）';
+COMMENT ON COLUMN zhifu_huidiao_renwu.huidiao_rizhi_id IS '回调日志ID';
+COMMENT ON COLUMN zhifu_huidiao_renwu.zhifu_pingtai IS '支付平台：weixin(微信)、zhifubao(支付宝)';
+COMMENT ON COLUMN zhifu_huidiao_renwu.dingdan_hao IS '商户订单号（支付订单编号）';
+COMMENT ON COLUMN zhifu_huidiao_renwu.disanfang_dingdan_hao IS '第三方支付订单号';
+COMMENT ON COLUMN zhifu_huidiao_renwu.jiaoyi_jine IS '交易金额';
+COMMENT ON COLUMN zhifu_huidiao_renwu.zhifu_zhanghu IS '支付账户';
+COMMENT ON COLUMN zhifu_huidiao_renwu.huidiao_shuju IS '回调数据（JSON格式）';
+COMMENT ON COLUMN zhifu_huidiao_renwu.jieshou_shijian IS '接收时间';
+COMMENT ON COLUMN zhifu_huidiao_renwu.renwu_zhuangtai IS '处理状态：daichuli(待处理)、chenggong(成功)、shibai(失败)';
+COMMENT ON COLUMN zhifu_huidiao_renwu.chongshi_cishu IS '失败重试次数';
+COMMENT ON COLUMN zhifu_huidiao_renwu.cuowu_xinxi IS '错误信息';
+COMMENT ON COLUMN zhifu_huidiao_renwu.chuli_shijian IS '处理时间';
+
+-- 流水去重查询（按第三方订单号）
+CREATE INDEX IF NOT EXISTS ix_zhifu_liushui_disanfang_dingdan_hao ON zhifu_liushui (disanfang_dingdan_hao);
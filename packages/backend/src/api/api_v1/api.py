@@ -16,7 +16,7 @@ from .endpoints.hetong_guanli import hetong_moban, hetong, hetong_yifang_zhuti,
 from .endpoints.xiansuo_guanli import xiansuo, xiansuo_laiyuan, xiansuo_zhuangtai, xiansuo_genjin, xiansuo_baojia
 from .endpoints.zhifu_guanli import zhifu_dingdan, zhifu_liushui, zhifu_tongzhi, hetong_zhifu, yinhang_huikuan_danju, zhifu_peizhi, zhifu_api, zhifu_huidiao, zhifu_tuikuan
 from .endpoints.shenhe_guanli import shenhe_guize, rule_test, approval_matrix, payment_audit
-from .endpoints.caiwu_guanli import kaipiao, chengben, caiwu_shezhi
+from .endpoints.caiwu_guanli import kaipiao, chengben, caiwu_shezhi, zhangbu_baobiao, zhangbu_guozhang
 from .endpoints.fuwu_guanli import fuwu_gongdan, task_items
 from .endpoints.heguishixiang_guanli import heguishixiang_moban
 from .endpoints import audit_workflows, audit_records
@@ -89,6 +89,8 @@ api_router.include_router(payment_audit.router, prefix="/payment-audit", tags=["
 api_router.include_router(kaipiao.router, prefix="/invoices", tags=["开票申请"])
 api_router.include_router(chengben.router, prefix="/costs", tags=["成本记录"])
 api_router.include_router(caiwu_shezhi.router, prefix="/finance-settings", tags=["财务设置"])
+api_router.include_router(zhangbu_baobiao.router, prefix="/ledger-reports", tags=["账簿报表"])
+api_router.include_router(zhangbu_guozhang.router, prefix="/ledger", tags=["凭证过账"])
 
 # 服务管理模块
 api_router.include_router(fuwu_gongdan.router, prefix="/service-orders", tags=["服务工单管理"])
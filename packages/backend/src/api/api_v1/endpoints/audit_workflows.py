@@ -16,6 +16,8 @@ from schemas.shenhe_guanli.audit_workflow_schemas import (
     AuditWorkflowResponse,
     AuditWorkflowListParams
 )
+from schemas.shenhe_guanli import ShenheBatchActionRequest
+from services.shenhe_guanli.shenhe_liucheng_service import ShenheLiuchengService
 from typing import Dict, Any
 
 router = APIRouter()
@@ -165,6 +167,26 @@ async def create_workflow(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"创建工作流失败: {str(e)}")
 
+@router.post("/actions/batch", response_model=Dict[str, Any])
+@check_permission("audit:process")
+async def process_audit_actions_bulk(
+    request: ShenheBatchActionRequest,
+    current_user: Yonghu = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """批量处理审核操作（单个事务），逐项返回处理结果"""
+    service = ShenheLiuchengService(db)
+    results = service.process_audit_actions_bulk(request, current_user.id)
+    success_count = sum(1 for item in results if item["success"])
+
+    return {
+        "success": success_count == len(results),
+        "message": f"成功处理 {success_count} 项，失败 {len(results) - success_count} 项",
+        "success_count": success_count,
+        "failed_count": len(results) - success_count,
+        "results": results
+    }
+
 @router.get("/template/{workflow_id}", response_model=AuditWorkflowResponse)
 @check_permission("audit_config")
 async def get_workflow_template(
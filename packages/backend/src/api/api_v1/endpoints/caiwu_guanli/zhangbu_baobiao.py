@@ -0,0 +1,86 @@
+"""
+账簿报表API端点
+"""
+from typing import Callable, Optional
+from urllib.parse import quote
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+
+from core.database import SessionLocal
+from core.report_export import MEDIA_TYPES, OPENPYXL_AVAILABLE, iter_csv, iter_xlsx
+from core.security.permissions import require_permission
+from models.yonghu_guanli import Yonghu
+from services.caiwu_zhangwu.zhangbu_baobiao_service import Baobiao, ZhangbuBaobiaoService
+
+router = APIRouter()
+
+GESHI_PATTERN = "^(csv|xlsx)$"
+
+def _export(build: Callable[[ZhangbuBaobiaoService], Baobiao], geshi: str) -> StreamingResponse:
+    """校验参数后流式导出报表"""
+    if geshi == "xlsx" and not OPENPYXL_AVAILABLE:
+        raise HTTPException(status_code=400, detail="服务器未安装 XLSX 导出组件，请导出 CSV")
+    # 流式响应在请求依赖释放后仍在执行，使用独立的数据库会话
+    db = SessionLocal()
+    try:
+        baobiao = build(ZhangbuBaobiaoService(db))
+    except Exception:
+        db.close()
+        raise
+
+    def content():
+        try:
+            if geshi == "xlsx":
+                yield from iter_xlsx(baobiao.lietou, baobiao.rows, baobiao.mingcheng)
+            else:
+                yield from iter_csv(baobiao.lietou, baobiao.rows)
+        finally:
+            db.close()
+
+    filename = quote(f"{baobiao.mingcheng}.{geshi}")
+    return StreamingResponse(
+        content(),
+        media_type=MEDIA_TYPES[geshi],
+        headers={"Content-Disposition": f"attachment; filename*=UTF-8''{filename}"}
+    )
+
+@router.get("/trial-balance", summary="导出科目余额表")
+def export_trial_balance(
+    kuaiji_qijian: str = Query(..., description="会计期间（YYYY-MM）"),
+    kehu_id: Optional[str] = Query(None, description="客户ID，为空时导出全部客户"),
+    geshi: str = Query("csv", pattern=GESHI_PATTERN, description="导出格式：csv、xlsx"),
+    current_user: Yonghu = Depends(require_permission("ledger:read"))
+):
+    """
+    导出指定会计期间的科目余额表（期初余额、本期借贷方发生额、期末余额）
+
+    每个客户后附本期借贷方发生额合计行，用于试算平衡
+    """
+    return _export(lambda service: service.trial_balance(kuaiji_qijian, kehu_id), geshi)
+
+@router.get("/subsidiary-ledger", summary="导出明细账")
+def export_subsidiary_ledger(
+    kehu_id: str = Query(..., description="客户ID"),
+    kaishi_qijian: str = Query(..., description="开始会计期间（YYYY-MM）"),
+    jieshu_qijian: str = Query(..., description="结束会计期间（YYYY-MM，含）"),
+    kemu_bianma: Optional[str] = Query(None, description="科目编码，为空时导出全部科目"),
+    geshi: str = Query("csv", pattern=GESHI_PATTERN, description="导出格式：csv、xlsx"),
+    current_user: Yonghu = Depends(require_permission("ledger:read"))
+):
+    """导出客户的明细账，每个科目前附期初余额行，余额按登记日期滚动计算"""
+    return _export(
+        lambda service: service.subsidiary_ledger(kehu_id, kaishi_qijian, jieshu_qijian, kemu_bianma),
+        geshi
+    )
+
+@router.get("/period-comparison", summary="导出期间对比表")
+def export_period_comparison(
+    kaishi_qijian: str = Query(..., description="开始会计期间（YYYY-MM）"),
+    jieshu_qijian: str = Query(..., description="结束会计期间（YYYY-MM，含）"),
+    kehu_id: Optional[str] = Query(None, description="客户ID，为空时导出全部客户"),
+    geshi: str = Query("csv", pattern=GESHI_PATTERN, description="导出格式：csv、xlsx"),
+    current_user: Yonghu = Depends(require_permission("ledger:read"))
+):
+    """导出各期间的发生额与期末余额，以及与上一期间期末余额的变动"""
+    return _export(lambda service: service.period_comparison(kaishi_qijian, jieshu_qijian, kehu_id), geshi)
@@ -0,0 +1,66 @@
+"""
+凭证过账与期末结账API端点
+"""
+from fastapi import APIRouter, Depends
+from sqlalchemy.orm import Session
+
+from core.database import get_db
+from core.security.permissions import require_permission
+from models.yonghu_guanli import Yonghu
+from services.caiwu_zhangwu.zhangbu_guozhang_service import ZhangbuGuozhangService
+from schemas.caiwu_guanli.zhangbu_guozhang_schemas import (
+    PingzhengGuozhangRequest,
+    PingzhengGuozhangResponse,
+    WufaGuozhangPingzheng,
+    QimoJiezhangRequest,
+    QimoJiezhangResponse
+)
+
+router = APIRouter()
+
+@router.post("/post", response_model=PingzhengGuozhangResponse, summary="凭证过账")
+def post_vouchers(
+    request: PingzhengGuozhangRequest,
+    db: Session = Depends(get_db),
+    current_user: Yonghu = Depends(require_permission("ledger:post"))
+):
+    """
+    过账已审核的凭证，生成明细账并更新科目余额表
+
+    - **pingzheng_ids**: 指定过账的凭证ID，为空时过账全部已审核凭证
+    - **kehu_id**: 只过账该客户的凭证
+    - **limit**: 本次最多过账的凭证数量
+
+    借贷不平或日期在已结账期间的凭证跳过，在 wufa_guozhang 中返回
+    """
+    service = ZhangbuGuozhangService(db)
+    count = service.post_vouchers(current_user.id, request.pingzheng_ids, request.kehu_id, request.limit)
+    return PingzhengGuozhangResponse(
+        guozhang_shuliang=count,
+        wufa_guozhang=[
+            WufaGuozhangPingzheng(
+                id=pingzheng.id,
+                kehu_id=pingzheng.kehu_id,
+                pingzheng_bianhao=pingzheng.pingzheng_bianhao,
+                pingzheng_riqi=pingzheng.pingzheng_riqi,
+                jiebie_jine=pingzheng.jiebie_jine,
+                daifang_jine=pingzheng.daifang_jine,
+                yuanyin=yuanyin
+            )
+            for pingzheng, yuanyin in service.list_unpostable(request.kehu_id)
+        ]
+    )
+
+@router.post("/close-period", response_model=QimoJiezhangResponse, summary="期末结账")
+def close_period(
+    request: QimoJiezhangRequest,
+    db: Session = Depends(get_db),
+    current_user: Yonghu = Depends(require_permission("ledger:close"))
+):
+    """
+    期末结账：将所有客户该期间的期末余额结转为下一期间的期初余额
+
+    期间需按顺序结账，且该期间没有已审核未过账的凭证；结账后该期间及之前日期的凭证不再过账
+    """
+    count = ZhangbuGuozhangService(db).close_period(request.kuaiji_qijian, current_user.id)
+    return QimoJiezhangResponse(kuaiji_qijian=request.kuaiji_qijian, jiezhuan_shuliang=count)
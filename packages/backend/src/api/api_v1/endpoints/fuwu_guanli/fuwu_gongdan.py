@@ -3,9 +3,10 @@
 """
 from typing import Optional
 from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from core.database import get_db
+from core.database import get_db, get_async_db
 from core.security import get_current_user
 from models.yonghu_guanli import Yonghu
 from services.fuwu_guanli import FuwuGongdanService
@@ -44,7 +45,7 @@ def create_gongdan_from_hetong(
     return service.create_gongdan_from_hetong(hetong_id, current_user.id)
 
 @router.get("/", response_model=FuwuGongdanListResponse, summary="获取服务工单列表")
-def get_gongdan_list(
+async def get_gongdan_list(
     page: int = Query(1, ge=1, description="页码"),
     size: int = Query(20, ge=1, le=100, description="每页数量"),
     gongdan_bianhao: Optional[str] = Query(None, description="工单编号"),
@@ -56,7 +57,9 @@ def get_gongdan_list(
     kehu_id: Optional[str] = Query(None, description="客户ID"),
     hetong_id: Optional[str] = Query(None, description="合同ID"),
     is_overdue: Optional[bool] = Query(None, description="是否逾期"),
-    db: Session = Depends(get_db),
+    cursor: Optional[str] = Query(None, description="分页游标（上一页返回的 next_cursor，传入后忽略页码）"),
+    total_mode: str = Query("exact", pattern="^(exact|estimate)$", description="总数模式：exact-精确计数，estimate-统计信息估算"),
+    async_db: AsyncSession = Depends(get_async_db),
     current_user: Yonghu = Depends(get_current_user)
 ):
     """获取服务工单列表"""
@@ -71,11 +74,13 @@ def get_gongdan_list(
         zhixing_ren_id=zhixing_ren_id,
         kehu_id=kehu_id,
         hetong_id=hetong_id,
-        is_overdue=is_overdue
+        is_overdue=is_overdue,
+        cursor=cursor,
+        total_mode=total_mode
     )
     
-    service = FuwuGongdanService(db)
-    return service.get_gongdan_list(params)
+    service = FuwuGongdanService(async_db)
+    return await service.get_gongdan_list_async(params)
 
 @router.get("/{gongdan_id}", response_model=FuwuGongdanDetailResponse, summary="获取服务工单详情")
 def get_gongdan_detail(
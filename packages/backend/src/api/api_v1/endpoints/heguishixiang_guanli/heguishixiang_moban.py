@@ -2,20 +2,22 @@
 合规事项模板管理API接口
 """
 from typing import List
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session
 
 from core.database import get_db
 from core.security import get_current_user, check_permission
 from models.yonghu_guanli import Yonghu
-from services.heguishixiang_guanli import HeguishixiangMobanService
+from services.heguishixiang_guanli import HeguishixiangMobanService, HeguishixiangShengchengService
 from schemas.heguishixiang_guanli.heguishixiang_moban_schemas import (
     HeguishixiangMobanCreate,
     HeguishixiangMobanUpdate,
     HeguishixiangMobanResponse,
     HeguishixiangMobanListParams,
     HeguishixiangMobanListResponse,
-    HeguishixiangMobanOptionsResponse
+    HeguishixiangMobanOptionsResponse,
+    HeguishixiangShiliGenerateRequest,
+    HeguishixiangShiliGenerateResponse
 )
 
 router = APIRouter()
@@ -85,6 +87,28 @@ async def get_active_heguishixiang_mobans(
     service = HeguishixiangMobanService(db)
     return service.get_active_mobans()
 
+@router.post("/generate-instances", response_model=HeguishixiangShiliGenerateResponse, summary="批量生成合规事项实例")
+async def generate_heguishixiang_shili(
+    request: HeguishixiangShiliGenerateRequest,
+    db: Session = Depends(get_db),
+    current_user: Yonghu = Depends(check_permission("compliance:template:create"))
+):
+    """
+    按客户合规事项配置批量生成截止日期在指定区间内的合规事项实例（可重复执行，已有实例不会重复生成）
+    
+    需要权限：compliance:template:create
+    """
+    if request.end_date <= request.start_date:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="结束日期必须晚于开始日期")
+    service = HeguishixiangShengchengService(db)
+    return service.generate_instances(
+        request.start_date,
+        request.end_date,
+        moban_ids=request.moban_ids,
+        kehu_ids=request.kehu_ids,
+        created_by=current_user.id
+    )
+
 @router.get("/{moban_id}", response_model=HeguishixiangMobanResponse, summary="获取合规事项模板详情")
 async def get_heguishixiang_moban_detail(
     moban_id: str,
@@ -1,12 +1,14 @@
 """
 合同生成API端点
 """
-from typing import List, Dict, Any, Optional
+import json
+from typing import List, Dict, Any, Literal, Optional
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from pydantic import BaseModel, Field
 
-from core.database import get_db
+from core.database import get_db, SessionLocal
 from core.security.jwt_handler import get_current_user
 from models.yonghu_guanli import Yonghu
 from services.hetong_guanli.hetong_generate_service import HetongGenerateService
@@ -29,6 +31,15 @@ class ContractTypeConfig(BaseModel):
     party_id: Optional[str] = Field(None, description="乙方主体ID")
     price_change_reason: Optional[str] = Field(None, description="价格调整原因")
 
+class ContractBulkGenerateRequest(BaseModel):
+    """批量生成合同请求模型"""
+    baojia_ids: List[str] = Field(..., min_length=1, max_length=1000, description="报价ID列表")
+    contract_type: str = Field("daili_jizhang", description="合同类型")
+    yifang_zhuti_id: Optional[str] = Field(None, description="乙方主体ID")
+    initial_status: Literal["draft", "pending", "approved", "active"] = Field(
+        "active", description="合同初始状态：draft-草稿，pending-待审批，approved-已审批，active-已生效"
+    )
+
 class ContractPreviewRequest(BaseModel):
     """合同预览请求模型"""
     hetong_moban_id: str = Field(..., description="合同模板ID")
@@ -180,6 +191,42 @@ async def generate_contracts(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"生成合同失败: {str(e)}")
 
+@router.post("/generate/bulk", summary="批量生成合同")
+async def generate_contracts_bulk(
+    request: ContractBulkGenerateRequest,
+    current_user: Yonghu = Depends(get_current_user)
+):
+    """
+    基于多个报价批量生成合同（如年底批量续签）
+
+    以 NDJSON 流式返回进度，每行一个事件：
+    - prepared：报价校验完成（total、valid、failed）
+    - progress：合同渲染进度（rendered、total）
+    - completed：写入完成（created、failed 明细）
+    - error：整批失败（message）
+
+    按报价原价生成，不触发价格调整审核
+    """
+    created_by = current_user.id
+
+    def event_stream():
+        # 流式响应在请求依赖释放后仍在执行，使用独立的数据库会话
+        db = SessionLocal()
+        try:
+            service = HetongGenerateService(db)
+            for event in service.generate_contracts_bulk(
+                baojia_ids=request.baojia_ids,
+                contract_type=request.contract_type,
+                created_by=created_by,
+                yifang_zhuti_id=request.yifang_zhuti_id,
+                initial_status=request.initial_status
+            ):
+                yield json.dumps(event, ensure_ascii=False) + "\n"
+        finally:
+            db.close()
+
+    return StreamingResponse(event_stream(), media_type="application/x-ndjson")
+
 @router.post("/preview", summary="预览合同")
 async def preview_contract(
     request: ContractPreviewRequest,
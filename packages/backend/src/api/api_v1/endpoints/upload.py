@@ -1,23 +1,28 @@
 """
 文件上传API
+
+上传内容分块写入、按 SHA-256 去重保存（见 core/file_storage.py），相同文件重复上传返回同一URL。
+网络不稳定时可使用断点续传：创建会话 -> 按偏移量分块 PUT -> 中断后查询会话偏移量继续。
+图片上传后在后台生成缩略图与预览图（见 core/image_derivatives.py），通过 thumb_url / preview_url 访问。
 """
-import os
-import uuid
-from datetime import datetime
-from typing import Dict, Any
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
+from typing import Dict, Any, Literal
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Query, Request
+from fastapi.responses import FileResponse
 from sqlalchemy.orm import Session
 
+from core.config import settings
 from core.database import get_db
+from core.file_storage import UploadSizeLimitRoute, file_storage
+from core.image_derivatives import derivative_url, image_deriver
 from core.security import get_current_user
 from models.yonghu_guanli import Yonghu
+from schemas.xitong_guanli import UploadSessionCreate
 
-router = APIRouter()
+# multipart 上传在解析请求体之前按大小上限拒绝
+router = APIRouter(route_class=UploadSizeLimitRoute)
 
-# 上传目录配置
-UPLOAD_DIR = "/var/www/uploads"
 ALLOWED_IMAGE_TYPES = ["image/jpeg", "image/jpg", "image/png", "image/gif", "image/webp"]
-MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB
+MAX_FILE_SIZE = settings.UPLOAD_MAX_SIZE
 
 @router.post("/image", summary="上传图片")
 async def upload_image(
@@ -27,14 +32,16 @@ async def upload_image(
 ) -> Dict[str, Any]:
     """
     上传图片文件
-    
+
     支持的文件格式：JPG、PNG、GIF、WEBP
     文件大小限制：10MB
-    
+
     返回：
     - url: 图片访问URL
     - filename: 原始文件名
     - size: 文件大小（字节）
+    - sha256: 文件内容哈希
+    - thumb_url / preview_url: 缩略图、预览图URL
     """
     # 检查文件类型
     if file.content_type not in ALLOWED_IMAGE_TYPES:
@@ -42,42 +49,18 @@ async def upload_image(
             status_code=400,
             detail="不支持的文件类型，请上传图片文件（JPG、PNG、GIF、WEBP）"
         )
-    
-    # 读取文件内容以检查大小
-    contents = await file.read()
-    file_size = len(contents)
-    
-    # 检查文件大小
-    if file_size > MAX_FILE_SIZE:
-        raise HTTPException(
-            status_code=400,
-            detail="文件大小不能超过10MB"
-        )
-    
-    # 生成唯一文件名
-    file_ext = os.path.splitext(file.filename)[1]
-    unique_filename = f"{uuid.uuid4()}{file_ext}"
-    
-    # 按日期创建子目录
-    date_dir = datetime.now().strftime("%Y%m%d")
-    upload_path = os.path.join(UPLOAD_DIR, "images", date_dir)
-    
-    # 确保目录存在
-    os.makedirs(upload_path, exist_ok=True)
-    
-    # 保存文件
-    file_path = os.path.join(upload_path, unique_filename)
-    with open(file_path, "wb") as f:
-        f.write(contents)
-    
-    # 生成访问URL
-    file_url = f"/uploads/images/{date_dir}/{unique_filename}"
-    
+
+    stored = await file_storage.save_upload(file, "images", MAX_FILE_SIZE)
+    image_deriver.schedule(stored.url)
+
     return {
-        "url": file_url,
+        "url": stored.url,
         "filename": file.filename,
-        "size": file_size,
-        "content_type": file.content_type
+        "size": stored.size,
+        "content_type": file.content_type,
+        "sha256": stored.sha256,
+        "thumb_url": derivative_url(stored.url, "thumb"),
+        "preview_url": derivative_url(stored.url, "preview")
     }
 
 @router.post("/file", summary="上传文件")
@@ -88,48 +71,94 @@ async def upload_file(
 ) -> Dict[str, Any]:
     """
     上传通用文件
-    
+
     支持的文件格式：PDF、图片、文档等
     文件大小限制：10MB
-    
+
     返回：
     - url: 文件访问URL
     - filename: 原始文件名
     - size: 文件大小（字节）
+    - sha256: 文件内容哈希
     """
-    # 读取文件内容以检查大小
-    contents = await file.read()
-    file_size = len(contents)
-    
-    # 检查文件大小
-    if file_size > MAX_FILE_SIZE:
-        raise HTTPException(
-            status_code=400,
-            detail="文件大小不能超过10MB"
-        )
-    
-    # 生成唯一文件名
-    file_ext = os.path.splitext(file.filename)[1]
-    unique_filename = f"{uuid.uuid4()}{file_ext}"
-    
-    # 按日期创建子目录
-    date_dir = datetime.now().strftime("%Y%m%d")
-    upload_path = os.path.join(UPLOAD_DIR, "files", date_dir)
-    
-    # 确保目录存在
-    os.makedirs(upload_path, exist_ok=True)
-    
-    # 保存文件
-    file_path = os.path.join(upload_path, unique_filename)
-    with open(file_path, "wb") as f:
-        f.write(contents)
-    
-    # 生成访问URL
-    file_url = f"/uploads/files/{date_dir}/{unique_filename}"
-    
+    stored = await file_storage.save_upload(file, "files", MAX_FILE_SIZE)
+
     return {
-        "url": file_url,
+        "url": stored.url,
         "filename": file.filename,
-        "size": file_size,
-        "content_type": file.content_type
+        "size": stored.size,
+        "content_type": file.content_type,
+        "sha256": stored.sha256
     }
+
+# 会话元数据的读写为同步文件操作，会话创建与查询使用普通函数，由 FastAPI 在线程池中执行
+@router.post("/sessions", summary="创建断点续传会话")
+def create_upload_session(
+    session_data: UploadSessionCreate,
+    current_user: Yonghu = Depends(get_current_user)
+) -> Dict[str, Any]:
+    """
+    创建断点续传会话
+
+    返回 session_id 与 offset（已接收字节数），随后以
+    PUT /upload/sessions/{session_id}?offset=<offset> 分块上传原始字节（请求体即数据块），
+    最后一块接收完毕时返回文件 url。会话 24 小时内没有上传数据时过期。
+    """
+    if session_data.category == "images" and session_data.content_type not in ALLOWED_IMAGE_TYPES:
+        raise HTTPException(
+            status_code=400,
+            detail="不支持的文件类型，请上传图片文件（JPG、PNG、GIF、WEBP）"
+        )
+
+    return file_storage.create_session(
+        owner_id=current_user.id,
+        filename=session_data.filename,
+        size=session_data.size,
+        content_type=session_data.content_type,
+        category=session_data.category,
+        max_size=MAX_FILE_SIZE
+    )
+
+@router.get("/sessions/{session_id}", summary="查询断点续传会话")
+def get_upload_session(
+    session_id: str,
+    current_user: Yonghu = Depends(get_current_user)
+) -> Dict[str, Any]:
+    """查询会话已接收的字节数（offset），中断后从该位置继续上传"""
+    return file_storage.get_session(session_id, current_user.id)
+
+@router.put("/sessions/{session_id}", summary="上传数据块")
+async def upload_session_chunk(
+    session_id: str,
+    request: Request,
+    offset: int = Query(..., ge=0, description="本块在文件中的起始位置，必须等于已接收的字节数"),
+    current_user: Yonghu = Depends(get_current_user)
+) -> Dict[str, Any]:
+    """
+    追加数据块（请求体为原始字节）
+
+    offset 与已接收字节数不一致时返回 409，客户端应先查询会话再继续；
+    数据全部接收后 completed 为 true 并返回 url、sha256。
+    """
+    result = await file_storage.append_session(session_id, current_user.id, offset, request.stream())
+    if result["completed"]:
+        image_deriver.schedule(result["url"])
+        result["thumb_url"] = derivative_url(result["url"], "thumb")
+        result["preview_url"] = derivative_url(result["url"], "preview")
+    return result
+
+@router.get("/derived/{variant}/{file_path:path}", summary="获取图片缩略图/预览图")
+async def get_derived_image(
+    variant: Literal["thumb", "preview"],
+    file_path: str
+):
+    """
+    获取上传图片的缩略图（thumb，长边 256px）或预览图（preview，长边 1280px），WebP 格式
+
+    file_path 为图片URL去掉 /uploads/ 前缀的部分；尚未生成时当场生成。
+    与 /uploads 静态文件一致，不要求登录，便于直接用作图片地址。
+    """
+    path = await image_deriver.ensure(file_path, variant)
+    if path is None:
+        raise HTTPException(status_code=404, detail="图片不存在")
+    return FileResponse(path, headers={"Cache-Control": "public, max-age=604800"})
@@ -4,10 +4,11 @@
 from typing import Optional
 from datetime import datetime
 from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from core.database import get_db
-from core.security.permissions import require_permission, has_permission
+from core.database import get_db, get_async_db
+from core.security.permissions import require_permission, has_permission, has_permission_async
 from core.security.jwt_handler import get_current_user
 from models.yonghu_guanli import Yonghu
 from services.xiansuo_guanli import XiansuoService
@@ -54,7 +55,9 @@ async def get_xiansuo_list(
     hangye_leixing: Optional[str] = Query(None, description="行业类型筛选"),
     start_date: Optional[datetime] = Query(None, description="开始时间"),
     end_date: Optional[datetime] = Query(None, description="结束时间"),
-    db: Session = Depends(get_db),
+    cursor: Optional[str] = Query(None, description="分页游标（上一页返回的 next_cursor，传入后忽略页码）"),
+    total_mode: str = Query("exact", pattern="^(exact|estimate)$", description="总数模式：exact-精确计数，estimate-统计信息估算"),
+    async_db: AsyncSession = Depends(get_async_db),
     current_user: Yonghu = Depends(require_permission("xiansuo:read"))
 ):
     """
@@ -63,12 +66,11 @@ async def get_xiansuo_list(
     支持分页、搜索和多维度筛选
     数据隔离：普通用户只能查看自己创建的线索，有read_all权限的用户可以查看所有线索
     """
-    service = XiansuoService(db)
-
-    # 检查是否有全局查看权限
-    has_read_all = has_permission(db, current_user, "xiansuo:read_all")
+    # 检查是否有全局查看权限（与列表查询共用异步会话，避免阻塞事件循环）
+    has_read_all = await has_permission_async(async_db, current_user, "xiansuo:read_all")
 
-    return service.get_xiansuo_list(
+    service = XiansuoService(async_db)
+    return await service.get_xiansuo_list_async(
         page=page,
         size=size,
         search=search,
@@ -80,7 +82,9 @@ async def get_xiansuo_list(
         start_date=start_date,
         end_date=end_date,
         current_user_id=current_user.id,
-        has_read_all_permission=has_read_all
+        has_read_all_permission=has_read_all,
+        cursor=cursor,
+        total_mode=total_mode
     )
 
 @router.get("/statistics", response_model=XiansuoStatistics, summary="获取线索统计数据")
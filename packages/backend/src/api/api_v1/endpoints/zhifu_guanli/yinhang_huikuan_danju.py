@@ -6,7 +6,10 @@ from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
 from sqlalchemy.orm import Session
 from pydantic import BaseModel, Field
 
+from core.config import settings
 from core.database import get_db
+from core.file_storage import file_storage
+from core.image_derivatives import derivative_url, image_deriver
 from core.security import get_current_user
 from models.yonghu_guanli import Yonghu
 from services.zhifu_guanli.yinhang_huikuan_danju_service import YinhangHuikuanDanjuService
@@ -250,20 +253,23 @@ async def upload_danju_file(
             detail="不支持的文件类型，请上传PDF或图片文件"
         )
     
-    # 检查文件大小（10MB）
-    if file.size > 10 * 1024 * 1024:
-        raise HTTPException(
-            status_code=400,
-            detail="文件大小不能超过10MB"
-        )
-    
-    service = YinhangHuikuanDanjuService(db)
-    result = service.upload_danju_file(file, current_user.id)
+    # 分块保存并检查文件大小（10MB），相同单据重复上传只保存一份
+    category = "files" if file.content_type == "application/pdf" else "images"
+    stored = await file_storage.save_upload(file, category, settings.UPLOAD_MAX_SIZE)
+    image_deriver.schedule(stored.url)
     
     return {
         "success": True,
         "message": "文件上传成功",
-        "data": result
+        "data": {
+            "url": stored.url,
+            "filename": file.filename,
+            "size": stored.size,
+            "content_type": file.content_type,
+            "sha256": stored.sha256,
+            "thumb_url": derivative_url(stored.url, "thumb"),
+            "preview_url": derivative_url(stored.url, "preview")
+        }
     }
 
 @router.get("/statistics/overview", summary="获取汇款单据统计概览")
@@ -3,10 +3,11 @@
 """
 from typing import List
 from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from datetime import datetime
 
-from core.database import get_db
+from core.database import get_db, get_async_db
 from core.security.permissions import require_permission
 from models.yonghu_guanli import Yonghu
 from models.zhifu_guanli import ZhifuDingdan
@@ -50,7 +51,9 @@ async def get_zhifu_dingdan_list(
     kehu_id: str = Query(None, description="客户ID"),
     zhifu_leixing: str = Query(None, description="支付类型"),
     zhifu_zhuangtai: str = Query(None, description="支付状态"),
-    db: Session = Depends(get_db),
+    cursor: str = Query(None, description="分页游标（上一页返回的 next_cursor，传入后忽略页码）"),
+    total_mode: str = Query("exact", pattern="^(exact|estimate)$", description="总数模式：exact-精确计数，estimate-统计信息估算"),
+    async_db: AsyncSession = Depends(get_async_db),
     current_user: Yonghu = Depends(require_permission("payment:read"))
 ):
     """
@@ -65,10 +68,12 @@ async def get_zhifu_dingdan_list(
         hetong_id=hetong_id,
         kehu_id=kehu_id,
         zhifu_leixing=zhifu_leixing,
-        zhifu_zhuangtai=zhifu_zhuangtai
+        zhifu_zhuangtai=zhifu_zhuangtai,
+        cursor=cursor,
+        total_mode=total_mode
     )
-    service = ZhifuDingdanService(db)
-    return service.get_zhifu_dingdan_list(params)
+    service = ZhifuDingdanService(async_db)
+    return await service.get_zhifu_dingdan_list_async(params)
 
 @router.get("/statistics", response_model=ZhifuDingdanStatistics, summary="获取支付订单统计")
 async def get_zhifu_dingdan_statistics(
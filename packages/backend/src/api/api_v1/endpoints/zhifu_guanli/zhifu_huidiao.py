@@ -1,29 +1,41 @@
 """
 支付回调API端点
+
+支付成功通知验签后写入支付回调处理队列即返回成功（同一笔交易的重复通知只入队一次），
+订单状态与支付流水由后台 worker 批量更新（见 services/zhifu_guanli/zhifu_huidiao_duilie_service.py）。
+验签使用进程内注册表中已初始化的支付客户端（见 services/zhifu_guanli/zhifu_kehuduan_registry.py）。
 """
 from fastapi import APIRouter, Depends, Request, Response
 from sqlalchemy.orm import Session
-from typing import Dict, Any
+from typing import Optional
 import json
 import logging
 
 from core.database import get_db
 from services.zhifu_guanli.zhifu_huidiao_service import ZhifuHuidiaoService
-from services.zhifu_guanli.zhifu_peizhi_service import ZhifuPeizhiService
-from services.zhifu_guanli.zhifu_dingdan_service import ZhifuDingdanService
-from services.zhifu_guanli.zhifu_liushui_service import ZhifuLiushuiService
-from models.zhifu_guanli.zhifu_liushui import ZhifuLiushui
-from schemas.zhifu_guanli.zhifu_liushui_schemas import ZhifuLiushuiCreate
-from utils.payment.weixin_pay import WeixinPayUtil
-from utils.payment.weixin_pay_sandbox import WeixinPaySandboxUtil
-from utils.payment.alipay import AlipayUtil, ALIPAY_SDK_AVAILABLE
+from services.zhifu_guanli.zhifu_huidiao_duilie_service import ZhifuHuidiaoDuilieService
+from services.zhifu_guanli.zhifu_huidiao_worker import huidiao_worker
+from services.zhifu_guanli.zhifu_kehuduan_registry import zhifu_kehuduan_registry
+from utils.payment.alipay import ALIPAY_SDK_AVAILABLE
 from decimal import Decimal
-from datetime import datetime
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+def _weixin_response(is_sandbox: bool, success: bool, message: Optional[str] = None) -> Response:
+    """微信支付回调响应（沙箱环境 API v2 返回XML，正式环境 API v3 返回JSON）"""
+    code = 'SUCCESS' if success else 'FAIL'
+    if is_sandbox:
+        return Response(
+            content=f'<xml><return_code><![CDATA[{code}]]></return_code><return_msg><![CDATA[{message or "OK"}]]></return_msg></xml>',
+            media_type='application/xml'
+        )
+    return Response(
+        content=json.dumps({'code': code, 'message': message or '成功'}),
+        media_type='application/json'
+    )
+
 @router.post("/weixin/notify", summary="微信支付回调")
 async def weixin_payment_notify(
     request: Request,
@@ -33,11 +45,10 @@ async def weixin_payment_notify(
     微信支付回调接口
     
     此接口由微信支付系统调用，用于通知支付结果
-    不需要认证，但需要验证签名
+    不需要认证，但需要验证签名；验签通过后入队即返回成功
     """
     huidiao_service = ZhifuHuidiaoService(db)
-    peizhi_service = ZhifuPeizhiService(db)
-    dingdan_service = ZhifuDingdanService(db)
+    is_sandbox = False
     
     try:
         # 获取请求数据
@@ -58,48 +69,20 @@ async def weixin_payment_notify(
         
         try:
             # 解析回调数据（需要先验证签名）
-            # 获取一个启用的微信支付配置用于验证签名
-            peizhi_list = peizhi_service.get_list(
-                page=1,
-                page_size=1,
-                peizhi_leixing='weixin',
-                zhuangtai='qiyong'
-            )
-            
-            if not peizhi_list.items:
+            # 获取启用的微信支付配置的客户端用于验证签名
+            kehuduan = zhifu_kehuduan_registry.get_active(db, 'weixin')
+            if not kehuduan:
                 raise ValueError("未找到启用的微信支付配置")
-            
-            peizhi = peizhi_list.items[0]
-            
-            # 获取解密后的配置
-            peizhi_detail = peizhi_service.get_detail(peizhi.id)
 
             # 检查是否为沙箱环境
-            is_sandbox = peizhi_detail.huanjing == "shachang"
+            is_sandbox = kehuduan.is_sandbox
+            weixin_util = kehuduan.weixin()
 
             if is_sandbox:
                 # 沙箱环境使用API v2回调验证
-                weixin_util = WeixinPaySandboxUtil(
-                    appid=peizhi_detail.weixin_appid,
-                    mch_id=peizhi_detail.weixin_shanghu_hao,
-                    api_key=peizhi_detail.weixin_api_v3_miyao,
-                    notify_url=peizhi_detail.tongzhi_url
-                )
-
-                # 验证签名
                 callback_result = weixin_util.verify_notify(body_str)
             else:
-                # 正式环境使用API v3回调验证
-                weixin_util = WeixinPayUtil({
-                    'weixin_appid': peizhi_detail.weixin_appid,
-                    'weixin_shanghu_hao': peizhi_detail.weixin_shanghu_hao,
-                    'weixin_shanghu_siyao': peizhi_detail.weixin_shanghu_siyao,
-                    'weixin_zhengshu_xuliehao': peizhi_detail.weixin_zhengshu_xuliehao,
-                    'weixin_api_v3_miyao': peizhi_detail.weixin_api_v3_miyao,
-                    'tongzhi_url': peizhi_detail.tongzhi_url
-                })
-
-                # 验证签名并解密数据
+                # 正式环境使用API v3回调验证，验证签名并解密数据
                 callback_result = weixin_util.callback(headers, body_str)
 
             if not callback_result.get('success'):
@@ -114,21 +97,7 @@ async def weixin_payment_notify(
                     chuli_zhuangtai='shibai',
                     cuowu_xinxi='签名验证失败'
                 )
-
-                # 沙箱环境返回XML格式
-                if is_sandbox:
-                    return Response(
-                        content='<xml><return_code><![CDATA[FAIL]]></return_code><return_msg><![CDATA[签名验证失败]]></return_msg></xml>',
-                        media_type='application/xml'
-                    )
-                else:
-                    return Response(
-                        content=json.dumps({'code': 'FAIL', 'message': '签名验证失败'}),
-                        media_type='application/json'
-                    )
-            
-            # 签名验证成功
-            huidiao_service.update_log_verification(log.id, qianming_yanzheng='chenggong')
+                return _weixin_response(is_sandbox, False, '签名验证失败')
             
             # 获取回调数据
             callback_data = callback_result.get('data', {})
@@ -146,110 +115,42 @@ async def weixin_payment_notify(
             if not out_trade_no:
                 raise ValueError("回调数据中缺少商户订单号")
 
-            # 查找订单
-            dingdan = dingdan_service.get_by_dingdan_hao(out_trade_no)
-            if not dingdan:
-                raise ValueError(f"订单不存在: {out_trade_no}")
-
-            # 更新订单状态
-            if trade_state == 'SUCCESS':
-                # 支付成功
-                dingdan_service.update_status(
-                    dingdan.id,
-                    zhuangtai='paid',
-                    disanfang_dingdan_hao=transaction_id
-                )
-
-                # 创建支付流水记录
-                liushui_service = ZhifuLiushuiService(db)
-
-                # 检查是否已经创建过流水记录（避免重复创建）
-                existing_liushui = db.query(ZhifuLiushui).filter(
-                    ZhifuLiushui.zhifu_dingdan_id == dingdan.id,
-                    ZhifuLiushui.disanfang_dingdan_hao == transaction_id,
-                    ZhifuLiushui.is_deleted == "N"
-                ).first()
-
-                if not existing_liushui:
-                    # 获取交易金额
-                    if is_sandbox:
-                        # 沙箱环境直接从total_fee获取
-                        total_amount = Decimal(callback_data.get('total_fee', 0)) / 100
-                    else:
-                        # 正式环境从amount对象获取
-                        amount_data = callback_data.get('amount', {})
-                        total_amount = Decimal(amount_data.get('total', 0)) / 100
-
-                    # 获取支付账户(openid)
-                    if is_sandbox:
-                        # 沙箱环境从openid字段获取
-                        zhifu_zhanghu = callback_data.get('openid', '')
-                    else:
-                        # 正式环境从payer对象获取
-                        zhifu_zhanghu = callback_data.get('payer', {}).get('openid', '')
-
-                    # 创建流水数据
-                    liushui_data = ZhifuLiushuiCreate(
-                        zhifu_dingdan_id=dingdan.id,
-                        kehu_id=dingdan.kehu_id,
-                        liushui_leixing="income",
-                        jiaoyijine=total_amount,
-                        shouxufei=Decimal('0.00'),  # 微信支付手续费通常在结算时扣除
-                        shiji_shouru=total_amount,
-                        zhifu_fangshi="weixin",
-                        zhifu_zhanghu=zhifu_zhanghu,
-                        disanfang_liushui_hao=transaction_id,
-                        disanfang_dingdan_hao=transaction_id,
-                        jiaoyishijian=datetime.now(),
-                        liushui_zhuangtai="success",
-                        duizhang_zhuangtai="pending"
-                    )
-
-                    try:
-                        liushui_service.create_zhifu_liushui(liushui_data, "system")
-                        logger.info(f"支付流水创建成功: {out_trade_no}")
-                    except Exception as e:
-                        logger.error(f"创建支付流水失败: {str(e)}")
-                        # 流水创建失败不影响回调成功响应
-
+            if trade_state != 'SUCCESS':
+                # 其他状态只记录日志
+                huidiao_service.update_log_verification(log.id, qianming_yanzheng='chenggong')
                 huidiao_service.update_log_result(
                     log.id,
                     chuli_zhuangtai='chenggong',
-                    chuli_jieguo=json.dumps(callback_data, ensure_ascii=False)
+                    chuli_jieguo=f"交易状态: {trade_state}"
                 )
+                return _weixin_response(is_sandbox, True)
 
-                logger.info(f"微信支付回调处理成功: {out_trade_no}")
-
-                # 返回响应 (沙箱环境返回XML, 正式环境返回JSON)
-                if is_sandbox:
-                    return Response(
-                        content='<xml><return_code><![CDATA[SUCCESS]]></return_code><return_msg><![CDATA[OK]]></return_msg></xml>',
-                        media_type='application/xml'
-                    )
-                else:
-                    return Response(
-                        content=json.dumps({'code': 'SUCCESS', 'message': '成功'}),
-                        media_type='application/json'
-                    )
+            if is_sandbox:
+                # 沙箱环境从total_fee、openid字段获取
+                total_amount = Decimal(callback_data.get('total_fee', 0)) / 100
+                zhifu_zhanghu = callback_data.get('openid', '')
             else:
-                # 其他状态
-                huidiao_service.update_log_result(
-                    log.id,
-                    chuli_zhuangtai='chenggong',
-                    chuli_jieguo=f"交易状态: {trade_state}"
-                )
+                # 正式环境从amount、payer对象获取
+                total_amount = Decimal(callback_data.get('amount', {}).get('total', 0)) / 100
+                zhifu_zhanghu = callback_data.get('payer', {}).get('openid', '')
+
+            # 支付成功：入队后由 worker 更新订单状态、创建支付流水
+            queued = ZhifuHuidiaoDuilieService(db).enqueue(
+                huidiao_rizhi_id=log.id,
+                zhifu_pingtai='weixin',
+                dingdan_hao=out_trade_no,
+                disanfang_dingdan_hao=transaction_id,
+                jiaoyi_jine=total_amount,
+                zhifu_zhanghu=zhifu_zhanghu,
+                huidiao_shuju=callback_data
+            )
+            if queued:
+                huidiao_worker.wake()
+                logger.info(f"微信支付回调已入队: {out_trade_no}")
+            else:
+                logger.info(f"微信支付重复回调已忽略: {out_trade_no}")
 
-                # 返回响应
-                if is_sandbox:
-                    return Response(
-                        content='<xml><return_code><![CDATA[SUCCESS]]></return_code><return_msg><![CDATA[OK]]></return_msg></xml>',
-                        media_type='application/xml'
-                    )
-                else:
-                    return Response(
-                        content=json.dumps({'code': 'SUCCESS', 'message': '成功'}),
-                        media_type='application/json'
-                    )
+            return _weixin_response(is_sandbox, True)
 
         except Exception as e:
             logger.error(f"微信支付回调处理失败: {str(e)}")
@@ -258,22 +159,7 @@ async def weixin_payment_notify(
                 chuli_zhuangtai='shibai',
                 cuowu_xinxi=str(e)
             )
-
-            # 返回错误响应
-            # 注意: 这里的is_sandbox可能未定义,需要从peizhi获取
-            try:
-                if peizhi_detail and peizhi_detail.huanjing == "shachang":
-                    return Response(
-                        content=f'<xml><return_code><![CDATA[FAIL]]></return_code><return_msg><![CDATA[{str(e)}]]></return_msg></xml>',
-                        media_type='application/xml'
-                    )
-            except (AttributeError, NameError):
-                pass
-
-            return Response(
-                content=json.dumps({'code': 'FAIL', 'message': str(e)}),
-                media_type='application/json'
-            )
+            return _weixin_response(is_sandbox, False, str(e))
             
     except Exception as e:
         logger.error(f"微信支付回调异常: {str(e)}")
@@ -291,7 +177,7 @@ async def zhifubao_payment_notify(
     支付宝支付回调接口
     
     此接口由支付宝系统调用，用于通知支付结果
-    不需要认证，但需要验证签名
+    不需要认证，但需要验证签名；验签通过后入队即返回成功
     """
     if not ALIPAY_SDK_AVAILABLE:
         return Response(
@@ -300,8 +186,6 @@ async def zhifubao_payment_notify(
         )
     
     huidiao_service = ZhifuHuidiaoService(db)
-    peizhi_service = ZhifuPeizhiService(db)
-    dingdan_service = ZhifuDingdanService(db)
     
     try:
         # 获取请求数据
@@ -321,30 +205,11 @@ async def zhifubao_payment_notify(
         )
         
         try:
-            # 获取一个启用的支付宝配置用于验证签名
-            peizhi_list = peizhi_service.get_list(
-                page=1,
-                page_size=1,
-                peizhi_leixing='zhifubao',
-                zhuangtai='qiyong'
-            )
-            
-            if not peizhi_list.items:
+            # 获取启用的支付宝配置的客户端用于验证签名
+            kehuduan = zhifu_kehuduan_registry.get_active(db, 'zhifubao')
+            if not kehuduan:
                 raise ValueError("未找到启用的支付宝配置")
-            
-            peizhi = peizhi_list.items[0]
-            
-            # 获取解密后的配置
-            peizhi_detail = peizhi_service.get_detail(peizhi.id)
-            
-            # 初始化支付宝工具
-            alipay_util = AlipayUtil(
-                appid=peizhi_detail.zhifubao_appid,
-                app_private_key=peizhi_detail.zhifubao_shanghu_siyao,
-                alipay_public_key=peizhi_detail.zhifubao_zhifubao_gongyao,
-                notify_url=peizhi_detail.tongzhi_url,
-                debug=peizhi_detail.huanjing == 'shachang'
-            )
+            alipay_util = kehuduan.alipay()
             
             # 验证签名
             sign = data_dict.pop('sign', None)
@@ -370,9 +235,6 @@ async def zhifubao_payment_notify(
                 
                 return Response(content='fail', media_type='text/plain')
             
-            # 签名验证成功
-            huidiao_service.update_log_verification(log.id, qianming_yanzheng='chenggong')
-            
             # 提取订单信息
             out_trade_no = data_dict.get('out_trade_no')  # 商户订单号
             trade_no = data_dict.get('trade_no')  # 支付宝交易号
@@ -381,70 +243,9 @@ async def zhifubao_payment_notify(
             if not out_trade_no:
                 raise ValueError("回调数据中缺少商户订单号")
             
-            # 查找订单
-            dingdan = dingdan_service.get_by_dingdan_hao(out_trade_no)
-            if not dingdan:
-                raise ValueError(f"订单不存在: {out_trade_no}")
-            
-            # 更新订单状态
-            if trade_status in ['TRADE_SUCCESS', 'TRADE_FINISHED']:
-                # 支付成功
-                dingdan_service.update_status(
-                    dingdan.id,
-                    zhuangtai='paid',
-                    disanfang_dingdan_hao=trade_no
-                )
-
-                # 创建支付流水记录
-                liushui_service = ZhifuLiushuiService(db)
-
-                # 检查是否已经创建过流水记录（避免重复创建）
-                existing_liushui = db.query(ZhifuLiushui).filter(
-                    ZhifuLiushui.zhifu_dingdan_id == dingdan.id,
-                    ZhifuLiushui.disanfang_dingdan_hao == trade_no,
-                    ZhifuLiushui.is_deleted == "N"
-                ).first()
-
-                if not existing_liushui:
-                    # 获取交易金额
-                    total_amount = Decimal(data_dict.get('total_amount', '0'))
-                    buyer_pay_amount = Decimal(data_dict.get('buyer_pay_amount', '0'))
-
-                    # 创建流水数据
-                    liushui_data = ZhifuLiushuiCreate(
-                        zhifu_dingdan_id=dingdan.id,
-                        kehu_id=dingdan.kehu_id,
-                        liushui_leixing="income",
-                        jiaoyijine=total_amount,
-                        shouxufei=Decimal('0.00'),  # 支付宝手续费通常在结算时扣除
-                        shiji_shouru=total_amount,
-                        zhifu_fangshi="zhifubao",
-                        zhifu_zhanghu=data_dict.get('buyer_logon_id', ''),
-                        disanfang_liushui_hao=trade_no,
-                        disanfang_dingdan_hao=trade_no,
-                        jiaoyishijian=datetime.now(),
-                        liushui_zhuangtai="success",
-                        duizhang_zhuangtai="pending"
-                    )
-
-                    try:
-                        liushui_service.create_zhifu_liushui(liushui_data, "system")
-                        logger.info(f"支付流水创建成功: {out_trade_no}")
-                    except Exception as e:
-                        logger.error(f"创建支付流水失败: {str(e)}")
-                        # 流水创建失败不影响回调成功响应
-
-                huidiao_service.update_log_result(
-                    log.id,
-                    chuli_zhuangtai='chenggong',
-                    chuli_jieguo=json.dumps(data_dict, ensure_ascii=False)
-                )
-
-                logger.info(f"支付宝支付回调处理成功: {out_trade_no}")
-
-                return Response(content='success', media_type='text/plain')
-            else:
-                # 其他状态
+            if trade_status not in ['TRADE_SUCCESS', 'TRADE_FINISHED']:
+                # 其他状态只记录日志
+                huidiao_service.update_log_verification(log.id, qianming_yanzheng='chenggong')
                 huidiao_service.update_log_result(
                     log.id,
                     chuli_zhuangtai='chenggong',
@@ -452,6 +253,24 @@ async def zhifubao_payment_notify(
                 )
                 
                 return Response(content='success', media_type='text/plain')
+
+            # 支付成功：入队后由 worker 更新订单状态、创建支付流水
+            queued = ZhifuHuidiaoDuilieService(db).enqueue(
+                huidiao_rizhi_id=log.id,
+                zhifu_pingtai='zhifubao',
+                dingdan_hao=out_trade_no,
+                disanfang_dingdan_hao=trade_no,
+                jiaoyi_jine=Decimal(data_dict.get('total_amount', '0')),
+                zhifu_zhanghu=data_dict.get('buyer_logon_id', ''),
+                huidiao_shuju=data_dict
+            )
+            if queued:
+                huidiao_worker.wake()
+                logger.info(f"支付宝支付回调已入队: {out_trade_no}")
+            else:
+                logger.info(f"支付宝支付重复回调已忽略: {out_trade_no}")
+
+            return Response(content='success', media_type='text/plain')
                 
         except Exception as e:
             logger.error(f"支付宝支付回调处理失败: {str(e)}")
@@ -50,6 +50,8 @@ async def get_zhifu_liushui_list(
     zhifu_fangshi: str = Query(None, description="支付方式"),
     liushui_zhuangtai: str = Query(None, description="流水状态"),
     duizhang_zhuangtai: str = Query(None, description="对账状态"),
+    cursor: str = Query(None, description="分页游标（上一页返回的 next_cursor，传入后忽略页码）"),
+    total_mode: str = Query("exact", pattern="^(exact|estimate)$", description="总数模式：exact-精确计数，estimate-统计信息估算"),
     db: Session = Depends(get_db),
     current_user: Yonghu = Depends(require_permission("payment:read"))
 ):
@@ -67,7 +69,9 @@ async def get_zhifu_liushui_list(
         liushui_leixing=liushui_leixing,
         zhifu_fangshi=zhifu_fangshi,
         liushui_zhuangtai=liushui_zhuangtai,
-        duizhang_zhuangtai=duizhang_zhuangtai
+        duizhang_zhuangtai=duizhang_zhuangtai,
+        cursor=cursor,
+        total_mode=total_mode
     )
     service = ZhifuLiushuiService(db)
     return service.get_zhifu_liushui_list(params)
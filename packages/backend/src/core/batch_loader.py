@@ -0,0 +1,63 @@
+"""
+列表关联数据批量加载
+
+列表接口需要为每行补充关联实体（合同、客户、乙方主体等）时，先收集本页的外键，
+再按实体类型各执行一次 IN 查询，避免逐行查询带来的 N+1 问题。
+
+用法：
+    hetong_map = load_by_ids(db, Hetong, (item.hetong_id for item in items))
+    hetong = hetong_map.get(item.hetong_id)
+"""
+from typing import Any, Dict, Iterable, Optional, Set, Type, TypeVar
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+ModelT = TypeVar("ModelT")
+
+def _collect_ids(ids: Iterable[Optional[str]]) -> Set[str]:
+    """去重并剔除空值"""
+    return {i for i in ids if i}
+
+def _build_stmt(model: Type[ModelT], ids: Set[str], include_deleted: bool):
+    stmt = select(model).where(model.id.in_(ids))
+    if not include_deleted and hasattr(model, "is_deleted"):
+        stmt = stmt.where(model.is_deleted == "N")
+    return stmt
+
+def load_by_ids(
+    db: Session,
+    model: Type[ModelT],
+    ids: Iterable[Optional[str]],
+    include_deleted: bool = False
+) -> Dict[str, ModelT]:
+    """
+    按主键批量加载实体
+
+    Args:
+        db: 数据库会话
+        model: 实体模型
+        ids: 主键集合（可含重复值与空值）
+        include_deleted: 是否包含已软删除的记录
+
+    Returns:
+        Dict[str, ModelT]: 主键 -> 实体，不存在的主键不出现在结果中
+    """
+    ids = _collect_ids(ids)
+    if not ids:
+        return {}
+    rows = db.execute(_build_stmt(model, ids, include_deleted)).scalars()
+    return {row.id: row for row in rows}
+
+async def load_by_ids_async(
+    db: Any,
+    model: Type[ModelT],
+    ids: Iterable[Optional[str]],
+    include_deleted: bool = False
+) -> Dict[str, ModelT]:
+    """按主键批量加载实体（异步版本，db 为 AsyncSession），参数同 load_by_ids"""
+    ids = _collect_ids(ids)
+    if not ids:
+        return {}
+    rows = (await db.execute(_build_stmt(model, ids, include_deleted))).scalars()
+    return {row.id: row for row in rows}
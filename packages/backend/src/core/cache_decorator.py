@@ -1,13 +1,95 @@
 """缓存装饰器"""
+import asyncio
 import functools
 import logging
-from typing import Any, Callable, Optional
+import math
+import random
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
 
 from core.redis_client import CacheKeys, redis_client
 from core.config import settings
+from core.local_cache import invalidate_local, local_cache
 
 logger = logging.getLogger(__name__)
 
+# 正在执行中的缓存回源：缓存键 -> Future，同一进程内并发未命中只执行一次原函数
+_inflight: Dict[str, "asyncio.Future"] = {}
+
+# 各键前缀最近一次回源耗时（秒，指数平滑），用于提前刷新的概率计算
+_recompute_seconds: Dict[str, float] = {}
+
+_MISSING = object()
+
+def _record_cache(prefix: str, result: str) -> None:
+    try:
+        from core.monitoring import metrics_collector
+        metrics_collector.record_cache(prefix, result)
+    except Exception:
+        pass  # 指标收集失败不影响缓存
+
+def _should_refresh_early(prefix: str, remaining_ttl: int) -> bool:
+    """
+    XFetch 概率提前刷新：剩余时间越短、回源越慢，越可能由本次调用提前回源，
+    把过期瞬间的集中回源分散到过期之前
+    """
+    beta = settings.CACHE_EARLY_REFRESH_BETA
+    if beta <= 0 or remaining_ttl < 0:
+        return False
+    delta = _recompute_seconds.get(prefix, 0.0)
+    return delta * beta * -math.log(1.0 - random.random()) >= remaining_ttl
+
+async def _load_single_flight(cache_key: str, prefix: str, ttl: int, loader: Callable[[], Awaitable[Any]]) -> Any:
+    """
+    执行原函数并写入两级缓存，同一键的并发调用共享一次执行结果
+
+    执行者被取消（如客户端断开）时不影响等待方：等待方重新查找，由其中一个接替执行
+    """
+    while True:
+        pending = _inflight.get(cache_key)
+        if pending is None:
+            break
+        _record_cache(prefix, "coalesced")
+        try:
+            return await asyncio.shield(pending)
+        except asyncio.CancelledError:
+            # 只有执行者被取消时继续；本调用自身被取消时照常抛出
+            if not pending.cancelled() or asyncio.current_task().cancelling():
+                raise
+
+    future = asyncio.get_running_loop().create_future()
+    _inflight[cache_key] = future
+    try:
+        start = time.perf_counter()
+        result = await loader()
+        elapsed = time.perf_counter() - start
+        previous = _recompute_seconds.get(prefix)
+        _recompute_seconds[prefix] = elapsed if previous is None else previous * 0.8 + elapsed * 0.2
+
+        # 存储到缓存，并按键前缀登记失效标签
+        success = await redis_client.set(cache_key, result, ttl, tags=redis_client.key_tags(cache_key))
+        if success:
+            logger.info(
+                "Cache populated for key '%s' (ttl=%s)", cache_key, ttl
+            )
+        else:
+            logger.warning("Failed to persist cache for key '%s'", cache_key)
+        if settings.CACHE_L1_ENABLED:
+            local_cache.set(cache_key, result, min(ttl, settings.CACHE_L1_TTL))
+
+        future.set_result(result)
+        return result
+    except asyncio.CancelledError:
+        future.cancel()
+        raise
+    except Exception as e:
+        future.set_exception(e)
+        # 没有其他等待方时避免 "exception was never retrieved" 警告
+        future.exception()
+        raise
+    finally:
+        _inflight.pop(cache_key, None)
+
 def cache_result(
     key_prefix: str,
     ttl: int = settings.CACHE_DEFAULT_TTL,
@@ -16,7 +98,10 @@ def cache_result(
 ):
     """
     缓存结果装饰器
-    
+
+    查找顺序：进程内缓存 -> Redis -> 执行原函数（同一键并发未命中只执行一次），
+    Redis 中的结果临近过期时按概率提前回源。
+
     Args:
         key_prefix: 缓存键前缀
         ttl: 缓存过期时间（秒）
@@ -33,34 +118,40 @@ def cache_result(
                 cache_key = redis_client.generate_cache_key(key_prefix, *args, **kwargs)
             else:
                 cache_key = key_prefix
-            
-            # 尝试从缓存获取
-            cached_result = await redis_client.get(cache_key)
-            if cached_result is not None:
-                logger.info("Cache hit for key '%s'", cache_key)
-                return cached_result
 
-            # 缓存未命中，执行原函数
-            logger.debug("Cache miss for key '%s', executing %s", cache_key, func.__name__)
-            result = await func(*args, **kwargs)
+            # 进程内缓存
+            if settings.CACHE_L1_ENABLED:
+                cached_result = local_cache.get(cache_key, _MISSING)
+                if cached_result is not _MISSING:
+                    _record_cache(key_prefix, "l1_hit")
+                    return cached_result
 
-            # 存储到缓存
-            success = await redis_client.set(cache_key, result, ttl)
-            if success:
-                logger.info(
-                    "Cache populated for key '%s' (ttl=%s)", cache_key, ttl
-                )
+            # Redis
+            cached_result, remaining_ttl = await redis_client.get_with_ttl(cache_key)
+            if cached_result is not None:
+                if not _should_refresh_early(key_prefix, remaining_ttl):
+                    logger.info("Cache hit for key '%s'", cache_key)
+                    _record_cache(key_prefix, "redis_hit")
+                    if settings.CACHE_L1_ENABLED:
+                        l1_ttl = settings.CACHE_L1_TTL if remaining_ttl < 0 else min(remaining_ttl, settings.CACHE_L1_TTL)
+                        local_cache.set(cache_key, cached_result, l1_ttl)
+                    return cached_result
+                _record_cache(key_prefix, "early_refresh")
             else:
-                logger.warning("Failed to persist cache for key '%s'", cache_key)
+                _record_cache(key_prefix, "miss")
 
-            return result
+            # 缓存未命中，执行原函数
+            logger.debug("Cache miss for key '%s', executing %s", cache_key, func.__name__)
+            return await _load_single_flight(
+                cache_key, key_prefix, ttl, lambda: func(*args, **kwargs)
+            )
         return wrapper
     return decorator
 
 def cache_invalidate(*patterns: str):
     """
     缓存失效装饰器
-    在函数执行成功后清除指定模式的缓存
+    在函数执行成功后清除指定模式的缓存（Redis 与各 worker 的进程内缓存）
     
     Args:
         patterns: 要清除的缓存键模式
@@ -74,6 +165,7 @@ def cache_invalidate(*patterns: str):
             # 清除相关缓存
             for pattern in patterns:
                 count = await redis_client.delete_pattern(pattern)
+                await invalidate_local(pattern)
                 if count > 0:
                     logger.info("Cache invalidated for pattern '%s' (%s keys)", pattern, count)
 
@@ -125,8 +217,8 @@ def cache_xiansuo_laiyuan(ttl: int = settings.CACHE_LONG_TTL):
             logger.debug("Cache miss for key '%s', executing %s", cache_key, func.__name__)
             result = await func(*args, **kwargs)
 
-            # 存储到缓存
-            success = await redis_client.set(cache_key, result, ttl)
+            # 存储到缓存，并按键前缀登记失效标签
+            success = await redis_client.set(cache_key, result, ttl, tags=redis_client.key_tags(cache_key))
             if success:
                 logger.info(
                     "Cache populated for key '%s' (ttl=%s)", cache_key, ttl
@@ -0,0 +1,64 @@
+"""
+事务提交后的缓存失效钩子
+
+进程内缓存（权限集合、审核规则索引等）需要在相关数据变更提交后失效：
+- after_flush：ORM 单条写入涉及指定模型时标记当前事务
+- do_orm_execute：ORM 批量 INSERT/UPDATE/DELETE 涉及指定模型时标记当前事务
+- after_commit：有标记时调用一次回调；after_rollback 丢弃标记
+
+标记保存在 session.info 中，每个注册各自独立；不经过 ORM 的写入（connection.execute）
+由调用方用 invalidate_on_commit 返回的函数手动标记。
+"""
+import itertools
+from typing import Callable, Iterable
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+def invalidate_on_commit(
+    models: Iterable[type],
+    callback: Callable[[Session], None]
+) -> Callable[[Session], None]:
+    """
+    注册提交后回调：事务写入 models 中任一模型时，提交后调用 callback(session)
+
+    Args:
+        models: 需要监听的模型类
+        callback: 提交后调用的函数，参数为提交的会话
+
+    Returns:
+        Callable[[Session], None]: 手动标记会话的函数，供不经过 ORM 的批量写入调用
+    """
+    models = tuple(models)
+    # 每个注册使用独立的标记键
+    dirty_key = object()
+
+    def mark_changes(session: Session, flush_context) -> None:
+        for obj in itertools.chain(session.new, session.dirty, session.deleted):
+            if isinstance(obj, models):
+                session.info[dirty_key] = True
+                return
+
+    def mark_bulk_changes(orm_execute_state) -> None:
+        if orm_execute_state.is_select:
+            return
+        mapper = orm_execute_state.bind_mapper
+        if mapper is not None and issubclass(mapper.class_, models):
+            orm_execute_state.session.info[dirty_key] = True
+
+    def on_commit(session: Session) -> None:
+        if session.info.pop(dirty_key, False):
+            callback(session)
+
+    def on_rollback(session: Session) -> None:
+        session.info.pop(dirty_key, None)
+
+    event.listen(Session, "after_flush", mark_changes)
+    event.listen(Session, "do_orm_execute", mark_bulk_changes)
+    event.listen(Session, "after_commit", on_commit)
+    event.listen(Session, "after_rollback", on_rollback)
+
+    def mark(session: Session) -> None:
+        session.info[dirty_key] = True
+
+    return mark
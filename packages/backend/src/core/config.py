@@ -22,6 +22,13 @@ class Settings(BaseSettings):
     # 数据库配置
     DATABASE_URL: PostgresDsn
 
+    # 数据库连接池配置（同步与异步引擎共用）
+    DB_POOL_SIZE: int = 10            # 连接池常驻连接数
+    DB_MAX_OVERFLOW: int = 20         # 超出常驻连接后允许的额外连接数
+    DB_POOL_TIMEOUT: int = 30         # 获取连接的等待超时（秒）
+    DB_POOL_RECYCLE: int = 1800       # 连接回收时间（秒），避免使用被服务端断开的连接
+    DB_POOL_PRE_PING: bool = True     # 取出连接前是否执行存活检测
+
     # Redis 配置
     REDIS_HOST: str = "localhost"
     REDIS_PORT: int = 6379
@@ -34,6 +41,47 @@ class Settings(BaseSettings):
     CACHE_LONG_TTL: int = 86400   # 24小时
     CACHE_SHORT_TTL: int = 60     # 1分钟
 
+    # cache_result 进程内一级缓存（前置于 Redis），多 worker 间通过 Redis pub/sub 同步失效
+    CACHE_L1_ENABLED: bool = True
+    CACHE_L1_MAX_SIZE: int = 1000       # 最大条目数，超出后按 LRU 淘汰
+    CACHE_L1_TTL: int = 30              # 进程内缓存时间（秒），不超过 Redis 剩余 TTL
+    # 提前刷新系数（XFetch），越大越早刷新，0 表示只在过期后刷新
+    CACHE_EARLY_REFRESH_BETA: float = 1.0
+
+    # 合同模板渲染缓存（进程内，条目数上限）
+    HETONG_TEMPLATE_CACHE_SIZE: int = 128   # 编译后的模板
+    HETONG_PREVIEW_CACHE_SIZE: int = 128    # 渲染后的预览
+
+    # 业务编号分配（core/sequence.py）：每个进程每次从编号序列表预分配的序号数量
+    SEQUENCE_BLOCK_SIZE: int = 10
+
+    # 服务工单统计汇总表（fuwu_gongdan_tongji），启用后工单变更时增量维护，
+    # 按单个执行人/客户的统计直接读取汇总表
+    FUWU_GONGDAN_ROLLUP_ENABLED: bool = False
+
+    # 合规日历分桶表（heguishixiang_rili），启用后合规事项实例变更时增量维护，
+    # 合规日历直接按年月读取分桶
+    HEGUISHIXIANG_RILI_ENABLED: bool = False
+
+    # 合规事项提醒调度器（需要 Redis，多个 worker 中只有一个调度）
+    HEGUISHIXIANG_TIXING_ENABLED: bool = False
+    HEGUISHIXIANG_TIXING_TICK_SECONDS: int = 1      # 调度刻度（秒）
+    HEGUISHIXIANG_TIXING_WINDOW_SECONDS: int = 600  # 每次加载的提醒时间窗口（秒）
+    HEGUISHIXIANG_TIXING_BATCH_SIZE: int = 500      # 每个刻度最多发送的提醒数量
+
+    # 文件上传（core/file_storage.py）
+    UPLOAD_DIR: str = "/var/www/uploads"               # 上传文件目录，挂载为 /uploads 静态文件
+    UPLOAD_TEMP_DIR: str = "/var/www/uploads_tmp"      # 上传中的临时文件与续传会话，需与 UPLOAD_DIR 在同一文件系统
+    UPLOAD_MAX_SIZE: int = 10 * 1024 * 1024            # 单个文件大小上限（字节）
+    UPLOAD_CHUNK_SIZE: int = 1024 * 1024               # 分块读写大小（字节）
+    UPLOAD_SESSION_TTL: int = 86400                    # 断点续传会话有效期（秒）
+    IMAGE_DERIVE_WORKERS: int = 2                      # 图片缩略图/预览图派生进程数（core/image_derivatives.py）
+
+    # 支付回调处理队列（services/zhifu_guanli/zhifu_huidiao_worker.py）
+    ZHIFU_HUIDIAO_POLL_SECONDS: float = 2.0            # 队列为空时的轮询间隔（秒）
+    ZHIFU_HUIDIAO_BATCH_SIZE: int = 200                # 每批处理的回调数量
+    ZHIFU_HUIDIAO_MAX_RETRIES: int = 5                 # 处理异常时的最大重试次数
+
     # CORS 配置
     BACKEND_CORS_ORIGINS: List[AnyHttpUrl] = []
 
@@ -47,6 +95,12 @@ class Settings(BaseSettings):
     RATE_LIMIT_MAX_REQUESTS: int = 200        # 每个 IP 每分钟最大请求数
     RATE_LIMIT_WINDOW_SECONDS: int = 60       # 限流时间窗口（秒）
 
+    # SQL 语句统计（请求级 SQL 条数/耗时，超出预算或疑似 N+1 时记录警告）
+    DB_PROFILER_ENABLED: bool = False            # 是否启用，启用后响应头返回 X-DB-Queries / X-DB-Time
+    DB_QUERY_BUDGET_DEFAULT: int = 50            # 单个请求默认 SQL 条数预算
+    DB_QUERY_BUDGETS: Dict[str, int] = {}        # 按路由覆盖预算，键为 "GET /api/v1/xxx/{id}"
+    DB_REPEATED_STATEMENT_THRESHOLD: int = 10    # 同一语句形状重复达到该次数视为疑似 N+1
+
     # Sentry 错误监控配置
     SENTRY_DSN: Optional[str] = None          # Sentry DSN，为空则不启用
     SENTRY_ENVIRONMENT: str = "development"   # 环境标识
@@ -62,6 +116,14 @@ class Settings(BaseSettings):
             return v
         raise ValueError(v)
 
+    def get_async_database_url(self) -> str:
+        """获取异步数据库连接URL（asyncpg 驱动）"""
+        url = str(self.DATABASE_URL)
+        scheme, _, rest = url.partition("://")
+        if scheme == "postgresql+asyncpg":
+            return url
+        return f"postgresql+asyncpg://{rest}"
+
     def get_redis_url(self) -> str:
         """获取Redis连接URL"""
         if self.REDIS_URL:
@@ -1,18 +1,42 @@
 """
 数据库配置和会话管理
+
+- 同步引擎 / SessionLocal：供现有同步服务使用
+- 异步引擎 / AsyncSessionLocal：基于 asyncpg，供高并发读接口使用，避免查询阻塞事件循环
 """
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
 from core.config import settings
 
+# 连接池参数（同步与异步引擎共用）
+_pool_options = {
+    "pool_size": settings.DB_POOL_SIZE,
+    "max_overflow": settings.DB_MAX_OVERFLOW,
+    "pool_timeout": settings.DB_POOL_TIMEOUT,
+    "pool_recycle": settings.DB_POOL_RECYCLE,
+    "pool_pre_ping": settings.DB_POOL_PRE_PING,
+}
+
 # 创建数据库引擎
-engine = create_engine(str(settings.DATABASE_URL))
+engine = create_engine(str(settings.DATABASE_URL), **_pool_options)
 
 # 创建会话工厂
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# 创建异步数据库引擎（asyncpg）
+async_engine = create_async_engine(settings.get_async_database_url(), **_pool_options)
+
+# 创建异步会话工厂（提交后不过期对象，便于在会话关闭后序列化响应）
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False,
+)
+
 # 创建基础模型类
 Base = declarative_base()
 
@@ -23,3 +47,8 @@ def get_db():
         yield db
     finally:
         db.close()
+
+async def get_async_db():
+    """获取异步数据库会话"""
+    async with AsyncSessionLocal() as db:
+        yield db
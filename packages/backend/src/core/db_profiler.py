@@ -0,0 +1,108 @@
+"""
+请求级 SQL 语句统计
+
+通过 SQLAlchemy 引擎事件记录每个请求执行的 SQL 条数、数据库总耗时，
+并按“语句形状”（去掉参数、IN 列表长度与字面量后的 SQL）计数，
+同一形状在一个请求内反复出现通常意味着循环内逐行查询（N+1）。
+
+统计对象保存在 ContextVar 中：中间件在请求开始时放入一个 QueryStats，
+线程池中执行的同步接口与异步接口都会复制该上下文，因此写入的是同一对象。
+
+用法：
+    token = start_profiling()
+    try:
+        ...
+    finally:
+        stats = stop_profiling(token)
+"""
+import re
+import time
+from collections import Counter
+from contextvars import ContextVar, Token
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+_current_stats: ContextVar[Optional["QueryStats"]] = ContextVar("db_query_stats", default=None)
+
+_installed = False
+
+# 语句形状归一化规则
+_WHITESPACE_RE = re.compile(r"\s+")
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST_RE = re.compile(r"\bIN\s*\((?:[^()]*)\)", re.IGNORECASE)
+_LIMIT_RE = re.compile(r"\b(LIMIT|OFFSET)\s+\S+", re.IGNORECASE)
+
+# 日志中语句形状的最大长度
+MAX_SHAPE_LENGTH = 300
+
+@dataclass
+class QueryStats:
+    """单个请求的 SQL 统计"""
+
+    count: int = 0
+    total_ms: float = 0.0
+    shapes: Counter = field(default_factory=Counter)
+
+    def record(self, statement: str, duration_ms: float) -> None:
+        self.count += 1
+        self.total_ms += duration_ms
+        self.shapes[normalize_statement(statement)] += 1
+
+    def repeated_shapes(self, threshold: int) -> List[Tuple[str, int]]:
+        """出现次数达到阈值的语句形状，按次数倒序"""
+        return [(shape, n) for shape, n in self.shapes.most_common() if n >= threshold]
+
+def normalize_statement(statement: str) -> str:
+    """将 SQL 归一化为语句形状，参数值与 IN 列表长度不同的同类查询归为一类"""
+    shape = _STRING_RE.sub("?", statement)
+    shape = _IN_LIST_RE.sub("IN (?)", shape)
+    shape = _LIMIT_RE.sub(r"\1 ?", shape)
+    shape = _NUMBER_RE.sub("?", shape)
+    return _WHITESPACE_RE.sub(" ", shape).strip()[:MAX_SHAPE_LENGTH]
+
+def start_profiling() -> Token:
+    """为当前上下文开始统计"""
+    return _current_stats.set(QueryStats())
+
+def stop_profiling(token: Token) -> QueryStats:
+    """结束统计并返回结果"""
+    stats = _current_stats.get() or QueryStats()
+    _current_stats.reset(token)
+    return stats
+
+def get_current_stats() -> Optional[QueryStats]:
+    """当前上下文的统计对象，未开启统计时为 None"""
+    return _current_stats.get()
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current_stats.get() is not None:
+        conn.info.setdefault("_db_profiler_start", []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current_stats.get()
+    if stats is None:
+        return
+    starts = conn.info.get("_db_profiler_start")
+    if not starts:
+        return
+    stats.record(statement, (time.perf_counter() - starts.pop()) * 1000)
+
+def _handle_error(exception_context):
+    # 执行失败时不会触发 after_cursor_execute，丢弃对应的开始时间
+    conn = exception_context.connection
+    if conn is not None and conn.info.get("_db_profiler_start"):
+        conn.info["_db_profiler_start"].pop()
+
+def install_db_profiler() -> None:
+    """在 Engine 类上注册事件（同步引擎与异步引擎底层的 sync_engine 均生效），重复调用无副作用"""
+    global _installed
+    if _installed:
+        return
+    event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(Engine, "handle_error", _handle_error)
+    _installed = True
@@ -0,0 +1,376 @@
+"""
+上传文件存储（按内容寻址）
+
+- 上传内容按块读取，写入与哈希计算都在线程池中进行，不阻塞事件循环；边写边计算 SHA-256、边检查大小，
+  超出上限立即中止
+- 文件按 SHA-256 存放为 <分类>/<哈希前两位>/<哈希><扩展名>，同一文件重复上传只保存一份
+- 断点续传：先创建上传会话，再按偏移量分块追加，中断后查询会话获取已接收的偏移量继续上传；
+  会话元数据与未完成的数据保存在 UPLOAD_TEMP_DIR（多个 worker 共享），接收完毕后计算哈希并转入正式目录；
+  每次追加数据都会刷新会话的最后活动时间，超过 UPLOAD_SESSION_TTL 没有活动的会话才会被清理
+- Starlette 会先把整个 multipart 请求体解析落盘再调用接口函数，UploadSizeLimitRoute 在解析前按
+  Content-Length 拒绝超限的上传，没有 Content-Length 时边接收边计数
+- 转入正式目录用 os.replace 原子重命名；UPLOAD_TEMP_DIR 与 UPLOAD_DIR 不在同一文件系统时，
+  先复制到 UPLOAD_DIR 下的暂存目录再重命名，正式路径上不会出现写了一半的文件
+
+临时目录不在静态文件目录下，未完成的上传不会被访问到。
+"""
+import asyncio
+import errno
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import time
+import uuid
+from typing import Any, AsyncIterator, BinaryIO, Callable, Coroutine, Dict, NamedTuple, Optional
+
+from fastapi import HTTPException, UploadFile
+from fastapi.routing import APIRoute
+from starlette.requests import Request
+from starlette.responses import Response
+
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# 允许的存储分类（对应 /uploads/<分类>/）
+CATEGORIES = ("images", "files")
+
+_EXT_PATTERN = re.compile(r"\.[a-z0-9]{1,10}")
+_SESSION_ID_PATTERN = re.compile(r"[0-9a-f]{32}")
+
+# multipart 请求体中分隔符、各部分头部与普通表单字段的余量
+_MULTIPART_OVERHEAD = 64 * 1024
+
+class StoredFile(NamedTuple):
+    """已保存的文件"""
+    url: str
+    sha256: str
+    size: int
+    deduplicated: bool   # 相同内容已存在，本次未重复保存
+
+def normalize_ext(filename: Optional[str]) -> str:
+    """取文件扩展名（小写），不合法的扩展名忽略"""
+    ext = os.path.splitext(filename or "")[1].lower()
+    return ext if _EXT_PATTERN.fullmatch(ext) else ""
+
+def _size_limit_detail(max_size: int) -> str:
+    return f"文件大小不能超过{max_size // (1024 * 1024)}MB"
+
+class UploadSizeLimitRoute(APIRoute):
+    """
+    multipart 上传在解析请求体之前限制大小的路由类
+
+    Content-Length 超过 max_size（加上 multipart 余量）时直接返回 413；
+    分块传输没有 Content-Length 时边接收边计数，超过上限立即中止，不再继续落盘
+    """
+
+    max_size: int = settings.UPLOAD_MAX_SIZE
+
+    def get_route_handler(self) -> Callable[[Request], Coroutine[Any, Any, Response]]:
+        handler = super().get_route_handler()
+        max_size = self.max_size
+        limit = max_size + _MULTIPART_OVERHEAD
+
+        async def limited_handler(request: Request) -> Response:
+            if not request.headers.get("content-type", "").startswith("multipart/form-data"):
+                return await handler(request)
+            content_length = request.headers.get("content-length", "")
+            if content_length.isdigit() and int(content_length) > limit:
+                raise HTTPException(status_code=413, detail=_size_limit_detail(max_size))
+
+            received = 0
+            receive = request.receive
+
+            async def limited_receive():
+                nonlocal received
+                message = await receive()
+                if message["type"] == "http.request":
+                    received += len(message.get("body", b""))
+                    if received > limit:
+                        raise HTTPException(status_code=413, detail=_size_limit_detail(max_size))
+                return message
+
+            return await handler(Request(request.scope, limited_receive))
+
+        return limited_handler
+
+class FileStorage:
+    """按内容寻址的上传文件存储"""
+
+    def __init__(
+        self,
+        root: str = settings.UPLOAD_DIR,
+        temp_dir: str = settings.UPLOAD_TEMP_DIR,
+        url_prefix: str = "/uploads",
+        chunk_size: int = settings.UPLOAD_CHUNK_SIZE
+    ):
+        self.root = root
+        self.temp_dir = temp_dir
+        self.url_prefix = url_prefix
+        self.chunk_size = chunk_size
+
+    # ---------- 普通上传 ----------
+
+    async def save_upload(self, file: UploadFile, category: str, max_size: int) -> StoredFile:
+        """
+        分块保存上传文件
+
+        Raises:
+            HTTPException: 文件超过 max_size
+        """
+        if file.size is not None and file.size > max_size:
+            raise HTTPException(status_code=400, detail=_size_limit_detail(max_size))
+
+        async def chunks() -> AsyncIterator[bytes]:
+            while True:
+                chunk = await file.read(self.chunk_size)
+                if not chunk:
+                    return
+                yield chunk
+
+        return await self.save_stream(chunks(), category, normalize_ext(file.filename), max_size)
+
+    async def save_stream(self, chunks: AsyncIterator[bytes], category: str, ext: str, max_size: int) -> StoredFile:
+        """保存数据流：写入临时文件的同时计算哈希，完成后按哈希转入正式目录"""
+        self._check_category(category)
+        os.makedirs(self.temp_dir, exist_ok=True)
+        temp_path = os.path.join(self.temp_dir, f"{uuid.uuid4().hex}.tmp")
+        digest = hashlib.sha256()
+        size = 0
+        handle = await asyncio.to_thread(open, temp_path, "wb")
+        try:
+            async for chunk in chunks:
+                size += len(chunk)
+                if size > max_size:
+                    raise HTTPException(status_code=400, detail=_size_limit_detail(max_size))
+                await asyncio.to_thread(_write_chunk, handle, digest, chunk)
+            await asyncio.to_thread(handle.close)
+            return await asyncio.to_thread(self._commit, temp_path, category, ext, digest.hexdigest(), size)
+        except BaseException:
+            handle.close()
+            _remove_quietly(temp_path)
+            raise
+
+    def _commit(self, temp_path: str, category: str, ext: str, sha256: str, size: int) -> StoredFile:
+        """临时文件转入 <分类>/<哈希前两位>/<哈希><扩展名>，已存在相同内容时丢弃临时文件"""
+        relative = f"{category}/{sha256[:2]}/{sha256}{ext}"
+        path = os.path.join(self.root, relative)
+        deduplicated = os.path.exists(path)
+        if deduplicated:
+            os.remove(temp_path)
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # 原子重命名，并发上传相同内容时后写入的覆盖先写入的，内容一致
+            try:
+                os.replace(temp_path, path)
+            except OSError as e:
+                if e.errno != errno.EXDEV:
+                    raise
+                self._replace_across_devices(temp_path, path)
+        return StoredFile(f"{self.url_prefix}/{relative}", sha256, size, deduplicated)
+
+    def _replace_across_devices(self, temp_path: str, path: str) -> None:
+        """临时目录在其他文件系统：先完整复制到 UPLOAD_DIR 下的暂存目录，再原子重命名到正式路径"""
+        staging_dir = os.path.join(self.root, ".staging")
+        os.makedirs(staging_dir, exist_ok=True)
+        staging_path = os.path.join(staging_dir, f"{uuid.uuid4().hex}.tmp")
+        try:
+            shutil.copyfile(temp_path, staging_path)
+            os.replace(staging_path, path)
+        except BaseException:
+            _remove_quietly(staging_path)
+            raise
+        os.remove(temp_path)
+
+    @staticmethod
+    def _check_category(category: str) -> None:
+        if category not in CATEGORIES:
+            raise ValueError(f"不支持的存储分类: {category}")
+
+    # ---------- 断点续传 ----------
+
+    def _session_paths(self, session_id: str):
+        if not _SESSION_ID_PATTERN.fullmatch(session_id):
+            raise HTTPException(status_code=404, detail="上传会话不存在或已过期")
+        base = os.path.join(self.temp_dir, "sessions", session_id)
+        return f"{base}.json", f"{base}.part"
+
+    def create_session(self, owner_id: str, filename: str, size: int, content_type: Optional[str],
+                       category: str, max_size: int) -> Dict[str, Any]:
+        """
+        创建断点续传会话
+
+        Returns:
+            Dict: 会话信息（session_id、offset 等）
+        """
+        self._check_category(category)
+        if size <= 0:
+            raise HTTPException(status_code=400, detail="文件大小必须大于0")
+        if size > max_size:
+            raise HTTPException(status_code=400, detail=_size_limit_detail(max_size))
+
+        self.purge_expired_sessions()
+        session_id = uuid.uuid4().hex
+        meta_path, part_path = self._session_paths(session_id)
+        os.makedirs(os.path.dirname(meta_path), exist_ok=True)
+        meta = {
+            "session_id": session_id,
+            "owner_id": owner_id,
+            "filename": filename,
+            "size": size,
+            "content_type": content_type,
+            "category": category,
+            "created_at": time.time(),
+        }
+        open(part_path, "wb").close()
+        with open(meta_path, "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False)
+        return self._session_info(meta, 0, meta["created_at"])
+
+    def get_session(self, session_id: str, owner_id: str) -> Dict[str, Any]:
+        """查询会话及已接收的偏移量"""
+        meta = self._load_session(session_id, owner_id)
+        meta_path, part_path = self._session_paths(session_id)
+        try:
+            last_active = os.path.getmtime(meta_path)
+            received = os.path.getsize(part_path)
+        except FileNotFoundError:
+            raise HTTPException(status_code=404, detail="上传会话不存在或已过期")
+        return self._session_info(meta, received, last_active)
+
+    async def append_session(self, session_id: str, owner_id: str, offset: int,
+                             chunks: AsyncIterator[bytes]) -> Dict[str, Any]:
+        """
+        从 offset 处追加数据，接收完毕时完成上传
+
+        Raises:
+            HTTPException: 会话不存在(404)、偏移量与已接收数据不一致或会话正在被其他请求写入(409)、
+                数据超过声明的文件大小(400)
+        """
+        meta = await asyncio.to_thread(self._load_session, session_id, owner_id)
+        meta_path, part_path = self._session_paths(session_id)
+        handle = await asyncio.to_thread(self._open_part, part_path)
+        try:
+            received = os.fstat(handle.fileno()).st_size
+            if offset != received:
+                raise HTTPException(
+                    status_code=409,
+                    detail=f"偏移量不一致，已接收 {received} 字节，请从该位置继续上传"
+                )
+            await asyncio.to_thread(_touch_session, meta_path)
+            try:
+                async for chunk in chunks:
+                    received += len(chunk)
+                    if received > meta["size"]:
+                        raise HTTPException(status_code=400, detail="上传内容超过声明的文件大小")
+                    await asyncio.to_thread(handle.write, chunk)
+            except BaseException:
+                # 丢弃本次请求中未完整接收的数据，客户端从原偏移量重传
+                await asyncio.to_thread(_truncate, handle, offset)
+                raise
+            await asyncio.to_thread(handle.flush)
+            last_active = await asyncio.to_thread(_touch_session, meta_path)
+        finally:
+            handle.close()
+
+        if received < meta["size"]:
+            return self._session_info(meta, received, last_active)
+
+        stored = await asyncio.to_thread(self._finish_session, meta, meta_path, part_path)
+        info = self._session_info(meta, received, last_active)
+        info.update(completed=True, url=stored.url, sha256=stored.sha256, deduplicated=stored.deduplicated)
+        return info
+
+    def _finish_session(self, meta: Dict[str, Any], meta_path: str, part_path: str) -> StoredFile:
+        digest = hashlib.sha256()
+        with open(part_path, "rb") as f:
+            for chunk in iter(lambda: f.read(self.chunk_size), b""):
+                digest.update(chunk)
+        stored = self._commit(part_path, meta["category"], normalize_ext(meta["filename"]),
+                              digest.hexdigest(), meta["size"])
+        _remove_quietly(meta_path)
+        return stored
+
+    def _load_session(self, session_id: str, owner_id: str) -> Dict[str, Any]:
+        meta_path, _ = self._session_paths(session_id)
+        try:
+            with open(meta_path, encoding="utf-8") as f:
+                meta = json.load(f)
+        except FileNotFoundError:
+            raise HTTPException(status_code=404, detail="上传会话不存在或已过期")
+        if meta["owner_id"] != owner_id:
+            raise HTTPException(status_code=404, detail="上传会话不存在或已过期")
+        return meta
+
+    @staticmethod
+    def _open_part(part_path: str) -> BinaryIO:
+        """以追加方式打开会话数据并加排他锁，同一会话同时只允许一个请求写入"""
+        try:
+            handle = open(part_path, "ab")
+        except FileNotFoundError:
+            raise HTTPException(status_code=404, detail="上传会话不存在或已过期")
+        try:
+            fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            handle.close()
+            raise HTTPException(status_code=409, detail="该上传会话正在上传中")
+        return handle
+
+    @staticmethod
+    def _session_info(meta: Dict[str, Any], offset: int, last_active: float) -> Dict[str, Any]:
+        return {
+            "session_id": meta["session_id"],
+            "filename": meta["filename"],
+            "size": meta["size"],
+            "content_type": meta["content_type"],
+            "offset": offset,
+            "completed": False,
+            "expires_at": last_active + settings.UPLOAD_SESSION_TTL,
+        }
+
+    def purge_expired_sessions(self) -> int:
+        """删除超过 UPLOAD_SESSION_TTL 没有上传活动（元数据文件修改时间）的未完成会话，返回删除数量"""
+        session_dir = os.path.join(self.temp_dir, "sessions")
+        if not os.path.isdir(session_dir):
+            return 0
+        deadline = time.time() - settings.UPLOAD_SESSION_TTL
+        purged = 0
+        with os.scandir(session_dir) as entries:
+            for entry in entries:
+                if entry.name.endswith(".json") and entry.stat().st_mtime < deadline:
+                    _remove_quietly(entry.path)
+                    _remove_quietly(entry.path[:-len(".json")] + ".part")
+                    purged += 1
+        if purged:
+            logger.info(f"已清理过期上传会话 {purged} 个")
+        return purged
+
+def _touch_session(meta_path: str) -> float:
+    """刷新会话的最后活动时间（元数据文件修改时间）"""
+    now = time.time()
+    try:
+        os.utime(meta_path, (now, now))
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="上传会话不存在或已过期")
+    return now
+
+def _write_chunk(handle: BinaryIO, digest: Any, chunk: bytes) -> None:
+    # 哈希计算与写入都在线程中执行（hashlib 处理大块数据时释放 GIL）
+    digest.update(chunk)
+    handle.write(chunk)
+
+def _truncate(handle: BinaryIO, size: int) -> None:
+    handle.flush()
+    handle.truncate(size)
+
+def _remove_quietly(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+file_storage = FileStorage()
@@ -0,0 +1,176 @@
+"""
+上传图片的缩略图 / 预览图
+
+凭证等图片上传后在后台进程池中派生 WebP 缩略图（thumb）与中等尺寸预览图（preview），
+保存为 <UPLOAD_DIR>/derived/<键前两位>/<键>_<规格>.webp：
+- 按内容寻址保存的图片（见 core/file_storage.py）以文件名中的 SHA-256 为键，相同图片只派生一次；
+  早期按日期目录保存的图片以其路径的 SHA-256 为键
+- 上传后立即提交派生任务，不等待完成；接口首次请求时若尚未生成则当场生成（同一图片同时只有一个派生任务）
+- 同一张原图只解码一次，按尺寸从大到小依次缩小；JPEG 解码时直接按目标尺寸缩放（draft），
+  手机拍摄的大图也只需解码一小部分像素
+
+未安装 Pillow 时不派生，接口直接返回原图。
+"""
+import asyncio
+import hashlib
+import logging
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
+
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+try:
+    from PIL import Image, ImageOps
+    PIL_AVAILABLE = True
+except ImportError:
+    logger.warning("Pillow未正确安装，图片缩略图功能将不可用")
+    PIL_AVAILABLE = False
+
+class Variant(NamedTuple):
+    """派生图规格"""
+    max_edge: int    # 长边像素
+    quality: int     # WebP 质量
+
+VARIANTS: Dict[str, Variant] = {
+    "thumb": Variant(256, 75),
+    "preview": Variant(1280, 80),
+}
+
+IMAGE_EXTS = (".jpg", ".jpeg", ".png", ".gif", ".webp")
+UPLOAD_URL_PREFIX = "/uploads/"
+
+_SHA256_PATTERN = re.compile(r"[0-9a-f]{64}")
+
+def is_image_path(path: str) -> bool:
+    return os.path.splitext(path)[1].lower() in IMAGE_EXTS
+
+def derivative_url(file_url: Optional[str], variant: str) -> Optional[str]:
+    """上传文件URL（/uploads/...）对应的派生图接口URL，非图片返回 None"""
+    if not file_url or not file_url.startswith(UPLOAD_URL_PREFIX) or not is_image_path(file_url):
+        return None
+    return f"{settings.API_V1_STR}/upload/derived/{variant}/{file_url[len(UPLOAD_URL_PREFIX):]}"
+
+def derivative_key(relative_path: str) -> str:
+    """派生图的键：内容寻址文件取文件名中的哈希，其他文件取路径哈希"""
+    stem = os.path.splitext(os.path.basename(relative_path))[0]
+    if _SHA256_PATTERN.fullmatch(stem):
+        return stem
+    return hashlib.sha256(relative_path.encode("utf-8")).hexdigest()
+
+def render_derivatives(source_path: str, targets: List[Tuple[int, int, str]]) -> None:
+    """
+    从原图生成派生图（在进程池中执行）
+
+    Args:
+        source_path: 原图路径
+        targets: [(长边像素, WebP 质量, 保存路径)]
+    """
+    targets = sorted(targets, reverse=True)
+    with Image.open(source_path) as opened:
+        largest = targets[0][0]
+        # JPEG 按 1/2、1/4、1/8 缩放解码，只保证不小于最大的目标尺寸
+        opened.draft("RGB", (largest, largest))
+        image = ImageOps.exif_transpose(opened)
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if "transparency" in image.info or image.mode in ("LA", "PA") else "RGB")
+        for max_edge, quality, dest in targets:
+            image.thumbnail((max_edge, max_edge), Image.LANCZOS)
+            os.makedirs(os.path.dirname(dest), exist_ok=True)
+            temp = f"{dest}.{os.getpid()}.tmp"
+            image.save(temp, "WEBP", quality=quality, method=4)
+            os.replace(temp, dest)
+
+class ImageDeriver:
+    """图片派生任务调度（进程池）"""
+
+    def __init__(self, root: str = settings.UPLOAD_DIR, workers: int = settings.IMAGE_DERIVE_WORKERS):
+        self.root = os.path.realpath(root)
+        self.workers = workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+        # 派生键 -> 进行中的派生任务
+        self._inflight: Dict[str, asyncio.Future] = {}
+        # 上传后提交、尚未完成的派生任务（保持引用，避免任务被回收）
+        self._pending_tasks: Set[asyncio.Task] = set()
+
+    def _derived_path(self, key: str, variant: str) -> str:
+        return os.path.join(self.root, "derived", key[:2], f"{key}_{variant}.webp")
+
+    def source_path(self, relative_path: str) -> Optional[str]:
+        """上传目录内的原图路径，不存在、不是图片或越出上传目录时返回 None"""
+        path = os.path.realpath(os.path.join(self.root, relative_path))
+        if not path.startswith(self.root + os.sep) or not is_image_path(path) or not os.path.isfile(path):
+            return None
+        return path
+
+    def schedule(self, file_url: str) -> None:
+        """上传后提交派生任务，不等待完成"""
+        if not PIL_AVAILABLE or not file_url.startswith(UPLOAD_URL_PREFIX) or not is_image_path(file_url):
+            return
+        task = asyncio.ensure_future(self.ensure(file_url[len(UPLOAD_URL_PREFIX):]))
+        self._pending_tasks.add(task)
+        task.add_done_callback(self._on_scheduled_done)
+
+    def _on_scheduled_done(self, task: asyncio.Task) -> None:
+        self._pending_tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning(f"后台图片派生任务失败: {task.exception()}")
+
+    async def ensure(self, relative_path: str, variant: Optional[str] = None) -> Optional[str]:
+        """
+        确保派生图已生成
+
+        Args:
+            relative_path: 原图相对上传目录的路径
+            variant: 需要的规格，为空表示全部规格
+
+        Returns:
+            Optional[str]: 指定规格的派生图路径（未安装 Pillow 时为原图路径），原图不存在时为 None
+        """
+        source = self.source_path(relative_path)
+        if source is None:
+            return None
+        if not PIL_AVAILABLE:
+            return source
+
+        key = derivative_key(relative_path)
+        wanted = self._derived_path(key, variant) if variant else None
+        if wanted and os.path.exists(wanted):
+            return wanted
+
+        future = self._inflight.get(key)
+        if future is None:
+            missing = [
+                (spec.max_edge, spec.quality, self._derived_path(key, name))
+                for name, spec in VARIANTS.items()
+                if not os.path.exists(self._derived_path(key, name))
+            ]
+            if not missing:
+                return wanted
+            loop = asyncio.get_running_loop()
+            future = loop.run_in_executor(self._get_executor(), render_derivatives, source, missing)
+            self._inflight[key] = future
+            future.add_done_callback(lambda _: self._inflight.pop(key, None))
+        try:
+            await asyncio.shield(future)
+        except Exception as e:
+            # 原图损坏或格式不支持时退回原图
+            logger.warning(f"图片派生失败: {relative_path}, {e}")
+            return source
+        return wanted
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        return self._executor
+
+    def shutdown(self) -> None:
+        """关闭进程池（应用关闭时调用）"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+image_deriver = ImageDeriver()
@@ -0,0 +1,122 @@
+"""
+进程内缓存（cache_result 的一级缓存）
+
+cache_result 的查找顺序：进程内 LRU -> Redis -> 执行原函数。
+- 进程内缓存有容量上限（LRU 淘汰）与短 TTL，且不超过 Redis 中剩余的 TTL
+- 多个 worker 之间通过 Redis pub/sub 广播失效模式，收到后淘汰本进程内匹配的条目；
+  Redis 不可用时只能依赖短 TTL 兜底
+- 进程内缓存直接保存原函数返回的对象，调用方不应修改返回值
+- LocalCache 也会在线程池中被访问（同步端点、批量生成），读写均在锁内完成
+"""
+import asyncio
+import fnmatch
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Tuple
+
+from core.config import settings
+from core.redis_client import redis_client
+
+logger = logging.getLogger(__name__)
+
+# 失效广播频道
+INVALIDATE_CHANNEL = "cache:l1:invalidate"
+
+# 失效广播订阅中断后的重试间隔（秒，指数退避）
+_LISTENER_RETRY_MIN_SECONDS = 1
+_LISTENER_RETRY_MAX_SECONDS = 30
+
+class LocalCache:
+    """带 TTL 的有界 LRU 缓存"""
+
+    def __init__(self, max_size: int = settings.CACHE_L1_MAX_SIZE):
+        self.max_size = max_size
+        # key -> (过期时间, 值)
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return default
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        if ttl <= 0 or self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def delete_pattern(self, pattern: str) -> int:
+        """按 Redis 风格的通配模式淘汰条目"""
+        with self._lock:
+            matched = [key for key in self._entries if fnmatch.fnmatchcase(key, pattern)]
+            for key in matched:
+                del self._entries[key]
+        return len(matched)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+local_cache = LocalCache()
+
+async def invalidate_local(pattern: str) -> None:
+    """淘汰本进程匹配的条目，并广播给其他 worker"""
+    local_cache.delete_pattern(pattern)
+    if not redis_client.is_connected:
+        return
+    try:
+        await redis_client.redis.publish(INVALIDATE_CHANNEL, pattern)
+    except Exception as e:
+        logger.warning("Publish L1 invalidation for '%s' failed: %s", pattern, e)
+
+async def run_invalidation_listener() -> None:
+    """
+    订阅失效广播并淘汰本进程条目（应用启动时作为后台任务运行）
+
+    订阅中断后按退避间隔重新订阅，直到任务被取消
+    """
+    delay = _LISTENER_RETRY_MIN_SECONDS
+    while True:
+        if redis_client.is_connected:
+            pubsub = redis_client.redis.pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.subscribe(INVALIDATE_CHANNEL)
+                # 重新订阅前可能错过失效消息，清空本进程缓存
+                local_cache.clear()
+                delay = _LISTENER_RETRY_MIN_SECONDS
+                async for message in pubsub.listen():
+                    if message and message.get("type") == "message":
+                        local_cache.delete_pattern(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # 订阅中断后清空本进程缓存，避免错过失效消息导致读到旧数据
+                local_cache.clear()
+                logger.warning("L1 invalidation listener interrupted, resubscribing in %ss: %s", delay, e)
+            finally:
+                try:
+                    await pubsub.close()
+                except Exception:
+                    pass
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, _LISTENER_RETRY_MAX_SECONDS)
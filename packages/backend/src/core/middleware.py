@@ -5,10 +5,11 @@
 - 请求日志中间件
 - 请求追踪 ID 中间件
 - 性能监控中间件
+- SQL 语句统计中间件
 - 全局限流中间件
 """
 import time
-from typing import Callable, Optional
+from typing import Callable, Dict, Optional
 from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.requests import Request
 from starlette.responses import Response, JSONResponse
@@ -169,6 +170,91 @@ class PerformanceMiddleware(BaseHTTPMiddleware):
 
         return response
 
+class DBProfilerMiddleware(BaseHTTPMiddleware):
+    """
+    SQL 语句统计中间件
+
+    功能：
+    - 统计每个请求执行的 SQL 条数与数据库耗时，返回 X-DB-Queries / X-DB-Time 响应头
+    - 超出路由预算或同一语句形状重复执行（疑似 N+1）时记录警告
+    - 按路由模板汇总到 Prometheus 指标
+    """
+
+    SKIP_PATHS = {"/health", "/", "/favicon.ico", "/metrics"}
+
+    def __init__(
+        self,
+        app,
+        default_budget: int = 50,
+        route_budgets: Optional[Dict[str, int]] = None,
+        repeated_threshold: int = 10
+    ):
+        super().__init__(app)
+        self.default_budget = default_budget
+        self.route_budgets = route_budgets or {}
+        self.repeated_threshold = repeated_threshold
+
+        from core.db_profiler import install_db_profiler
+        install_db_profiler()
+
+    async def dispatch(self, request: Request, call_next: Callable) -> Response:
+        if request.url.path in self.SKIP_PATHS:
+            return await call_next(request)
+
+        from core.db_profiler import start_profiling, stop_profiling
+
+        token = start_profiling()
+        try:
+            response = await call_next(request)
+        finally:
+            stats = stop_profiling(token)
+
+        response.headers["X-DB-Queries"] = str(stats.count)
+        response.headers["X-DB-Time"] = f"{stats.total_ms:.2f}ms"
+
+        # 使用路由模板而非实际路径，避免指标按 ID 膨胀
+        route = request.scope.get("route")
+        route_path = getattr(route, "path", None) or request.url.path
+        route_key = f"{request.method} {route_path}"
+        budget = self.route_budgets.get(route_key, self.default_budget)
+        repeated = stats.repeated_shapes(self.repeated_threshold)
+
+        if stats.count > budget:
+            logger.warning(
+                f"SQL 语句超出预算: {route_key} 执行 {stats.count} 条（预算 {budget}）",
+                extra={"extra_data": {
+                    "db_queries": stats.count,
+                    "db_time_ms": round(stats.total_ms, 2),
+                    "budget": budget
+                }}
+            )
+        if repeated:
+            shape, times = repeated[0]
+            logger.warning(
+                f"疑似 N+1 查询: {route_key} 同一语句执行 {times} 次",
+                extra={"extra_data": {
+                    "statement": shape,
+                    "repeated_statements": [
+                        {"statement": s, "count": n} for s, n in repeated[:5]
+                    ]
+                }}
+            )
+
+        try:
+            from core.monitoring import metrics_collector
+            metrics_collector.record_db_queries(
+                request.method,
+                route_path,
+                stats.count,
+                stats.total_ms,
+                budget_exceeded=stats.count > budget,
+                repeated=bool(repeated)
+            )
+        except Exception:
+            pass  # 指标收集失败不影响请求处理
+
+        return response
+
 class RateLimitMiddleware(BaseHTTPMiddleware):
     """
     全局限流中间件
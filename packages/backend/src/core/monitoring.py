@@ -9,7 +9,7 @@
 import time
 import asyncio
 from datetime import datetime
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Tuple
 from dataclasses import dataclass, field
 from collections import defaultdict
 
@@ -32,6 +32,17 @@ class MetricsCollector:
     # 错误计数
     error_count: Dict[str, int] = field(default_factory=lambda: defaultdict(int))
     
+    # SQL 语句统计（按 method:路由模板），需启用 DB_PROFILER_ENABLED
+    db_request_count: Dict[str, int] = field(default_factory=lambda: defaultdict(int))
+    db_query_count: Dict[str, int] = field(default_factory=lambda: defaultdict(int))
+    db_time_ms: Dict[str, float] = field(default_factory=lambda: defaultdict(float))
+    db_budget_exceeded: Dict[str, int] = field(default_factory=lambda: defaultdict(int))
+    db_repeated_statement: Dict[str, int] = field(default_factory=lambda: defaultdict(int))
+
+    # cache_result 缓存结果计数：(键前缀, 结果) -> 次数
+    # 结果：l1_hit / redis_hit / miss / early_refresh / coalesced
+    cache_events: Dict[Tuple[str, str], int] = field(default_factory=lambda: defaultdict(int))
+
     # 活跃连接数
     active_connections: int = 0
     
@@ -59,6 +70,29 @@ class MetricsCollector:
             error_key = f"{status_code}:{path}"
             self.error_count[error_key] += 1
     
+    def record_db_queries(
+        self,
+        method: str,
+        route: str,
+        query_count: int,
+        db_time_ms: float,
+        budget_exceeded: bool,
+        repeated: bool
+    ):
+        """记录请求的 SQL 语句统计"""
+        key = f"{method}:{route}"
+        self.db_request_count[key] += 1
+        self.db_query_count[key] += query_count
+        self.db_time_ms[key] += db_time_ms
+        if budget_exceeded:
+            self.db_budget_exceeded[key] += 1
+        if repeated:
+            self.db_repeated_statement[key] += 1
+
+    def record_cache(self, prefix: str, result: str):
+        """记录缓存命中情况"""
+        self.cache_events[(prefix, result)] += 1
+
     def get_request_stats(self, key: str) -> Dict[str, float]:
         """获取请求统计信息"""
         durations = self.request_duration.get(key, [])
@@ -95,7 +129,28 @@ class MetricsCollector:
             lines.append(f'http_request_duration_ms{{method="{method}",path="{path}",quantile="0.5"}} {stats["p50_ms"]}')
             lines.append(f'http_request_duration_ms{{method="{method}",path="{path}",quantile="0.95"}} {stats["p95_ms"]}')
             lines.append(f'http_request_duration_ms{{method="{method}",path="{path}",quantile="0.99"}} {stats["p99_ms"]}')
-        
+
+        db_metrics = (
+            ("db_profiled_requests_total", "Requests with SQL statement profiling", self.db_request_count),
+            ("db_queries_total", "Total SQL statements executed", self.db_query_count),
+            ("db_time_ms_total", "Total SQL execution time in milliseconds", self.db_time_ms),
+            ("db_query_budget_exceeded_total", "Requests exceeding the SQL statement budget", self.db_budget_exceeded),
+            ("db_repeated_statement_requests_total", "Requests with repeated identical SQL statements (possible N+1)", self.db_repeated_statement),
+        )
+        for name, help_text, values in db_metrics:
+            if not values:
+                continue
+            lines.extend([f"# HELP {name} {help_text}", f"# TYPE {name} counter"])
+            for key, value in values.items():
+                method, route = key.split(":", 1)
+                value = f"{value:.2f}" if isinstance(value, float) else value
+                lines.append(f'{name}{{method="{method}",route="{route}"}} {value}')
+
+        if self.cache_events:
+            lines.extend(["# HELP cache_requests_total cache_result lookups by key prefix and result", "# TYPE cache_requests_total counter"])
+            for (prefix, result), count in self.cache_events.items():
+                lines.append(f'cache_requests_total{{prefix="{prefix}",result="{result}"}} {count}')
+
         return "\n".join(lines)
 
 # 全局指标收集器
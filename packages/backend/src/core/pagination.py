@@ -0,0 +1,118 @@
+"""
+列表分页工具
+
+除传统的 page/size（OFFSET）分页外，提供两种可选模式：
+- 游标分页：按（排序时间, id）倒序做 keyset 翻页，深页不再扫描被跳过的行。
+  每页响应返回不透明的 next_cursor，下一次请求带上 cursor 即可继续翻页（此时忽略 page）
+- 估算总数：total_mode=estimate 时从 pg_class.reltuples 读取表行数估算值，
+  不执行精确 count；仅在没有业务筛选条件且为 PostgreSQL 时生效，否则仍精确计数
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Any, List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import func, select, text, tuple_
+from sqlalchemy.orm import Session
+
+# 总数计算模式
+TOTAL_MODE_EXACT = "exact"
+TOTAL_MODE_ESTIMATE = "estimate"
+
+_ESTIMATE_SQL = text(
+    "SELECT reltuples::bigint FROM pg_class "
+    "WHERE oid = to_regclass(:table_name)"
+)
+
+def encode_cursor(sort_value: datetime, row_id: str) -> str:
+    """将（排序时间, id）编码为不透明游标"""
+    raw = json.dumps([sort_value.isoformat(), row_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    """解析游标，格式错误时返回 400"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        sort_value, row_id = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return datetime.fromisoformat(sort_value), str(row_id)
+    except (ValueError, TypeError, UnicodeError):
+        raise HTTPException(status_code=400, detail="无效的分页游标")
+
+def paginate(query: Any, sort_column: Any, id_column: Any, page: int, size: int, cursor: Optional[str] = None) -> Any:
+    """
+    为查询追加排序与分页（Query 与 select() 均可）
+
+    按 (sort_column, id_column) 倒序排列；传入 cursor 时从游标位置之后继续，
+    否则按 page 计算 OFFSET。多取一行用于判断是否还有下一页，配合 split_page 使用。
+    """
+    query = query.order_by(sort_column.desc(), id_column.desc())
+
+    if cursor:
+        sort_value, row_id = decode_cursor(cursor)
+        query = query.filter(tuple_(sort_column, id_column) < tuple_(sort_value, row_id))
+    else:
+        query = query.offset((page - 1) * size)
+
+    return query.limit(size + 1)
+
+def split_page(rows: Sequence[Any], size: int, sort_attr: str) -> Tuple[List[Any], Optional[str]]:
+    """截取本页数据，并在还有下一页时生成 next_cursor"""
+    rows = list(rows)
+    if len(rows) <= size:
+        return rows, None
+
+    rows = rows[:size]
+    last = rows[-1]
+    return rows, encode_cursor(getattr(last, sort_attr), last.id)
+
+def _use_estimate(db: Any, total_mode: str, filtered: bool) -> bool:
+    return (
+        total_mode == TOTAL_MODE_ESTIMATE
+        and not filtered
+        and db.get_bind().dialect.name == "postgresql"
+    )
+
+def count_total(
+    db: Session,
+    model: Any,
+    conditions: Sequence[Any],
+    total_mode: str = TOTAL_MODE_EXACT,
+    filtered: bool = True
+) -> int:
+    """
+    计算列表总数
+
+    Args:
+        db: 数据库会话
+        model: 列表对应的模型
+        conditions: 过滤条件
+        total_mode: exact-精确计数，estimate-读取 pg_class 估算值
+        filtered: 是否带有业务筛选条件（带筛选时估算值不准确，始终精确计数）
+    """
+    if _use_estimate(db, total_mode, filtered):
+        estimate = db.execute(_ESTIMATE_SQL, {"table_name": model.__tablename__}).scalar()
+        # 从未 ANALYZE 的表 reltuples 为 -1，退回精确计数
+        if estimate is not None and estimate >= 0:
+            return int(estimate)
+
+    return db.execute(
+        select(func.count()).select_from(model).where(*conditions)
+    ).scalar() or 0
+
+async def count_total_async(
+    db: Any,
+    model: Any,
+    conditions: Sequence[Any],
+    total_mode: str = TOTAL_MODE_EXACT,
+    filtered: bool = True
+) -> int:
+    """计算列表总数（异步版本，db 为 AsyncSession），参数同 count_total"""
+    if _use_estimate(db, total_mode, filtered):
+        estimate = await db.scalar(_ESTIMATE_SQL, {"table_name": model.__tablename__})
+        if estimate is not None and estimate >= 0:
+            return int(estimate)
+
+    return await db.scalar(
+        select(func.count()).select_from(model).where(*conditions)
+    ) or 0
@@ -1,8 +1,16 @@
-"""Redis 客户端管理"""
+"""
+Redis 客户端管理
+
+缓存失效采用标签索引：带 tags 写入的缓存键会登记到 cache:tags:<标签> 有序集合中，
+分值为键的过期时间戳（不过期为 +inf），每次写入时顺带移除已过期的成员，集合大小不超过未过期的键数；
+delete_pattern 遇到 "<前缀>:*" 形式的模式时直接按标签集合成员删除，
+不再使用阻塞 Redis 的 KEYS；其他临时模式通过 SCAN 游标逐批匹配。
+"""
 import hashlib
 import json
 import logging
-from typing import Any, List, Optional
+import time
+from typing import Any, Iterable, List, Optional, Tuple
 
 import redis.asyncio as redis
 
@@ -10,6 +18,32 @@ from core.config import settings
 
 logger = logging.getLogger(__name__)
 
+# 标签集合键前缀（有序集合；与早期的普通集合 cache:tag:* 区分，避免类型冲突）
+TAG_KEY_PREFIX = "cache:tags:"
+
+# SCAN 每批数量 / DEL 每批键数
+SCAN_BATCH_SIZE = 500
+DELETE_BATCH_SIZE = 500
+
+_GLOB_CHARS = set("*?[]\\")
+
+# 分布式锁：未持有时 SET NX，已由同一 token 持有时续期；释放时只删除自己的锁
+_ACQUIRE_LOCK_SCRIPT = """
+if redis.call('set', KEYS[1], ARGV[1], 'NX', 'EX', ARGV[2]) then
+    return 1
+end
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('expire', KEYS[1], ARGV[2])
+end
+return 0
+"""
+_RELEASE_LOCK_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
 class RedisClient:
     """Redis客户端类"""
     
@@ -71,13 +105,40 @@ class RedisClient:
             logger.warning("Redis GET failed for key '%s': %s", key, e)
             return None
     
+    async def get_with_ttl(self, key: str) -> Tuple[Any, int]:
+        """获取缓存数据及剩余过期时间（一次往返），不存在时返回 (None, -2)"""
+        if not self.is_connected:
+            logger.warning("Redis unavailable, skip GET for key '%s'", key)
+            return None, -2
+
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                pipe.get(key)
+                pipe.ttl(key)
+                data, ttl = await pipe.execute()
+            if data:
+                return json.loads(data), int(ttl)
+            return None, -2
+        except Exception as e:
+            logger.warning("Redis GET failed for key '%s': %s", key, e)
+            return None, -2
+
     async def set(
         self, 
         key: str, 
         value: Any, 
-        ttl: Optional[int] = None
+        ttl: Optional[int] = None,
+        tags: Optional[Iterable[str]] = None
     ) -> bool:
-        """设置缓存数据"""
+        """
+        设置缓存数据
+
+        Args:
+            key: 缓存键
+            value: 缓存值
+            ttl: 过期时间（秒），为空则不过期
+            tags: 失效标签，键会登记到对应标签集合，供 delete_tag / delete_pattern 按标签删除
+        """
         if not self.is_connected:
             logger.warning("Redis unavailable, skip SET for key '%s'", key)
             return False
@@ -94,12 +155,34 @@ class RedisClient:
                 # 普通数据
                 data = json.dumps(value, ensure_ascii=False, default=str)
 
-            if ttl:
-                result = await self.redis.setex(key, ttl, data)
-            else:
-                result = await self.redis.set(key, data)
+            if not tags:
+                if ttl:
+                    result = await self.redis.setex(key, ttl, data)
+                else:
+                    result = await self.redis.set(key, data)
+                return bool(result)
 
-            return bool(result)
+            now = time.time()
+            expires_at = now + ttl if ttl else float("inf")
+            async with self.redis.pipeline(transaction=False) as pipe:
+                if ttl:
+                    pipe.setex(key, ttl, data)
+                else:
+                    pipe.set(key, data)
+                for tag in tags:
+                    tag_key = f"{TAG_KEY_PREFIX}{tag}"
+                    pipe.zadd(tag_key, {key: expires_at})
+                    # 移除已过期的键，热点标签的集合不会无限增长
+                    pipe.zremrangebyscore(tag_key, "-inf", now)
+                    if ttl:
+                        # 标签集合的过期时间不短于其中任一成员：新集合设置过期，已有集合只延长
+                        pipe.expire(tag_key, ttl, nx=True)
+                        pipe.expire(tag_key, ttl, gt=True)
+                    else:
+                        pipe.persist(tag_key)
+                results = await pipe.execute()
+
+            return bool(results[0])
         except Exception as e:
             logger.warning("Redis SET failed for key '%s': %s", key, e)
             return False
@@ -117,22 +200,86 @@ class RedisClient:
             logger.warning("Redis DELETE failed for key '%s': %s", key, e)
             return False
     
-    async def delete_pattern(self, pattern: str) -> int:
-        """删除匹配模式的所有键"""
+    async def delete_pattern(self, pattern: str, use_tags: bool = True) -> int:
+        """
+        删除匹配模式的所有键
+
+        Args:
+            pattern: 键模式
+            use_tags: "<前缀>:*" 形式且前缀不含通配符时按标签集合删除（键需通过
+                set(tags=...) 写入，cache_result 会自动登记）；为 False 或其他模式时
+                使用 SCAN 游标匹配后分批删除，可覆盖未登记标签的键
+        """
         if not self.is_connected:
             logger.warning("Redis unavailable, skip pattern delete for '%s'", pattern)
             return 0
 
+        tag = self.pattern_to_tag(pattern) if use_tags else None
+        if tag is not None:
+            return await self.delete_tag(tag)
+
         try:
-            keys = await self.redis.keys(pattern)
-            if keys:
-                result = await self.redis.delete(*keys)
-                return int(result)
-            return 0
+            deleted = 0
+            batch: List[str] = []
+            async for key in self.redis.scan_iter(match=pattern, count=SCAN_BATCH_SIZE):
+                batch.append(key)
+                if len(batch) >= DELETE_BATCH_SIZE:
+                    deleted += int(await self.redis.delete(*batch))
+                    batch = []
+            if batch:
+                deleted += int(await self.redis.delete(*batch))
+            return deleted
         except Exception as e:
             logger.warning("Redis delete pattern '%s' failed: %s", pattern, e)
             return 0
+
+    async def delete_tag(self, tag: str) -> int:
+        """删除登记在标签下的所有键（含标签集合本身），返回删除的缓存键数量"""
+        if not self.is_connected:
+            logger.warning("Redis unavailable, skip tag delete for '%s'", tag)
+            return 0
+
+        tag_key = f"{TAG_KEY_PREFIX}{tag}"
+        try:
+            members = list(await self.redis.zrangebyscore(tag_key, time.time(), "+inf"))
+            deleted = 0
+            for i in range(0, len(members), DELETE_BATCH_SIZE):
+                deleted += int(await self.redis.delete(*members[i:i + DELETE_BATCH_SIZE]))
+            await self.redis.delete(tag_key)
+            return deleted
+        except Exception as e:
+            logger.warning("Redis delete tag '%s' failed: %s", tag, e)
+            return 0
+
+    @staticmethod
+    def key_tags(key: str) -> List[str]:
+        """缓存键的前缀标签，如 xiansuo:detail:1 -> [xiansuo, xiansuo:detail]"""
+        parts = key.split(":")
+        return [":".join(parts[:i]) for i in range(1, len(parts))]
+
+    @staticmethod
+    def pattern_to_tag(pattern: str) -> Optional[str]:
+        """可按标签删除的模式返回对应标签，否则返回 None"""
+        if not pattern.endswith(":*"):
+            return None
+        prefix = pattern[:-2]
+        if not prefix or _GLOB_CHARS & set(prefix):
+            return None
+        return prefix
     
+    async def incr(self, key: str, amount: int = 1) -> Optional[int]:
+        """原子递增计数器，返回递增后的值"""
+        if not self.is_connected:
+            logger.warning("Redis unavailable, skip INCR for key '%s'", key)
+            return None
+
+        try:
+            result = await self.redis.incr(key, amount)
+            return int(result)
+        except Exception as e:
+            logger.warning("Redis INCR failed for key '%s': %s", key, e)
+            return None
+
     async def exists(self, key: str) -> bool:
         """检查键是否存在"""
         if not self.is_connected:
@@ -169,15 +316,45 @@ class RedisClient:
         except Exception as e:
             logger.warning("Redis TTL failed for key '%s': %s", key, e)
             return -1
-    
+
+    async def acquire_lock(self, key: str, token: str, ttl: int) -> bool:
+        """
+        获取或续期分布式锁（SET NX EX），锁已由同一 token 持有时延长过期时间
+
+        Args:
+            key: 锁键
+            token: 持有者标识
+            ttl: 过期时间（秒），持有者需在过期前续期
+        """
+        if not self.is_connected:
+            return False
+
+        try:
+            result = await self.redis.eval(_ACQUIRE_LOCK_SCRIPT, 1, key, token, ttl)
+            return bool(result)
+        except Exception as e:
+            logger.warning("Redis lock acquire failed for key '%s': %s", key, e)
+            return False
+
+    async def release_lock(self, key: str, token: str) -> bool:
+        """释放分布式锁（只删除同一 token 持有的锁）"""
+        if not self.is_connected:
+            return False
+
+        try:
+            result = await self.redis.eval(_RELEASE_LOCK_SCRIPT, 1, key, token)
+            return bool(result)
+        except Exception as e:
+            logger.warning("Redis lock release failed for key '%s': %s", key, e)
+            return False
+
     async def keys(self, pattern: str = "*") -> List[str]:
-        """获取匹配模式的所有键"""
+        """获取匹配模式的所有键（SCAN 游标遍历，不阻塞 Redis）"""
         if not self.is_connected:
             return []
 
         try:
-            keys = await self.redis.keys(pattern)
-            return list(keys)
+            return [key async for key in self.redis.scan_iter(match=pattern, count=SCAN_BATCH_SIZE)]
         except Exception as e:
             logger.warning("Redis KEYS failed for pattern '%s': %s", pattern, e)
             return []
@@ -195,13 +372,13 @@ class RedisClient:
             logger.warning("Redis FLUSHDB failed: %s", e)
             return False
     
-    async def info(self) -> dict:
+    async def info(self, section: Optional[str] = None) -> dict:
         """获取Redis服务器信息"""
         if not self.is_connected:
             return {}
 
         try:
-            info = await self.redis.info()
+            info = await self.redis.info(section) if section else await self.redis.info()
             return dict(info)
         except Exception as e:
             logger.warning("Redis INFO failed: %s", e)
@@ -260,6 +437,9 @@ class CacheManager:
     async def invalidate_pattern(self, pattern: str) -> int:
         """使匹配模式的缓存失效"""
         count = await self.redis.delete_pattern(pattern)
+        # 延迟导入避免循环依赖
+        from core.local_cache import invalidate_local
+        await invalidate_local(pattern)
         if count > 0:
             logger.info("CacheManager invalidated pattern '%s' (%s keys)", pattern, count)
         return count
@@ -271,7 +451,9 @@ class CacheManager:
         
         try:
             info = await self.redis.info()
-            keys_count = len(await self.redis.keys("*"))
+            # 键数量取自 INFO keyspace（info() 已包含该段），不遍历键
+            db_index = self.redis.redis.connection_pool.connection_kwargs.get("db", 0)
+            keys_count = (info.get(f"db{db_index}") or {}).get("keys", 0)
             
             return {
                 "status": "connected",
@@ -316,6 +498,7 @@ class CacheKeys:
     
     # 用户权限相关
     USER_PERMISSIONS = "user:permissions"
+    USER_PERMISSIONS_VERSION = "user:permissions:version"
     ROLE_PERMISSIONS = "role:permissions"
     USER_ROLES = "user:roles"
     
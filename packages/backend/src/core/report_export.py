@@ -0,0 +1,67 @@
+"""
+报表流式导出
+
+把报表行（任意可迭代对象）逐批编码为 CSV / XLSX 字节块，供 StreamingResponse 直接返回，
+不在内存中拼出整个文件：
+- CSV：每 EXPORT_BATCH_ROWS 行编码一次（UTF-8 带 BOM，Excel 可直接打开）
+- XLSX：openpyxl 只写模式逐行写入（工作表内容写入临时文件），保存到临时文件后分块读出
+"""
+import csv
+import io
+import logging
+import tempfile
+from typing import Iterable, Iterator, Sequence
+
+logger = logging.getLogger(__name__)
+
+try:
+    from openpyxl import Workbook
+    OPENPYXL_AVAILABLE = True
+except ImportError:
+    logger.warning("openpyxl未正确安装，报表 XLSX 导出功能将不可用")
+    OPENPYXL_AVAILABLE = False
+
+EXPORT_BATCH_ROWS = 1000
+EXPORT_CHUNK_SIZE = 64 * 1024
+
+MEDIA_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+def iter_csv(lietou: Sequence[str], rows: Iterable[Sequence]) -> Iterator[bytes]:
+    """逐批把报表行编码为 CSV"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(lietou)
+    pending = 0
+    first = True
+    for row in rows:
+        writer.writerow(["" if value is None else value for value in row])
+        pending += 1
+        if pending >= EXPORT_BATCH_ROWS:
+            yield buffer.getvalue().encode("utf-8-sig" if first else "utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+            first = False
+    if first or pending:
+        yield buffer.getvalue().encode("utf-8-sig" if first else "utf-8")
+
+def iter_xlsx(lietou: Sequence[str], rows: Iterable[Sequence], sheet_title: str = "Sheet1") -> Iterator[bytes]:
+    """逐行写入只写模式工作簿，完成后分块读出"""
+    if not OPENPYXL_AVAILABLE:
+        raise RuntimeError("openpyxl未安装，无法导出 XLSX")
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(title=sheet_title[:31])
+    sheet.append(list(lietou))
+    for row in rows:
+        sheet.append(list(row))
+    with tempfile.TemporaryFile() as output:
+        workbook.save(output)
+        output.seek(0)
+        while True:
+            chunk = output.read(EXPORT_CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
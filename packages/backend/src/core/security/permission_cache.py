@@ -0,0 +1,259 @@
+"""
+用户权限集合缓存
+
+用户的有效权限集合（quanxian_bianma 的 frozenset）按以下顺序查找：
+1. 请求级：挂在当前请求的数据库会话 db.info 上，同一请求内只计算一次
+2. 进程内：带 TTL 的本地字典，按权限版本号校验
+3. Redis：CacheKeys.USER_PERMISSIONS 下，键中包含权限版本号
+
+YonghuJiaose / JiaoseQuanxian（以及角色、权限本身）变更后递增权限版本号，
+旧版本的缓存项不再命中，随 TTL 自然过期，无需按模式删除键。
+每个请求第一次查找权限时先读取 Redis 中的全局版本号再使用进程内缓存，
+其它进程撤销的权限在下一个请求立即生效，不必等待本地 TTL 过期。
+"""
+import asyncio
+import logging
+import threading
+import time
+from typing import Dict, FrozenSet, Optional, Set, Tuple, Union
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from core.commit_hooks import invalidate_on_commit
+from core.config import settings
+from core.redis_client import CacheKeys, redis_client
+from models.yonghu_guanli import Jiaose, JiaoseQuanxian, Quanxian, Yonghu, YonghuJiaose
+
+logger = logging.getLogger(__name__)
+
+# db.info 中的请求级缓存键
+_REQUEST_SCOPE_KEY = "user_permission_sets"
+
+# 变更后需要使权限缓存失效的模型
+_PERMISSION_MODELS = (YonghuJiaose, JiaoseQuanxian, Jiaose, Quanxian)
+
+def _permission_set_stmt(user_id: str):
+    return (
+        select(Quanxian.quanxian_bianma)
+        .join(JiaoseQuanxian, JiaoseQuanxian.quanxian_id == Quanxian.id)
+        .join(Jiaose, Jiaose.id == JiaoseQuanxian.jiaose_id)
+        .join(YonghuJiaose, YonghuJiaose.jiaose_id == Jiaose.id)
+        .where(
+            YonghuJiaose.yonghu_id == user_id,
+            YonghuJiaose.is_deleted == "N",
+            JiaoseQuanxian.is_deleted == "N",
+            Jiaose.zhuangtai == "active",
+            Jiaose.is_deleted == "N",
+            Quanxian.zhuangtai == "active",
+            Quanxian.is_deleted == "N",
+        )
+        .distinct()
+    )
+
+def load_user_permission_set(db: Session, user_id: str) -> FrozenSet[str]:
+    """
+    单条查询加载用户的有效权限编码集合
+
+    Args:
+        db: 数据库会话
+        user_id: 用户ID
+
+    Returns:
+        FrozenSet[str]: 权限编码集合
+    """
+    return frozenset(db.execute(_permission_set_stmt(user_id)).scalars().all())
+
+async def load_user_permission_set_async(db: AsyncSession, user_id: str) -> FrozenSet[str]:
+    """单条查询加载用户的有效权限编码集合（异步会话）"""
+    result = await db.execute(_permission_set_stmt(user_id))
+    return frozenset(result.scalars().all())
+
+class PermissionCache:
+    """用户权限集合的多级缓存"""
+
+    # 进程内缓存最大条目数
+    MAX_LOCAL_ENTRIES = 10000
+
+    def __init__(
+        self,
+        local_ttl: int = settings.CACHE_SHORT_TTL,
+        redis_ttl: int = settings.CACHE_DEFAULT_TTL
+    ):
+        self.local_ttl = local_ttl
+        self.redis_ttl = redis_ttl
+        self._version = 0
+        # user_id -> (版本号, 过期时间, 权限集合)
+        self._entries: Dict[str, Tuple[int, float, FrozenSet[str]]] = {}
+        self._lock = threading.Lock()
+        # 尚未同步到 Redis 的版本递增次数，期间不读取 Redis 中的旧版本缓存
+        self._pending_bumps = 0
+        self._pending_tasks: Set[asyncio.Task] = set()
+
+    @property
+    def version(self) -> int:
+        """当前进程已知的权限版本号"""
+        return self._version
+
+    @staticmethod
+    def _redis_key(version: int, user_id: str) -> str:
+        return f"{CacheKeys.USER_PERMISSIONS}:v{version}:{user_id}"
+
+    @staticmethod
+    def _request_scope(db: Union[Session, AsyncSession]) -> Dict[str, FrozenSet[str]]:
+        return db.info.setdefault(_REQUEST_SCOPE_KEY, {})
+
+    def _get_local(self, user_id: str) -> Optional[FrozenSet[str]]:
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            version, expires_at, permissions = entry
+            if version != self._version or expires_at < time.monotonic():
+                del self._entries[user_id]
+                return None
+            return permissions
+
+    def _set_local(self, user_id: str, permissions: FrozenSet[str], version: int) -> None:
+        with self._lock:
+            if version != self._version:
+                return
+            if len(self._entries) >= self.MAX_LOCAL_ENTRIES:
+                # 容量满时淘汰最早写入的条目
+                self._entries.pop(next(iter(self._entries)))
+            self._entries[user_id] = (version, time.monotonic() + self.local_ttl, permissions)
+
+    def _adopt_version(self, version: int) -> None:
+        """采用 Redis 中更新的全局版本号，版本变化时清空本地缓存"""
+        with self._lock:
+            if version > self._version:
+                self._version = version
+                self._entries.clear()
+
+    async def _refresh_version(self) -> bool:
+        """
+        读取 Redis 中的全局版本号并采用，返回之后是否可以读写 Redis 缓存
+
+        本进程还有未同步到 Redis 的版本递增时不读取（Redis 中的版本号落后于本地）
+        """
+        if not redis_client.is_connected or self._pending_bumps:
+            return False
+        remote_version = await redis_client.get(CacheKeys.USER_PERMISSIONS_VERSION)
+        if remote_version is not None:
+            self._adopt_version(int(remote_version))
+        return True
+
+    def _refresh_version_from_thread(self) -> None:
+        """同步路径在线程池中借助 anyio 回到事件循环读取全局版本号；不在工作线程中（脚本等）时跳过"""
+        if not redis_client.is_connected or self._pending_bumps:
+            return
+        try:
+            import anyio.from_thread
+            anyio.from_thread.run(self._refresh_version)
+        except Exception:
+            pass
+
+    def get_sync(self, db: Session, user: Yonghu) -> FrozenSet[str]:
+        """获取用户权限集合（同步路径：请求级 → 进程内 → 数据库）"""
+        scope = self._request_scope(db)
+        permissions = scope.get(user.id)
+        if permissions is not None:
+            return permissions
+
+        self._refresh_version_from_thread()
+        version = self._version
+        permissions = self._get_local(user.id)
+        if permissions is None:
+            permissions = load_user_permission_set(db, user.id)
+            self._set_local(user.id, permissions, version)
+
+        scope[user.id] = permissions
+        return permissions
+
+    async def get(self, db: Union[Session, AsyncSession], user: Yonghu) -> FrozenSet[str]:
+        """获取用户权限集合（异步路径：请求级 → 进程内 → Redis → 数据库，可传入同步或异步会话）"""
+        scope = self._request_scope(db)
+        permissions = scope.get(user.id)
+        if permissions is not None:
+            return permissions
+
+        # 先比对全局版本号，其它进程递增版本后本地缓存项不再命中
+        use_redis = await self._refresh_version()
+        permissions = self._get_local(user.id)
+        if permissions is not None:
+            scope[user.id] = permissions
+            return permissions
+
+        version = self._version
+        if use_redis:
+            cached = await redis_client.get(self._redis_key(version, user.id))
+            if cached is not None:
+                permissions = frozenset(cached)
+
+        if permissions is None:
+            if isinstance(db, AsyncSession):
+                permissions = await load_user_permission_set_async(db, user.id)
+            else:
+                # 同步会话上的查询放到线程池执行，避免阻塞事件循环
+                permissions = await asyncio.to_thread(load_user_permission_set, db, user.id)
+            if use_redis:
+                await redis_client.set(
+                    self._redis_key(version, user.id), sorted(permissions), self.redis_ttl
+                )
+
+        self._set_local(user.id, permissions, version)
+        scope[user.id] = permissions
+        return permissions
+
+    def invalidate(self, db: Optional[Session] = None) -> None:
+        """
+        使所有用户的权限缓存失效
+
+        本地立即递增版本号；Redis 中的全局版本号异步递增，其它进程在下一个请求查找权限时生效。
+        """
+        with self._lock:
+            self._version += 1
+            self._entries.clear()
+        if db is not None:
+            db.info.pop(_REQUEST_SCOPE_KEY, None)
+        if redis_client.is_connected:
+            with self._lock:
+                self._pending_bumps += 1
+            self._schedule_remote_bump()
+
+    async def _bump_remote_version(self) -> None:
+        try:
+            version = await redis_client.incr(CacheKeys.USER_PERMISSIONS_VERSION)
+            if version is not None:
+                self._adopt_version(version)
+        finally:
+            with self._lock:
+                self._pending_bumps -= 1
+
+    def _schedule_remote_bump(self) -> None:
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+
+        if loop is not None:
+            task = loop.create_task(self._bump_remote_version())
+            self._pending_tasks.add(task)
+            task.add_done_callback(self._pending_tasks.discard)
+            return
+
+        # 同步接口运行在线程池中，借助 anyio 回到事件循环执行
+        try:
+            import anyio.from_thread
+            anyio.from_thread.run(self._bump_remote_version)
+        except Exception as e:
+            with self._lock:
+                self._pending_bumps -= 1
+            logger.warning("Failed to bump permission cache version in Redis: %s", e)
+
+# 全局权限缓存实例
+permission_cache = PermissionCache()
+
+# 角色/权限数据变更提交后失效
+invalidate_on_commit(_PERMISSION_MODELS, permission_cache.invalidate)
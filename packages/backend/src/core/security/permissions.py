@@ -2,13 +2,15 @@
 权限检查装饰器和工具函数
 """
 from functools import wraps
-from typing import List, Optional
+from typing import List, Optional, Union
 from fastapi import HTTPException, status, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from core.database import get_db
 from .jwt_handler import get_current_user
-from models.yonghu_guanli import Yonghu, Jiaose, Quanxian, JiaoseQuanxian
+from .permission_cache import permission_cache
+from models.yonghu_guanli import Yonghu, Quanxian
 
 def check_permission(permission_code: str):
     """
@@ -44,7 +46,7 @@ def check_permission(permission_code: str):
                 )
             
             # 检查用户权限
-            if not has_permission(db, current_user, permission_code):
+            if not await has_permission_async(db, current_user, permission_code):
                 raise HTTPException(
                     status_code=status.HTTP_403_FORBIDDEN,
                     detail=f"权限不足：需要 {permission_code} 权限"
@@ -54,9 +56,15 @@ def check_permission(permission_code: str):
         return wrapper
     return decorator
 
+def is_super_admin(user: Yonghu) -> bool:
+    """超级管理员拥有所有权限"""
+    return user.yonghu_ming == "admin"
+
 def has_permission(db: Session, user: Yonghu, permission_code: str) -> bool:
     """
     检查用户是否具有指定权限
+
+    权限集合在同一请求内只加载一次，并由 permission_cache 跨请求缓存
     
     Args:
         db: 数据库会话
@@ -66,33 +74,27 @@ def has_permission(db: Session, user: Yonghu, permission_code: str) -> bool:
     Returns:
         bool: 是否具有权限
     """
-    # 超级管理员拥有所有权限
-    if user.yonghu_ming == "admin":
+    if is_super_admin(user):
         return True
     
-    # 查询用户的所有角色
-    from models.yonghu_guanli import YonghuJiaose
-    user_roles = db.query(Jiaose).join(
-        YonghuJiaose, YonghuJiaose.jiaose_id == Jiaose.id
-    ).filter(
-        YonghuJiaose.yonghu_id == user.id,
-        Jiaose.zhuangtai == "active"
-    ).all()
+    return permission_code in permission_cache.get_sync(db, user)
+
+async def has_permission_async(db: Union[Session, AsyncSession], user: Yonghu, permission_code: str) -> bool:
+    """
+    检查用户是否具有指定权限（可使用 Redis 缓存层的异步版本）
     
-    # 查询角色的所有权限
-    for role in user_roles:
-        role_permissions = db.query(Quanxian).join(
-            JiaoseQuanxian
-        ).filter(
-            JiaoseQuanxian.jiaose_id == role.id,
-            Quanxian.quanxian_bianma == permission_code,
-            Quanxian.zhuangtai == "active"
-        ).first()
+    Args:
+        db: 数据库会话（同步或异步）
+        user: 用户对象
+        permission_code: 权限编码
         
-        if role_permissions:
-            return True
-    
-    return False
+    Returns:
+        bool: 是否具有权限
+    """
+    if is_super_admin(user):
+        return True
+
+    return permission_code in await permission_cache.get(db, user)
 
 def get_user_permissions(db: Session, user: Yonghu) -> List[str]:
     """
@@ -106,26 +108,13 @@ def get_user_permissions(db: Session, user: Yonghu) -> List[str]:
         List[str]: 权限编码列表
     """
     # 超级管理员拥有所有权限
-    if user.yonghu_ming == "admin":
+    if is_super_admin(user):
         all_permissions = db.query(Quanxian).filter(
             Quanxian.zhuangtai == "active"
         ).all()
         return [perm.quanxian_bianma for perm in all_permissions]
     
-    # 查询用户的所有权限
-    permissions = db.query(Quanxian).join(
-        JiaoseQuanxian
-    ).join(
-        Jiaose
-    ).join(
-        Jiaose.yonghu_liebiao
-    ).filter(
-        Yonghu.id == user.id,
-        Jiaose.zhuangtai == "active",
-        Quanxian.zhuangtai == "active"
-    ).distinct().all()
-    
-    return [perm.quanxian_bianma for perm in permissions]
+    return sorted(permission_cache.get_sync(db, user))
 
 def require_permission(permission_code: str):
     """
@@ -137,11 +126,11 @@ def require_permission(permission_code: str):
     Returns:
         依赖函数
     """
-    def permission_dependency(
+    async def permission_dependency(
         current_user: Yonghu = Depends(get_current_user),
         db: Session = Depends(get_db)
     ):
-        if not has_permission(db, current_user, permission_code):
+        if not await has_permission_async(db, current_user, permission_code):
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail=f"权限不足：需要 {permission_code} 权限"
@@ -160,13 +149,16 @@ def require_any_permission(permission_codes: List[str]):
     Returns:
         依赖函数
     """
-    def permission_dependency(
+    async def permission_dependency(
         current_user: Yonghu = Depends(get_current_user),
         db: Session = Depends(get_db)
     ):
-        for permission_code in permission_codes:
-            if has_permission(db, current_user, permission_code):
-                return current_user
+        if is_super_admin(current_user):
+            return current_user
+
+        user_permissions = await permission_cache.get(db, current_user)
+        if any(code in user_permissions for code in permission_codes):
+            return current_user
         
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -185,12 +177,16 @@ def require_all_permissions(permission_codes: List[str]):
     Returns:
         依赖函数
     """
-    def permission_dependency(
+    async def permission_dependency(
         current_user: Yonghu = Depends(get_current_user),
         db: Session = Depends(get_db)
     ):
+        if is_super_admin(current_user):
+            return current_user
+
+        user_permissions = await permission_cache.get(db, current_user)
         for permission_code in permission_codes:
-            if not has_permission(db, current_user, permission_code):
+            if permission_code not in user_permissions:
                 raise HTTPException(
                     status_code=status.HTTP_403_FORBIDDEN,
                     detail=f"权限不足：需要 {permission_code} 权限"
@@ -3,15 +3,20 @@
 """
 from typing import List, Set
 from fastapi import HTTPException, status, Depends
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 
 from core.database import get_db
-from models import Yonghu, YonghuJiaose, JiaoseQuanxian, Quanxian
+from models import Yonghu, YonghuJiaose
 from .jwt_handler import get_current_user
+from .permission_cache import load_user_permission_set
+from .role_permission_index import role_permission_index
 
 def get_user_permissions(user: Yonghu, db: Session) -> Set[str]:
     """
     获取用户权限列表
+
+    查询用户的角色ID后从角色权限索引求并集；索引未覆盖的角色回退为单条联表查询
     
     Args:
         user: 用户对象
@@ -20,31 +25,18 @@ def get_user_permissions(user: Yonghu, db: Session) -> Set[str]:
     Returns:
         用户权限编码集合
     """
-    permissions = set()
-    
-    # 查询用户的所有角色
-    user_roles = db.query(YonghuJiaose).filter(
-        YonghuJiaose.yonghu_id == user.id
-    ).all()
-    
-    # 遍历每个角色，获取角色的权限
-    for user_role in user_roles:
-        role_permissions = db.query(JiaoseQuanxian).filter(
-            JiaoseQuanxian.jiaose_id == user_role.jiaose_id
-        ).all()
-        
-        # 获取权限详情
-        for role_permission in role_permissions:
-            permission = db.query(Quanxian).filter(
-                Quanxian.id == role_permission.quanxian_id,
-                Quanxian.zhuangtai == "active",
-                Quanxian.is_deleted == "N"
-            ).first()
-            
-            if permission:
-                permissions.add(permission.quanxian_bianma)
-    
-    return permissions
+    role_ids = db.execute(
+        select(YonghuJiaose.jiaose_id).where(
+            YonghuJiaose.yonghu_id == user.id,
+            YonghuJiaose.is_deleted == "N"
+        )
+    ).scalars().all()
+
+    permissions = role_permission_index.permissions_for_roles(db, role_ids)
+    if permissions is None:
+        permissions = load_user_permission_set(db, user.id)
+
+    return set(permissions)
 
 def check_permission(required_permission: str):
     """
@@ -0,0 +1,96 @@
+"""
+角色 → 权限编码 索引
+
+一次性加载全部角色的有效权限编码，按角色ID建立 frozenset 索引。
+计算用户权限时只需查询用户的角色ID，再对索引做并集，避免逐角色、逐权限查询。
+
+索引与 permission_cache 共用权限版本号：角色/权限经 JiaoseService、QuanxianService
+或 ORM 修改后版本号递增，索引在下次访问时重建；另按 TTL 定期重建以感知其它进程的修改。
+"""
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, FrozenSet, Iterable, Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from core.config import settings
+from models.yonghu_guanli import Jiaose, JiaoseQuanxian, Quanxian
+from .permission_cache import permission_cache
+
+class RolePermissionIndex:
+    """角色权限索引"""
+
+    def __init__(self, ttl: int = settings.CACHE_SHORT_TTL):
+        self.ttl = ttl
+        self._index: Dict[str, FrozenSet[str]] = {}
+        self._version = -1
+        self._built_at = 0.0
+        self._lock = threading.Lock()
+
+    def _is_stale(self) -> bool:
+        return (
+            self._version != permission_cache.version
+            or time.monotonic() - self._built_at > self.ttl
+        )
+
+    def rebuild(self, db: Session) -> Dict[str, FrozenSet[str]]:
+        """
+        重建索引
+
+        所有角色（含停用、已删除）都会进入索引，停用或已删除的角色对应空集合，
+        因此用户持有的角色只要在索引中即可直接求并集。
+        """
+        version = permission_cache.version
+
+        index = defaultdict(set)
+        for jiaose_id in db.execute(select(Jiaose.id)).scalars():
+            index[jiaose_id]
+
+        rows = db.execute(
+            select(JiaoseQuanxian.jiaose_id, Quanxian.quanxian_bianma)
+            .join(Quanxian, Quanxian.id == JiaoseQuanxian.quanxian_id)
+            .join(Jiaose, Jiaose.id == JiaoseQuanxian.jiaose_id)
+            .where(
+                JiaoseQuanxian.is_deleted == "N",
+                Jiaose.zhuangtai == "active",
+                Jiaose.is_deleted == "N",
+                Quanxian.zhuangtai == "active",
+                Quanxian.is_deleted == "N",
+            )
+        )
+        for jiaose_id, quanxian_bianma in rows:
+            index[jiaose_id].add(quanxian_bianma)
+
+        compiled = {jiaose_id: frozenset(codes) for jiaose_id, codes in index.items()}
+        with self._lock:
+            self._index = compiled
+            self._version = version
+            self._built_at = time.monotonic()
+        return compiled
+
+    def get(self, db: Session) -> Dict[str, FrozenSet[str]]:
+        """获取索引，过期时重建"""
+        if self._is_stale():
+            return self.rebuild(db)
+        return self._index
+
+    def permissions_for_roles(self, db: Session, role_ids: Iterable[str]) -> Optional[FrozenSet[str]]:
+        """
+        计算一组角色的权限并集
+
+        Returns:
+            权限编码集合；若有角色不在索引中（索引构建后新建的角色）返回 None，由调用方回退查询
+        """
+        index = self.get(db)
+        permissions = set()
+        for role_id in role_ids:
+            role_permissions = index.get(role_id)
+            if role_permissions is None:
+                return None
+            permissions |= role_permissions
+        return frozenset(permissions)
+
+# 全局角色权限索引实例
+role_permission_index = RolePermissionIndex()
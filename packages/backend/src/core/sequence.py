@@ -0,0 +1,131 @@
+"""
+业务编号分配
+
+线索、合同、成本、开票等编号的格式为 前缀 + 日期 + 序号（如 XS20250101001、HT202501010001）。
+原先按“当天已有记录数 + 1”生成，并发创建时会撞号，只能靠唯一约束失败后重试。
+现改为由编号序列表 bianhao_xulie 按 (业务表, 前缀日期) 原子递增分配：
+- 分配序号是一条 UPDATE ... RETURNING，O(1) 且无需重试；某个序列首次使用时按业务表中当天已有的
+  最大编号初始化（INSERT ... ON CONFLICT 处理多个进程同时初始化）
+- 每个进程按块预分配（SEQUENCE_BLOCK_SIZE），块内序号在进程内发放，不访问数据库
+- 分配在独立连接上立即提交，不占用业务事务的行锁
+
+编号保证唯一但不保证连续：业务事务回滚、进程退出时未用完的块都会留下空号。
+"""
+import threading
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import func, text
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import InstrumentedAttribute
+
+from core.config import settings
+from models.xitong_guanli.bianhao_xulie import BianhaoXulie  # noqa: F401  确保编号序列表注册到元数据
+
+_UPDATE_SQL = text(
+    "UPDATE bianhao_xulie SET dangqian_zhi = dangqian_zhi + :count, updated_at = :now "
+    "WHERE xulie_jian = :key RETURNING dangqian_zhi"
+)
+
+_INSERT_SQL = text(
+    "INSERT INTO bianhao_xulie (xulie_jian, dangqian_zhi, updated_at) VALUES (:key, :initial + :count, :now) "
+    "ON CONFLICT (xulie_jian) DO UPDATE SET dangqian_zhi = bianhao_xulie.dangqian_zhi + :count, updated_at = :now "
+    "RETURNING dangqian_zhi"
+)
+
+class SequenceAllocator:
+    """编号序列分配器（进程内按块缓存）"""
+
+    def __init__(self, block_size: int = settings.SEQUENCE_BLOCK_SIZE):
+        self.block_size = max(1, block_size)
+        # 序列键 -> (下一个可用序号, 块内最后一个序号)
+        self._blocks: Dict[str, Tuple[int, int]] = {}
+        self._lock = threading.Lock()
+
+    def reserve(self, db: Session, key: str, count: int = 1,
+                seed: Optional[Callable[[], int]] = None) -> int:
+        """
+        直接从数据库预留 count 个连续序号（不经过进程内的块）
+
+        Args:
+            db: 数据库会话（只用于获取引擎和计算初始值）
+            key: 序列键
+            count: 序号数量
+            seed: 序列首次使用时返回初始值（已使用的最大序号）
+
+        Returns:
+            int: 第一个序号
+        """
+        params = {"key": key, "count": count, "now": datetime.utcnow()}
+        with db.get_bind().connect() as conn:
+            value = conn.execute(_UPDATE_SQL, params).scalar()
+            if value is None:
+                initial = seed() if seed else 0
+                value = conn.execute(_INSERT_SQL, {**params, "initial": initial}).scalar()
+            conn.commit()
+        return value - count + 1
+
+    def next_value(self, db: Session, key: str, seed: Optional[Callable[[], int]] = None) -> int:
+        """取下一个序号，块用完时再从数据库预分配一块"""
+        with self._lock:
+            start, end = self._blocks.get(key, (1, 0))
+            if start > end:
+                start = self.reserve(db, key, self.block_size, seed)
+                end = start + self.block_size - 1
+            self._blocks[key] = (start + 1, end)
+            return start
+
+    def reset(self) -> None:
+        """丢弃进程内未用完的块"""
+        with self._lock:
+            self._blocks.clear()
+
+# 全局编号分配器
+sequence_allocator = SequenceAllocator()
+
+def _daily_key(column: InstrumentedAttribute, prefix: str) -> Tuple[str, str]:
+    """返回 (序列键, 编号前缀)，编号前缀为 前缀 + 当天日期"""
+    code_prefix = f"{prefix}{datetime.now().strftime('%Y%m%d')}"
+    return f"{column.class_.__tablename__}:{code_prefix}", code_prefix
+
+def max_code_sequence(db: Session, column: InstrumentedAttribute, code_prefix: str, width: int) -> int:
+    """
+    业务表中指定前缀编号的最大序号（用于初始化序列）
+
+    只统计序号长度不超过 width + 2 的编号，忽略旧版本生成的“时间戳 + 随机数”兜底编号
+    """
+    last = db.query(column).filter(
+        column.like(f"{code_prefix}%"),
+        func.length(column) <= len(code_prefix) + width + 2
+    ).order_by(func.length(column).desc(), column.desc()).first()
+
+    suffix = last[0][len(code_prefix):] if last else ""
+    return int(suffix) if suffix.isdigit() else 0
+
+def next_daily_code(db: Session, column: InstrumentedAttribute, prefix: str, width: int = 4) -> str:
+    """
+    生成 前缀 + 日期 + 序号 格式的编号
+
+    Args:
+        db: 数据库会话
+        column: 编号所在的模型字段，如 Xiansuo.xiansuo_bianma
+        prefix: 编号前缀，如 XS
+        width: 序号最小位数
+
+    Returns:
+        str: 编号
+    """
+    key, code_prefix = _daily_key(column, prefix)
+    sequence = sequence_allocator.next_value(
+        db, key, seed=lambda: max_code_sequence(db, column, code_prefix, width)
+    )
+    return f"{code_prefix}{sequence:0{width}d}"
+
+def reserve_daily_codes(db: Session, column: InstrumentedAttribute, prefix: str, count: int,
+                        width: int = 4) -> List[str]:
+    """预留 count 个序号连续的编号（批量创建时使用）"""
+    key, code_prefix = _daily_key(column, prefix)
+    start = sequence_allocator.reserve(
+        db, key, count, seed=lambda: max_code_sequence(db, column, code_prefix, width)
+    )
+    return [f"{code_prefix}{sequence:0{width}d}" for sequence in range(start, start + count)]
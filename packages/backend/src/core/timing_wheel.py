@@ -0,0 +1,108 @@
+"""
+分层时间轮
+
+按固定刻度（tick）推进的定时队列，各层槽数相同：第 0 层每槽一个刻度，第 n 层每槽 slots^n 个刻度。
+- 加入条目按距当前刻度的远近放入对应层的槽，O(1)
+- 推进时只处理到期的第 0 层槽；高层槽在轮到时整体下沉到低层，每个条目最多下沉层数次
+- 超出最高层范围的条目放入溢出列表，最高层每转一圈重新放置一次
+- 已到期（不晚于当前刻度）的条目直接进入就绪列表，下次推进时返回
+
+推进与加入的开销只与到期、下沉的条目数有关，与时间轮中条目总数无关。
+"""
+from typing import Any, List, Tuple
+
+# (到期刻度, 条目)
+_Entry = Tuple[int, Any]
+
+class TimingWheel:
+    """分层时间轮（非线程安全，由调用方保证单线程使用）"""
+
+    def __init__(self, tick: float = 1.0, slots: int = 60, levels: int = 3, start: float = 0.0):
+        """
+        Args:
+            tick: 刻度长度（与 start、到期时间同一单位，通常为秒）
+            slots: 每层槽数
+            levels: 层数，覆盖范围为 tick * slots^levels
+            start: 起始时间
+        """
+        if tick <= 0 or slots < 2 or levels < 1:
+            raise ValueError("tick 必须大于 0，slots 不少于 2，levels 不少于 1")
+        self.tick = tick
+        self.slots = slots
+        self._spans = [slots ** level for level in range(levels + 1)]
+        self._wheels: List[List[List[_Entry]]] = [[[] for _ in range(slots)] for _ in range(levels)]
+        self._overflow: List[_Entry] = []
+        self._ready: List[Any] = []
+        self._current = self._to_tick(start)
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _to_tick(self, when: float) -> int:
+        return int(when // self.tick)
+
+    def add(self, when: float, item: Any) -> None:
+        """加入在 when 时到期的条目"""
+        self._size += 1
+        self._place(self._to_tick(when), item)
+
+    def _place(self, due: int, item: Any) -> None:
+        delta = due - self._current
+        if delta <= 0:
+            self._ready.append(item)
+            return
+        for level, wheel in enumerate(self._wheels):
+            if delta < self._spans[level + 1]:
+                wheel[(due // self._spans[level]) % self.slots].append((due, item))
+                return
+        self._overflow.append((due, item))
+
+    def advance(self, now: float) -> List[Any]:
+        """推进到 now，返回此前到期的全部条目"""
+        target = self._to_tick(now)
+        due = self._ready
+        self._ready = []
+        size = self._size - len(due)
+        top = len(self._wheels)
+
+        while self._current < target and size:
+            self._current += 1
+            tick = self._current
+            # 高层槽轮到时下沉，从高到低保证下沉的条目还能继续落到更低层
+            if tick % self._spans[top] == 0 and self._overflow:
+                overflow, self._overflow = self._overflow, []
+                for entry_due, item in overflow:
+                    self._place(entry_due, item)
+            for level in range(top - 1, 0, -1):
+                if tick % self._spans[level]:
+                    continue
+                wheel = self._wheels[level]
+                index = (tick // self._spans[level]) % self.slots
+                bucket, wheel[index] = wheel[index], []
+                for entry_due, item in bucket:
+                    self._place(entry_due, item)
+            index = tick % self.slots
+            bucket = self._wheels[0][index]
+            if bucket:
+                self._wheels[0][index] = []
+                due.extend(item for _, item in bucket)
+                size -= len(bucket)
+            if self._ready:
+                # 下沉时恰好到期的条目
+                due.extend(self._ready)
+                size -= len(self._ready)
+                self._ready = []
+
+        self._current = max(self._current, target)
+        self._size -= len(due)
+        return due
+
+    def clear(self) -> None:
+        """清空全部条目"""
+        for wheel in self._wheels:
+            for bucket in wheel:
+                bucket.clear()
+        self._overflow.clear()
+        self._ready.clear()
+        self._size = 0
@@ -1,6 +1,7 @@
 """
 代理记账营运内部系统 - 主应用入口
 """
+import asyncio
 import os
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
@@ -13,7 +14,7 @@ from api.api_v1.api import api_router
 from core.redis_client import redis_client
 from core.cache_decorator import warm_up_cache
 from core.logging import setup_logging, get_logger
-from core.middleware import RequestLoggingMiddleware, RateLimitMiddleware
+from core.middleware import DBProfilerMiddleware, RequestLoggingMiddleware, RateLimitMiddleware
 from core.exceptions import BaseCustomException
 from core.exception_handlers import (
     custom_exception_handler,
@@ -49,6 +50,13 @@ async def lifespan(app: FastAPI):
         if redis_client.is_connected:
             await warm_up_cache()
             logger.info("✅ 缓存预热完成")
+            # 订阅进程内缓存失效广播
+            from core.local_cache import run_invalidation_listener
+            app.state.cache_invalidation_task = asyncio.create_task(run_invalidation_listener())
+            # 合规事项提醒调度（多个 worker 通过 Redis 锁选出一个调度者）
+            if settings.HEGUISHIXIANG_TIXING_ENABLED:
+                from services.heguishixiang_guanli.tixing_scheduler import run_tixing_scheduler
+                app.state.tixing_scheduler_task = asyncio.create_task(run_tixing_scheduler())
     except Exception as e:
         logger.warning(f"⚠️ Redis连接失败，系统将在无缓存模式下运行: {e}")
         # 确保Redis客户端状态正确
@@ -62,18 +70,50 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.warning(f"⚠️ 事件处理器加载失败: {e}")
 
+    # 支付回调处理队列（多个 worker 通过数据库行锁分配回调，不依赖 Redis）
+    from services.zhifu_guanli.zhifu_huidiao_worker import huidiao_worker
+    app.state.zhifu_huidiao_task = asyncio.create_task(huidiao_worker.run())
+
+    # 预热支付客户端（解密配置、解析密钥），回调验签时不再重复创建
+    try:
+        from core.database import SessionLocal
+        from services.zhifu_guanli.zhifu_kehuduan_registry import zhifu_kehuduan_registry
+        warmed = await asyncio.to_thread(zhifu_kehuduan_registry.warm, SessionLocal)
+        logger.info(f"✅ 支付客户端预热完成: {warmed} 个配置")
+    except Exception as e:
+        logger.warning(f"⚠️ 支付客户端预热失败: {e}")
+
     logger.info("✅ 系统启动完成")
 
     yield
 
     # 关闭时
     logger.info("🔄 正在关闭系统...")
+    background_tasks = [
+        task for task in (
+            getattr(app.state, task_name, None)
+            for task_name in ("cache_invalidation_task", "tixing_scheduler_task", "zhifu_huidiao_task")
+        )
+        if task is not None
+    ]
+    for task in background_tasks:
+        task.cancel()
+    # 等待任务退出（释放调度锁等清理依赖 Redis 连接）后再断开 Redis
+    await asyncio.gather(*background_tasks, return_exceptions=True)
+    from core.image_derivatives import image_deriver
+    image_deriver.shutdown()
     try:
         if redis_client.is_connected:
             await redis_client.disconnect()
             logger.info("✅ Redis连接已关闭")
     except Exception as e:
         logger.warning(f"⚠️ Redis关闭时出现错误: {e}")
+    try:
+        from core.database import async_engine
+        await async_engine.dispose()
+        logger.info("✅ 异步数据库连接池已释放")
+    except Exception as e:
+        logger.warning(f"⚠️ 异步数据库连接池释放时出现错误: {e}")
     logger.info("✅ 系统已关闭")
 
 app = FastAPI(
@@ -115,6 +155,15 @@ app.add_middleware(
 # 添加请求日志中间件（在 CORS 之后添加，确保 CORS 优先处理）
 app.add_middleware(RequestLoggingMiddleware)
 
+# 添加 SQL 语句统计中间件（建议仅在测试/预发环境启用）
+if settings.DB_PROFILER_ENABLED:
+    app.add_middleware(
+        DBProfilerMiddleware,
+        default_budget=settings.DB_QUERY_BUDGET_DEFAULT,
+        route_budgets=settings.DB_QUERY_BUDGETS,
+        repeated_threshold=settings.DB_REPEATED_STATEMENT_THRESHOLD
+    )
+
 # 添加全局限流中间件（可通过配置启用/禁用）
 if getattr(settings, 'RATE_LIMIT_ENABLED', True):
     app.add_middleware(
@@ -133,9 +182,8 @@ app.add_exception_handler(Exception, general_exception_handler)
 app.include_router(api_router, prefix=settings.API_V1_STR)
 
 # 配置静态文件服务
-UPLOAD_DIR = "/var/www/uploads"
-os.makedirs(UPLOAD_DIR, exist_ok=True)
-app.mount("/uploads", StaticFiles(directory=UPLOAD_DIR), name="uploads")
+os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
+app.mount("/uploads", StaticFiles(directory=settings.UPLOAD_DIR), name="uploads")
 
 @app.get("/")
 async def root() -> dict[str, str]:
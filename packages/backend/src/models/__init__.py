@@ -50,7 +50,9 @@ from .renwu_guanli import (
 # 财务与账务模块
 from .caiwu_zhangwu import (
     Pingzheng,
-    Zhangbu
+    Zhangbu,
+    KemuYue,
+    ZhangbuJiezhang
 )
 
 # 产品管理模块
@@ -91,7 +93,8 @@ from .caiwu_guanli import (
 from .fuwu_guanli import (
     FuwuGongdan,
     FuwuGongdanXiangmu,
-    FuwuGongdanRizhi
+    FuwuGongdanRizhi,
+    FuwuGongdanTongji
 )
 
 # 合规事项管理模块
@@ -100,7 +103,8 @@ from .heguishixiang_guanli import (
     KehuHeguishixiang,
     HeguishixiangShili,
     HeguishixiangTixing,
-    TixingJilu
+    TixingJilu,
+    HeguishixiangRili
 )
 
 # 办公管理模块
@@ -152,6 +156,8 @@ __all__ = [
     # 财务与账务
     "Pingzheng",
     "Zhangbu",
+    "KemuYue",
+    "ZhangbuJiezhang",
 
     # 产品管理
     "ChanpinFenlei",
@@ -183,6 +189,7 @@ __all__ = [
     "FuwuGongdan",
     "FuwuGongdanXiangmu",
     "FuwuGongdanRizhi",
+    "FuwuGongdanTongji",
 
     # 合规事项管理
     "HeguishixiangMoban",
@@ -190,6 +197,7 @@ __all__ = [
     "HeguishixiangShili",
     "HeguishixiangTixing",
     "TixingJilu",
+    "HeguishixiangRili",
 
     # 办公管理
     "BaoxiaoShenqing",
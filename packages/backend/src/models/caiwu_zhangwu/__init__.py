@@ -3,8 +3,12 @@
 """
 from .pingzheng import Pingzheng
 from .zhangbu import Zhangbu
+from .kemu_yue import KemuYue
+from .zhangbu_jiezhang import ZhangbuJiezhang
 
 __all__ = [
     "Pingzheng",
-    "Zhangbu"
+    "Zhangbu",
+    "KemuYue",
+    "ZhangbuJiezhang"
 ]
@@ -0,0 +1,82 @@
+"""
+科目余额表模型
+"""
+from sqlalchemy import Column, String, Numeric, DateTime
+from datetime import datetime
+
+from ..base import Base
+
+class KemuYue(Base):
+    """科目余额表（按客户、科目、会计期间物化期初/本期发生额/期末余额，凭证过账时增量维护）"""
+
+    __tablename__ = "kemu_yue"
+    __table_args__ = {"comment": "科目余额表"}
+
+    kehu_id = Column(
+        String(36),
+        primary_key=True,
+        comment="客户ID"
+    )
+
+    kemu_bianma = Column(
+        String(20),
+        primary_key=True,
+        comment="科目编码"
+    )
+
+    kuaiji_qijian = Column(
+        String(7),
+        primary_key=True,
+        comment="会计期间（YYYY-MM）"
+    )
+
+    kuaiji_kemu = Column(
+        String(100),
+        nullable=False,
+        comment="会计科目"
+    )
+
+    yue_fangxiang = Column(
+        String(10),
+        nullable=False,
+        comment="余额方向：jie-借方，dai-贷方"
+    )
+
+    qichu_yue = Column(
+        Numeric(15, 2),
+        default=0,
+        nullable=False,
+        comment="期初余额（上一期间结账时结转）"
+    )
+
+    benqi_jiefang = Column(
+        Numeric(15, 2),
+        default=0,
+        nullable=False,
+        comment="本期借方发生额"
+    )
+
+    benqi_daifang = Column(
+        Numeric(15, 2),
+        default=0,
+        nullable=False,
+        comment="本期贷方发生额"
+    )
+
+    qimo_yue = Column(
+        Numeric(15, 2),
+        default=0,
+        nullable=False,
+        comment="期末余额（按余额方向：期初 + 本期同向发生额 - 本期反向发生额）"
+    )
+
+    updated_at = Column(
+        DateTime,
+        default=datetime.utcnow,
+        onupdate=datetime.utcnow,
+        nullable=False,
+        comment="更新时间"
+    )
+
+    def __repr__(self) -> str:
+        return f"<KemuYue({self.kehu_id}:{self.kemu_bianma}, {self.kuaiji_qijian}={self.qimo_yue})>"
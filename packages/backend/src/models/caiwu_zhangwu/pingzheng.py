@@ -1,7 +1,7 @@
 """
 凭证表模型
 """
-from sqlalchemy import Column, String, Text, Numeric, DateTime, ForeignKey
+from sqlalchemy import Column, String, Text, Numeric, DateTime, ForeignKey, Index
 
 from ..base import BaseModel
 
@@ -9,7 +9,11 @@ class Pingzheng(BaseModel):
     """凭证表"""
     
     __tablename__ = "pingzheng"
-    __table_args__ = {"comment": "凭证表"}
+    __table_args__ = (
+        # 过账按状态领取待过账凭证
+        Index("ix_pingzheng_zhuangtai_riqi", "pingzheng_zhuangtai", "pingzheng_riqi"),
+        {"comment": "凭证表"},
+    )
     
     kehu_id = Column(
         String(36),
@@ -1,7 +1,7 @@
 """
 账簿表模型
 """
-from sqlalchemy import Column, String, Numeric, DateTime, ForeignKey
+from sqlalchemy import Column, String, Numeric, DateTime, ForeignKey, Index
 
 from ..base import BaseModel
 
@@ -9,7 +9,11 @@ class Zhangbu(BaseModel):
     """账簿表"""
     
     __tablename__ = "zhangbu"
-    __table_args__ = {"comment": "账簿表"}
+    __table_args__ = (
+        # 明细账、科目余额结转按客户+科目+期间查询
+        Index("ix_zhangbu_kehu_kemu_qijian", "kehu_id", "kemu_bianma", "kuaiji_qijian"),
+        {"comment": "账簿表"},
+    )
     
     kehu_id = Column(
         String(36),
@@ -0,0 +1,33 @@
+"""
+账簿结账记录模型
+"""
+from sqlalchemy import Column, String, DateTime
+
+from ..base import Base
+
+class ZhangbuJiezhang(Base):
+    """账簿结账记录表（已结账的会计期间不再过账）"""
+
+    __tablename__ = "zhangbu_jiezhang"
+    __table_args__ = {"comment": "账簿结账记录表"}
+
+    kuaiji_qijian = Column(
+        String(7),
+        primary_key=True,
+        comment="会计期间（YYYY-MM）"
+    )
+
+    jiezhang_shijian = Column(
+        DateTime,
+        nullable=False,
+        comment="结账时间"
+    )
+
+    jiezhang_ren_id = Column(
+        String(36),
+        nullable=True,
+        comment="结账人ID"
+    )
+
+    def __repr__(self) -> str:
+        return f"<ZhangbuJiezhang(kuaiji_qijian='{self.kuaiji_qijian}')>"
@@ -2,9 +2,11 @@
 服务管理模块数据模型
 """
 from .fuwu_gongdan import FuwuGongdan, FuwuGongdanXiangmu, FuwuGongdanRizhi
+from .fuwu_gongdan_tongji import FuwuGongdanTongji
 
 __all__ = [
     "FuwuGongdan",
     "FuwuGongdanXiangmu", 
-    "FuwuGongdanRizhi"
+    "FuwuGongdanRizhi",
+    "FuwuGongdanTongji"
 ]
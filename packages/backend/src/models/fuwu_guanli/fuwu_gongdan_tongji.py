@@ -0,0 +1,63 @@
+"""
+服务工单统计汇总模型
+"""
+from sqlalchemy import Column, String, Integer, DateTime
+from datetime import datetime
+
+from ..base import Base
+
+class FuwuGongdanTongji(Base):
+    """服务工单统计汇总表（按执行人/客户、状态物化计数，工单状态变更时增量维护）"""
+
+    __tablename__ = "fuwu_gongdan_tongji"
+    __table_args__ = {"comment": "服务工单统计汇总表"}
+
+    weidu_leixing = Column(
+        String(20),
+        primary_key=True,
+        comment="汇总维度：zhixing_ren-执行人，kehu-客户"
+    )
+
+    weidu_id = Column(
+        String(36),
+        primary_key=True,
+        comment="维度ID（执行人ID或客户ID）"
+    )
+
+    gongdan_zhuangtai = Column(
+        String(20),
+        primary_key=True,
+        comment="工单状态"
+    )
+
+    gongdan_shuliang = Column(
+        Integer,
+        default=0,
+        nullable=False,
+        comment="工单数量"
+    )
+
+    wancheng_tianshu_zonghe = Column(
+        Integer,
+        default=0,
+        nullable=False,
+        comment="完成天数合计（仅统计有实际开始、结束时间的工单）"
+    )
+
+    wancheng_jishu = Column(
+        Integer,
+        default=0,
+        nullable=False,
+        comment="参与完成天数统计的工单数量"
+    )
+
+    updated_at = Column(
+        DateTime,
+        default=datetime.utcnow,
+        onupdate=datetime.utcnow,
+        nullable=False,
+        comment="更新时间"
+    )
+
+    def __repr__(self) -> str:
+        return f"<FuwuGongdanTongji({self.weidu_leixing}:{self.weidu_id}, {self.gongdan_zhuangtai}={self.gongdan_shuliang})>"
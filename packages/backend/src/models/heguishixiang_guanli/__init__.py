@@ -6,11 +6,13 @@ from .kehu_heguishixiang import KehuHeguishixiang
 from .heguishixiang_shili import HeguishixiangShili
 from .heguishixiang_tixing import HeguishixiangTixing
 from .tixing_jilu import TixingJilu
+from .heguishixiang_rili import HeguishixiangRili
 
 __all__ = [
     "HeguishixiangMoban",
     "KehuHeguishixiang", 
     "HeguishixiangShili",
     "HeguishixiangTixing",
-    "TixingJilu"
+    "TixingJilu",
+    "HeguishixiangRili"
 ]
@@ -0,0 +1,56 @@
+"""
+合规日历分桶模型
+"""
+from sqlalchemy import Column, String, Integer, Text, DateTime
+from datetime import datetime
+
+from ..base import Base
+
+class HeguishixiangRili(Base):
+    """合规日历分桶表（按年、月、客户物化日历条目，合规事项实例变更时增量维护）"""
+
+    __tablename__ = "heguishixiang_rili"
+    __table_args__ = {"comment": "合规日历分桶表"}
+
+    nian = Column(
+        Integer,
+        primary_key=True,
+        comment="年份（按计划结束时间）"
+    )
+
+    yue = Column(
+        Integer,
+        primary_key=True,
+        comment="月份（按计划结束时间）"
+    )
+
+    kehu_id = Column(
+        String(36),
+        primary_key=True,
+        comment="客户ID"
+    )
+
+    shixiang_shuliang = Column(
+        Integer,
+        default=0,
+        nullable=False,
+        comment="事项数量"
+    )
+
+    shixiang_liebiao = Column(
+        Text,
+        nullable=False,
+        default="[]",
+        comment="日历条目列表（JSON数组，按计划结束时间排序）"
+    )
+
+    updated_at = Column(
+        DateTime,
+        default=datetime.utcnow,
+        onupdate=datetime.utcnow,
+        nullable=False,
+        comment="更新时间"
+    )
+
+    def __repr__(self) -> str:
+        return f"<HeguishixiangRili({self.nian}-{self.yue}, kehu_id='{self.kehu_id}', shixiang_shuliang={self.shixiang_shuliang})>"
@@ -1,7 +1,7 @@
 """
 合规事项实例表
 """
-from sqlalchemy import Column, String, Text, ForeignKey, DateTime, Integer
+from sqlalchemy import Column, String, Text, ForeignKey, DateTime, Integer, UniqueConstraint
 from sqlalchemy.orm import relationship
 from models.base import BaseModel
 
@@ -9,7 +9,11 @@ class HeguishixiangShili(BaseModel):
     """合规事项实例表"""
 
     __tablename__ = "heguishixiang_shili"
-    __table_args__ = {"comment": "合规事项实例表"}
+    __table_args__ = (
+        # 同一客户同一事项每个申报期间只有一个实例，批量生成依赖此约束去重
+        UniqueConstraint("kehu_id", "heguishixiang_moban_id", "shenbao_qijian", name="uq_heguishixiang_shili_qijian"),
+        {"comment": "合规事项实例表"}
+    )
 
     # 关联信息
     kehu_id = Column(
@@ -63,6 +67,7 @@ class HeguishixiangShili(BaseModel):
     jihua_jieshu_shijian = Column(
         DateTime,
         nullable=False,
+        index=True,
         comment="计划结束时间（法定截止时间）"
     )
 
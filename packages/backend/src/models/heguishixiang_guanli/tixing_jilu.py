@@ -77,6 +77,7 @@ class TixingJilu(BaseModel):
     jihua_fasong_shijian = Column(
         DateTime,
         nullable=False,
+        index=True,
         comment="计划发送时间"
     )
 
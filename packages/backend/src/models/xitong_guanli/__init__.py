@@ -2,5 +2,7 @@
 系统管理模块模型
 """
 from .system_config import SystemConfig
+from .bianhao_xulie import BianhaoXulie
+from .jiejiari import Jiejiari
 
-__all__ = ['SystemConfig']
+__all__ = ['SystemConfig', 'BianhaoXulie', 'Jiejiari']
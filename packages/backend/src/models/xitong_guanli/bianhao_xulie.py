@@ -0,0 +1,37 @@
+"""
+编号序列模型
+"""
+from sqlalchemy import Column, String, BigInteger, DateTime
+from datetime import datetime
+
+from ..base import Base
+
+class BianhaoXulie(Base):
+    """编号序列表（按业务表、前缀和日期原子递增，供 core.sequence 分配业务编号）"""
+
+    __tablename__ = "bianhao_xulie"
+    __table_args__ = {"comment": "编号序列表"}
+
+    xulie_jian = Column(
+        String(100),
+        primary_key=True,
+        comment="序列键：业务表名:前缀日期，如 xiansuo:XS20250101"
+    )
+
+    dangqian_zhi = Column(
+        BigInteger,
+        default=0,
+        nullable=False,
+        comment="已分配的最大序号"
+    )
+
+    updated_at = Column(
+        DateTime,
+        default=datetime.utcnow,
+        onupdate=datetime.utcnow,
+        nullable=False,
+        comment="更新时间"
+    )
+
+    def __repr__(self) -> str:
+        return f"<BianhaoXulie({self.xulie_jian}={self.dangqian_zhi})>"
@@ -0,0 +1,34 @@
+"""
+节假日日历模型
+"""
+from sqlalchemy import Column, String, Date, Boolean
+
+from ..base import Base
+
+class Jiejiari(Base):
+    """节假日日历表（法定节假日与调休工作日，未登记的日期按周一至周五为工作日处理）"""
+
+    __tablename__ = "jiejiari"
+    __table_args__ = {"comment": "节假日日历表"}
+
+    riqi = Column(
+        Date,
+        primary_key=True,
+        comment="日期"
+    )
+
+    shifou_gongzuori = Column(
+        Boolean,
+        default=False,
+        nullable=False,
+        comment="是否工作日：False-法定节假日，True-调休工作日（周末上班）"
+    )
+
+    mingcheng = Column(
+        String(50),
+        nullable=True,
+        comment="节假日名称，如 春节、国庆节"
+    )
+
+    def __repr__(self) -> str:
+        return f"<Jiejiari({self.riqi}, {self.mingcheng}, shifou_gongzuori={self.shifou_gongzuori})>"
@@ -8,6 +8,7 @@ from .hetong_zhifu import HetongZhifu
 from .yinhang_huikuan_danju import YinhangHuikuanDanju
 from .zhifu_peizhi import ZhifuPeizhi
 from .zhifu_huidiao_rizhi import ZhifuHuidiaoRizhi
+from .zhifu_huidiao_renwu import ZhifuHuidiaoRenwu
 from .zhifu_tuikuan import ZhifuTuikuan
 
 __all__ = [
@@ -18,5 +19,6 @@ __all__ = [
     "YinhangHuikuanDanju",
     "ZhifuPeizhi",
     "ZhifuHuidiaoRizhi",
+    "ZhifuHuidiaoRenwu",
     "ZhifuTuikuan"
 ]
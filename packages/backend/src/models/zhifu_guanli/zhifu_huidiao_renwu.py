@@ -0,0 +1,100 @@
+"""
+支付回调处理队列表模型
+"""
+from sqlalchemy import Column, String, Text, DateTime, Integer, Numeric, Index
+from ..base import BaseModel
+
+class ZhifuHuidiaoRenwu(BaseModel):
+    """支付回调处理队列表（签名验证通过的支付成功通知，由后台 worker 批量处理）"""
+
+    __tablename__ = "zhifu_huidiao_renwu"
+    __table_args__ = (
+        Index("ix_zhifu_huidiao_renwu_zhuangtai", "renwu_zhuangtai", "created_at"),
+        {"comment": "支付回调处理队列表"},
+    )
+
+    # 幂等键：平台 + 商户订单号 + 第三方订单号，支付平台重复通知只入队一次
+    mideng_jian = Column(
+        String(200),
+        unique=True,
+        nullable=False,
+        comment="幂等键（平台:商户订单号:第三方订单号）"
+    )
+
+    huidiao_rizhi_id = Column(
+        String(36),
+        nullable=True,
+        comment="回调日志ID"
+    )
+
+    zhifu_pingtai = Column(
+        String(20),
+        nullable=False,
+        comment="支付平台：weixin(微信)、zhifubao(支付宝)"
+    )
+
+    dingdan_hao = Column(
+        String(100),
+        nullable=False,
+        comment="商户订单号（支付订单编号）"
+    )
+
+    disanfang_dingdan_hao = Column(
+        String(100),
+        nullable=True,
+        comment="第三方支付订单号"
+    )
+
+    jiaoyi_jine = Column(
+        Numeric(10, 2),
+        nullable=False,
+        comment="交易金额"
+    )
+
+    zhifu_zhanghu = Column(
+        String(100),
+        nullable=True,
+        comment="支付账户"
+    )
+
+    huidiao_shuju = Column(
+        Text,
+        nullable=True,
+        comment="回调数据（JSON格式）"
+    )
+
+    jieshou_shijian = Column(
+        DateTime,
+        nullable=False,
+        comment="接收时间"
+    )
+
+    # 处理信息
+    renwu_zhuangtai = Column(
+        String(20),
+        default="daichuli",
+        nullable=False,
+        comment="处理状态：daichuli(待处理)、chenggong(成功)、shibai(失败)"
+    )
+
+    chongshi_cishu = Column(
+        Integer,
+        default=0,
+        nullable=False,
+        comment="失败重试次数"
+    )
+
+    cuowu_xinxi = Column(
+        Text,
+        nullable=True,
+        comment="错误信息"
+    )
+
+    chuli_shijian = Column(
+        DateTime,
+        nullable=True,
+        comment="处理时间"
+    )
+
+    def __repr__(self):
+        return f"<ZhifuHuidiaoRenwu(dingdan_hao={self.dingdan_hao}, zhuangtai={self.renwu_zhuangtai})>"
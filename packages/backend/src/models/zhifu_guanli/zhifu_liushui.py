@@ -96,6 +96,7 @@ class ZhifuLiushui(BaseModel):
     disanfang_dingdan_hao = Column(
         String(100),
         nullable=True,
+        index=True,
         comment="第三方订单号"
     )
     
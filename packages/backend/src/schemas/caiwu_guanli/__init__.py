@@ -35,6 +35,13 @@ from .caiwu_shezhi_schemas import (
     ZhichuLeibieResponse,
     ZhichuLeibieListResponse
 )
+from .zhangbu_guozhang_schemas import (
+    PingzhengGuozhangRequest,
+    PingzhengGuozhangResponse,
+    WufaGuozhangPingzheng,
+    QimoJiezhangRequest,
+    QimoJiezhangResponse
+)
 
 __all__ = [
     # 开票申请
@@ -75,5 +82,12 @@ __all__ = [
     "ZhichuLeibieCreate",
     "ZhichuLeibieUpdate",
     "ZhichuLeibieResponse",
-    "ZhichuLeibieListResponse"
+    "ZhichuLeibieListResponse",
+
+    # 凭证过账与期末结账
+    "PingzhengGuozhangRequest",
+    "PingzhengGuozhangResponse",
+    "WufaGuozhangPingzheng",
+    "QimoJiezhangRequest",
+    "QimoJiezhangResponse"
 ]
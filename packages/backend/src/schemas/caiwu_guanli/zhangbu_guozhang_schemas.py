@@ -0,0 +1,39 @@
+"""
+凭证过账与期末结账相关的 Pydantic 模式
+"""
+from typing import Optional, List
+from datetime import datetime
+from decimal import Decimal
+from pydantic import BaseModel, Field
+
+class PingzhengGuozhangRequest(BaseModel):
+    """凭证过账的请求模式"""
+    pingzheng_ids: Optional[List[str]] = Field(None, description="指定过账的凭证ID，为空时过账全部已审核凭证")
+    kehu_id: Optional[str] = Field(None, description="只过账该客户的凭证")
+    limit: Optional[int] = Field(None, ge=1, le=10000, description="本次最多过账的凭证数量")
+
+class WufaGuozhangPingzheng(BaseModel):
+    """过账时跳过的已审核凭证"""
+    id: str = Field(..., description="凭证ID")
+    kehu_id: str = Field(..., description="客户ID")
+    pingzheng_bianhao: str = Field(..., description="凭证编号")
+    pingzheng_riqi: datetime = Field(..., description="凭证日期")
+    jiebie_jine: Decimal = Field(..., description="借方金额")
+    daifang_jine: Decimal = Field(..., description="贷方金额")
+    yuanyin: str = Field(..., description="跳过原因")
+
+class PingzhengGuozhangResponse(BaseModel):
+    """凭证过账的响应模式"""
+    guozhang_shuliang: int = Field(..., description="过账的凭证数量")
+    wufa_guozhang: List[WufaGuozhangPingzheng] = Field(
+        default_factory=list, description="借贷不平或所属期间已结账、需要更正后处理的已审核凭证"
+    )
+
+class QimoJiezhangRequest(BaseModel):
+    """期末结账的请求模式"""
+    kuaiji_qijian: str = Field(..., pattern=r"^\d{4}-(0[1-9]|1[0-2])$", description="会计期间（YYYY-MM）")
+
+class QimoJiezhangResponse(BaseModel):
+    """期末结账的响应模式"""
+    kuaiji_qijian: str = Field(..., description="结账的会计期间")
+    jiezhuan_shuliang: int = Field(..., description="结转到下一期间的科目余额数量")
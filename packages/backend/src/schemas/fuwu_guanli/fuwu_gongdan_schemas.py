@@ -154,6 +154,8 @@ class FuwuGongdanListParams(BaseModel):
     kehu_id: Optional[str] = Field(None, description="客户ID")
     hetong_id: Optional[str] = Field(None, description="合同ID")
     is_overdue: Optional[bool] = Field(None, description="是否逾期")
+    cursor: Optional[str] = Field(None, description="分页游标（传入上一页返回的 next_cursor，此时忽略页码）")
+    total_mode: str = Field("exact", pattern="^(exact|estimate)$", description="总数模式：exact-精确计数，estimate-统计信息估算")
 
 class FuwuGongdanListResponse(BaseModel):
     """服务工单列表响应模型"""
@@ -162,6 +164,7 @@ class FuwuGongdanListResponse(BaseModel):
     page: int = Field(..., description="当前页码")
     size: int = Field(..., description="每页数量")
     pages: int = Field(..., description="总页数")
+    next_cursor: Optional[str] = Field(None, description="下一页游标，没有更多数据时为空")
 
 class FuwuGongdanStatistics(BaseModel):
     """服务工单统计模型"""
@@ -10,5 +10,9 @@ __all__ = [
     "HeguishixiangMobanResponse",
     "HeguishixiangMobanListResponse",
     "HeguishixiangMobanListParams",
-    "HeguishixiangMobanOptionsResponse"
+    "HeguishixiangMobanOptionsResponse",
+
+    # 合规事项实例生成
+    "HeguishixiangShiliGenerateRequest",
+    "HeguishixiangShiliGenerateResponse"
 ]
@@ -2,7 +2,7 @@
 合规事项模板相关的Pydantic模式
 """
 from typing import Optional, List, Dict, Any
-from datetime import datetime
+from datetime import date, datetime
 from pydantic import BaseModel, Field
 
 class HeguishixiangMobanBase(BaseModel):
@@ -93,3 +93,16 @@ class HeguishixiangMobanBatchUpdateRequest(BaseModel):
     """批量更新合规事项模板请求模式"""
     template_ids: List[str] = Field(..., description="模板ID列表")
     update_data: HeguishixiangMobanUpdate = Field(..., description="更新数据")
+
+class HeguishixiangShiliGenerateRequest(BaseModel):
+    """批量生成合规事项实例请求模式"""
+    start_date: date = Field(..., description="开始日期（按截止日期筛选申报期间）")
+    end_date: date = Field(..., description="结束日期（不含）")
+    moban_ids: Optional[List[str]] = Field(None, description="只生成这些模板的实例")
+    kehu_ids: Optional[List[str]] = Field(None, description="只生成这些客户的实例")
+
+class HeguishixiangShiliGenerateResponse(BaseModel):
+    """批量生成合规事项实例响应模式"""
+    created: int = Field(..., description="新生成的实例数量")
+    existing: int = Field(..., description="已存在而跳过的实例数量")
+    invalid: List[Dict[str, str]] = Field(default_factory=list, description="截止时间规则无效的客户配置")
@@ -14,7 +14,9 @@ from .shenhe_liucheng_schemas import (
     ShenheLiuchengCreate,
     ShenheLiuchengUpdate,
     ShenheLiuchengResponse,
-    ShenheLiuchengListParams
+    ShenheLiuchengListParams,
+    ShenheBatchActionItem,
+    ShenheBatchActionRequest
 )
 
 from .shenhe_jilu_schemas import (
@@ -49,6 +51,8 @@ __all__ = [
     "ShenheLiuchengUpdate",
     "ShenheLiuchengResponse",
     "ShenheLiuchengListParams",
+    "ShenheBatchActionItem",
+    "ShenheBatchActionRequest",
 
     # 审核记录
     "ShenheJiluBase",
@@ -64,3 +64,12 @@ class ShenheActionRequest(BaseModel):
     shenhe_yijian: Optional[str] = Field(None, description="审核意见")
     fujian_lujing: Optional[str] = Field(None, description="附件路径")
     fujian_miaoshu: Optional[str] = Field(None, description="附件描述")
+
+class ShenheBatchActionItem(ShenheActionRequest):
+    """批量审核中的单项操作"""
+    liucheng_id: str = Field(..., description="审核流程ID")
+    step_id: str = Field(..., description="审核步骤ID")
+
+class ShenheBatchActionRequest(BaseModel):
+    """批量审核操作请求模型"""
+    items: List[ShenheBatchActionItem] = Field(..., min_length=1, max_length=200, description="审核操作列表")
@@ -116,6 +116,7 @@ class XiansuoListResponse(BaseModel):
     total: int
     page: int
     size: int
+    next_cursor: Optional[str] = None
 
 class XiansuoDetailResponse(XiansuoResponse):
     """线索详情响应模式"""
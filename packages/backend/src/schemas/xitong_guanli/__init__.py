@@ -8,11 +8,13 @@ from .system_config_schemas import (
     SystemInfoResponse,
     CacheClearResponse
 )
+from .upload_schemas import UploadSessionCreate
 
 __all__ = [
     'SystemConfigResponse',
     'SystemConfigUpdate',
     'SystemConfigBatchUpdate',
     'SystemInfoResponse',
-    'CacheClearResponse'
+    'CacheClearResponse',
+    'UploadSessionCreate'
 ]
@@ -0,0 +1,12 @@
+"""
+文件上传Schema
+"""
+from typing import Literal, Optional
+from pydantic import BaseModel, Field
+
+class UploadSessionCreate(BaseModel):
+    """创建断点续传会话"""
+    filename: str = Field(..., min_length=1, max_length=255, description="原始文件名")
+    size: int = Field(..., gt=0, description="文件大小（字节）")
+    content_type: Optional[str] = Field(None, max_length=100, description="文件类型")
+    category: Literal["images", "files"] = Field("files", description="存储分类：images(图片)、files(文件)")
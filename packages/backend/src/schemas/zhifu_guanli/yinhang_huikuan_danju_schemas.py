@@ -4,7 +4,9 @@
 from typing import Optional, List
 from datetime import datetime
 from decimal import Decimal
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, computed_field
+
+from core.image_derivatives import derivative_url
 
 class YinhangHuikuanDanjuBase(BaseModel):
     """银行汇款单据基础模型"""
@@ -58,6 +60,16 @@ class YinhangHuikuanDanjuResponse(BaseModel):
     updated_at: datetime
     created_by: Optional[str]
 
+    @computed_field(description="凭证缩略图URL（非图片为空）")
+    @property
+    def thumb_url(self) -> Optional[str]:
+        return derivative_url(self.danju_lujing, "thumb")
+
+    @computed_field(description="凭证预览图URL（非图片为空）")
+    @property
+    def preview_url(self) -> Optional[str]:
+        return derivative_url(self.danju_lujing, "preview")
+
     class Config:
         from_attributes = True
 
@@ -121,6 +121,8 @@ class ZhifuDingdanListParams(BaseModel):
     zhifu_zhuangtai: Optional[str] = Field(None, description="支付状态")
     start_date: Optional[datetime] = Field(None, description="开始日期")
     end_date: Optional[datetime] = Field(None, description="结束日期")
+    cursor: Optional[str] = Field(None, description="分页游标（传入上一页返回的 next_cursor，此时忽略页码）")
+    total_mode: str = Field("exact", pattern="^(exact|estimate)$", description="总数模式：exact-精确计数，estimate-统计信息估算")
 
 class ZhifuDingdanListResponse(BaseModel):
     """支付订单列表响应模式"""
@@ -128,6 +130,7 @@ class ZhifuDingdanListResponse(BaseModel):
     items: List[ZhifuDingdanResponse]
     page: int
     size: int
+    next_cursor: Optional[str] = None
 
 class ZhifuDingdanStatistics(BaseModel):
     """支付订单统计信息"""
@@ -51,3 +51,4 @@ class ZhifuHuidiaoRizhiListResponse(BaseModel):
     items: list[ZhifuHuidiaoRizhiResponse]
     page: int
     page_size: int
+    next_cursor: Optional[str] = None
@@ -118,6 +118,8 @@ class ZhifuLiushuiListParams(BaseModel):
     duizhang_zhuangtai: Optional[str] = Field(None, description="对账状态")
     start_date: Optional[datetime] = Field(None, description="开始日期")
     end_date: Optional[datetime] = Field(None, description="结束日期")
+    cursor: Optional[str] = Field(None, description="分页游标（传入上一页返回的 next_cursor，此时忽略页码）")
+    total_mode: str = Field("exact", pattern="^(exact|estimate)$", description="总数模式：exact-精确计数，estimate-统计信息估算")
 
 class ZhifuLiushuiListResponse(BaseModel):
     """支付流水列表响应模式"""
@@ -125,3 +127,4 @@ class ZhifuLiushuiListResponse(BaseModel):
     items: List[ZhifuLiushuiResponse]
     page: int
     size: int
+    next_cursor: Optional[str] = None
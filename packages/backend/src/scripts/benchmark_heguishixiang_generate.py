@@ -0,0 +1,136 @@
+"""
+合规事项实例批量生成基准测试
+
+5000 个客户 × 20 个模板（12 个月度、5 个季度、2 个年度、1 个自定义），生成 2025 年 1 月到期的全部实例，对比：
+- naive:  逐个配置懒加载模板、解析规则、查询实例是否存在、逐条 ORM 写入（逐条分配编号）
+- engine: HeguishixiangShengchengService.generate_instances，规则编译一次、一条 INSERT ... ON CONFLICT DO NOTHING
+
+naive 只在前 NAIVE_CUSTOMERS 个客户上运行，并与 engine 对同一批客户的生成结果比对。
+使用内存 SQLite，输出耗时与每个实例的平均耗时。
+用法：cd src && python -m scripts.benchmark_heguishixiang_generate
+"""
+import time
+from datetime import date, datetime, time as dt_time
+from typing import Callable, Set, Tuple
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import models  # noqa: F401  确保所有模型注册到元数据
+from core.sequence import next_daily_code, sequence_allocator
+from models.base import Base
+from models.heguishixiang_guanli import HeguishixiangMoban, HeguishixiangShili, KehuHeguishixiang
+from models.kehu_guanli import Kehu
+from models.xitong_guanli.jiejiari import Jiejiari
+from services.heguishixiang_guanli.heguishixiang_shengcheng_service import HeguishixiangShengchengService
+from services.heguishixiang_guanli.jiezhi_guize import WorkdayCalendar, compile_deadline_rule
+
+CUSTOMER_COUNT = 5000
+NAIVE_CUSTOMERS = 250
+START = date(2025, 1, 1)
+END = date(2025, 2, 1)
+
+# (申报周期, 规则, 模板数量)
+TEMPLATE_RULES = (
+    ("monthly", '{"type": "monthly", "day": 15}', 12),
+    ("quarterly", '{"type": "quarterly", "day": 15}', 5),
+    ("annually", '{"type": "annually", "day": 20}', 2),
+    ("custom", '{"dates": ["01-31", "07-31"]}', 1),
+)
+
+Result = Set[Tuple[str, str, str, datetime]]
+
+def seed(db: Session, customer_count: int) -> None:
+    """创建客户、模板与客户合规事项配置，以及 2025 年元旦假日"""
+    db.execute(insert(Kehu), [
+        {"id": f"kehu-{i}", "gongsi_mingcheng": f"客户{i}", "tongyi_shehui_xinyong_daima": f"9131{i:06d}",
+         "faren_xingming": "张三"}
+        for i in range(customer_count)
+    ])
+    moban_rows = []
+    for zhouqi, guize, count in TEMPLATE_RULES:
+        for _ in range(count):
+            index = len(moban_rows)
+            moban_rows.append({
+                "id": f"moban-{index}", "shixiang_mingcheng": f"事项{index}", "shixiang_bianma": f"SX{index}",
+                "shixiang_leixing": "shuiwu_shenbao", "shenbao_zhouqi": zhouqi, "jiezhi_shijian_guize": guize,
+            })
+    db.execute(insert(HeguishixiangMoban), moban_rows)
+    db.execute(insert(KehuHeguishixiang), [
+        {"id": f"peizhi-{i}-{moban['id']}", "kehu_id": f"kehu-{i}", "heguishixiang_moban_id": moban["id"]}
+        for i in range(customer_count)
+        for moban in moban_rows
+    ])
+    db.execute(insert(Jiejiari), [{"riqi": date(2025, 1, 1), "shifou_gongzuori": False, "mingcheng": "元旦"}])
+    db.commit()
+
+def naive_generate(db: Session) -> None:
+    """逐配置、逐实例生成"""
+    peizhi_list = db.query(KehuHeguishixiang).filter(
+        KehuHeguishixiang.is_deleted == "N",
+        KehuHeguishixiang.peizhi_zhuangtai == "active"
+    ).all()
+    for peizhi in peizhi_list:
+        moban = peizhi.heguishixiang_moban
+        rule = compile_deadline_rule.__wrapped__(moban.shenbao_zhouqi, peizhi.teshu_jiezhi_shijian or moban.jiezhi_shijian_guize)
+        for qijian in rule.periods(START, END):
+            exists = db.query(HeguishixiangShili).filter(
+                HeguishixiangShili.kehu_id == peizhi.kehu_id,
+                HeguishixiangShili.heguishixiang_moban_id == moban.id,
+                HeguishixiangShili.shenbao_qijian == qijian.mingcheng
+            ).first()
+            if exists:
+                continue
+            jiezhi = WorkdayCalendar.load(db, qijian.jiezhi, END).roll_forward(qijian.jiezhi)
+            db.add(HeguishixiangShili(
+                kehu_id=peizhi.kehu_id,
+                heguishixiang_moban_id=moban.id,
+                kehu_heguishixiang_id=peizhi.id,
+                shili_bianhao=next_daily_code(db, HeguishixiangShili.shili_bianhao, "HG", width=6),
+                shili_mingcheng=f"{qijian.mingcheng}{moban.shixiang_mingcheng}",
+                shenbao_qijian=qijian.mingcheng,
+                jihua_kaishi_shijian=datetime.combine(qijian.kaishi, dt_time.min) if qijian.kaishi else None,
+                jihua_jieshu_shijian=datetime.combine(jiezhi, dt_time(23, 59, 59)),
+                fengxian_dengji=peizhi.kehu_fengxian_dengji or moban.fengxian_dengji,
+            ))
+    db.commit()
+
+def load_result(db: Session, customer_count: int) -> Result:
+    kehu_ids = [f"kehu-{i}" for i in range(customer_count)]
+    return {
+        tuple(row) for row in db.query(
+            HeguishixiangShili.kehu_id,
+            HeguishixiangShili.heguishixiang_moban_id,
+            HeguishixiangShili.shenbao_qijian,
+            HeguishixiangShili.jihua_jieshu_shijian
+        ).filter(HeguishixiangShili.kehu_id.in_(kehu_ids))
+    }
+
+def run(name: str, customer_count: int, func: Callable[[Session], None]) -> Session:
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    seed(db, customer_count)
+    sequence_allocator.reset()
+
+    start = time.perf_counter()
+    func(db)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    count = db.query(HeguishixiangShili).count()
+    print(f"{name:<8} 客户={customer_count:>5} 实例={count:>7} {elapsed_ms:>10.1f} ms  {elapsed_ms * 1000 / count:>8.1f} µs/实例")
+    return db
+
+def main() -> None:
+    print(f"模板={sum(count for _, _, count in TEMPLATE_RULES)} 区间={START} ~ {END}")
+    naive_db = run("naive", NAIVE_CUSTOMERS, naive_generate)
+    engine_db = run("engine", CUSTOMER_COUNT, lambda db: HeguishixiangShengchengService(db).generate_instances(START, END))
+
+    start = time.perf_counter()
+    again = HeguishixiangShengchengService(engine_db).generate_instances(START, END)
+    print(f"{'rerun':<8} 新生成={again['created']} 已存在={again['existing']} {(time.perf_counter() - start) * 1000:>10.1f} ms")
+    assert again["created"] == 0, "重复执行生成了重复实例"
+    assert load_result(naive_db, NAIVE_CUSTOMERS) == load_result(engine_db, NAIVE_CUSTOMERS), "两种实现结果不一致"
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+合规事项提醒调度基准测试
+
+10 个提醒配置（提醒时间 09:00 ~ 09:09，截止前 3 天起每天提醒，最多重复 2 次），
+合规事项实例的截止日期均匀分布在一年内，对比不同实例数量下每个调度刻度（1 秒）的开销：
+- naive:     每个刻度按配置扫描全部未结束实例，计算本刻度内到期的提醒
+- scheduler: TixingScheduler 按 10 分钟窗口加载到时间轮，每个刻度只取出到期的提醒并批量发送
+
+scheduler 从 08:59:30 连续推进 600 个刻度（含窗口加载与发送），naive 只测 3 个刻度。
+另以 naive 方式全量计算同一窗口内的提醒，与 load_due 的结果比对。
+使用内存 SQLite，输出每个刻度的平均耗时。
+用法：cd src && python -m scripts.benchmark_heguishixiang_tixing
+"""
+import time
+from datetime import datetime, timedelta
+from typing import Set, Tuple
+
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import models  # noqa: F401  确保所有模型注册到元数据
+from core.sequence import sequence_allocator
+from models.base import Base
+from models.heguishixiang_guanli import HeguishixiangMoban, HeguishixiangShili, HeguishixiangTixing
+from models.kehu_guanli import Kehu
+from services.heguishixiang_guanli.heguishixiang_tixing_service import (
+    FINISHED_STATUSES,
+    SCHEDULED_TYPES,
+    HeguishixiangTixingService,
+    fire_times,
+    parse_tixing_shijian,
+)
+from services.heguishixiang_guanli.tixing_scheduler import TixingScheduler
+
+SIZES = (10_000, 50_000, 200_000)
+CONFIG_COUNT = 10
+KEHU_COUNT = 1000
+START = datetime(2025, 6, 17, 8, 59, 30)
+TICKS = 600
+NAIVE_TICKS = 3
+
+Renwu = Set[Tuple[str, str, datetime]]
+
+def seed(db: Session, size: int) -> None:
+    db.execute(insert(Kehu), [
+        {"id": f"kehu-{i}", "gongsi_mingcheng": f"客户{i}", "tongyi_shehui_xinyong_daima": f"9131{i:06d}",
+         "faren_xingming": "张三"}
+        for i in range(KEHU_COUNT)
+    ])
+    db.execute(insert(HeguishixiangMoban), [
+        {"id": f"moban-{i}", "shixiang_mingcheng": f"事项{i}", "shixiang_bianma": f"SX{i}",
+         "shixiang_leixing": "shuiwu_shenbao", "shenbao_zhouqi": "monthly", "jiezhi_shijian_guize": "{}"}
+        for i in range(CONFIG_COUNT)
+    ])
+    db.execute(insert(HeguishixiangTixing), [
+        {"id": f"tixing-{i}", "heguishixiang_moban_id": f"moban-{i}", "tixing_mingcheng": f"提醒{i}",
+         "tixing_leixing": "deadline_reminder", "tiqian_tianshu": 3, "tixing_shijian": f"09:{i:02d}",
+         "jieshou_ren_leixing": "accountant", "tixing_biaoti_moban": "{shili_mingcheng}还剩{shengyu_tianshu}天",
+         "tixing_neirong_moban": "请在{jiezhi_riqi}前完成", "chongfu_tixing": True, "chongfu_jiangetianshu": 1,
+         "zuida_chongfu_cishu": 2, "fasong_cishu": 0, "chenggong_cishu": 0}
+        for i in range(CONFIG_COUNT)
+    ])
+    base = datetime(2025, 1, 1, 23, 59, 59)
+    db.execute(insert(HeguishixiangShili), [
+        {"id": f"shili-{i}", "kehu_id": f"kehu-{i % KEHU_COUNT}", "heguishixiang_moban_id": f"moban-{i % CONFIG_COUNT}",
+         "shili_bianhao": f"HG{i:08d}", "shili_mingcheng": f"实例{i}", "shenbao_qijian": f"期间{i}",
+         "jihua_jieshu_shijian": base + timedelta(days=(i // CONFIG_COUNT) % 365),
+         "shili_zhuangtai": "completed" if i % 5 == 0 else "pending", "fuzeren_id": f"yonghu-{i % 50}",
+         "tixing_cishu": 0}
+        for i in range(size)
+    ])
+    db.commit()
+
+def naive_due(db: Session, start: datetime, end: datetime) -> Renwu:
+    """按配置扫描全部未结束实例，计算 [start, end) 内的提醒"""
+    result = set()
+    configs = db.execute(select(HeguishixiangTixing).where(
+        HeguishixiangTixing.tixing_zhuangtai == "active",
+        HeguishixiangTixing.tixing_leixing.in_(SCHEDULED_TYPES)
+    )).scalars().all()
+    for config in configs:
+        rows = db.execute(select(HeguishixiangShili.id, HeguishixiangShili.jihua_jieshu_shijian).where(
+            HeguishixiangShili.heguishixiang_moban_id == config.heguishixiang_moban_id,
+            HeguishixiangShili.shili_zhuangtai.notin_(FINISHED_STATUSES),
+            HeguishixiangShili.is_deleted == "N"
+        ))
+        at = parse_tixing_shijian(config.tixing_shijian)
+        for shili_id, deadline in rows:
+            for fire in fire_times(config.tixing_leixing, deadline, at, config.tiqian_tianshu,
+                                   config.chongfu_jiangetianshu, config.zuida_chongfu_cishu, start, end):
+                result.add((config.id, shili_id, fire))
+    return result
+
+def run(size: int) -> None:
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    session_factory = sessionmaker(bind=engine)
+    db = session_factory()
+    seed(db, size)
+    sequence_allocator.reset()
+
+    window_end = START + timedelta(seconds=TICKS)
+    expected = naive_due(db, START, window_end)
+    loaded = {
+        (renwu.tixing_id, renwu.shili_id, renwu.jihua_fasong_shijian)
+        for renwu in HeguishixiangTixingService(db).load_due(START, window_end)
+    }
+    assert loaded == expected, "两种实现结果不一致"
+
+    start = time.perf_counter()
+    for tick in range(NAIVE_TICKS):
+        now = START + timedelta(seconds=tick)
+        naive_due(db, now - timedelta(seconds=1), now)
+    naive_ms = (time.perf_counter() - start) * 1000 / NAIVE_TICKS
+
+    scheduler = TixingScheduler(session_factory=session_factory, tick_seconds=1, window_seconds=TICKS,
+                                batch_size=5000)
+    sent = 0
+    slowest = 0.0
+    start = time.perf_counter()
+    for tick in range(TICKS):
+        tick_start = time.perf_counter()
+        sent += scheduler.tick(START + timedelta(seconds=tick))
+        slowest = max(slowest, time.perf_counter() - tick_start)
+    scheduler_ms = (time.perf_counter() - start) * 1000 / TICKS
+
+    assert sent == len(expected), f"发送数量 {sent} 与预期 {len(expected)} 不一致"
+    print(f"实例={size:>7}  窗口提醒={len(expected):>5}  naive {naive_ms:>9.2f} ms/刻度  "
+          f"scheduler {scheduler_ms:>7.3f} ms/刻度（最慢 {slowest * 1000:.1f} ms）")
+
+def main() -> None:
+    print(f"配置={CONFIG_COUNT} 刻度=1s 窗口={TICKS}s 起始={START}")
+    for size in SIZES:
+        run(size)
+
+if __name__ == "__main__":
+    main()
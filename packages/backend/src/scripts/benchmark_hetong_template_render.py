@@ -0,0 +1,91 @@
+"""
+合同模板渲染基准测试
+
+对比三种实现（约 50 KB 模板、60 个变量）：
+- legacy:  原 render_template，逐变量对全文执行两次 str.replace 并逐变量记录日志
+- compiled: 编译缓存后的片段列表，一次 join（当前 HetongGenerateService.render_template）
+- preview: 预览缓存命中（当前 preview_contract / preview_hetong_moban）
+
+不依赖数据库，输出平均耗时。
+用法：cd src && python -m scripts.benchmark_hetong_template_render
+"""
+import logging
+import time
+from datetime import datetime
+from types import SimpleNamespace
+from typing import Any, Callable, Dict
+
+from services.hetong_guanli.hetong_generate_service import HetongGenerateService
+from services.hetong_guanli.hetong_template_renderer import (
+    clear_template_cache,
+    render_preview,
+    render_template_content,
+)
+
+VARIABLE_COUNT = 60
+TEMPLATE_SIZE = 50 * 1024
+ITERATIONS = 200
+
+logger = logging.getLogger(__name__)
+
+def legacy_render(content: str, values: Dict[str, Any]) -> str:
+    """原实现：每个变量两次全文扫描"""
+    for key, value in values.items():
+        str_value = str(value) if value is not None else ""
+        placeholder1 = f"{{{{{key}}}}}"
+        content = content.replace(placeholder1, str_value)
+        placeholder2 = f"{{{{ {key} }}}}"
+        content = content.replace(placeholder2, str_value)
+        logger.debug(f"替换变量 {key}: {placeholder1} 和 {placeholder2} -> {str_value}")
+    return content
+
+def build_template(variables: Dict[str, Any]) -> str:
+    """生成约 50 KB 的模板，条款中轮流引用各变量（带空格与不带空格两种写法）"""
+    names = list(variables)
+    clauses = []
+    size = 0
+    index = 0
+    while size < TEMPLATE_SIZE:
+        name = names[index % len(names)]
+        placeholder = f"{{{{ {name} }}}}" if index % 2 else f"{{{{{name}}}}}"
+        clause = f"第{index + 1}条 甲方应于约定期限内按{placeholder}履行相关义务，乙方提供相应服务。\n"
+        clauses.append(clause)
+        size += len(clause.encode("utf-8"))
+        index += 1
+    return "".join(clauses)
+
+def run(name: str, func: Callable[[], str]) -> str:
+    result = func()  # 预热
+    start = time.perf_counter()
+    for _ in range(ITERATIONS):
+        result = func()
+    elapsed_ms = (time.perf_counter() - start) * 1000 / ITERATIONS
+    print(f"{name:<9} {elapsed_ms:>10.3f} ms/次")
+    return result
+
+def main() -> None:
+    customer = SimpleNamespace(
+        gongsi_mingcheng="上海示例科技有限公司", faren_xingming="张三", lianxi_dianhua="13800000000",
+        lianxi_youxiang="demo@example.com", lianxi_dizhi="上海市浦东新区", tongyi_shehui_xinyong_daima="91310000XXXXXXXX",
+        zhuce_dizhi="上海市浦东新区", faren_shenfenzheng="310000XXXXXXXXXXXX", faren_lianxi="13800000000",
+        chengli_riqi=datetime(2020, 1, 1),
+    )
+    service = HetongGenerateService(db=None)
+    variables: Dict[str, Any] = {"hetong_jine": 12800}
+    values = service._build_render_values(customer, variables)
+    for i in range(VARIABLE_COUNT - len(values)):
+        variables[f"ziding_bianliang_{i}"] = f"自定义值{i}"
+    values = service._build_render_values(customer, variables)
+
+    content = build_template(values)
+    print(f"模板大小={len(content.encode('utf-8')) // 1024} KB 变量数={len(values)} 迭代={ITERATIONS}")
+
+    clear_template_cache()
+    updated_at = datetime(2024, 1, 1)
+    legacy = run("legacy", lambda: legacy_render(content, values))
+    compiled = run("compiled", lambda: render_template_content(content, values, moban_id="bench", updated_at=updated_at))
+    preview = run("preview", lambda: render_preview(content, values, moban_id="bench", updated_at=updated_at))
+    assert legacy == compiled == preview, "三种实现结果不一致"
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+凭证图片缩略图/预览图派生基准测试
+
+手机拍摄尺寸（4032x3024）的 JPEG 凭证生成 256px 缩略图与 1280px 预览图，对比：
+- naive:   每个规格各自完整解码原图再缩小
+- derive:  render_derivatives 只解码一次，按目标尺寸缩放解码（draft），由大到小依次缩小
+
+另外测量列表页加载 20 张凭证时传输的字节数（原图 vs 缩略图）。
+用法：cd src && python -m scripts.benchmark_image_derivatives
+"""
+import os
+import tempfile
+import time
+
+from PIL import Image
+
+from core.image_derivatives import VARIANTS, render_derivatives
+
+ROUNDS = 5
+LIST_PAGE_SIZE = 20
+
+def make_photo(path: str) -> None:
+    # 带噪声的渐变，接近拍摄照片的压缩率
+    base = Image.linear_gradient("L").resize((4032, 3024))
+    noise = Image.effect_noise((4032, 3024), 12)
+    Image.merge("RGB", (base, noise, base.transpose(Image.FLIP_LEFT_RIGHT))).save(path, "JPEG", quality=90)
+
+def naive_derive(source: str, targets) -> None:
+    for max_edge, quality, dest in targets:
+        with Image.open(source) as image:
+            image = image.convert("RGB")
+            image.thumbnail((max_edge, max_edge), Image.LANCZOS)
+            image.save(dest, "WEBP", quality=quality, method=4)
+
+def timed(fn, *args) -> float:
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        fn(*args)
+    return (time.perf_counter() - start) * 1000 / ROUNDS
+
+def main() -> None:
+    with tempfile.TemporaryDirectory() as workdir:
+        source = os.path.join(workdir, "voucher.jpg")
+        make_photo(source)
+        targets = [
+            (spec.max_edge, spec.quality, os.path.join(workdir, f"{name}.webp"))
+            for name, spec in VARIANTS.items()
+        ]
+
+        naive_ms = timed(naive_derive, source, targets)
+        derive_ms = timed(render_derivatives, source, targets)
+        print(f"naive   {naive_ms:>8.1f} ms/张")
+        print(f"derive  {derive_ms:>8.1f} ms/张")
+
+        for max_edge, _, dest in targets:
+            with Image.open(dest) as image:
+                assert max(image.size) == max_edge, f"{dest} 尺寸不正确: {image.size}"
+
+        original = os.path.getsize(source)
+        thumb = os.path.getsize(os.path.join(workdir, "thumb.webp"))
+        print(f"列表页 {LIST_PAGE_SIZE} 张: 原图 {original * LIST_PAGE_SIZE / 1024 / 1024:.1f} MB, "
+              f"缩略图 {thumb * LIST_PAGE_SIZE / 1024:.1f} KB")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+用户权限计算基准测试
+
+对比三种实现（5 个角色、300 个权限的用户）：
+- legacy: 原 rbac_handler.get_user_permissions，逐角色、逐权限查询
+- join:   单条联表查询（load_user_permission_set）
+- index:  角色权限索引 + 用户角色ID查询（当前 get_user_permissions）
+
+使用内存 SQLite，输出平均耗时与每次调用的 SQL 语句数。
+用法：cd src && python -m scripts.benchmark_rbac_permissions
+"""
+import time
+from typing import Callable, Set
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import models  # noqa: F401  确保所有模型注册到元数据
+from core.security.permission_cache import load_user_permission_set
+from core.security.rbac_handler import get_user_permissions
+from models.base import Base
+from models.yonghu_guanli import Jiaose, JiaoseQuanxian, Quanxian, Yonghu, YonghuJiaose
+
+ROLE_COUNT = 5
+PERMISSION_COUNT = 300
+ITERATIONS = 200
+
+def legacy_get_user_permissions(user: Yonghu, db: Session) -> Set[str]:
+    """原实现：O(角色数 × 权限数) 次查询"""
+    permissions = set()
+    user_roles = db.query(YonghuJiaose).filter(YonghuJiaose.yonghu_id == user.id).all()
+    for user_role in user_roles:
+        role_permissions = db.query(JiaoseQuanxian).filter(
+            JiaoseQuanxian.jiaose_id == user_role.jiaose_id
+        ).all()
+        for role_permission in role_permissions:
+            permission = db.query(Quanxian).filter(
+                Quanxian.id == role_permission.quanxian_id,
+                Quanxian.zhuangtai == "active",
+                Quanxian.is_deleted == "N"
+            ).first()
+            if permission:
+                permissions.add(permission.quanxian_bianma)
+    return permissions
+
+def seed(db: Session) -> Yonghu:
+    """创建一个拥有 5 个角色、共 300 个权限的用户（每个角色 60 个）"""
+    user = Yonghu(yonghu_ming="bench", mima="-", youxiang="bench@example.com", xingming="bench", zhuangtai="active")
+    db.add(user)
+    roles = [Jiaose(jiaose_ming=f"角色{i}", jiaose_bianma=f"role_{i}", zhuangtai="active") for i in range(ROLE_COUNT)]
+    permissions = [
+        Quanxian(quanxian_ming=f"权限{i}", quanxian_bianma=f"bench:{i}", ziyuan_leixing="api", zhuangtai="active")
+        for i in range(PERMISSION_COUNT)
+    ]
+    db.add_all(roles + permissions)
+    db.flush()
+    for i, permission in enumerate(permissions):
+        db.add(JiaoseQuanxian(jiaose_id=roles[i % ROLE_COUNT].id, quanxian_id=permission.id))
+    for role in roles:
+        db.add(YonghuJiaose(yonghu_id=user.id, jiaose_id=role.id))
+    db.commit()
+    return user
+
+def run(name: str, func: Callable[[], Set[str]], statements: list) -> Set[str]:
+    result = func()  # 预热
+    statements.clear()
+    start = time.perf_counter()
+    for _ in range(ITERATIONS):
+        result = func()
+    elapsed_ms = (time.perf_counter() - start) * 1000 / ITERATIONS
+    print(f"{name:<8} {elapsed_ms:>10.3f} ms/次 {len(statements) / ITERATIONS:>8.1f} 条SQL/次  权限数={len(result)}")
+    return result
+
+def main() -> None:
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    statements: list = []
+    event.listen(engine, "before_cursor_execute", lambda conn, cursor, statement, *args: statements.append(statement))
+
+    db = sessionmaker(bind=engine, autoflush=False)()
+    user = seed(db)
+
+    print(f"用户角色数={ROLE_COUNT} 权限数={PERMISSION_COUNT} 迭代={ITERATIONS}")
+    legacy = run("legacy", lambda: legacy_get_user_permissions(user, db), statements)
+    joined = run("join", lambda: set(load_user_permission_set(db, user.id)), statements)
+    indexed = run("index", lambda: get_user_permissions(user, db), statements)
+    assert legacy == joined == indexed, "三种实现结果不一致"
+    db.close()
+
+if __name__ == "__main__":
+    main()
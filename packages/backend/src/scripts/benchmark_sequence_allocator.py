@@ -0,0 +1,90 @@
+"""
+业务编号并发分配基准测试
+
+200 个线程同时创建线索，对比两种编号生成方式：
+- legacy:    原 _generate_xiansuo_bianma，按“当天已有记录数 + 1”生成，唯一约束冲突后回滚重试
+- sequence:  编号序列表分配（当前 next_daily_code）
+
+使用临时文件 SQLite（多个连接才能模拟并发），输出总耗时、冲突重试次数，并校验编号互不重复。
+用法：cd src && python -m scripts.benchmark_sequence_allocator
+"""
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime
+from typing import Callable, List
+
+from sqlalchemy import create_engine
+from sqlalchemy.exc import IntegrityError, OperationalError
+from sqlalchemy.orm import Session, sessionmaker
+
+import models  # noqa: F401  确保所有模型注册到元数据
+from core.sequence import next_daily_code, sequence_allocator
+from models.base import Base
+from models.xiansuo_guanli import Xiansuo
+from models.xitong_guanli.bianhao_xulie import BianhaoXulie
+
+THREADS = 200
+
+def legacy_generate(db: Session) -> str:
+    """原实现：统计当天线索数量生成序号"""
+    today = datetime.now().strftime("%Y%m%d")
+    count = db.query(Xiansuo).filter(Xiansuo.xiansuo_bianma.like(f"XS{today}%")).count()
+    return f"XS{today}{count + 1:03d}"
+
+def sequence_generate(db: Session) -> str:
+    return next_daily_code(db, Xiansuo.xiansuo_bianma, "XS", width=3)
+
+def create_xiansuo(session_factory: sessionmaker, generate: Callable[[Session], str],
+                   barrier: threading.Barrier, retries: List[int]) -> None:
+    """生成编号并写入线索，冲突或锁等待失败时回滚重试"""
+    barrier.wait()
+    db = session_factory()
+    try:
+        while True:
+            try:
+                db.add(Xiansuo(xiansuo_bianma=generate(db), gongsi_mingcheng="基准测试", lianxi_ren="张三",
+                               laiyuan_id="bench"))
+                db.commit()
+                return
+            except (IntegrityError, OperationalError):
+                db.rollback()
+                retries.append(1)
+    finally:
+        db.close()
+
+def run(name: str, generate: Callable[[Session], str]) -> None:
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False, "timeout": 30},
+                           pool_size=THREADS, max_overflow=0)
+    Base.metadata.create_all(engine, tables=[Xiansuo.__table__, BianhaoXulie.__table__])
+    session_factory = sessionmaker(bind=engine, autoflush=False)
+    sequence_allocator.reset()
+
+    barrier = threading.Barrier(THREADS)
+    retries: List[int] = []
+    threads = [
+        threading.Thread(target=create_xiansuo, args=(session_factory, generate, barrier, retries))
+        for _ in range(THREADS)
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed_ms = (time.perf_counter() - start) * 1000
+
+    with session_factory() as db:
+        codes = [row[0] for row in db.query(Xiansuo.xiansuo_bianma).all()]
+    engine.dispose()
+    assert len(codes) == len(set(codes)) == THREADS, f"{name} 编号重复或缺失"
+    print(f"{name:<9} {elapsed_ms:>10.1f} ms  重试={len(retries):>6}  编号数={len(codes)}")
+
+def main() -> None:
+    print(f"并发线程={THREADS}")
+    run("legacy", legacy_generate)
+    run("sequence", sequence_generate)
+
+if __name__ == "__main__":
+    main()
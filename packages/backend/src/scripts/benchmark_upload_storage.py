@@ -0,0 +1,74 @@
+"""
+文件上传保存基准测试
+
+20 个 10MB 上传并发保存（上传内容已由 multipart 解析写入磁盘临时文件，与 Starlette 一致），
+同时运行一个每 1ms 唤醒一次的心跳协程，对比：
+- legacy:    await file.read() 读入整个文件，再在事件循环中同步 open().write()
+- streaming: FileStorage.save_upload 分块读写（线程池）并计算 SHA-256
+
+输出总耗时、心跳最大延迟（事件循环被阻塞的最长时间）与 Python 内存峰值。
+用法：cd src && python -m scripts.benchmark_upload_storage
+"""
+import asyncio
+import os
+import tempfile
+import time
+import tracemalloc
+import uuid
+from typing import Awaitable, Callable, List
+
+from fastapi import UploadFile
+
+from core.file_storage import FileStorage
+
+UPLOAD_COUNT = 20
+FILE_SIZE = 10 * 1024 * 1024
+
+def make_upload(content: bytes) -> UploadFile:
+    spooled = tempfile.SpooledTemporaryFile(max_size=1024 * 1024)
+    spooled.write(content)
+    spooled.seek(0)
+    return UploadFile(spooled, filename="voucher.jpg")
+
+async def legacy_save(file: UploadFile, root: str) -> None:
+    contents = await file.read()
+    os.makedirs(root, exist_ok=True)
+    with open(os.path.join(root, f"{uuid.uuid4()}.jpg"), "wb") as f:
+        f.write(contents)
+
+async def run(name: str, save: Callable[[UploadFile], Awaitable[object]], contents: List[bytes]) -> None:
+    uploads = [make_upload(content) for content in contents]
+    lags = []
+    done = False
+
+    async def heartbeat() -> None:
+        while not done:
+            start = time.perf_counter()
+            await asyncio.sleep(0.001)
+            lags.append(time.perf_counter() - start - 0.001)
+
+    beat = asyncio.create_task(heartbeat())
+    tracemalloc.start()
+    start = time.perf_counter()
+    await asyncio.gather(*(save(upload) for upload in uploads))
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    done = True
+    await beat
+    print(f"{name:<10} {elapsed_ms:>8.1f} ms  心跳最大延迟 {max(lags) * 1000:>7.1f} ms  内存峰值 {peak / 1024 / 1024:>6.1f} MB")
+
+async def main() -> None:
+    # 一半为重复内容，streaming 只保存一份
+    contents = [os.urandom(FILE_SIZE) for _ in range(UPLOAD_COUNT // 2)] * 2
+    with tempfile.TemporaryDirectory() as workdir:
+        await run("legacy", lambda upload: legacy_save(upload, os.path.join(workdir, "legacy")), contents)
+
+        storage = FileStorage(root=os.path.join(workdir, "uploads"), temp_dir=os.path.join(workdir, "tmp"))
+        await run("streaming", lambda upload: storage.save_upload(upload, "images", FILE_SIZE), contents)
+        saved = sum(len(files) for _, _, files in os.walk(os.path.join(workdir, "uploads")))
+        assert saved == UPLOAD_COUNT // 2, f"去重后应保存 {UPLOAD_COUNT // 2} 个文件，实际 {saved}"
+        print(f"上传 {UPLOAD_COUNT} 个，按内容去重后保存 {saved} 个")
+
+if __name__ == "__main__":
+    asyncio.run(main())
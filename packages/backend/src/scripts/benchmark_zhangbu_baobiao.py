@@ -0,0 +1,226 @@
+"""
+账簿报表导出基准测试
+
+1000 个客户、每客户每月 42 张凭证，共 12 个月（1008000 行明细账），导出全部客户全年明细账与科目余额表：
+- materialized: 一次查出全部客户的明细账行，在 Python 中逐行累计余额，拼出完整 CSV 后返回；
+                科目余额表按全部明细账 GROUP BY 汇总
+- streaming:    ZhangbuBaobiaoService 按客户用窗口函数计算滚动余额，yield_per 分批读取，
+                iter_csv 逐批编码；科目余额表读取 kemu_yue 并逐行输出
+
+明细账与科目余额表直接批量写入（不经过凭证过账），内存峰值用 tracemalloc 统计。
+使用内存 SQLite。用法：cd src && python -m scripts.benchmark_zhangbu_baobiao [客户数]
+"""
+import csv
+import io
+import logging
+import random
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from decimal import Decimal
+
+from sqlalchemy import case, create_engine, func, insert, select
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import models  # noqa: F401  确保所有模型注册到元数据
+from core.report_export import iter_csv
+from models.base import Base
+from models.caiwu_zhangwu import KemuYue, Zhangbu
+from services.caiwu_zhangwu.zhangbu_baobiao_service import ZhangbuBaobiaoService
+from services.caiwu_zhangwu.zhangbu_guozhang_service import kemu_yue_fangxiang, parse_kemu
+
+KEHU_COUNT = 1000
+PINGZHENG_PER_MONTH = 42
+MONTHS = 12
+INSERT_BATCH_ROWS = 50000
+FENLU = (
+    ("1002 银行存款", "5001 主营业务收入"),
+    ("6602 管理费用", "1002 银行存款"),
+    ("1122 应收账款", "5001 主营业务收入"),
+    ("1002 银行存款", "1122 应收账款"),
+    ("2202 应付账款", "1002 银行存款"),
+    ("1405 库存商品", "2202 应付账款"),
+)
+
+def make_session():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    return sessionmaker(bind=engine)()
+
+def load_ledger(db, kehu_count: int) -> None:
+    """批量写入明细账，同时按期间物化科目余额（每期间结转全部已出现的科目）"""
+    rng = random.Random(0)
+    kemu_list = {}
+    for pair in FENLU:
+        for kemu in pair:
+            bianma, mingcheng = parse_kemu(kemu)
+            kemu_list[kemu] = (bianma, mingcheng, kemu_yue_fangxiang(bianma))
+    created_at = datetime(2024, 1, 1)
+    rows = []
+    yue = {}
+    for kehu in range(kehu_count):
+        kehu_id = f"kehu-{kehu:04d}"
+        balances = {}
+        for month in range(1, MONTHS + 1):
+            qijian = f"2024-{month:02d}"
+            fasheng = {}
+            for index in range(PINGZHENG_PER_MONTH):
+                jiefang_kemu, daifang_kemu = rng.choice(FENLU)
+                jine = Decimal(rng.randint(100, 100000)) / 100
+                riqi = datetime(2024, month, index % 28 + 1)
+                pingzheng_id = f"pz-{kehu_id}-{qijian}-{index:03d}"
+                for kemu, duifang, jiefang, daifang in (
+                    (jiefang_kemu, daifang_kemu, jine, Decimal("0")),
+                    (daifang_kemu, jiefang_kemu, Decimal("0"), jine),
+                ):
+                    bianma, mingcheng, fangxiang = kemu_list[kemu]
+                    rows.append({
+                        "id": f"{pingzheng_id}-{bianma}",
+                        "kehu_id": kehu_id,
+                        "pingzheng_id": pingzheng_id,
+                        "zhangbu_leixing": "mingxizhang",
+                        "kuaiji_kemu": mingcheng,
+                        "kemu_bianma": bianma,
+                        "jiebie_jine": jiefang,
+                        "daifang_jine": daifang,
+                        "yue_fangxiang": fangxiang,
+                        "kuaiji_qijian": qijian,
+                        "dengji_riqi": riqi,
+                        "zhaiyao": "测试凭证",
+                        "duifang_kemu": duifang,
+                        "created_at": created_at,
+                        "updated_at": created_at,
+                        "is_deleted": "N",
+                    })
+                    jie, dai = fasheng.get(kemu, (Decimal("0"), Decimal("0")))
+                    fasheng[kemu] = (jie + jiefang, dai + daifang)
+            for kemu in set(balances) | set(fasheng):
+                bianma, mingcheng, fangxiang = kemu_list[kemu]
+                jie, dai = fasheng.get(kemu, (Decimal("0"), Decimal("0")))
+                qichu = balances.get(kemu, Decimal("0"))
+                balances[kemu] = qichu + (jie - dai if fangxiang == "jie" else dai - jie)
+                yue[(kehu_id, bianma, qijian)] = {
+                    "kehu_id": kehu_id, "kemu_bianma": bianma, "kuaiji_qijian": qijian,
+                    "kuaiji_kemu": mingcheng, "yue_fangxiang": fangxiang, "qichu_yue": qichu,
+                    "benqi_jiefang": jie, "benqi_daifang": dai, "qimo_yue": balances[kemu],
+                    "updated_at": created_at,
+                }
+            if len(rows) >= INSERT_BATCH_ROWS:
+                db.execute(insert(Zhangbu), rows)
+                rows = []
+    if rows:
+        db.execute(insert(Zhangbu), rows)
+    db.execute(insert(KemuYue), list(yue.values()))
+    db.commit()
+
+def materialized_ledger(db, kaishi_qijian: str, jieshu_qijian: str):
+    """全部客户明细账一次查出，累计余额后拼出完整 CSV；返回 (CSV 字节, 各科目期末余额)"""
+    lines = db.execute(
+        select(
+            Zhangbu.kehu_id, Zhangbu.kemu_bianma, Zhangbu.kuaiji_kemu, Zhangbu.kuaiji_qijian,
+            Zhangbu.dengji_riqi, Zhangbu.zhaiyao, Zhangbu.duifang_kemu,
+            Zhangbu.jiebie_jine, Zhangbu.daifang_jine, Zhangbu.yue_fangxiang
+        )
+        .where(Zhangbu.kuaiji_qijian >= kaishi_qijian, Zhangbu.kuaiji_qijian <= jieshu_qijian)
+        .order_by(Zhangbu.kehu_id, Zhangbu.kemu_bianma, Zhangbu.dengji_riqi, Zhangbu.created_at, Zhangbu.id)
+    ).all()
+    balances = {}
+    output = []
+    for line in lines:
+        key = (line.kehu_id, line.kemu_bianma)
+        change = line.jiebie_jine - line.daifang_jine
+        balances[key] = balances.get(key, Decimal("0")) + (change if line.yue_fangxiang == "jie" else -change)
+        output.append((
+            line.kehu_id, line.kemu_bianma, line.kuaiji_kemu, line.kuaiji_qijian, line.dengji_riqi.date(),
+            line.zhaiyao, line.duifang_kemu, line.jiebie_jine, line.daifang_jine, balances[key]
+        ))
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerows(output)
+    return buffer.getvalue().encode("utf-8-sig"), balances
+
+def streaming_ledger(db, kehu_ids, kaishi_qijian: str, jieshu_qijian: str):
+    """逐客户流式导出明细账；返回 (CSV 字节数, 各科目期末余额)"""
+    service = ZhangbuBaobiaoService(db)
+    balances = {}
+    size = 0
+    for kehu_id in kehu_ids:
+        baobiao = service.subsidiary_ledger(kehu_id, kaishi_qijian, jieshu_qijian)
+
+        def rows(kehu_id=kehu_id, source=baobiao.rows):
+            for row in source:
+                balances[(kehu_id, row[0])] = row[10]
+                yield row
+
+        for chunk in iter_csv(baobiao.lietou, rows()):
+            size += len(chunk)
+    return size, balances
+
+def materialized_trial_balance(db, qijian: str):
+    net = func.sum(case(
+        (Zhangbu.yue_fangxiang == "jie", Zhangbu.jiebie_jine - Zhangbu.daifang_jine),
+        else_=Zhangbu.daifang_jine - Zhangbu.jiebie_jine
+    ))
+    return db.execute(
+        select(Zhangbu.kehu_id, Zhangbu.kemu_bianma, net.label("yue"))
+        .where(Zhangbu.kuaiji_qijian <= qijian)
+        .group_by(Zhangbu.kehu_id, Zhangbu.kemu_bianma)
+        .order_by(Zhangbu.kehu_id, Zhangbu.kemu_bianma)
+    ).all()
+
+def streaming_trial_balance(db, qijian: str) -> int:
+    baobiao = ZhangbuBaobiaoService(db).trial_balance(qijian)
+    return sum(len(chunk) for chunk in iter_csv(baobiao.lietou, baobiao.rows))
+
+def measure(func, *args):
+    """返回 (结果, 耗时秒, 内存峰值 MB)"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func(*args)
+    seconds = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1] / 1024 / 1024
+    tracemalloc.stop()
+    return result, seconds, peak
+
+def main() -> None:
+    logging.disable(logging.WARNING)
+    kehu_count = int(sys.argv[1]) if len(sys.argv) > 1 else KEHU_COUNT
+    kaishi_qijian, jieshu_qijian = "2024-01", f"2024-{MONTHS:02d}"
+
+    db = make_session()
+    start = time.perf_counter()
+    load_ledger(db, kehu_count)
+    lines = db.scalar(select(func.count()).select_from(Zhangbu))
+    print(f"写入 {lines} 行明细账（{kehu_count} 个客户，{MONTHS} 个月）：{time.perf_counter() - start:.1f} s")
+    kehu_ids = [f"kehu-{kehu:04d}" for kehu in range(kehu_count)]
+
+    (content, legacy), legacy_seconds, legacy_peak = measure(materialized_ledger, db, kaishi_qijian, jieshu_qijian)
+    (size, streamed), streaming_seconds, streaming_peak = measure(
+        streaming_ledger, db, kehu_ids, kaishi_qijian, jieshu_qijian
+    )
+    print(f"明细账      materialized {legacy_seconds:>7.2f} s  峰值 {legacy_peak:>8.1f} MB  {len(content) / 1024 / 1024:.1f} MB")
+    print(f"明细账      streaming    {streaming_seconds:>7.2f} s  峰值 {streaming_peak:>8.1f} MB  {size / 1024 / 1024:.1f} MB")
+    del content
+
+    grouped, legacy_seconds, legacy_peak = measure(materialized_trial_balance, db, jieshu_qijian)
+    size, streaming_seconds, streaming_peak = measure(streaming_trial_balance, db, jieshu_qijian)
+    print(f"科目余额表  materialized {legacy_seconds:>7.2f} s  峰值 {legacy_peak:>8.1f} MB")
+    print(f"科目余额表  streaming    {streaming_seconds:>7.2f} s  峰值 {streaming_peak:>8.1f} MB  {size / 1024:.1f} KB")
+
+    assert legacy == streamed, "明细账期末余额不一致"
+    kemu_yue = {
+        (row.kehu_id, row.kemu_bianma): row.qimo_yue
+        for row in db.execute(
+            select(KemuYue.kehu_id, KemuYue.kemu_bianma, KemuYue.qimo_yue).where(KemuYue.kuaiji_qijian == jieshu_qijian)
+        )
+    }
+    assert kemu_yue == {
+        (row.kehu_id, row.kemu_bianma): Decimal(row.yue).quantize(Decimal("0.01")) for row in grouped
+    }, "科目余额表期末余额不一致"
+    print("期末余额一致")
+    db.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""
+凭证过账与科目余额基准测试
+
+100 个客户、每客户每月 20 张凭证，共 12 个月（24000 张凭证、48000 行明细账），按月过账：
+- legacy:      逐张凭证按该科目全部历史明细账 SUM 计算期初余额后插入明细账；
+               科目余额表（试算平衡）查询时按全部明细账 GROUP BY 汇总
+- incremental: 一批凭证一次批量插入明细账，科目余额表增量 upsert，月末结账结转；
+               科目余额表查询直接读取 kemu_yue
+
+使用内存 SQLite。用法：cd src && python -m scripts.benchmark_zhangbu_guozhang
+"""
+import logging
+import random
+import time
+from datetime import datetime
+from decimal import Decimal
+
+from sqlalchemy import case, create_engine, func, insert, select
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import models  # noqa: F401  确保所有模型注册到元数据
+from models.base import Base
+from models.caiwu_zhangwu import KemuYue, Pingzheng, Zhangbu
+from services.caiwu_zhangwu.zhangbu_guozhang_service import (
+    ZhangbuGuozhangService,
+    kemu_yue_fangxiang,
+    parse_kemu,
+)
+
+KEHU_COUNT = 100
+PINGZHENG_PER_MONTH = 20
+MONTHS = 12
+FENLU = (
+    ("1002 银行存款", "5001 主营业务收入"),
+    ("6602 管理费用", "1002 银行存款"),
+    ("1122 应收账款", "5001 主营业务收入"),
+    ("1002 银行存款", "1122 应收账款"),
+    ("2202 应付账款", "1002 银行存款"),
+    ("1405 库存商品", "2202 应付账款"),
+)
+
+def make_session():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    return sessionmaker(bind=engine)()
+
+def add_month(db, month: int) -> None:
+    rng = random.Random(month)
+    rows = []
+    for kehu in range(KEHU_COUNT):
+        for index in range(PINGZHENG_PER_MONTH):
+            jiefang_kemu, daifang_kemu = rng.choice(FENLU)
+            jine = Decimal(rng.randint(100, 100000)) / 100
+            rows.append({
+                "kehu_id": f"kehu-{kehu}",
+                "zhizuo_ren_id": "zhizuo",
+                "pingzheng_bianhao": f"PZ-{month:02d}-{kehu}-{index:03d}",
+                "pingzheng_riqi": datetime(2024, month, index % 28 + 1),
+                "zhaiyao": "测试凭证",
+                "jiebie_kemu": jiefang_kemu,
+                "jiebie_jine": jine,
+                "daifang_kemu": daifang_kemu,
+                "daifang_jine": jine,
+                "pingzheng_zhuangtai": "approved",
+                "created_by": "bench",
+            })
+    db.execute(insert(Pingzheng), rows)
+    db.commit()
+
+def legacy_post(db) -> None:
+    pingzheng_list = db.scalars(
+        select(Pingzheng).where(Pingzheng.pingzheng_zhuangtai == "approved")
+        .order_by(Pingzheng.pingzheng_riqi, Pingzheng.pingzheng_bianhao)
+    ).all()
+    for pingzheng in pingzheng_list:
+        for kemu, duifang, jiefang, daifang in (
+            (pingzheng.jiebie_kemu, pingzheng.daifang_kemu, pingzheng.jiebie_jine, Decimal("0")),
+            (pingzheng.daifang_kemu, pingzheng.jiebie_kemu, Decimal("0"), pingzheng.jiebie_jine),
+        ):
+            bianma, mingcheng = parse_kemu(kemu)
+            fangxiang = kemu_yue_fangxiang(bianma)
+            jie, dai = db.execute(
+                select(func.coalesce(func.sum(Zhangbu.jiebie_jine), 0), func.coalesce(func.sum(Zhangbu.daifang_jine), 0))
+                .where(Zhangbu.kehu_id == pingzheng.kehu_id, Zhangbu.kemu_bianma == bianma)
+            ).one()
+            qichu = Decimal(jie) - Decimal(dai) if fangxiang == "jie" else Decimal(dai) - Decimal(jie)
+            change = jiefang - daifang if fangxiang == "jie" else daifang - jiefang
+            db.add(Zhangbu(
+                kehu_id=pingzheng.kehu_id, pingzheng_id=pingzheng.id, zhangbu_leixing="mingxizhang",
+                kuaiji_kemu=mingcheng, kemu_bianma=bianma, jiebie_jine=jiefang, daifang_jine=daifang,
+                yue_fangxiang=fangxiang, qichu_yue=qichu, qimo_yue=qichu + change,
+                kuaiji_qijian=f"{pingzheng.pingzheng_riqi:%Y-%m}", dengji_riqi=pingzheng.pingzheng_riqi,
+                zhaiyao=pingzheng.zhaiyao, duifang_kemu=duifang, created_by="bench"
+            ))
+            db.flush()
+        pingzheng.pingzheng_zhuangtai = "posted"
+    db.commit()
+
+def legacy_trial_balance(db, qijian: str):
+    net = func.sum(case(
+        (Zhangbu.yue_fangxiang == "jie", Zhangbu.jiebie_jine - Zhangbu.daifang_jine),
+        else_=Zhangbu.daifang_jine - Zhangbu.jiebie_jine
+    ))
+    return {
+        (row.kehu_id, row.kemu_bianma): Decimal(row.yue).quantize(Decimal("0.01"))
+        for row in db.execute(
+            select(Zhangbu.kehu_id, Zhangbu.kemu_bianma, net.label("yue"))
+            .where(Zhangbu.kuaiji_qijian <= qijian)
+            .group_by(Zhangbu.kehu_id, Zhangbu.kemu_bianma)
+        )
+    }
+
+def incremental_trial_balance(db, qijian: str):
+    return {
+        (row.kehu_id, row.kemu_bianma): row.qimo_yue
+        for row in db.execute(
+            select(KemuYue.kehu_id, KemuYue.kemu_bianma, KemuYue.qimo_yue).where(KemuYue.kuaiji_qijian == qijian)
+        )
+    }
+
+def main() -> None:
+    logging.disable(logging.WARNING)
+    qijian = f"2024-{MONTHS:02d}"
+
+    db = make_session()
+    legacy_seconds = 0.0
+    for month in range(1, MONTHS + 1):
+        add_month(db, month)
+        start = time.perf_counter()
+        legacy_post(db)
+        legacy_seconds += time.perf_counter() - start
+    start = time.perf_counter()
+    legacy = legacy_trial_balance(db, qijian)
+    legacy_query = time.perf_counter() - start
+    db.close()
+
+    db = make_session()
+    service = ZhangbuGuozhangService(db)
+    incremental_seconds = 0.0
+    for month in range(1, MONTHS + 1):
+        add_month(db, month)
+        start = time.perf_counter()
+        service.post_vouchers("bench")
+        if month < MONTHS:
+            service.close_period(f"2024-{month:02d}", "bench")
+        incremental_seconds += time.perf_counter() - start
+    start = time.perf_counter()
+    incremental = incremental_trial_balance(db, qijian)
+    incremental_query = time.perf_counter() - start
+    db.close()
+
+    lines = KEHU_COUNT * PINGZHENG_PER_MONTH * MONTHS * 2
+    print(f"过账 {lines} 行明细账（{MONTHS} 个月）")
+    print(f"legacy       过账 {legacy_seconds:>7.2f} s  科目余额表 {legacy_query * 1000:>8.1f} ms")
+    print(f"incremental  过账 {incremental_seconds:>7.2f} s  科目余额表 {incremental_query * 1000:>8.1f} ms")
+    print(f"过账加速 {legacy_seconds / incremental_seconds:.1f}x，查询加速 {legacy_query / incremental_query:.1f}x")
+
+    assert legacy == {key: yue for key, yue in incremental.items() if key in legacy}, "两种方式的期末余额不一致"
+    assert all(yue == 0 for key, yue in incremental.items() if key not in legacy)
+    print("期末余额一致")
+
+if __name__ == "__main__":
+    main()
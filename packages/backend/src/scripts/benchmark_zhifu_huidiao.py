@@ -0,0 +1,176 @@
+"""
+支付回调处理回放基准测试
+
+回放一段支付平台的通知流量：2000 笔支付成功的交易，每笔被重复通知 1~4 次（支付平台在超时、
+高峰期会重试），对比验签之后的处理开销（验签两种方式相同，不计入）：
+- legacy: 旧回调接口在请求内完成全部处理：写日志、更新验签结果、查订单、更新订单、查流水、
+          创建流水、更新处理结果，各自提交；重复通知同样完整处理一遍
+- queued: 回调接口写日志后按幂等键入队（一次提交）即返回；worker 每批 200 条批量更新订单与流水
+
+输出回调接口的吞吐（每秒确认的通知数）、worker 处理耗时，并比对两种方式最终的订单与流水。
+使用内存 SQLite。
+用法：cd src && python -m scripts.benchmark_zhifu_huidiao
+"""
+import logging
+import random
+import time
+from datetime import datetime
+from decimal import Decimal
+from typing import List, Set, Tuple
+
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import models  # noqa: F401  确保所有模型注册到元数据
+from models.base import Base
+from models.kehu_guanli import Kehu
+from models.zhifu_guanli import ZhifuDingdan, ZhifuLiushui
+from schemas.zhifu_guanli.zhifu_liushui_schemas import ZhifuLiushuiCreate
+from services.zhifu_guanli.zhifu_dingdan_service import ZhifuDingdanService
+from services.zhifu_guanli.zhifu_huidiao_duilie_service import ZhifuHuidiaoDuilieService
+from services.zhifu_guanli.zhifu_huidiao_service import ZhifuHuidiaoService
+from services.zhifu_guanli.zhifu_huidiao_worker import ZhifuHuidiaoWorker
+from services.zhifu_guanli.zhifu_liushui_service import ZhifuLiushuiService
+
+ORDER_COUNT = 2000
+KEHU_COUNT = 200
+BATCH_SIZE = 200
+AMOUNT = Decimal("300.00")
+
+# (商户订单号, 微信订单号)
+Notification = Tuple[str, str]
+
+def make_session_factory() -> sessionmaker:
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    factory = sessionmaker(bind=engine)
+    db = factory()
+    db.execute(insert(Kehu), [
+        {"id": f"kehu-{i}", "gongsi_mingcheng": f"客户{i}", "tongyi_shehui_xinyong_daima": f"9131{i:06d}",
+         "faren_xingming": "张三"}
+        for i in range(KEHU_COUNT)
+    ])
+    db.execute(insert(ZhifuDingdan), [
+        {"id": f"dingdan-{i}", "hetong_id": f"hetong-{i}", "kehu_id": f"kehu-{i % KEHU_COUNT}",
+         "dingdan_bianhao": f"DD{i:08d}", "dingdan_mingcheng": "代理记账服务费", "dingdan_jine": AMOUNT,
+         "yingfu_jine": AMOUNT, "shifu_jine": Decimal("0"), "zhifu_leixing": "weixin",
+         "zhifu_zhuangtai": "pending", "huidiao_zhuangtai": "pending", "chuangjian_shijian": datetime.now()}
+        for i in range(ORDER_COUNT)
+    ])
+    db.commit()
+    db.close()
+    return factory
+
+def make_trace() -> List[Notification]:
+    rng = random.Random(7)
+    trace = []
+    for i in range(ORDER_COUNT):
+        trace.extend([(f"DD{i:08d}", f"wx{i:010d}")] * rng.randint(1, 4))
+    # 重试通知与其他交易交错到达
+    rng.shuffle(trace)
+    return trace
+
+def create_log(db: Session, out_trade_no: str):
+    return ZhifuHuidiaoService(db).create_log(
+        huidiao_leixing="zhifu", zhifu_pingtai="weixin", qingqiu_url="/api/v1/public/payment-callback/weixin/notify",
+        qingqiu_fangfa="POST", qingqiu_tou={}, qingqiu_shuju={"out_trade_no": out_trade_no}
+    )
+
+def legacy_handle(db: Session, out_trade_no: str, transaction_id: str) -> None:
+    """旧回调接口验签之后的处理流程"""
+    huidiao_service = ZhifuHuidiaoService(db)
+    log = create_log(db, out_trade_no)
+    huidiao_service.update_log_verification(log.id, qianming_yanzheng="chenggong")
+
+    dingdan = ZhifuDingdanService(db).get_by_dingdan_hao(out_trade_no)
+    # 同 ZhifuDingdanService.update_status（不发布事件）
+    dingdan.zhifu_zhuangtai = "paid"
+    dingdan.disanfang_dingdan_hao = transaction_id
+    dingdan.zhifu_shijian = datetime.now()
+    dingdan.shifu_jine = dingdan.yingfu_jine
+    db.commit()
+    db.refresh(dingdan)
+
+    existing = db.query(ZhifuLiushui).filter(
+        ZhifuLiushui.zhifu_dingdan_id == dingdan.id,
+        ZhifuLiushui.disanfang_dingdan_hao == transaction_id,
+        ZhifuLiushui.is_deleted == "N"
+    ).first()
+    if not existing:
+        ZhifuLiushuiService(db).create_zhifu_liushui(ZhifuLiushuiCreate(
+            zhifu_dingdan_id=dingdan.id, kehu_id=dingdan.kehu_id, liushui_leixing="income",
+            jiaoyijine=AMOUNT, shouxufei=Decimal("0.00"), shiji_shouru=AMOUNT, zhifu_fangshi="weixin",
+            zhifu_zhanghu="openid", disanfang_liushui_hao=transaction_id, disanfang_dingdan_hao=transaction_id,
+            jiaoyishijian=datetime.now(), liushui_zhuangtai="success", duizhang_zhuangtai="pending"
+        ), "system")
+    huidiao_service.update_log_result(log.id, chuli_zhuangtai="chenggong", chuli_jieguo="{}")
+
+def queued_handle(db: Session, out_trade_no: str, transaction_id: str) -> None:
+    """新回调接口验签之后的处理流程"""
+    log = create_log(db, out_trade_no)
+    ZhifuHuidiaoDuilieService(db).enqueue(
+        huidiao_rizhi_id=log.id, zhifu_pingtai="weixin", dingdan_hao=out_trade_no,
+        disanfang_dingdan_hao=transaction_id, jiaoyi_jine=AMOUNT, zhifu_zhanghu="openid",
+        huidiao_shuju={"out_trade_no": out_trade_no, "transaction_id": transaction_id}
+    )
+
+def legacy_liushui_bianhao() -> str:
+    # 旧流水编号为 LS + 日期 + 6 位随机数，回放 2000 笔会撞号，改为顺序编号以便回放完成
+    legacy_liushui_bianhao.counter += 1
+    return f"LS{datetime.now():%Y%m%d}{legacy_liushui_bianhao.counter:06d}"
+
+legacy_liushui_bianhao.counter = 0
+
+def replay(factory: sessionmaker, trace: List[Notification], handle) -> float:
+    start = time.perf_counter()
+    for out_trade_no, transaction_id in trace:
+        # 每个回调请求使用独立会话
+        db = factory()
+        try:
+            handle(db, out_trade_no, transaction_id)
+        finally:
+            db.close()
+    return time.perf_counter() - start
+
+def final_state(factory: sessionmaker) -> Tuple[Set[str], Set[Tuple[str, str]]]:
+    db = factory()
+    try:
+        paid = set(db.scalars(select(ZhifuDingdan.id).where(ZhifuDingdan.zhifu_zhuangtai == "paid")))
+        liushui = db.execute(select(ZhifuLiushui.zhifu_dingdan_id, ZhifuLiushui.disanfang_dingdan_hao)).all()
+        assert len(liushui) == len(set(liushui)), "存在重复流水"
+        return paid, {tuple(row) for row in liushui}
+    finally:
+        db.close()
+
+def main() -> None:
+    # 屏蔽事件总线“没有订阅者”等日志
+    logging.disable(logging.WARNING)
+    trace = make_trace()
+    print(f"交易 {ORDER_COUNT} 笔，通知 {len(trace)} 条（含重复通知 {len(trace) - ORDER_COUNT} 条）")
+
+    legacy_factory = make_session_factory()
+    ZhifuLiushuiService._generate_liushui_bianhao = staticmethod(legacy_liushui_bianhao)
+    legacy_seconds = replay(legacy_factory, trace, legacy_handle)
+    print(f"legacy  接口 {legacy_seconds * 1000:>8.0f} ms  {len(trace) / legacy_seconds:>8.0f} 条/秒")
+
+    queued_factory = make_session_factory()
+    queued_seconds = replay(queued_factory, trace, queued_handle)
+    worker = ZhifuHuidiaoWorker(session_factory=queued_factory, batch_size=BATCH_SIZE)
+    start = time.perf_counter()
+    processed = worker.drain()
+    worker_seconds = time.perf_counter() - start
+    print(f"queued  接口 {queued_seconds * 1000:>8.0f} ms  {len(trace) / queued_seconds:>8.0f} 条/秒")
+    print(f"queued  worker {worker_seconds * 1000:>6.0f} ms  {processed / worker_seconds:>8.0f} 条/秒（{processed} 条入队）")
+    total = queued_seconds + worker_seconds
+    print(f"queued  合计 {total * 1000:>8.0f} ms  {len(trace) / total:>8.0f} 条/秒")
+
+    assert processed == ORDER_COUNT, f"应入队 {ORDER_COUNT} 条，实际 {processed}"
+    legacy_state = final_state(legacy_factory)
+    queued_state = final_state(queued_factory)
+    assert legacy_state == queued_state, "两种方式最终的订单与流水不一致"
+    assert len(queued_state[0]) == ORDER_COUNT and len(queued_state[1]) == ORDER_COUNT
+    print("最终订单状态与流水一致")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+支付客户端获取基准测试
+
+模拟支付回调验签前获取客户端的开销（各 50 次）：
+- legacy:   每次查询启用配置、AES 解密全部密钥字段，并创建客户端（RSA 私钥按 PEM 解析，
+            与 WeChatPay / AliPay 初始化时解析商户私钥相同；微信支付正式环境还会下载平台证书，未计入）
+- registry: 只按类型查询启用配置的 ID 与 updated_at，版本未变时直接复用注册表中的客户端
+
+使用内存 SQLite，为避免访问网络，客户端以沙箱工具类 + 私钥解析代替。
+用法：cd src && python -m scripts.benchmark_zhifu_kehuduan
+"""
+import logging
+import time
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import models  # noqa: F401  确保所有模型注册到元数据
+from models.base import Base
+from schemas.zhifu_guanli.zhifu_peizhi_schemas import ZhifuPeizhiCreate
+from services.zhifu_guanli.zhifu_kehuduan_registry import ZhifuKehuduanRegistry
+from services.zhifu_guanli.zhifu_peizhi_service import ZhifuPeizhiService
+from utils.payment.weixin_pay_sandbox import WeixinPaySandboxUtil
+
+ROUNDS = 50
+
+def make_private_key() -> str:
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    return key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption()
+    ).decode()
+
+def legacy_client(db):
+    peizhi = ZhifuPeizhiService(db).get_active_config_by_type("weixin")
+    serialization.load_pem_private_key(peizhi.weixin_shanghu_siyao.encode(), password=None)
+    return WeixinPaySandboxUtil(
+        appid=peizhi.weixin_appid,
+        mch_id=peizhi.weixin_shanghu_hao,
+        api_key=peizhi.weixin_api_v3_miyao,
+        notify_url=peizhi.tongzhi_url
+    )
+
+def registry_client(db, registry: ZhifuKehuduanRegistry):
+    return registry.get_active(db, "weixin").weixin()
+
+def main() -> None:
+    logging.disable(logging.WARNING)
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    factory = sessionmaker(bind=engine)
+    db = factory()
+    ZhifuPeizhiService(db).create_zhifu_peizhi(ZhifuPeizhiCreate(
+        peizhi_mingcheng="微信支付", peizhi_leixing="weixin", huanjing="shachang",
+        weixin_appid="wx-appid", weixin_shanghu_hao="1900000001", weixin_shanghu_siyao=make_private_key(),
+        weixin_zhengshu_xuliehao="serial", weixin_api_v3_miyao="k" * 32,
+        tongzhi_url="https://example.com/notify"
+    ), "admin")
+
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        legacy = legacy_client(db)
+    legacy_seconds = time.perf_counter() - start
+
+    registry = ZhifuKehuduanRegistry()
+    registry.warm(factory)
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        cached = registry_client(db, registry)
+    registry_seconds = time.perf_counter() - start
+    db.close()
+
+    print(f"legacy    {legacy_seconds * 1000:>8.0f} ms  {legacy_seconds / ROUNDS * 1e6:>8.1f} us/次")
+    print(f"registry  {registry_seconds * 1000:>8.0f} ms  {registry_seconds / ROUNDS * 1e6:>8.1f} us/次")
+    print(f"加速 {legacy_seconds / registry_seconds:.1f}x")
+
+    assert (legacy.appid, legacy.mch_id, legacy.api_key, legacy.notify_url) == \
+        (cached.appid, cached.mch_id, cached.api_key, cached.notify_url), "两种方式得到的客户端配置不一致"
+    print("客户端配置一致")
+
+if __name__ == "__main__":
+    main()
@@ -3,10 +3,10 @@
 """
 from typing import Optional, List
 from sqlalchemy.orm import Session
-from sqlalchemy import desc, func
+from sqlalchemy import desc
 from fastapi import HTTPException
-from datetime import datetime
 
+from core.sequence import next_daily_code
 from models.caiwu_guanli import (
     ShoufukuanQudao,
     ShouruLeibie,
@@ -44,27 +44,7 @@ class CaiwuShezhiService:
         格式: 前缀 + 时间戳(YYYYMMDD) + 序号(3位)
         例如: SR20251112001, BX20251112001, ZC20251112001
         """
-        today = datetime.now().strftime("%Y%m%d")
-        base_code = f"{prefix}{today}"
-
-        # 查询今天已有的最大序号
-        result = self.db.query(func.max(model_class.bianma)).filter(
-            model_class.bianma.like(f"{base_code}%"),
-            model_class.is_deleted == "N"
-        ).scalar()
-
-        if result:
-            # 提取序号部分并加1
-            try:
-                last_seq = int(result[-3:])
-                new_seq = last_seq + 1
-            except (ValueError, IndexError):
-                new_seq = 1
-        else:
-            new_seq = 1
-
-        # 生成新编码，序号补齐3位
-        return f"{base_code}{new_seq:03d}"
+        return next_daily_code(self.db, model_class.bianma, prefix, width=3)
 
     # ==================== 收付款渠道 ====================
     def create_qudao(self, qudao_data: ShoufukuanQudaoCreate, created_by: str) -> ShoufukuanQudaoResponse:
@@ -8,6 +8,7 @@ from fastapi import HTTPException
 from datetime import datetime, timedelta
 from decimal import Decimal
 
+from core.sequence import next_daily_code
 from models.caiwu_guanli import ChengbenJilu
 from models.hetong_guanli import Hetong
 from schemas.caiwu_guanli.chengben_schemas import (
@@ -359,15 +360,5 @@ class ChengbenService:
         )
     
     def _generate_chengben_bianhao(self) -> str:
-        """生成成本编号"""
-        today = datetime.now().strftime("%Y%m%d")
-        
-        # 查询今天已有的成本记录数量
-        count = self.db.query(ChengbenJilu).filter(
-            ChengbenJilu.chengben_bianhao.like(f"CB{today}%"),
-            ChengbenJilu.is_deleted == "N"
-        ).count()
-        
-        # 生成编号：CB + 日期 + 4位序号
-        sequence = str(count + 1).zfill(4)
-        return f"CB{today}{sequence}"
+        """生成成本编号：CB + 日期 + 4位序号"""
+        return next_daily_code(self.db, ChengbenJilu.chengben_bianhao, "CB")
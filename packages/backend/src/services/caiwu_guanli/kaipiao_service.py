@@ -8,6 +8,7 @@ from fastapi import HTTPException
 from datetime import datetime
 from decimal import Decimal
 
+from core.sequence import next_daily_code
 from models.caiwu_guanli import KaipiaoShenqing
 from models.kehu_guanli import Kehu
 from models.hetong_guanli import Hetong
@@ -304,15 +305,5 @@ class KaipiaoService:
         )
     
     def _generate_shenqing_bianhao(self) -> str:
-        """生成申请编号"""
-        today = datetime.now().strftime("%Y%m%d")
-        
-        # 查询今天已有的申请数量
-        count = self.db.query(KaipiaoShenqing).filter(
-            KaipiaoShenqing.shenqing_bianhao.like(f"KP{today}%"),
-            KaipiaoShenqing.is_deleted == "N"
-        ).count()
-        
-        # 生成编号：KP + 日期 + 4位序号
-        sequence = str(count + 1).zfill(4)
-        return f"KP{today}{sequence}"
+        """生成申请编号：KP + 日期 + 4位序号"""
+        return next_daily_code(self.db, KaipiaoShenqing.shenqing_bianhao, "KP")
@@ -0,0 +1,3 @@
+"""
+财务与账务模块服务
+"""
@@ -0,0 +1,255 @@
+"""
+账簿报表服务
+
+科目余额表、明细账、期间对比表，由数据库完成汇总与余额计算，结果按批次（yield_per）逐行读取：
+- 科目余额表：直接读取过账时增量维护的科目余额表（KemuYue），每个客户后附借贷发生额合计行（试算平衡）
+- 明细账：按客户读取明细账，余额用窗口函数 SUM() OVER (PARTITION BY 科目 ORDER BY 登记日期) 按全部历史累计，
+  不依赖明细账行上保存的余额；每个科目前附期初余额行
+- 期间对比表：科目余额按期间排列，LAG() 取上一期间期末余额计算变动
+
+报表行是元组迭代器，由 core.report_export 编码为 CSV / XLSX 流式返回，不把所有客户的账簿加载到内存。
+迭代器在调用方消费期间占用数据库会话。
+"""
+import logging
+import re
+from decimal import Decimal
+from typing import Iterator, List, NamedTuple, Optional
+
+from fastapi import HTTPException
+from sqlalchemy import Numeric, case, func, select
+from sqlalchemy.orm import Session
+
+from models.caiwu_zhangwu import KemuYue, Pingzheng, Zhangbu
+from models.kehu_guanli import Kehu
+
+logger = logging.getLogger(__name__)
+
+REPORT_BATCH_ROWS = 2000
+
+_QIJIAN_PATTERN = re.compile(r"^\d{4}-(0[1-9]|1[0-2])$")
+
+_FANGXIANG_MINGCHENG = {"jie": "借", "dai": "贷"}
+
+class Baobiao(NamedTuple):
+    """报表：名称、列头与逐行生成的数据"""
+    mingcheng: str
+    lietou: List[str]
+    rows: Iterator[tuple]
+
+def _check_qijian(*qijian_list: Optional[str]) -> None:
+    for kuaiji_qijian in qijian_list:
+        if kuaiji_qijian is not None and not _QIJIAN_PATTERN.match(kuaiji_qijian):
+            raise HTTPException(status_code=400, detail="会计期间格式应为 YYYY-MM")
+
+class ZhangbuBaobiaoService:
+    """账簿报表服务"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def _stream(self, stmt):
+        return self.db.execute(stmt.execution_options(yield_per=REPORT_BATCH_ROWS))
+
+    def trial_balance(self, kuaiji_qijian: str, kehu_id: Optional[str] = None) -> Baobiao:
+        """
+        科目余额表（试算平衡表）
+
+        Args:
+            kuaiji_qijian: 会计期间（YYYY-MM）
+            kehu_id: 只导出该客户，为空时导出全部客户
+        """
+        _check_qijian(kuaiji_qijian)
+        stmt = (
+            select(
+                KemuYue.kehu_id,
+                Kehu.gongsi_mingcheng,
+                KemuYue.kemu_bianma,
+                KemuYue.kuaiji_kemu,
+                KemuYue.yue_fangxiang,
+                KemuYue.qichu_yue,
+                KemuYue.benqi_jiefang,
+                KemuYue.benqi_daifang,
+                KemuYue.qimo_yue
+            )
+            .outerjoin(Kehu, Kehu.id == KemuYue.kehu_id)
+            .where(KemuYue.kuaiji_qijian == kuaiji_qijian)
+            .order_by(KemuYue.kehu_id, KemuYue.kemu_bianma)
+        )
+        if kehu_id:
+            stmt = stmt.where(KemuYue.kehu_id == kehu_id)
+
+        def rows():
+            current = None
+            jiefang = daifang = Decimal("0")
+            for row in self._stream(stmt):
+                if current is not None and row.kehu_id != current[0]:
+                    yield (current[1], "合计", "", "", None, jiefang, daifang, None)
+                    jiefang = daifang = Decimal("0")
+                current = (row.kehu_id, row.gongsi_mingcheng or row.kehu_id)
+                jiefang += row.benqi_jiefang
+                daifang += row.benqi_daifang
+                yield (
+                    current[1], row.kemu_bianma, row.kuaiji_kemu,
+                    _FANGXIANG_MINGCHENG.get(row.yue_fangxiang, row.yue_fangxiang),
+                    row.qichu_yue, row.benqi_jiefang, row.benqi_daifang, row.qimo_yue
+                )
+            if current is not None:
+                yield (current[1], "合计", "", "", None, jiefang, daifang, None)
+
+        return Baobiao(
+            mingcheng=f"科目余额表_{kuaiji_qijian}",
+            lietou=["客户", "科目编码", "科目名称", "余额方向", "期初余额", "本期借方", "本期贷方", "期末余额"],
+            rows=rows()
+        )
+
+    def subsidiary_ledger(
+        self,
+        kehu_id: str,
+        kaishi_qijian: str,
+        jieshu_qijian: str,
+        kemu_bianma: Optional[str] = None
+    ) -> Baobiao:
+        """
+        明细账
+
+        Args:
+            kehu_id: 客户ID
+            kaishi_qijian: 开始会计期间（YYYY-MM）
+            jieshu_qijian: 结束会计期间（YYYY-MM，含）
+            kemu_bianma: 只导出该科目，为空时导出全部科目
+        """
+        _check_qijian(kaishi_qijian, jieshu_qijian)
+        if kaishi_qijian > jieshu_qijian:
+            raise HTTPException(status_code=400, detail="开始期间不能晚于结束期间")
+
+        zengliang = case(
+            (Zhangbu.yue_fangxiang == "dai", Zhangbu.daifang_jine - Zhangbu.jiebie_jine),
+            else_=Zhangbu.jiebie_jine - Zhangbu.daifang_jine
+        )
+        # 余额按该科目全部历史累计，窗口在期间过滤之前计算
+        lishi = (
+            select(
+                Zhangbu.kemu_bianma,
+                Zhangbu.kuaiji_kemu,
+                Zhangbu.yue_fangxiang,
+                Zhangbu.kuaiji_qijian,
+                Zhangbu.dengji_riqi,
+                Zhangbu.pingzheng_id,
+                Zhangbu.zhaiyao,
+                Zhangbu.duifang_kemu,
+                Zhangbu.jiebie_jine,
+                Zhangbu.daifang_jine,
+                zengliang.label("zengliang"),
+                func.sum(zengliang).over(
+                    partition_by=Zhangbu.kemu_bianma,
+                    order_by=(Zhangbu.dengji_riqi, Zhangbu.created_at, Zhangbu.id),
+                    rows=(None, 0)
+                ).label("yue"),
+                Zhangbu.created_at,
+                Zhangbu.id
+            )
+            .where(
+                Zhangbu.kehu_id == kehu_id,
+                Zhangbu.zhangbu_leixing == "mingxizhang",
+                Zhangbu.is_deleted == "N",
+                Zhangbu.kuaiji_qijian <= jieshu_qijian
+            )
+        )
+        if kemu_bianma:
+            lishi = lishi.where(Zhangbu.kemu_bianma == kemu_bianma)
+        lishi = lishi.subquery("lishi")
+        stmt = (
+            select(lishi, Pingzheng.pingzheng_bianhao)
+            .outerjoin(Pingzheng, Pingzheng.id == lishi.c.pingzheng_id)
+            .where(lishi.c.kuaiji_qijian >= kaishi_qijian)
+            .order_by(lishi.c.kemu_bianma, lishi.c.dengji_riqi, lishi.c.created_at, lishi.c.id)
+        )
+
+        def rows():
+            current = None
+            for row in self._stream(stmt):
+                fangxiang = _FANGXIANG_MINGCHENG.get(row.yue_fangxiang, row.yue_fangxiang)
+                if row.kemu_bianma != current:
+                    current = row.kemu_bianma
+                    yield (
+                        row.kemu_bianma, row.kuaiji_kemu, kaishi_qijian, None, None, "期初余额",
+                        None, None, None, fangxiang, Decimal(row.yue) - Decimal(row.zengliang)
+                    )
+                yield (
+                    row.kemu_bianma, row.kuaiji_kemu, row.kuaiji_qijian, row.dengji_riqi.date(),
+                    row.pingzheng_bianhao, row.zhaiyao, row.duifang_kemu,
+                    row.jiebie_jine, row.daifang_jine, fangxiang, Decimal(row.yue)
+                )
+
+        return Baobiao(
+            mingcheng=f"明细账_{kaishi_qijian}_{jieshu_qijian}",
+            lietou=[
+                "科目编码", "科目名称", "会计期间", "日期", "凭证号", "摘要",
+                "对方科目", "借方", "贷方", "余额方向", "余额"
+            ],
+            rows=rows()
+        )
+
+    def period_comparison(
+        self,
+        kaishi_qijian: str,
+        jieshu_qijian: str,
+        kehu_id: Optional[str] = None
+    ) -> Baobiao:
+        """
+        期间对比表：各期间的发生额、期末余额，以及与上一期间期末余额的变动
+
+        Args:
+            kaishi_qijian: 开始会计期间（YYYY-MM）
+            jieshu_qijian: 结束会计期间（YYYY-MM，含）
+            kehu_id: 只导出该客户，为空时导出全部客户
+        """
+        _check_qijian(kaishi_qijian, jieshu_qijian)
+        if kaishi_qijian > jieshu_qijian:
+            raise HTTPException(status_code=400, detail="开始期间不能晚于结束期间")
+
+        # 上一期间取开始期间之前的余额行，窗口在期间过滤之前计算
+        yue = (
+            select(
+                KemuYue.kehu_id,
+                KemuYue.kemu_bianma,
+                KemuYue.kuaiji_kemu,
+                KemuYue.kuaiji_qijian,
+                KemuYue.benqi_jiefang,
+                KemuYue.benqi_daifang,
+                KemuYue.qimo_yue,
+                func.lag(KemuYue.qimo_yue, type_=Numeric(15, 2)).over(
+                    partition_by=(KemuYue.kehu_id, KemuYue.kemu_bianma),
+                    order_by=KemuYue.kuaiji_qijian
+                ).label("shangqi_yue")
+            )
+            .where(KemuYue.kuaiji_qijian <= jieshu_qijian)
+        )
+        if kehu_id:
+            yue = yue.where(KemuYue.kehu_id == kehu_id)
+        yue = yue.subquery("yue")
+        stmt = (
+            select(yue, Kehu.gongsi_mingcheng)
+            .outerjoin(Kehu, Kehu.id == yue.c.kehu_id)
+            .where(yue.c.kuaiji_qijian >= kaishi_qijian)
+            .order_by(yue.c.kehu_id, yue.c.kemu_bianma, yue.c.kuaiji_qijian)
+        )
+
+        def rows():
+            for row in self._stream(stmt):
+                shangqi_yue = Decimal(row.shangqi_yue or 0)
+                biandong = row.qimo_yue - shangqi_yue
+                bili = round(biandong / shangqi_yue * 100, 2) if shangqi_yue else None
+                yield (
+                    row.gongsi_mingcheng or row.kehu_id, row.kemu_bianma, row.kuaiji_kemu, row.kuaiji_qijian,
+                    row.benqi_jiefang, row.benqi_daifang, row.qimo_yue, shangqi_yue, biandong, bili
+                )
+
+        return Baobiao(
+            mingcheng=f"期间对比表_{kaishi_qijian}_{jieshu_qijian}",
+            lietou=[
+                "客户", "科目编码", "科目名称", "会计期间", "本期借方", "本期贷方",
+                "期末余额", "上期期末余额", "变动金额", "变动比例(%)"
+            ],
+            rows=rows()
+        )
@@ -0,0 +1,509 @@
+"""
+凭证过账与期末结账服务
+
+已审核（approved）的凭证过账后写入账簿明细（Zhangbu），并增量维护科目余额表（KemuYue）：
+- 每张凭证生成借、贷两行明细账，互为对方科目；一批凭证的明细账一次批量插入
+- 科目余额按（客户, 科目编码, 会计期间）累加本期借/贷方发生额与期末余额（upsert），不再按历史明细重新汇总；
+  明细账每行的期初/期末余额从该科目当前余额开始，按凭证日期、编号顺序滚动计算
+- 期末结账用一条 INSERT ... SELECT 把所有客户该期间的期末余额结转为下一期间的期初余额，
+  下一期间已过账明细的余额同时调整；期间需按顺序结账，最近结账期间及之前日期的凭证不再过账
+- 借贷不平或日期在已结账期间的凭证跳过，保持已审核状态，由 list_unpostable 列出待处理，不影响其余凭证过账
+- 过账前先补齐本批缺少的科目余额行（ON CONFLICT DO NOTHING）再逐行加锁，并发过账同一新科目时按提交顺序滚动余额
+- PostgreSQL 上过账与结账按会计期间加事务级咨询锁互斥：过账持有本批各期间的共享锁，
+  结账持有本期间与下一期间的排他锁，结账读取余额后不会再有该期间的过账提交
+
+科目余额表只由本服务写入。凭证上的科目形如 "1002 银行存款"，余额方向按小企业会计准则的科目类别确定。
+"""
+import logging
+import re
+from datetime import datetime
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import and_, exists, func, insert, literal, or_, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from models.caiwu_zhangwu import KemuYue, Pingzheng, Zhangbu, ZhangbuJiezhang
+
+logger = logging.getLogger(__name__)
+
+_UPSERT_INSERTS = {
+    "postgresql": pg_insert,
+    "sqlite": sqlite_insert,
+}
+
+# 小企业会计准则损益类中的收入类科目（贷方余额）：主营业务收入、其他业务收入、投资收益、营业外收入
+_DAIFANG_SUNYI_KEMU = ("5001", "5051", "5111", "5301")
+
+_KEMU_PATTERN = re.compile(r"^\s*(\d{1,20})[\s\-_.:：、]*(.*)$")
+_QIJIAN_PATTERN = re.compile(r"^\d{4}-(0[1-9]|1[0-2])$")
+
+# 会计期间咨询锁的第一个键（第二个键为 YYYYMM）
+_QIJIAN_LOCK_SPACE = 7301
+
+# (客户ID, 科目编码, 会计期间)
+YueKey = Tuple[str, str, str]
+
+def parse_kemu(kemu: str) -> Tuple[str, str]:
+    """
+    拆分凭证上的科目为（科目编码, 科目名称）
+
+    支持 "1002 银行存款"、"1002-银行存款"、"1002银行存款"；没有编码时以科目名称（截断到 20 字符）作为编码
+    """
+    match = _KEMU_PATTERN.match(kemu)
+    if match:
+        return match.group(1), match.group(2).strip() or match.group(1)
+    kemu = kemu.strip()
+    return kemu[:20], kemu
+
+def kemu_yue_fangxiang(kemu_bianma: str) -> str:
+    """科目余额方向：负债、所有者权益、收入类为贷方，资产、成本、费用类为借方"""
+    if kemu_bianma[:1] in ("2", "3") or kemu_bianma.startswith(_DAIFANG_SUNYI_KEMU):
+        return "dai"
+    return "jie"
+
+def next_kuaiji_qijian(kuaiji_qijian: str) -> str:
+    """下一会计期间（YYYY-MM）"""
+    year, month = map(int, kuaiji_qijian.split("-"))
+    return f"{year + month // 12}-{month % 12 + 1:02d}"
+
+def qijian_fanwei(kuaiji_qijian: str) -> Tuple[datetime, datetime]:
+    """会计期间的起止时间 [开始, 结束)"""
+    start = datetime.strptime(kuaiji_qijian, "%Y-%m")
+    return start, datetime.strptime(next_kuaiji_qijian(kuaiji_qijian), "%Y-%m")
+
+class _YueState:
+    """过账过程中一个科目余额的当前值与本批增量"""
+
+    __slots__ = ("kuaiji_kemu", "yue_fangxiang", "yue", "jiefang", "daifang", "zengliang")
+
+    def __init__(self, kuaiji_kemu: str, yue_fangxiang: str, yue: Decimal):
+        self.kuaiji_kemu = kuaiji_kemu
+        self.yue_fangxiang = yue_fangxiang
+        self.yue = yue
+        self.jiefang = Decimal("0")
+        self.daifang = Decimal("0")
+        self.zengliang = Decimal("0")
+
+    def post(self, jiefang: Decimal, daifang: Decimal) -> Tuple[Decimal, Decimal]:
+        """记一笔发生额，返回（发生前余额, 发生后余额）"""
+        change = jiefang - daifang if self.yue_fangxiang == "jie" else daifang - jiefang
+        before = self.yue
+        self.yue += change
+        self.jiefang += jiefang
+        self.daifang += daifang
+        self.zengliang += change
+        return before, self.yue
+
+class ZhangbuGuozhangService:
+    """凭证过账与期末结账服务"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def post_vouchers(
+        self,
+        guozhang_ren_id: str,
+        pingzheng_ids: Optional[Sequence[str]] = None,
+        kehu_id: Optional[str] = None,
+        limit: Optional[int] = None
+    ) -> int:
+        """
+        过账已审核的凭证
+
+        Args:
+            guozhang_ren_id: 过账人ID
+            pingzheng_ids: 指定过账的凭证ID，为空时过账全部已审核凭证（非已审核状态的凭证忽略）
+            kehu_id: 只过账该客户的凭证
+            limit: 本次最多过账的凭证数量
+
+        Returns:
+            int: 过账的凭证数量（借贷不平或所属期间已结账的凭证跳过，不计入）
+        """
+        query = select(Pingzheng).where(
+            Pingzheng.pingzheng_zhuangtai == "approved",
+            Pingzheng.is_deleted == "N",
+            Pingzheng.jiebie_jine == Pingzheng.daifang_jine
+        )
+        closed_until = self._closed_until()
+        if closed_until is not None:
+            query = query.where(Pingzheng.pingzheng_riqi >= closed_until)
+        if pingzheng_ids is not None:
+            query = query.where(Pingzheng.id.in_(pingzheng_ids))
+        if kehu_id:
+            query = query.where(Pingzheng.kehu_id == kehu_id)
+        query = query.order_by(Pingzheng.pingzheng_riqi, Pingzheng.pingzheng_bianhao, Pingzheng.id)
+        if limit:
+            query = query.limit(limit)
+        pingzheng_list = self.db.execute(query.with_for_update(skip_locked=True)).scalars().all()
+        if pingzheng_list:
+            self._lock_periods({f"{pingzheng.pingzheng_riqi:%Y-%m}" for pingzheng in pingzheng_list}, shared=True)
+            pingzheng_list = self._skip_closed(pingzheng_list)
+        if not pingzheng_list:
+            self.db.commit()
+            return 0
+
+        now = datetime.now()
+        states = self._load_states(pingzheng_list)
+        lines = self._build_lines(pingzheng_list, states, guozhang_ren_id)
+        self.db.execute(insert(Zhangbu), lines)
+        self._apply_states(states, now)
+        self.db.execute(update(Pingzheng), [
+            {
+                "id": pingzheng.id,
+                "pingzheng_zhuangtai": "posted",
+                "guozhang_riqi": now,
+                "guozhang_ren_id": guozhang_ren_id,
+                "updated_by": guozhang_ren_id,
+                "updated_at": now
+            }
+            for pingzheng in pingzheng_list
+        ])
+        self.db.commit()
+
+        logger.info(f"凭证过账完成: {len(pingzheng_list)} 张凭证, {len(lines)} 行明细账")
+        return len(pingzheng_list)
+
+    def _closed_until(self) -> Optional[datetime]:
+        """最近结账期间的结束时间，此前日期的凭证不再过账；没有结账记录时返回 None"""
+        latest = self.db.scalar(select(func.max(ZhangbuJiezhang.kuaiji_qijian)))
+        return qijian_fanwei(latest)[1] if latest else None
+
+    def _skip_closed(self, pingzheng_list: Sequence[Pingzheng]) -> List[Pingzheng]:
+        """取得期间锁后重新检查结账状态，跳过查询之后才结账的期间中的凭证"""
+        closed_until = self._closed_until()
+        if closed_until is None:
+            return list(pingzheng_list)
+        skipped = [pingzheng.pingzheng_bianhao for pingzheng in pingzheng_list if pingzheng.pingzheng_riqi < closed_until]
+        if skipped:
+            logger.warning(f"会计期间已结账，跳过 {len(skipped)} 张凭证: {', '.join(skipped[:20])}")
+        return [pingzheng for pingzheng in pingzheng_list if pingzheng.pingzheng_riqi >= closed_until]
+
+    def _lock_periods(self, qijian_set: Iterable[str], shared: bool) -> None:
+        """
+        按会计期间加事务级咨询锁（事务结束时释放），使过账与结账互斥
+
+        按期间顺序加锁避免死锁；SQLite 写事务本身串行，不需要加锁
+        """
+        if self.db.get_bind().dialect.name != "postgresql":
+            return
+        lock = func.pg_advisory_xact_lock_shared if shared else func.pg_advisory_xact_lock
+        for qijian in sorted(qijian_set):
+            self.db.execute(select(lock(_QIJIAN_LOCK_SPACE, int(qijian.replace("-", "")))))
+
+    def list_unpostable(self, kehu_id: Optional[str] = None, limit: int = 100) -> List[Tuple[Pingzheng, str]]:
+        """
+        列出过账时跳过的已审核凭证（借贷不平，或日期在已结账期间），需要更正或冲销后处理
+
+        Returns:
+            List[Tuple[Pingzheng, str]]: (凭证, 跳过原因)
+        """
+        unbalanced = Pingzheng.jiebie_jine != Pingzheng.daifang_jine
+        conditions = [unbalanced]
+        closed_until = self._closed_until()
+        if closed_until is not None:
+            conditions.append(Pingzheng.pingzheng_riqi < closed_until)
+        query = select(Pingzheng).where(
+            Pingzheng.pingzheng_zhuangtai == "approved",
+            Pingzheng.is_deleted == "N",
+            or_(*conditions)
+        )
+        if kehu_id:
+            query = query.where(Pingzheng.kehu_id == kehu_id)
+        query = query.order_by(Pingzheng.pingzheng_riqi, Pingzheng.pingzheng_bianhao, Pingzheng.id).limit(limit)
+        return [
+            (pingzheng, "凭证借贷金额不平" if pingzheng.jiebie_jine != pingzheng.daifang_jine else "会计期间已结账")
+            for pingzheng in self.db.scalars(query)
+        ]
+
+    def _load_states(self, pingzheng_list: Sequence[Pingzheng]) -> Dict[YueKey, _YueState]:
+        """
+        锁定并加载本批凭证涉及的客户、期间的现有科目余额
+
+        先补齐本批缺少的科目余额行再 SELECT ... FOR UPDATE：并发过账同一个新科目时，
+        后到的批次在插入时等待先到的批次提交，从其提交后的余额开始计算明细账余额
+        """
+        self._ensure_yue_rows(pingzheng_list)
+        kehu_ids = {pingzheng.kehu_id for pingzheng in pingzheng_list}
+        qijian_set = {f"{pingzheng.pingzheng_riqi:%Y-%m}" for pingzheng in pingzheng_list}
+        rows = self.db.execute(
+            select(
+                KemuYue.kehu_id, KemuYue.kemu_bianma, KemuYue.kuaiji_qijian,
+                KemuYue.kuaiji_kemu, KemuYue.yue_fangxiang, KemuYue.qimo_yue
+            ).where(
+                KemuYue.kehu_id.in_(kehu_ids),
+                KemuYue.kuaiji_qijian.in_(qijian_set)
+            ).order_by(
+                KemuYue.kehu_id, KemuYue.kemu_bianma, KemuYue.kuaiji_qijian
+            ).with_for_update()
+        ).all()
+        return {
+            (row.kehu_id, row.kemu_bianma, row.kuaiji_qijian): _YueState(
+                row.kuaiji_kemu, row.yue_fangxiang, row.qimo_yue
+            )
+            for row in rows
+        }
+
+    def _ensure_yue_rows(self, pingzheng_list: Sequence[Pingzheng]) -> None:
+        """按键顺序插入本批缺少的科目余额行（余额为 0，已存在的忽略），使新科目也能被行锁保护"""
+        insert_ = _UPSERT_INSERTS.get(self.db.get_bind().dialect.name)
+        if insert_ is None:
+            return
+        rows: Dict[YueKey, dict] = {}
+        for pingzheng in pingzheng_list:
+            qijian = f"{pingzheng.pingzheng_riqi:%Y-%m}"
+            for kemu in (pingzheng.jiebie_kemu, pingzheng.daifang_kemu):
+                kemu_bianma, kuaiji_kemu = parse_kemu(kemu)
+                rows.setdefault((pingzheng.kehu_id, kemu_bianma, qijian), {
+                    "kehu_id": pingzheng.kehu_id,
+                    "kemu_bianma": kemu_bianma,
+                    "kuaiji_qijian": qijian,
+                    "kuaiji_kemu": kuaiji_kemu,
+                    "yue_fangxiang": kemu_yue_fangxiang(kemu_bianma),
+                    "qichu_yue": Decimal("0"),
+                    "benqi_jiefang": Decimal("0"),
+                    "benqi_daifang": Decimal("0"),
+                    "qimo_yue": Decimal("0"),
+                })
+        stmt = insert_(KemuYue.__table__).on_conflict_do_nothing(
+            index_elements=["kehu_id", "kemu_bianma", "kuaiji_qijian"]
+        )
+        self.db.execute(stmt, [rows[key] for key in sorted(rows)])
+
+    @staticmethod
+    def _build_lines(
+        pingzheng_list: Sequence[Pingzheng],
+        states: Dict[YueKey, _YueState],
+        guozhang_ren_id: str
+    ) -> List[dict]:
+        """生成明细账行并累计科目余额（凭证已按日期、编号排序）"""
+        lines = []
+        for pingzheng in pingzheng_list:
+            qijian = f"{pingzheng.pingzheng_riqi:%Y-%m}"
+            jine = pingzheng.jiebie_jine
+            entries = (
+                (pingzheng.jiebie_kemu, pingzheng.daifang_kemu, jine, Decimal("0")),
+                (pingzheng.daifang_kemu, pingzheng.jiebie_kemu, Decimal("0"), jine),
+            )
+            for kemu, duifang_kemu, jiefang, daifang in entries:
+                kemu_bianma, kuaiji_kemu = parse_kemu(kemu)
+                key = (pingzheng.kehu_id, kemu_bianma, qijian)
+                state = states.get(key)
+                if state is None:
+                    state = states[key] = _YueState(kuaiji_kemu, kemu_yue_fangxiang(kemu_bianma), Decimal("0"))
+                qichu_yue, qimo_yue = state.post(jiefang, daifang)
+                lines.append({
+                    "kehu_id": pingzheng.kehu_id,
+                    "pingzheng_id": pingzheng.id,
+                    "zhangbu_leixing": "mingxizhang",
+                    "kuaiji_kemu": kuaiji_kemu,
+                    "kemu_bianma": kemu_bianma,
+                    "jiebie_jine": jiefang,
+                    "daifang_jine": daifang,
+                    "yue_fangxiang": state.yue_fangxiang,
+                    "qichu_yue": qichu_yue,
+                    "qimo_yue": qimo_yue,
+                    "kuaiji_qijian": qijian,
+                    "dengji_riqi": pingzheng.pingzheng_riqi,
+                    "zhaiyao": pingzheng.zhaiyao,
+                    "duifang_kemu": duifang_kemu,
+                    "created_by": guozhang_ren_id
+                })
+        return lines
+
+    def _apply_states(self, states: Dict[YueKey, _YueState], now: datetime) -> None:
+        """将本批发生额累加到科目余额表（不存在的科目余额自动插入）"""
+        table = KemuYue.__table__
+        rows = [
+            {
+                "kehu_id": kehu_id,
+                "kemu_bianma": kemu_bianma,
+                "kuaiji_qijian": qijian,
+                "kuaiji_kemu": state.kuaiji_kemu,
+                "yue_fangxiang": state.yue_fangxiang,
+                "qichu_yue": Decimal("0"),
+                "benqi_jiefang": state.jiefang,
+                "benqi_daifang": state.daifang,
+                "qimo_yue": state.zengliang,
+                "updated_at": now
+            }
+            for (kehu_id, kemu_bianma, qijian), state in states.items()
+            if state.jiefang or state.daifang
+        ]
+        insert_ = _UPSERT_INSERTS.get(self.db.get_bind().dialect.name)
+
+        if insert_ is not None:
+            stmt = insert_(table)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["kehu_id", "kemu_bianma", "kuaiji_qijian"],
+                set_={
+                    "benqi_jiefang": table.c.benqi_jiefang + stmt.excluded.benqi_jiefang,
+                    "benqi_daifang": table.c.benqi_daifang + stmt.excluded.benqi_daifang,
+                    "qimo_yue": table.c.qimo_yue + stmt.excluded.qimo_yue,
+                    "updated_at": stmt.excluded.updated_at,
+                }
+            )
+            self.db.execute(stmt, rows)
+            return
+
+        # 其他数据库：先更新，未命中再插入
+        for row in rows:
+            result = self.db.execute(
+                update(table)
+                .where(
+                    table.c.kehu_id == row["kehu_id"],
+                    table.c.kemu_bianma == row["kemu_bianma"],
+                    table.c.kuaiji_qijian == row["kuaiji_qijian"]
+                )
+                .values(
+                    benqi_jiefang=table.c.benqi_jiefang + row["benqi_jiefang"],
+                    benqi_daifang=table.c.benqi_daifang + row["benqi_daifang"],
+                    qimo_yue=table.c.qimo_yue + row["qimo_yue"],
+                    updated_at=now
+                )
+            )
+            if result.rowcount == 0:
+                self.db.execute(table.insert().values(**row))
+
+    def close_period(self, kuaiji_qijian: str, jiezhang_ren_id: Optional[str] = None) -> int:
+        """
+        期末结账：将所有客户该期间的期末余额结转为下一期间的期初余额
+
+        Args:
+            kuaiji_qijian: 会计期间（YYYY-MM）
+            jiezhang_ren_id: 结账人ID
+
+        Returns:
+            int: 结转的科目余额数量
+
+        Raises:
+            HTTPException: 期间格式错误、已结账、之前的期间未结账或还有已审核未过账的凭证
+        """
+        if not _QIJIAN_PATTERN.match(kuaiji_qijian):
+            raise HTTPException(status_code=400, detail="会计期间格式应为 YYYY-MM")
+        next_qijian = next_kuaiji_qijian(kuaiji_qijian)
+        # 等待本期间与下一期间进行中的过账提交，结账提交前新的过账等待
+        self._lock_periods((kuaiji_qijian, next_qijian), shared=False)
+        try:
+            self._check_closable(kuaiji_qijian)
+        except HTTPException:
+            self.db.rollback()
+            raise
+
+        now = datetime.now()
+        # 先写结账记录（主键冲突即并发重复结账），此后该期间不再过账
+        self.db.add(ZhangbuJiezhang(kuaiji_qijian=kuaiji_qijian, jiezhang_shijian=now, jiezhang_ren_id=jiezhang_ren_id))
+        self.db.flush()
+
+        self._shift_next_lines(kuaiji_qijian, next_qijian)
+        count = self._roll_forward(kuaiji_qijian, next_qijian, now)
+        self.db.commit()
+
+        logger.info(f"会计期间 {kuaiji_qijian} 结账完成，结转 {count} 个科目余额到 {next_qijian}")
+        return count
+
+    def _check_closable(self, kuaiji_qijian: str) -> None:
+        """结账前检查：未结账、之前的期间均已结账、没有已审核未过账的凭证"""
+        if self.db.get(ZhangbuJiezhang, kuaiji_qijian) is not None:
+            raise HTTPException(status_code=400, detail=f"会计期间 {kuaiji_qijian} 已结账")
+
+        earlier = self.db.scalar(
+            select(func.min(KemuYue.kuaiji_qijian)).where(
+                KemuYue.kuaiji_qijian < kuaiji_qijian,
+                KemuYue.kuaiji_qijian.notin_(select(ZhangbuJiezhang.kuaiji_qijian))
+            )
+        )
+        if earlier:
+            raise HTTPException(status_code=400, detail=f"请先结账会计期间 {earlier}")
+
+        start, end = qijian_fanwei(kuaiji_qijian)
+        pending = self.db.scalar(
+            select(func.count()).select_from(Pingzheng).where(
+                Pingzheng.pingzheng_zhuangtai == "approved",
+                Pingzheng.is_deleted == "N",
+                Pingzheng.pingzheng_riqi >= start,
+                Pingzheng.pingzheng_riqi < end
+            )
+        )
+        if pending:
+            raise HTTPException(
+                status_code=400,
+                detail=f"会计期间 {kuaiji_qijian} 还有 {pending} 张已审核未过账的凭证"
+            )
+
+    def _shift_next_lines(self, kuaiji_qijian: str, next_qijian: str) -> None:
+        """下一期间提前过账的明细账，余额加上本期间结转的期初余额"""
+        jiezhuan = KemuYue.__table__.alias("jiezhuan")
+        matches = and_(
+            jiezhuan.c.kehu_id == Zhangbu.kehu_id,
+            jiezhuan.c.kemu_bianma == Zhangbu.kemu_bianma,
+            jiezhuan.c.kuaiji_qijian == kuaiji_qijian,
+            jiezhuan.c.qimo_yue != 0
+        )
+        carry = select(jiezhuan.c.qimo_yue).where(matches).scalar_subquery()
+        self.db.execute(
+            update(Zhangbu)
+            .where(Zhangbu.kuaiji_qijian == next_qijian, exists().where(matches))
+            .values(qichu_yue=Zhangbu.qichu_yue + carry, qimo_yue=Zhangbu.qimo_yue + carry)
+            .execution_options(synchronize_session=False)
+        )
+
+    def _roll_forward(self, kuaiji_qijian: str, next_qijian: str, now: datetime) -> int:
+        """一条语句把本期间非零期末余额写为下一期间的期初余额（已有下一期间余额的同时调整期末余额）"""
+        table = KemuYue.__table__
+        columns = [
+            "kehu_id", "kemu_bianma", "kuaiji_qijian", "kuaiji_kemu", "yue_fangxiang",
+            "qichu_yue", "benqi_jiefang", "benqi_daifang", "qimo_yue", "updated_at",
+        ]
+        source = select(
+            table.c.kehu_id,
+            table.c.kemu_bianma,
+            literal(next_qijian),
+            table.c.kuaiji_kemu,
+            table.c.yue_fangxiang,
+            table.c.qimo_yue,
+            literal(0),
+            literal(0),
+            table.c.qimo_yue,
+            literal(now),
+        ).where(table.c.kuaiji_qijian == kuaiji_qijian, table.c.qimo_yue != 0)
+        insert_ = _UPSERT_INSERTS.get(self.db.get_bind().dialect.name)
+
+        if insert_ is not None:
+            stmt = insert_(table).from_select(columns, source)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["kehu_id", "kemu_bianma", "kuaiji_qijian"],
+                set_={
+                    "qichu_yue": stmt.excluded.qichu_yue,
+                    "qimo_yue": table.c.qimo_yue - table.c.qichu_yue + stmt.excluded.qichu_yue,
+                    "updated_at": stmt.excluded.updated_at,
+                }
+            )
+            return self.db.execute(stmt).rowcount
+
+        # 其他数据库：先调整已有的下一期间余额，再插入缺少的
+        current = table.alias("current")
+        matches = and_(
+            current.c.kehu_id == table.c.kehu_id,
+            current.c.kemu_bianma == table.c.kemu_bianma,
+            current.c.kuaiji_qijian == kuaiji_qijian,
+            current.c.qimo_yue != 0
+        )
+        carry = select(current.c.qimo_yue).where(matches).scalar_subquery()
+        updated = self.db.execute(
+            update(table)
+            .where(table.c.kuaiji_qijian == next_qijian, exists().where(matches))
+            .values(qichu_yue=carry, qimo_yue=table.c.qimo_yue - table.c.qichu_yue + carry, updated_at=now)
+        ).rowcount
+        following = table.alias("following")
+        inserted = self.db.execute(
+            table.insert().from_select(columns, source.where(~exists().where(
+                following.c.kehu_id == table.c.kehu_id,
+                following.c.kemu_bianma == table.c.kemu_bianma,
+                following.c.kuaiji_qijian == next_qijian
+            )))
+        ).rowcount
+        return updated + inserted
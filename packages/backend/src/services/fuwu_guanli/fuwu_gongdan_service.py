@@ -1,14 +1,17 @@
 """
 服务工单管理服务
 """
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Union
 from decimal import Decimal
-from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import or_, func, desc
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, contains_eager, joinedload, selectinload
+from sqlalchemy import and_, or_, func, select
 from fastapi import HTTPException
 from datetime import datetime, timedelta
 
-from models.fuwu_guanli import FuwuGongdan, FuwuGongdanXiangmu, FuwuGongdanRizhi
+from core.config import settings
+from core.pagination import count_total, count_total_async, paginate, split_page
+from models.fuwu_guanli import FuwuGongdan, FuwuGongdanXiangmu, FuwuGongdanRizhi, FuwuGongdanTongji
 from models.hetong_guanli import Hetong
 from models.kehu_guanli import Kehu
 from models.yonghu_guanli import Yonghu
@@ -26,11 +29,17 @@ from schemas.fuwu_guanli.fuwu_gongdan_schemas import (
     FuwuGongdanXiangmuResponse,
     FuwuGongdanRizhiResponse
 )
+from services.fuwu_guanli.gongdan_tongji_rollup import (
+    WEIDU_KEHU,
+    WEIDU_ZHIXING_REN,
+    build_wancheng_tianshu_expr,
+    wancheng_tianshu_condition
+)
 
 class FuwuGongdanService:
     """服务工单管理服务类"""
     
-    def __init__(self, db: Session):
+    def __init__(self, db: Union[Session, AsyncSession]):
         self.db = db
     
     def create_gongdan(self, gongdan_data: FuwuGongdanCreate, created_by: str) -> FuwuGongdanDetailResponse:
@@ -168,57 +177,58 @@ class FuwuGongdanService:
         
         return self.get_gongdan_detail(gongdan.id)
     
-    def get_gongdan_list(self, params: FuwuGongdanListParams) -> FuwuGongdanListResponse:
-        """获取工单列表"""
-        query = self.db.query(FuwuGongdan).filter(FuwuGongdan.is_deleted == "N")
+    @staticmethod
+    def _build_list_conditions(params: FuwuGongdanListParams) -> List[Any]:
+        """构建工单列表的过滤条件（同步/异步查询共用）"""
+        conditions = [FuwuGongdan.is_deleted == "N"]
         
         # 应用过滤条件
         if params.gongdan_bianhao:
-            query = query.filter(FuwuGongdan.gongdan_bianhao.ilike(f"%{params.gongdan_bianhao}%"))
+            conditions.append(FuwuGongdan.gongdan_bianhao.ilike(f"%{params.gongdan_bianhao}%"))
         
         if params.gongdan_biaoti:
-            query = query.filter(FuwuGongdan.gongdan_biaoti.ilike(f"%{params.gongdan_biaoti}%"))
+            conditions.append(FuwuGongdan.gongdan_biaoti.ilike(f"%{params.gongdan_biaoti}%"))
         
         if params.fuwu_leixing:
-            query = query.filter(FuwuGongdan.fuwu_leixing == params.fuwu_leixing)
+            conditions.append(FuwuGongdan.fuwu_leixing == params.fuwu_leixing)
         
         if params.gongdan_zhuangtai:
-            query = query.filter(FuwuGongdan.gongdan_zhuangtai == params.gongdan_zhuangtai)
+            conditions.append(FuwuGongdan.gongdan_zhuangtai == params.gongdan_zhuangtai)
         
         if params.youxian_ji:
-            query = query.filter(FuwuGongdan.youxian_ji == params.youxian_ji)
+            conditions.append(FuwuGongdan.youxian_ji == params.youxian_ji)
         
         if params.zhixing_ren_id:
-            query = query.filter(FuwuGongdan.zhixing_ren_id == params.zhixing_ren_id)
+            conditions.append(FuwuGongdan.zhixing_ren_id == params.zhixing_ren_id)
         
         if params.kehu_id:
-            query = query.filter(FuwuGongdan.kehu_id == params.kehu_id)
+            conditions.append(FuwuGongdan.kehu_id == params.kehu_id)
         
         if params.hetong_id:
-            query = query.filter(FuwuGongdan.hetong_id == params.hetong_id)
+            conditions.append(FuwuGongdan.hetong_id == params.hetong_id)
         
         if params.is_overdue is not None:
             if params.is_overdue:
-                query = query.filter(
-                    FuwuGongdan.jihua_jieshu_shijian < datetime.now(),
-                    FuwuGongdan.gongdan_zhuangtai.notin_(["completed", "cancelled"])
-                )
+                conditions.append(FuwuGongdan.jihua_jieshu_shijian < datetime.now())
+                conditions.append(FuwuGongdan.gongdan_zhuangtai.notin_(["completed", "cancelled"]))
             else:
-                query = query.filter(
+                conditions.append(
                     or_(
                         FuwuGongdan.jihua_jieshu_shijian >= datetime.now(),
                         FuwuGongdan.gongdan_zhuangtai.in_(["completed", "cancelled"])
                     )
                 )
-        
-        # 计算总数
-        total = query.count()
-        
-        # 分页
-        offset = (params.page - 1) * params.size
-        gongdan_list = query.order_by(desc(FuwuGongdan.created_at)).offset(offset).limit(params.size).all()
-        
-        # 构建响应数据
+
+        return conditions
+
+    @staticmethod
+    def _build_list_response(
+        gongdan_list: List[FuwuGongdan],
+        total: int,
+        params: FuwuGongdanListParams,
+        next_cursor: Optional[str] = None
+    ) -> FuwuGongdanListResponse:
+        """构建工单列表响应"""
         items = []
         for gongdan in gongdan_list:
             item_data = {
@@ -235,8 +245,47 @@ class FuwuGongdanService:
             items=items,
             page=params.page,
             size=params.size,
-            pages=pages
+            pages=pages,
+            next_cursor=next_cursor
+        )
+
+    def get_gongdan_list(self, params: FuwuGongdanListParams) -> FuwuGongdanListResponse:
+        """获取工单列表"""
+        conditions = self._build_list_conditions(params)
+        
+        # 计算总数
+        total = count_total(self.db, FuwuGongdan, conditions, params.total_mode, filtered=len(conditions) > 1)
+        
+        # 分页（传入游标时按 keyset 翻页）
+        query = paginate(
+            self.db.query(FuwuGongdan).filter(*conditions),
+            FuwuGongdan.created_at, FuwuGongdan.id,
+            params.page, params.size, params.cursor
         )
+        gongdan_list, next_cursor = split_page(query.all(), params.size, "created_at")
+        
+        return self._build_list_response(gongdan_list, total, params, next_cursor)
+
+    async def get_gongdan_list_async(self, params: FuwuGongdanListParams) -> FuwuGongdanListResponse:
+        """获取工单列表（异步版本，self.db 需为 AsyncSession）"""
+        conditions = self._build_list_conditions(params)
+        
+        # 计算总数
+        total = await count_total_async(self.db, FuwuGongdan, conditions, params.total_mode, filtered=len(conditions) > 1)
+        
+        # 分页（预加载任务项，进度计算不能在异步会话中触发懒加载）
+        result = await self.db.execute(
+            paginate(
+                select(FuwuGongdan)
+                .options(selectinload(FuwuGongdan.xiangmu_list))
+                .where(*conditions),
+                FuwuGongdan.created_at, FuwuGongdan.id,
+                params.page, params.size, params.cursor
+            )
+        )
+        gongdan_list, next_cursor = split_page(result.scalars().all(), params.size, "created_at")
+        
+        return self._build_list_response(gongdan_list, total, params, next_cursor)
     
     def _add_status_change_log(self, gongdan_id: str, old_status: str, new_status: str, operator_id: str):
         """添加状态变更日志"""
@@ -611,64 +660,105 @@ class FuwuGongdanService:
 
         return FuwuGongdanRizhiResponse.model_validate(rizhi)
 
-    def get_gongdan_statistics(self, kehu_id: Optional[str] = None, zhixing_ren_id: Optional[str] = None) -> FuwuGongdanStatistics:
-        """获取工单统计信息"""
-        query = self.db.query(FuwuGongdan).filter(FuwuGongdan.is_deleted == "N")
-
-        # 应用过滤条件
-        if kehu_id:
-            query = query.filter(FuwuGongdan.kehu_id == kehu_id)
+    # 统计中单独列出的工单状态
+    _STATISTICS_STATUSES = ("created", "assigned", "in_progress", "pending_review", "completed", "cancelled")
 
-        if zhixing_ren_id:
-            query = query.filter(FuwuGongdan.zhixing_ren_id == zhixing_ren_id)
-
-        # 统计各状态数量
-        total_count = query.count()
-        created_count = query.filter(FuwuGongdan.gongdan_zhuangtai == "created").count()
-        assigned_count = query.filter(FuwuGongdan.gongdan_zhuangtai == "assigned").count()
-        in_progress_count = query.filter(FuwuGongdan.gongdan_zhuangtai == "in_progress").count()
-        pending_review_count = query.filter(FuwuGongdan.gongdan_zhuangtai == "pending_review").count()
-        completed_count = query.filter(FuwuGongdan.gongdan_zhuangtai == "completed").count()
-        cancelled_count = query.filter(FuwuGongdan.gongdan_zhuangtai == "cancelled").count()
-
-        # 统计逾期数量
-        overdue_count = query.filter(
+    @staticmethod
+    def _overdue_condition():
+        """逾期工单条件：超过计划结束时间且未完成、未取消"""
+        return and_(
             FuwuGongdan.jihua_jieshu_shijian < datetime.now(),
             FuwuGongdan.gongdan_zhuangtai.notin_(["completed", "cancelled"])
-        ).count()
-
-        # 计算平均完成天数
-        completed_gongdan_list = query.filter(
-            FuwuGongdan.gongdan_zhuangtai == "completed",
-            FuwuGongdan.shiji_kaishi_shijian.isnot(None),
-            FuwuGongdan.shiji_jieshu_shijian.isnot(None)
-        ).all()
+        )
 
-        if completed_gongdan_list:
-            total_days = sum([
-                (gongdan.shiji_jieshu_shijian - gongdan.shiji_kaishi_shijian).days
-                for gongdan in completed_gongdan_list
-            ])
-            avg_completion_days = total_days / len(completed_gongdan_list)
-        else:
-            avg_completion_days = 0.0
+    @classmethod
+    def _build_statistics(
+        cls,
+        status_counts: Dict[str, int],
+        overdue_count: int,
+        avg_completion_days: Optional[float]
+    ) -> FuwuGongdanStatistics:
+        """根据各状态数量等汇总结果构建统计响应"""
+        total_count = sum(status_counts.values())
+        completed_count = status_counts.get("completed", 0)
 
         # 计算完成率
         completion_rate = (completed_count / total_count * 100) if total_count > 0 else 0.0
 
         return FuwuGongdanStatistics(
             total_count=total_count,
-            created_count=created_count,
-            assigned_count=assigned_count,
-            in_progress_count=in_progress_count,
-            pending_review_count=pending_review_count,
-            completed_count=completed_count,
-            cancelled_count=cancelled_count,
+            **{f"{status}_count": status_counts.get(status, 0) for status in cls._STATISTICS_STATUSES},
             overdue_count=overdue_count,
-            avg_completion_days=avg_completion_days,
+            avg_completion_days=float(avg_completion_days or 0.0),
             completion_rate=completion_rate
         )
 
+    def get_gongdan_statistics(self, kehu_id: Optional[str] = None, zhixing_ren_id: Optional[str] = None) -> FuwuGongdanStatistics:
+        """获取工单统计信息"""
+        # 按单个执行人或客户统计时优先读取汇总表
+        if settings.FUWU_GONGDAN_ROLLUP_ENABLED and bool(kehu_id) != bool(zhixing_ren_id):
+            if zhixing_ren_id:
+                return self._get_gongdan_statistics_from_rollup(WEIDU_ZHIXING_REN, zhixing_ren_id)
+            return self._get_gongdan_statistics_from_rollup(WEIDU_KEHU, kehu_id)
+
+        conditions = [FuwuGongdan.is_deleted == "N"]
+
+        # 应用过滤条件
+        if kehu_id:
+            conditions.append(FuwuGongdan.kehu_id == kehu_id)
+
+        if zhixing_ren_id:
+            conditions.append(FuwuGongdan.zhixing_ren_id == zhixing_ren_id)
+
+        # 单次分组查询：各状态数量、逾期数量、平均完成天数
+        days = build_wancheng_tianshu_expr(self.db.get_bind().dialect.name)
+        rows = self.db.execute(
+            select(
+                FuwuGongdan.gongdan_zhuangtai,
+                func.count(),
+                func.count().filter(self._overdue_condition()),
+                func.avg(days).filter(wancheng_tianshu_condition())
+            )
+            .where(*conditions)
+            .group_by(FuwuGongdan.gongdan_zhuangtai)
+        ).all()
+
+        status_counts = {status: count for status, count, _, _ in rows}
+        overdue_count = sum(overdue for _, _, overdue, _ in rows)
+        avg_completion_days = next((avg for status, _, _, avg in rows if status == "completed"), None)
+
+        return self._build_statistics(status_counts, overdue_count, avg_completion_days)
+
+    def _get_gongdan_statistics_from_rollup(self, weidu_leixing: str, weidu_id: str) -> FuwuGongdanStatistics:
+        """从统计汇总表读取单个执行人/客户的工单统计"""
+        rows = self.db.execute(
+            select(
+                FuwuGongdanTongji.gongdan_zhuangtai,
+                FuwuGongdanTongji.gongdan_shuliang,
+                FuwuGongdanTongji.wancheng_tianshu_zonghe,
+                FuwuGongdanTongji.wancheng_jishu
+            ).where(
+                FuwuGongdanTongji.weidu_leixing == weidu_leixing,
+                FuwuGongdanTongji.weidu_id == weidu_id
+            )
+        ).all()
+
+        status_counts = {status: count for status, count, _, _ in rows if count}
+        tianshu = sum(total for _, _, total, _ in rows)
+        jishu = sum(count for _, _, _, count in rows)
+
+        # 逾期随时间变化，无法物化，实时统计
+        weidu_column = FuwuGongdan.zhixing_ren_id if weidu_leixing == WEIDU_ZHIXING_REN else FuwuGongdan.kehu_id
+        overdue_count = self.db.execute(
+            select(func.count()).where(
+                FuwuGongdan.is_deleted == "N",
+                weidu_column == weidu_id,
+                self._overdue_condition()
+            )
+        ).scalar_one()
+
+        return self._build_statistics(status_counts, overdue_count, tianshu / jishu if jishu else None)
+
     def assign_task_item(
         self,
         gongdan_id: str,
@@ -803,44 +893,33 @@ class FuwuGongdanService:
         # 获取总数
         total = query.count()
 
-        # 分页
+        # 分页：工单取自已有的 JOIN，客户、执行人随同一条语句加载
         offset = (page - 1) * size
-        items = query.offset(offset).limit(size).all()
+        items = query.options(
+            contains_eager(FuwuGongdanXiangmu.gongdan).joinedload(FuwuGongdan.kehu),
+            joinedload(FuwuGongdanXiangmu.zhixing_ren)
+        ).offset(offset).limit(size).all()
 
-        # 加载关联数据
+        # 构建响应数据
         result_items = []
         for item in items:
-            # 加载工单信息
-            gongdan = self.db.query(FuwuGongdan).options(
-                joinedload(FuwuGongdan.kehu)
-            ).filter(
-                FuwuGongdan.id == item.gongdan_id
-            ).first()
-
-            # 加载执行人信息
-            item_with_relations = self.db.query(FuwuGongdanXiangmu).options(
-                joinedload(FuwuGongdanXiangmu.zhixing_ren)
-            ).filter(
-                FuwuGongdanXiangmu.id == item.id
-            ).first()
-
-            # 构建响应数据
+            gongdan = item.gongdan
             item_dict = {
-                "id": item_with_relations.id,
-                "gongdan_id": item_with_relations.gongdan_id,
-                "xiangmu_mingcheng": item_with_relations.xiangmu_mingcheng,
-                "xiangmu_miaoshu": item_with_relations.xiangmu_miaoshu,
-                "xiangmu_zhuangtai": item_with_relations.xiangmu_zhuangtai,
-                "paixu": item_with_relations.paixu,
-                "jihua_gongshi": item_with_relations.jihua_gongshi,
-                "shiji_gongshi": item_with_relations.shiji_gongshi,
-                "kaishi_shijian": item_with_relations.kaishi_shijian,
-                "jieshu_shijian": item_with_relations.jieshu_shijian,
-                "beizhu": item_with_relations.beizhu,
-                "zhixing_ren_id": item_with_relations.zhixing_ren_id,
-                "zhixing_ren": item_with_relations.zhixing_ren,
-                "created_at": item_with_relations.created_at,
-                "updated_at": item_with_relations.updated_at,
+                "id": item.id,
+                "gongdan_id": item.gongdan_id,
+                "xiangmu_mingcheng": item.xiangmu_mingcheng,
+                "xiangmu_miaoshu": item.xiangmu_miaoshu,
+                "xiangmu_zhuangtai": item.xiangmu_zhuangtai,
+                "paixu": item.paixu,
+                "jihua_gongshi": item.jihua_gongshi,
+                "shiji_gongshi": item.shiji_gongshi,
+                "kaishi_shijian": item.kaishi_shijian,
+                "jieshu_shijian": item.jieshu_shijian,
+                "beizhu": item.beizhu,
+                "zhixing_ren_id": item.zhixing_ren_id,
+                "zhixing_ren": item.zhixing_ren,
+                "created_at": item.created_at,
+                "updated_at": item.updated_at,
                 "gongdan": {
                     "id": gongdan.id,
                     "gongdan_bianhao": gongdan.gongdan_bianhao,
@@ -0,0 +1,234 @@
+"""
+服务工单统计汇总维护
+
+FuwuGongdanTongji 按（维度类型, 维度ID, 工单状态）物化工单数量与完成天数合计。
+启用 FUWU_GONGDAN_ROLLUP_ENABLED 后，会话 flush 时根据 FuwuGongdan 的属性历史
+算出每个工单变更前后所属的汇总桶，只对差值执行 upsert，不再扫描工单表。
+
+注意：query.update() 等批量写入不经过 ORM 属性历史，不会同步汇总表，
+此类操作之后（以及首次启用时）需调用 rebuild_gongdan_rollup 全量重建。
+"""
+import itertools
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import Integer, and_, cast, delete, event, func, literal, select, update
+from sqlalchemy import inspect as sa_inspect
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from core.config import settings
+from models.fuwu_guanli import FuwuGongdan, FuwuGongdanTongji
+
+# 汇总维度
+WEIDU_ZHIXING_REN = "zhixing_ren"
+WEIDU_KEHU = "kehu"
+
+# 维度类型 -> 工单上的维度字段
+_WEIDU_COLUMNS = (
+    (WEIDU_ZHIXING_REN, "zhixing_ren_id"),
+    (WEIDU_KEHU, "kehu_id"),
+)
+
+# 影响汇总结果的工单字段
+_TRACKED_ATTRS = (
+    "zhixing_ren_id",
+    "kehu_id",
+    "gongdan_zhuangtai",
+    "is_deleted",
+    "shiji_kaishi_shijian",
+    "shiji_jieshu_shijian",
+)
+
+_UPSERT_INSERTS = {
+    "postgresql": pg_insert,
+    "sqlite": sqlite_insert,
+}
+
+# (维度类型, 维度ID, 工单状态) -> [工单数量, 完成天数合计, 参与完成天数统计的工单数量]
+RollupDelta = Dict[Tuple[str, str, str], List[int]]
+
+def build_wancheng_tianshu_expr(dialect_name: str):
+    """
+    工单完成天数的 SQL 表达式，与 Python 中 (结束 - 开始).days 一致（向下取整）
+
+    Args:
+        dialect_name: 数据库方言名称
+    """
+    start = FuwuGongdan.shiji_kaishi_shijian
+    end = FuwuGongdan.shiji_jieshu_shijian
+    if dialect_name == "postgresql":
+        return func.floor(func.extract("epoch", end - start) / 86400)
+    # SQLite 等不支持 extract(epoch)，按儒略日差值计算
+    return cast(func.julianday(end) - func.julianday(start), Integer)
+
+def wancheng_tianshu_condition():
+    """参与平均完成天数统计的工单条件"""
+    return and_(
+        FuwuGongdan.gongdan_zhuangtai == "completed",
+        FuwuGongdan.shiji_kaishi_shijian.isnot(None),
+        FuwuGongdan.shiji_jieshu_shijian.isnot(None)
+    )
+
+def _contributions(values: Optional[Dict[str, Any]]) -> Iterator[Tuple[Tuple[str, str, str], Optional[int]]]:
+    """工单在汇总表中所属的桶以及计入的完成天数"""
+    if values is None or values["is_deleted"] != "N":
+        return
+
+    status = values["gongdan_zhuangtai"]
+    start = values["shiji_kaishi_shijian"]
+    end = values["shiji_jieshu_shijian"]
+    days = (end - start).days if status == "completed" and start and end else None
+
+    for weidu_leixing, attr in _WEIDU_COLUMNS:
+        if values[attr]:
+            yield (weidu_leixing, values[attr], status), days
+
+def _snapshot(obj: FuwuGongdan, previous: bool) -> Dict[str, Any]:
+    """取工单当前值或 flush 前的值"""
+    state = sa_inspect(obj)
+    values = {}
+    for attr in _TRACKED_ATTRS:
+        if not previous:
+            values[attr] = getattr(obj, attr)
+            continue
+        history = state.attrs[attr].history
+        if history.deleted:
+            values[attr] = history.deleted[0]
+        elif history.unchanged:
+            values[attr] = history.unchanged[0]
+        else:
+            values[attr] = None
+    # 新建工单未 flush 前 is_deleted 可能尚未应用默认值
+    values["is_deleted"] = values["is_deleted"] or "N"
+    return values
+
+def _apply(deltas: RollupDelta, values: Optional[Dict[str, Any]], sign: int) -> None:
+    for key, days in _contributions(values):
+        delta = deltas[key]
+        delta[0] += sign
+        if days is not None:
+            delta[1] += sign * days
+            delta[2] += sign
+
+def collect_rollup_deltas(session: Session) -> RollupDelta:
+    """根据本次 flush 中工单的新增、修改、删除计算汇总表差值"""
+    deltas: RollupDelta = defaultdict(lambda: [0, 0, 0])
+
+    for obj in session.new:
+        if isinstance(obj, FuwuGongdan):
+            _apply(deltas, _snapshot(obj, previous=False), 1)
+
+    for obj in session.dirty:
+        if isinstance(obj, FuwuGongdan) and session.is_modified(obj, include_collections=False):
+            _apply(deltas, _snapshot(obj, previous=True), -1)
+            _apply(deltas, _snapshot(obj, previous=False), 1)
+
+    for obj in session.deleted:
+        if isinstance(obj, FuwuGongdan):
+            _apply(deltas, _snapshot(obj, previous=True), -1)
+
+    return {key: delta for key, delta in deltas.items() if any(delta)}
+
+def apply_rollup_deltas(connection: Connection, deltas: RollupDelta) -> None:
+    """将差值累加到汇总表（不存在的桶自动插入）"""
+    table = FuwuGongdanTongji.__table__
+    now = datetime.utcnow()
+    insert = _UPSERT_INSERTS.get(connection.dialect.name)
+
+    for (weidu_leixing, weidu_id, zhuangtai), (shuliang, tianshu, jishu) in deltas.items():
+        key = {
+            "weidu_leixing": weidu_leixing,
+            "weidu_id": weidu_id,
+            "gongdan_zhuangtai": zhuangtai,
+        }
+        increments = {
+            "gongdan_shuliang": table.c.gongdan_shuliang + shuliang,
+            "wancheng_tianshu_zonghe": table.c.wancheng_tianshu_zonghe + tianshu,
+            "wancheng_jishu": table.c.wancheng_jishu + jishu,
+            "updated_at": now,
+        }
+        row = dict(
+            key,
+            gongdan_shuliang=shuliang,
+            wancheng_tianshu_zonghe=tianshu,
+            wancheng_jishu=jishu,
+            updated_at=now
+        )
+
+        if insert is not None:
+            stmt = insert(table).values(**row).on_conflict_do_update(
+                index_elements=list(key.keys()),
+                set_=increments
+            )
+            connection.execute(stmt)
+            continue
+
+        # 其他数据库：先更新，未命中再插入
+        result = connection.execute(
+            update(table)
+            .where(*(table.c[name] == value for name, value in key.items()))
+            .values(**increments)
+        )
+        if result.rowcount == 0:
+            connection.execute(table.insert().values(**row))
+
+def rebuild_gongdan_rollup(db: Session) -> None:
+    """按工单表全量重建汇总表（调用方负责提交事务）"""
+    days = build_wancheng_tianshu_expr(db.get_bind().dialect.name)
+    condition = wancheng_tianshu_condition()
+
+    db.execute(delete(FuwuGongdanTongji))
+    for weidu_leixing, attr in _WEIDU_COLUMNS:
+        weidu_column = getattr(FuwuGongdan, attr)
+        source = (
+            select(
+                literal(weidu_leixing),
+                weidu_column,
+                FuwuGongdan.gongdan_zhuangtai,
+                func.count(),
+                func.coalesce(func.sum(days).filter(condition), 0),
+                func.count().filter(condition),
+                literal(datetime.utcnow()),
+            )
+            .where(FuwuGongdan.is_deleted == "N", weidu_column.isnot(None))
+            .group_by(weidu_column, FuwuGongdan.gongdan_zhuangtai)
+        )
+        db.execute(
+            FuwuGongdanTongji.__table__.insert().from_select(
+                [
+                    "weidu_leixing",
+                    "weidu_id",
+                    "gongdan_zhuangtai",
+                    "gongdan_shuliang",
+                    "wancheng_tianshu_zonghe",
+                    "wancheng_jishu",
+                    "updated_at",
+                ],
+                source
+            )
+        )
+
+# ==================== ORM 变更监听 ====================
+
+# 修改前的值未加载时无法计算差值，设置这些字段时主动加载旧值
+for _attr in _TRACKED_ATTRS:
+    event.listen(getattr(FuwuGongdan, _attr), "set", lambda *args: None, active_history=True)
+
+@event.listens_for(Session, "after_flush")
+def _refresh_gongdan_rollup(session: Session, flush_context) -> None:
+    """工单写入时增量维护汇总表，与工单变更处于同一事务"""
+    if not settings.FUWU_GONGDAN_ROLLUP_ENABLED:
+        return
+    if not any(
+        isinstance(obj, FuwuGongdan)
+        for obj in itertools.chain(session.new, session.dirty, session.deleted)
+    ):
+        return
+
+    deltas = collect_rollup_deltas(session)
+    if deltas:
+        apply_rollup_deltas(session.connection(), deltas)
@@ -3,8 +3,12 @@
 """
 from .heguishixiang_moban_service import HeguishixiangMobanService
 from .heguishixiang_calendar_service import HeguishixiangCalendarService
+from .heguishixiang_shengcheng_service import HeguishixiangShengchengService
+from .heguishixiang_tixing_service import HeguishixiangTixingService
 
 __all__ = [
     "HeguishixiangMobanService",
-    "HeguishixiangCalendarService"
+    "HeguishixiangCalendarService",
+    "HeguishixiangShengchengService",
+    "HeguishixiangTixingService"
 ]
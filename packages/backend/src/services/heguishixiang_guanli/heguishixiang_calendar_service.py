@@ -1,13 +1,20 @@
 """
 合规日历服务
 """
+import json
 from typing import List, Dict, Any, Optional
 from datetime import datetime, timedelta
 from sqlalchemy.orm import Session
 from sqlalchemy import and_, func
 
-from models.heguishixiang_guanli import HeguishixiangShili, HeguishixiangMoban
+from core.config import settings
+from models.heguishixiang_guanli import HeguishixiangShili, HeguishixiangMoban, HeguishixiangRili
 from models.kehu_guanli import Kehu
+from services.heguishixiang_guanli.heguishixiang_rili_bucket import (
+    build_calendar_entry,
+    calendar_entry_select,
+    month_range,
+)
 
 class HeguishixiangCalendarService:
     """合规日历服务"""
@@ -24,86 +31,74 @@ class HeguishixiangCalendarService:
     ) -> Dict[str, Any]:
         """获取合规日历数据"""
         
-        # 构建查询
-        query = self.db.query(HeguishixiangShili).join(
-            HeguishixiangMoban,
-            HeguishixiangShili.heguishixiang_moban_id == HeguishixiangMoban.id
-        ).join(
-            Kehu,
-            HeguishixiangShili.kehu_id == Kehu.id
-        ).filter(
-            and_(
-                HeguishixiangShili.is_deleted == "N",
-                HeguishixiangMoban.is_deleted == "N",
-                Kehu.is_deleted == "N"
-            )
-        )
-
-        # 时间范围筛选
-        if month:
-            # 月度视图
-            start_date = datetime(year, month, 1)
-            if month == 12:
-                end_date = datetime(year + 1, 1, 1) - timedelta(days=1)
-            else:
-                end_date = datetime(year, month + 1, 1) - timedelta(days=1)
+        if settings.HEGUISHIXIANG_RILI_ENABLED:
+            entries = self._load_entries_from_buckets(year, month, kehu_id)
+            if shixiang_leixing:
+                entries = [entry for entry in entries if entry["shixiang_leixing"] == shixiang_leixing]
         else:
-            # 年度视图
-            start_date = datetime(year, 1, 1)
-            end_date = datetime(year, 12, 31)
-
-        query = query.filter(
-            and_(
-                HeguishixiangShili.jihua_jieshu_shijian >= start_date,
-                HeguishixiangShili.jihua_jieshu_shijian <= end_date
-            )
-        )
-
-        # 其他筛选条件
-        if kehu_id:
-            query = query.filter(HeguishixiangShili.kehu_id == kehu_id)
-
-        if shixiang_leixing:
-            query = query.filter(HeguishixiangMoban.shixiang_leixing == shixiang_leixing)
-
-        # 获取数据
-        shili_list = query.all()
+            entries = self._load_entries(year, month, kehu_id, shixiang_leixing)
 
-        # 构建日历数据
+        # 构建日历数据（状态信息随当前时间变化，读取时计算）
         calendar_data = {}
-        
-        for shili in shili_list:
-            date_key = shili.jihua_jieshu_shijian.strftime("%Y-%m-%d")
-            
-            if date_key not in calendar_data:
-                calendar_data[date_key] = []
-
-            # 计算状态和紧急程度
-            status_info = self._get_status_info(shili)
-            
-            calendar_data[date_key].append({
-                "id": shili.id,
-                "shili_bianhao": shili.shili_bianhao,
-                "shili_mingcheng": shili.shili_mingcheng,
-                "shenbao_qijian": shili.shenbao_qijian,
-                "shili_zhuangtai": shili.shili_zhuangtai,
-                "jihua_jieshu_shijian": shili.jihua_jieshu_shijian.isoformat(),
-                "kehu_mingcheng": shili.kehu.gongsi_mingcheng,
-                "shixiang_leixing": shili.heguishixiang_moban.shixiang_leixing,
-                "shixiang_mingcheng": shili.heguishixiang_moban.shixiang_mingcheng,
-                "fengxian_dengji": shili.fengxian_dengji,
-                "yuqi_tianshu": shili.yuqi_tianshu,
-                "wancheng_jindu": shili.wancheng_jindu,
-                "status_info": status_info
+        for entry in entries:
+            deadline = datetime.fromisoformat(entry["jihua_jieshu_shijian"])
+            calendar_data.setdefault(deadline.strftime("%Y-%m-%d"), []).append({
+                **entry,
+                "status_info": self._build_status_info(entry["shili_zhuangtai"], deadline)
             })
 
         return {
             "year": year,
             "month": month,
             "calendar_data": calendar_data,
-            "summary": self._get_calendar_summary(shili_list, year, month)
+            "summary": self._get_calendar_summary(entries, year, month)
         }
 
+    def _load_entries_from_buckets(
+        self,
+        year: int,
+        month: Optional[int],
+        kehu_id: Optional[str]
+    ) -> List[Dict[str, Any]]:
+        """从日历分桶读取条目并按计划结束时间合并"""
+        query = self.db.query(HeguishixiangRili.shixiang_liebiao).filter(HeguishixiangRili.nian == year)
+        if month:
+            query = query.filter(HeguishixiangRili.yue == month)
+        if kehu_id:
+            query = query.filter(HeguishixiangRili.kehu_id == kehu_id)
+
+        entries = []
+        for (shixiang_liebiao,) in query.all():
+            entries.extend(json.loads(shixiang_liebiao))
+        entries.sort(key=lambda entry: entry["jihua_jieshu_shijian"])
+        return entries
+
+    def _load_entries(
+        self,
+        year: int,
+        month: Optional[int],
+        kehu_id: Optional[str],
+        shixiang_leixing: Optional[str]
+    ) -> List[Dict[str, Any]]:
+        """联表查询实例、客户、模板生成日历条目"""
+        # 时间范围：月度视图为当月，年度视图为全年
+        if month:
+            start_date, end_date = month_range(year, month)
+        else:
+            start_date, end_date = datetime(year, 1, 1), datetime(year + 1, 1, 1)
+
+        stmt = calendar_entry_select().where(
+            HeguishixiangShili.jihua_jieshu_shijian >= start_date,
+            HeguishixiangShili.jihua_jieshu_shijian < end_date
+        )
+        if kehu_id:
+            stmt = stmt.where(HeguishixiangShili.kehu_id == kehu_id)
+        if shixiang_leixing:
+            stmt = stmt.where(HeguishixiangMoban.shixiang_leixing == shixiang_leixing)
+
+        stmt = stmt.order_by(HeguishixiangShili.jihua_jieshu_shijian, HeguishixiangShili.id)
+        return [build_calendar_entry(row) for row in self.db.execute(stmt)]
+
     def get_upcoming_items(
         self,
         days: int = 7,
@@ -286,11 +281,15 @@ class HeguishixiangCalendarService:
     @staticmethod
     def _get_status_info(shili: HeguishixiangShili) -> Dict[str, Any]:
         """获取状态信息"""
+        return HeguishixiangCalendarService._build_status_info(shili.shili_zhuangtai, shili.jihua_jieshu_shijian)
+
+    @staticmethod
+    def _build_status_info(shili_zhuangtai: str, deadline: datetime) -> Dict[str, Any]:
+        """根据实例状态和计划结束时间计算状态信息"""
         now = datetime.now()
-        deadline = shili.jihua_jieshu_shijian
         days_remaining = (deadline.date() - now.date()).days
 
-        if shili.shili_zhuangtai == "completed":
+        if shili_zhuangtai == "completed":
             return {
                 "status": "completed",
                 "color": "success",
@@ -335,15 +334,19 @@ class HeguishixiangCalendarService:
 
     @staticmethod
     def _get_calendar_summary(
-        shili_list: List[HeguishixiangShili],
+        entries: List[Dict[str, Any]],
         year: int,
         month: Optional[int] = None
     ) -> Dict[str, Any]:
         """获取日历摘要信息"""
         
-        total_count = len(shili_list)
-        completed_count = sum(1 for shili in shili_list if shili.shili_zhuangtai == "completed")
-        overdue_count = sum(1 for shili in shili_list if shili.jihua_jieshu_shijian < datetime.now() and shili.shili_zhuangtai != "completed")
+        now = datetime.now()
+        total_count = len(entries)
+        completed_count = sum(1 for entry in entries if entry["shili_zhuangtai"] == "completed")
+        overdue_count = sum(
+            1 for entry in entries
+            if entry["shili_zhuangtai"] != "completed" and datetime.fromisoformat(entry["jihua_jieshu_shijian"]) < now
+        )
         
         return {
             "period": f"{year}年{month}月" if month else f"{year}年",
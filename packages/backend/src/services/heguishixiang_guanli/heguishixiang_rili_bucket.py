@@ -0,0 +1,245 @@
+"""
+合规日历分桶维护
+
+HeguishixiangRili 按（年, 月, 客户）物化合规日历条目，条目中已带上客户名称、事项类型与名称。
+启用 HEGUISHIXIANG_RILI_ENABLED 后：
+- 会话 flush 时根据合规事项实例的属性历史，找出实例变更前后所属的分桶，只重算这些分桶
+  （单个客户单月的实例，通常只有几条到几十条）
+- 客户名称、事项模板名称/类型变更或删除时，重算引用它们的分桶
+- 合规日历按年月直接读取分桶后合并，不再联表扫描全年实例
+
+重算前先锁定分桶行（SELECT ... FOR UPDATE），并发修改同一客户同月的实例时依次重算，结果不会互相覆盖。
+
+注意：批量 INSERT/UPDATE 等不经过 ORM 的写入不会同步分桶，此类操作之后需调用
+refresh_calendar_buckets 重算受影响的分桶；首次启用前执行 migrations/create_heguishixiang_rili.sql 回填。
+"""
+import itertools
+import json
+from datetime import datetime
+from typing import Any, Dict, Iterable, Optional, Set, Tuple
+
+from sqlalchemy import delete, event, or_, select, update
+from sqlalchemy import inspect as sa_inspect
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import Connection, Row
+from sqlalchemy.orm import Session
+
+from core.config import settings
+from models.heguishixiang_guanli import HeguishixiangMoban, HeguishixiangRili, HeguishixiangShili
+from models.kehu_guanli import Kehu
+
+# (年, 月, 客户ID)
+BucketKey = Tuple[int, int, str]
+
+# 决定实例所属分桶的字段
+_SHILI_KEY_ATTRS = ("kehu_id", "jihua_jieshu_shijian")
+
+# 日历条目中引用的客户、模板字段
+_KEHU_ATTRS = ("gongsi_mingcheng", "is_deleted")
+_MOBAN_ATTRS = ("shixiang_mingcheng", "shixiang_leixing", "is_deleted")
+
+_WATCHED_MODELS = (HeguishixiangShili, Kehu, HeguishixiangMoban)
+
+_UPSERT_INSERTS = {
+    "postgresql": pg_insert,
+    "sqlite": sqlite_insert,
+}
+
+def bucket_key(kehu_id: Optional[str], deadline: Optional[datetime]) -> Optional[BucketKey]:
+    """实例所属的分桶"""
+    if not kehu_id or deadline is None:
+        return None
+    return deadline.year, deadline.month, kehu_id
+
+def month_range(year: int, month: int) -> Tuple[datetime, datetime]:
+    """月份的时间范围 [月初, 下月初)"""
+    start = datetime(year, month, 1)
+    end = datetime(year + 1, 1, 1) if month == 12 else datetime(year, month + 1, 1)
+    return start, end
+
+def calendar_entry_select():
+    """日历条目查询：实例联表客户、模板，只取日历展示需要的字段"""
+    return select(
+        HeguishixiangShili.id,
+        HeguishixiangShili.shili_bianhao,
+        HeguishixiangShili.shili_mingcheng,
+        HeguishixiangShili.shenbao_qijian,
+        HeguishixiangShili.shili_zhuangtai,
+        HeguishixiangShili.jihua_jieshu_shijian,
+        Kehu.gongsi_mingcheng.label("kehu_mingcheng"),
+        HeguishixiangMoban.shixiang_leixing,
+        HeguishixiangMoban.shixiang_mingcheng,
+        HeguishixiangShili.fengxian_dengji,
+        HeguishixiangShili.yuqi_tianshu,
+        HeguishixiangShili.wancheng_jindu,
+    ).select_from(HeguishixiangShili).join(
+        HeguishixiangMoban,
+        HeguishixiangShili.heguishixiang_moban_id == HeguishixiangMoban.id
+    ).join(
+        Kehu,
+        HeguishixiangShili.kehu_id == Kehu.id
+    ).where(
+        HeguishixiangShili.is_deleted == "N",
+        HeguishixiangMoban.is_deleted == "N",
+        Kehu.is_deleted == "N"
+    )
+
+def build_calendar_entry(row: Row) -> Dict[str, Any]:
+    """日历条目（不含随当前时间变化的状态信息）"""
+    entry = dict(row._mapping)
+    entry["jihua_jieshu_shijian"] = row.jihua_jieshu_shijian.isoformat()
+    return entry
+
+def refresh_calendar_buckets(connection: Connection, keys: Iterable[BucketKey]) -> None:
+    """
+    按实例表重算指定分桶（调用方负责提交事务）
+
+    Args:
+        connection: 数据库连接（在 flush 监听中为会话当前连接）
+        keys: 需要重算的分桶
+    """
+    table = HeguishixiangRili.__table__
+    insert = _UPSERT_INSERTS.get(connection.dialect.name)
+    now = datetime.utcnow()
+
+    # 固定加锁顺序，避免并发重算多个分桶时死锁
+    for nian, yue, kehu_id in sorted(set(keys)):
+        key = {"nian": nian, "yue": yue, "kehu_id": kehu_id}
+        where = [table.c[name] == value for name, value in key.items()]
+        empty_row = dict(key, shixiang_shuliang=0, shixiang_liebiao="[]", updated_at=now)
+
+        # 先确保分桶行存在并锁定，同一分桶的重算串行执行
+        if insert is not None:
+            connection.execute(insert(table).values(**empty_row).on_conflict_do_nothing(index_elements=list(key)))
+        locked = connection.execute(select(table.c.nian).where(*where).with_for_update()).first()
+        if locked is None:
+            connection.execute(table.insert().values(**empty_row))
+
+        start, end = month_range(nian, yue)
+        rows = connection.execute(
+            calendar_entry_select().where(
+                HeguishixiangShili.kehu_id == kehu_id,
+                HeguishixiangShili.jihua_jieshu_shijian >= start,
+                HeguishixiangShili.jihua_jieshu_shijian < end
+            ).order_by(HeguishixiangShili.jihua_jieshu_shijian, HeguishixiangShili.id)
+        ).all()
+
+        if not rows:
+            connection.execute(delete(table).where(*where))
+            continue
+
+        connection.execute(
+            update(table).where(*where).values(
+                shixiang_shuliang=len(rows),
+                shixiang_liebiao=json.dumps([build_calendar_entry(row) for row in rows], ensure_ascii=False),
+                updated_at=now
+            )
+        )
+
+def rebuild_calendar_buckets(db: Session, year: Optional[int] = None) -> None:
+    """按实例表全量重建分桶（可只重建某一年，调用方负责提交事务）"""
+    shili_query = select(HeguishixiangShili.kehu_id, HeguishixiangShili.jihua_jieshu_shijian).where(
+        HeguishixiangShili.is_deleted == "N"
+    )
+    bucket_delete = delete(HeguishixiangRili)
+    if year:
+        shili_query = shili_query.where(
+            HeguishixiangShili.jihua_jieshu_shijian >= datetime(year, 1, 1),
+            HeguishixiangShili.jihua_jieshu_shijian < datetime(year + 1, 1, 1)
+        )
+        bucket_delete = bucket_delete.where(HeguishixiangRili.nian == year)
+
+    keys = {bucket_key(kehu_id, deadline) for kehu_id, deadline in db.execute(shili_query)}
+    db.execute(bucket_delete)
+    refresh_calendar_buckets(db.connection(), keys)
+
+# ==================== ORM 变更监听 ====================
+
+def _previous_value(obj: Any, attr: str) -> Any:
+    """取 flush 前的字段值"""
+    history = sa_inspect(obj).attrs[attr].history
+    if history.deleted:
+        return history.deleted[0]
+    if history.unchanged:
+        return history.unchanged[0]
+    return None
+
+def _has_changes(obj: Any, attrs: Tuple[str, ...]) -> bool:
+    state = sa_inspect(obj)
+    return any(state.attrs[attr].history.has_changes() for attr in attrs)
+
+def collect_bucket_keys(session: Session) -> Tuple[Set[BucketKey], Set[str], Set[str], Set[str]]:
+    """
+    根据本次 flush 的变更找出需要重算的分桶
+
+    Returns:
+        (实例变更前后所属的分桶, 名称或状态变化的客户ID, 已删除的客户ID, 名称、类型或状态变化的模板ID)
+    """
+    keys: Set[Optional[BucketKey]] = set()
+    kehu_ids: Set[str] = set()
+    deleted_kehu_ids: Set[str] = set()
+    moban_ids: Set[str] = set()
+
+    for obj in session.new:
+        if isinstance(obj, HeguishixiangShili):
+            keys.add(bucket_key(obj.kehu_id, obj.jihua_jieshu_shijian))
+
+    for obj in session.dirty:
+        if isinstance(obj, HeguishixiangShili) and session.is_modified(obj, include_collections=False):
+            keys.add(bucket_key(*(_previous_value(obj, attr) for attr in _SHILI_KEY_ATTRS)))
+            keys.add(bucket_key(obj.kehu_id, obj.jihua_jieshu_shijian))
+        elif isinstance(obj, Kehu) and _has_changes(obj, _KEHU_ATTRS):
+            kehu_ids.add(obj.id)
+        elif isinstance(obj, HeguishixiangMoban) and _has_changes(obj, _MOBAN_ATTRS):
+            moban_ids.add(obj.id)
+
+    for obj in session.deleted:
+        if isinstance(obj, HeguishixiangShili):
+            keys.add(bucket_key(*(_previous_value(obj, attr) for attr in _SHILI_KEY_ATTRS)))
+        elif isinstance(obj, Kehu):
+            deleted_kehu_ids.add(obj.id)
+        elif isinstance(obj, HeguishixiangMoban):
+            moban_ids.add(obj.id)
+
+    keys.discard(None)
+    return keys, kehu_ids, deleted_kehu_ids, moban_ids
+
+# 修改前的值未加载时无法确定原分桶，设置这些字段时主动加载旧值
+for _attr in _SHILI_KEY_ATTRS:
+    event.listen(getattr(HeguishixiangShili, _attr), "set", lambda *args: None, active_history=True)
+
+@event.listens_for(Session, "after_flush")
+def _refresh_calendar_buckets(session: Session, flush_context) -> None:
+    """实例、客户、模板写入时增量维护日历分桶，与业务变更处于同一事务"""
+    if not settings.HEGUISHIXIANG_RILI_ENABLED:
+        return
+    if not any(
+        isinstance(obj, _WATCHED_MODELS)
+        for obj in itertools.chain(session.new, session.dirty, session.deleted)
+    ):
+        return
+
+    keys, kehu_ids, deleted_kehu_ids, moban_ids = collect_bucket_keys(session)
+    connection = session.connection()
+
+    # 客户、模板的变化影响引用它们的所有实例所在分桶
+    if kehu_ids or moban_ids:
+        rows = connection.execute(
+            select(HeguishixiangShili.kehu_id, HeguishixiangShili.jihua_jieshu_shijian).where(
+                or_(
+                    HeguishixiangShili.kehu_id.in_(kehu_ids),
+                    HeguishixiangShili.heguishixiang_moban_id.in_(moban_ids)
+                ),
+                HeguishixiangShili.is_deleted == "N"
+            ).distinct()
+        )
+        keys.update(bucket_key(kehu_id, deadline) for kehu_id, deadline in rows)
+
+    if deleted_kehu_ids:
+        # 客户删除时实例由外键级联删除，直接清理其分桶
+        connection.execute(delete(HeguishixiangRili).where(HeguishixiangRili.kehu_id.in_(deleted_kehu_ids)))
+        keys = {key for key in keys if key[2] not in deleted_kehu_ids}
+
+    if keys:
+        refresh_calendar_buckets(connection, keys)
@@ -0,0 +1,222 @@
+"""
+合规事项实例批量生成服务
+
+按客户合规事项配置（KehuHeguishixiang）把模板展开为合规事项实例：
+- 每条截止时间规则只编译、展开一次（见 jiezhi_guize），所有使用该规则的客户共用同一组申报期间
+- 节假日顺延所需的日历一次性加载
+- 一个区间内的全部实例以一条 INSERT ... ON CONFLICT DO NOTHING 批量写入；
+  依赖 (客户, 模板, 申报期间) 唯一约束去重，重复执行不会生成重复实例
+"""
+import logging
+import uuid
+from datetime import date, datetime, time, timedelta
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from core.config import settings
+from core.sequence import reserve_daily_codes
+from models.heguishixiang_guanli import HeguishixiangMoban, HeguishixiangShili, KehuHeguishixiang
+from models.kehu_guanli import Kehu
+from services.heguishixiang_guanli.heguishixiang_rili_bucket import bucket_key, refresh_calendar_buckets
+from services.heguishixiang_guanli.jiezhi_guize import (
+    ShenbaoQijian,
+    WorkdayCalendar,
+    compile_deadline_rule,
+)
+from services.heguishixiang_guanli.tixing_scheduler import mark_tixing_changed
+
+logger = logging.getLogger(__name__)
+
+_UPSERT_INSERTS = {
+    "postgresql": pg_insert,
+    "sqlite": sqlite_insert,
+}
+
+# 顺延最多跨越的天数（加载节假日日历的余量）
+ROLL_FORWARD_MAX_DAYS = 30
+
+# (名称, 计划开始时间, 计划结束时间)
+RolledPeriod = Tuple[str, Optional[datetime], datetime]
+
+class HeguishixiangShengchengService:
+    """合规事项实例批量生成服务"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def generate_instances(
+        self,
+        start_date: date,
+        end_date: date,
+        moban_ids: Optional[Sequence[str]] = None,
+        kehu_ids: Optional[Sequence[str]] = None,
+        created_by: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        生成名义截止日期在 [start_date, end_date) 内的合规事项实例
+
+        Args:
+            start_date: 开始日期
+            end_date: 结束日期（不含）
+            moban_ids: 只生成这些模板的实例
+            kehu_ids: 只生成这些客户的实例
+            created_by: 创建人ID
+
+        Returns:
+            Dict: created-新生成数量，existing-已存在跳过数量，invalid-规则无效的配置
+        """
+        peizhi_list = self._load_peizhi(moban_ids, kehu_ids)
+        calendar = WorkdayCalendar.load(self.db, start_date, end_date + timedelta(days=ROLL_FORWARD_MAX_DAYS))
+
+        # 规则 -> 展开并顺延后的申报期间，每条规则只计算一次
+        periods_by_rule: Dict[Tuple[str, Optional[str]], List[RolledPeriod]] = {}
+        invalid: List[Dict[str, str]] = []
+        candidates = []
+        for peizhi in peizhi_list:
+            rule_key = (peizhi.shenbao_zhouqi, peizhi.teshu_jiezhi_shijian or peizhi.jiezhi_shijian_guize)
+            periods = periods_by_rule.get(rule_key)
+            if periods is None:
+                try:
+                    rule = compile_deadline_rule(*rule_key)
+                except ValueError as e:
+                    invalid.append({"peizhi_id": peizhi.id, "moban_id": peizhi.heguishixiang_moban_id, "reason": str(e)})
+                    continue
+                periods = [
+                    self._roll_period(qijian, calendar if rule.roll_forward else None)
+                    for qijian in rule.periods(start_date, end_date)
+                ]
+                periods_by_rule[rule_key] = periods
+            candidates.extend((peizhi, period) for period in periods)
+
+        existing = self._load_existing(candidates)
+        now = datetime.utcnow()
+        rows = []
+        for peizhi, (mingcheng, kaishi, jiezhi) in candidates:
+            if (peizhi.kehu_id, peizhi.heguishixiang_moban_id, mingcheng) in existing:
+                continue
+            rows.append({
+                "id": str(uuid.uuid4()),
+                "kehu_id": peizhi.kehu_id,
+                "heguishixiang_moban_id": peizhi.heguishixiang_moban_id,
+                "kehu_heguishixiang_id": peizhi.id,
+                "shili_mingcheng": f"{mingcheng}{peizhi.shixiang_mingcheng}",
+                "shenbao_qijian": mingcheng,
+                "jihua_kaishi_shijian": kaishi,
+                "jihua_jieshu_shijian": jiezhi,
+                "shili_zhuangtai": "pending",
+                "wancheng_jindu": 0,
+                "fuzeren_id": peizhi.fuzeren_id,
+                "fenpei_shijian": now if peizhi.fuzeren_id else None,
+                "shenhe_zhuangtai": "pending",
+                "fengxian_dengji": peizhi.kehu_fengxian_dengji or peizhi.fengxian_dengji or "medium",
+                "yuqi_tianshu": 0,
+                "tixing_cishu": 0,
+                "created_by": created_by,
+                "created_at": now,
+                "updated_at": now,
+                "is_deleted": "N",
+            })
+
+        created = self._insert_instances(rows)
+        self.db.commit()
+
+        logger.info(
+            f"合规事项实例生成完成: 区间 {start_date} ~ {end_date}, 配置 {len(peizhi_list)} 条, "
+            f"规则 {len(periods_by_rule)} 条, 新生成 {created}, 已存在 {len(candidates) - created}, 无效规则 {len(invalid)}"
+        )
+        return {
+            "created": created,
+            "existing": len(candidates) - created,
+            "invalid": invalid
+        }
+
+    def _load_peizhi(self, moban_ids: Optional[Sequence[str]], kehu_ids: Optional[Sequence[str]]) -> list:
+        """启用自动生成的客户合规事项配置（连同模板规则，只查询需要的字段）"""
+        stmt = select(
+            KehuHeguishixiang.id,
+            KehuHeguishixiang.kehu_id,
+            KehuHeguishixiang.heguishixiang_moban_id,
+            KehuHeguishixiang.teshu_jiezhi_shijian,
+            KehuHeguishixiang.fuzeren_id,
+            KehuHeguishixiang.kehu_fengxian_dengji,
+            HeguishixiangMoban.shixiang_mingcheng,
+            HeguishixiangMoban.shenbao_zhouqi,
+            HeguishixiangMoban.jiezhi_shijian_guize,
+            HeguishixiangMoban.fengxian_dengji,
+        ).join(
+            HeguishixiangMoban,
+            KehuHeguishixiang.heguishixiang_moban_id == HeguishixiangMoban.id
+        ).join(
+            Kehu,
+            KehuHeguishixiang.kehu_id == Kehu.id
+        ).where(
+            KehuHeguishixiang.is_deleted == "N",
+            KehuHeguishixiang.peizhi_zhuangtai == "active",
+            KehuHeguishixiang.zidong_shengcheng.is_(True),
+            HeguishixiangMoban.is_deleted == "N",
+            HeguishixiangMoban.moban_zhuangtai == "active",
+            Kehu.is_deleted == "N"
+        )
+        if moban_ids:
+            stmt = stmt.where(KehuHeguishixiang.heguishixiang_moban_id.in_(moban_ids))
+        if kehu_ids:
+            stmt = stmt.where(KehuHeguishixiang.kehu_id.in_(kehu_ids))
+        return self.db.execute(stmt).all()
+
+    @staticmethod
+    def _roll_period(qijian: ShenbaoQijian, calendar: Optional[WorkdayCalendar]) -> RolledPeriod:
+        """申报期间转换为计划开始、结束时间，截止日期按需顺延，截止时间为当天结束"""
+        jiezhi = calendar.roll_forward(qijian.jiezhi) if calendar else qijian.jiezhi
+        kaishi = datetime.combine(qijian.kaishi, time.min) if qijian.kaishi else None
+        return qijian.mingcheng, kaishi, datetime.combine(jiezhi, time(23, 59, 59))
+
+    def _load_existing(self, candidates: list) -> set:
+        """已存在的 (客户, 模板, 申报期间)，避免为已有实例预留编号"""
+        if not candidates:
+            return set()
+        moban_ids = {peizhi.heguishixiang_moban_id for peizhi, _ in candidates}
+        mingcheng_list = {period[0] for _, period in candidates}
+        rows = self.db.execute(
+            select(
+                HeguishixiangShili.kehu_id,
+                HeguishixiangShili.heguishixiang_moban_id,
+                HeguishixiangShili.shenbao_qijian
+            ).where(
+                HeguishixiangShili.heguishixiang_moban_id.in_(moban_ids),
+                HeguishixiangShili.shenbao_qijian.in_(mingcheng_list)
+            )
+        )
+        return {tuple(row) for row in rows}
+
+    def _insert_instances(self, rows: List[Dict[str, Any]]) -> int:
+        """批量写入实例，并发生成时已存在的实例由唯一约束跳过，返回实际写入数量"""
+        if not rows:
+            return 0
+
+        codes = reserve_daily_codes(self.db, HeguishixiangShili.shili_bianhao, "HG", len(rows), width=6)
+        for row, code in zip(rows, codes):
+            row["shili_bianhao"] = code
+
+        table = HeguishixiangShili.__table__
+        connection = self.db.connection()
+        insert = _UPSERT_INSERTS.get(connection.dialect.name)
+        if insert is None:
+            # 其他数据库不支持 ON CONFLICT，逐条写入前已按 _load_existing 去重
+            connection.execute(table.insert(), rows)
+            inserted = [(row["kehu_id"], row["jihua_jieshu_shijian"]) for row in rows]
+        else:
+            inserted = connection.execute(
+                insert(table).on_conflict_do_nothing().returning(table.c.kehu_id, table.c.jihua_jieshu_shijian),
+                rows
+            ).all()
+
+        # 批量写入不经过 ORM，需手动同步合规日历分桶，并在提交后通知提醒调度者
+        if settings.HEGUISHIXIANG_RILI_ENABLED and inserted:
+            refresh_calendar_buckets(connection, {bucket_key(kehu_id, deadline) for kehu_id, deadline in inserted})
+        if inserted:
+            mark_tixing_changed(self.db)
+        return len(inserted)
@@ -0,0 +1,336 @@
+"""
+合规事项提醒服务
+
+按提醒配置（HeguishixiangTixing）为未完成的合规事项实例计算提醒时间并发送，供提醒调度器（tixing_scheduler）调用：
+- deadline_reminder：截止日期前 tiqian_tianshu 天的 tixing_shijian 首次提醒，重复提醒每隔 chongfu_jiangetianshu 天一次，
+  最多重复 zuida_chongfu_cishu 次，不晚于截止时间
+- overdue_reminder：截止日期后 tiqian_tianshu 天首次提醒，重复规则同上
+- 接收人为配置的 jieshou_ren_id，未配置时为实例负责人；都没有的提醒跳过
+
+load_due 按时间窗口加载：每条配置一次查询，只读取截止时间落在窗口对应区间内的实例，
+开销与窗口内的提醒数量相关，与实例总数无关。dispatch 按接收人分组，每个接收人一条站内通知，
+提醒记录一次批量写入，实例与配置的提醒计数各一条批量 UPDATE。
+"""
+import json
+import logging
+from datetime import datetime, time, timedelta
+from functools import lru_cache
+from typing import Dict, Iterator, List, NamedTuple, Optional, Sequence, Set, Tuple
+
+from sqlalchemy import bindparam, insert, select, update
+from sqlalchemy.orm import Session
+
+from core.sequence import reserve_daily_codes
+from models.heguishixiang_guanli import HeguishixiangShili, HeguishixiangTixing, TixingJilu
+from models.kehu_guanli import Kehu
+from models.zhifu_guanli import ZhifuTongzhi
+
+logger = logging.getLogger(__name__)
+
+# 由调度器按时间触发的提醒类型（status_change 由状态变更触发，不在此处理）
+DEADLINE_REMINDER = "deadline_reminder"
+OVERDUE_REMINDER = "overdue_reminder"
+SCHEDULED_TYPES = (DEADLINE_REMINDER, OVERDUE_REMINDER)
+
+# 已结束的实例不再提醒
+FINISHED_STATUSES = ("completed", "cancelled")
+
+# 未配置最大重复次数时的上限
+MAX_CHONGFU_CISHU = 30
+
+DEFAULT_TIXING_SHIJIAN = time(9, 0)
+
+PRIORITY_ORDER = {"low": 0, "normal": 1, "high": 2, "urgent": 3}
+
+class TixingRenwu(NamedTuple):
+    """一次待发送的提醒"""
+    tixing_id: str
+    shili_id: str
+    jieshou_ren_id: str
+    tixing_leixing: str
+    jieshou_ren_leixing: str
+    fasong_fangshi: str
+    youxian_ji: str
+    biaoti: str
+    neirong: str
+    jihua_fasong_shijian: datetime
+
+class _TemplateValues(dict):
+    """模板中未知的占位符原样保留"""
+
+    def __missing__(self, key: str) -> str:
+        return "{" + key + "}"
+
+def render_tixing_text(template: str, values: Dict[str, str]) -> str:
+    """渲染提醒标题/内容模板，占位符格式为 {shili_mingcheng}"""
+    try:
+        return template.format_map(_TemplateValues(values))
+    except (ValueError, IndexError):
+        # 模板含不成对的花括号等，按原文发送
+        return template
+
+@lru_cache(maxsize=256)
+def parse_tixing_shijian(value: Optional[str]) -> time:
+    """解析 HH:MM 格式的提醒时间，为空时取 09:00"""
+    if not value:
+        return DEFAULT_TIXING_SHIJIAN
+    hour, minute = (int(part) for part in value.strip().split(":"))
+    return time(hour, minute)
+
+def fire_times(tixing_leixing: str, deadline: datetime, at: time, tiqian_tianshu: int,
+               interval_days: int, repeat_count: int, start: datetime, end: datetime) -> Iterator[datetime]:
+    """截止时间为 deadline 的实例在 [start, end) 内的提醒时间"""
+    sign = -1 if tixing_leixing == DEADLINE_REMINDER else 1
+    base = deadline.date() + timedelta(days=sign * tiqian_tianshu)
+    for k in range(repeat_count + 1):
+        fire = datetime.combine(base + timedelta(days=k * interval_days), at)
+        if fire >= end:
+            return
+        if tixing_leixing == DEADLINE_REMINDER and fire > deadline:
+            return
+        if tixing_leixing == OVERDUE_REMINDER and fire <= deadline:
+            continue
+        if fire >= start:
+            yield fire
+
+class HeguishixiangTixingService:
+    """合规事项提醒服务"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def load_due(self, start: datetime, end: datetime) -> List[TixingRenwu]:
+        """
+        计算 [start, end) 内应发送的提醒（已有提醒记录的跳过）
+
+        Args:
+            start: 窗口开始时间
+            end: 窗口结束时间（不含）
+
+        Returns:
+            List[TixingRenwu]: 待发送的提醒
+        """
+        configs = self.db.execute(
+            select(
+                HeguishixiangTixing.id,
+                HeguishixiangTixing.heguishixiang_moban_id,
+                HeguishixiangTixing.kehu_id,
+                HeguishixiangTixing.tixing_leixing,
+                HeguishixiangTixing.tiqian_tianshu,
+                HeguishixiangTixing.tixing_shijian,
+                HeguishixiangTixing.tixing_fangshi,
+                HeguishixiangTixing.jieshou_ren_leixing,
+                HeguishixiangTixing.jieshou_ren_id,
+                HeguishixiangTixing.tixing_biaoti_moban,
+                HeguishixiangTixing.tixing_neirong_moban,
+                HeguishixiangTixing.chongfu_tixing,
+                HeguishixiangTixing.chongfu_jiangetianshu,
+                HeguishixiangTixing.zuida_chongfu_cishu,
+                HeguishixiangTixing.youxian_ji,
+            ).where(
+                HeguishixiangTixing.is_deleted == "N",
+                HeguishixiangTixing.tixing_zhuangtai == "active",
+                HeguishixiangTixing.tixing_leixing.in_(SCHEDULED_TYPES)
+            )
+        ).all()
+        if not configs:
+            return []
+
+        sent = self._load_sent(start, end)
+        result = []
+        for config in configs:
+            try:
+                at = parse_tixing_shijian(config.tixing_shijian)
+            except ValueError:
+                logger.warning(f"提醒配置 {config.id} 的提醒时间无效: {config.tixing_shijian}")
+                continue
+
+            interval = config.chongfu_jiangetianshu or 0
+            repeat_count = 0
+            if config.chongfu_tixing and interval > 0:
+                repeat_count = config.zuida_chongfu_cishu or MAX_CHONGFU_CISHU
+            tiqian = config.tiqian_tianshu or 0
+
+            for shili in self._load_shili(config, tiqian, interval * repeat_count, start, end):
+                jieshou_ren_id = config.jieshou_ren_id or shili.fuzeren_id
+                if not jieshou_ren_id:
+                    continue
+                values = {
+                    "shili_mingcheng": shili.shili_mingcheng,
+                    "shenbao_qijian": shili.shenbao_qijian or "",
+                    "kehu_mingcheng": shili.gongsi_mingcheng or "",
+                    "jiezhi_riqi": shili.jihua_jieshu_shijian.strftime("%Y-%m-%d"),
+                }
+                for fire in fire_times(config.tixing_leixing, shili.jihua_jieshu_shijian, at, tiqian,
+                                       interval, repeat_count, start, end):
+                    if (config.id, shili.id, fire) in sent:
+                        continue
+                    values["shengyu_tianshu"] = str((shili.jihua_jieshu_shijian.date() - fire.date()).days)
+                    result.append(TixingRenwu(
+                        tixing_id=config.id,
+                        shili_id=shili.id,
+                        jieshou_ren_id=jieshou_ren_id,
+                        tixing_leixing=config.tixing_leixing,
+                        jieshou_ren_leixing=config.jieshou_ren_leixing,
+                        fasong_fangshi=config.tixing_fangshi or "system",
+                        youxian_ji=config.youxian_ji or "normal",
+                        biaoti=render_tixing_text(config.tixing_biaoti_moban, values),
+                        neirong=render_tixing_text(config.tixing_neirong_moban, values),
+                        jihua_fasong_shijian=fire,
+                    ))
+        return result
+
+    def _load_shili(self, config, tiqian: int, repeat_days: int, start: datetime, end: datetime) -> list:
+        """截止日期能使提醒时间落在 [start, end) 内的未结束实例"""
+        if config.tixing_leixing == DEADLINE_REMINDER:
+            earliest, latest = start.date() + timedelta(days=tiqian - repeat_days), end.date() + timedelta(days=tiqian)
+        else:
+            earliest, latest = start.date() - timedelta(days=tiqian + repeat_days), end.date() - timedelta(days=tiqian)
+
+        stmt = select(
+            HeguishixiangShili.id,
+            HeguishixiangShili.shili_mingcheng,
+            HeguishixiangShili.shenbao_qijian,
+            HeguishixiangShili.jihua_jieshu_shijian,
+            HeguishixiangShili.fuzeren_id,
+            Kehu.gongsi_mingcheng,
+        ).join(
+            Kehu,
+            HeguishixiangShili.kehu_id == Kehu.id
+        ).where(
+            HeguishixiangShili.jihua_jieshu_shijian >= datetime.combine(earliest, time.min),
+            HeguishixiangShili.jihua_jieshu_shijian < datetime.combine(latest + timedelta(days=1), time.min),
+            HeguishixiangShili.shili_zhuangtai.notin_(FINISHED_STATUSES),
+            HeguishixiangShili.is_deleted == "N"
+        )
+        if config.heguishixiang_moban_id:
+            stmt = stmt.where(HeguishixiangShili.heguishixiang_moban_id == config.heguishixiang_moban_id)
+        if config.kehu_id:
+            stmt = stmt.where(HeguishixiangShili.kehu_id == config.kehu_id)
+        return self.db.execute(stmt).all()
+
+    def _load_sent(self, start: datetime, end: datetime) -> Set[Tuple[str, str, datetime]]:
+        """窗口内已生成提醒记录的 (配置, 实例, 计划发送时间)"""
+        rows = self.db.execute(
+            select(
+                TixingJilu.heguishixiang_tixing_id,
+                TixingJilu.heguishixiang_shili_id,
+                TixingJilu.jihua_fasong_shijian
+            ).where(
+                TixingJilu.jihua_fasong_shijian >= start,
+                TixingJilu.jihua_fasong_shijian < end,
+                TixingJilu.is_deleted == "N"
+            )
+        )
+        return {tuple(row) for row in rows}
+
+    def dispatch(self, renwu_list: Sequence[TixingRenwu], now: Optional[datetime] = None) -> int:
+        """
+        发送一批提醒并提交
+
+        Args:
+            renwu_list: 待发送的提醒
+            now: 发送时间
+
+        Returns:
+            int: 实际发送数量（实例已结束的跳过）
+        """
+        if not renwu_list:
+            return 0
+        now = now or datetime.now()
+
+        # 加载到发送之间实例可能已完成
+        active_ids = set(self.db.scalars(
+            select(HeguishixiangShili.id).where(
+                HeguishixiangShili.id.in_({renwu.shili_id for renwu in renwu_list}),
+                HeguishixiangShili.shili_zhuangtai.notin_(FINISHED_STATUSES),
+                HeguishixiangShili.is_deleted == "N"
+            )
+        ))
+        by_recipient: Dict[str, List[TixingRenwu]] = {}
+        for renwu in renwu_list:
+            if renwu.shili_id in active_ids:
+                by_recipient.setdefault(renwu.jieshou_ren_id, []).append(renwu)
+        if not by_recipient:
+            return 0
+
+        sent = [renwu for group in by_recipient.values() for renwu in group]
+        codes = reserve_daily_codes(self.db, TixingJilu.tixing_bianhao, "TX", len(sent), width=6)
+        jilu_rows = []
+        shili_counts: Dict[str, int] = {}
+        tixing_counts: Dict[str, List[int]] = {}
+        for renwu, code in zip(sent, codes):
+            in_app = "system" in renwu.fasong_fangshi.split(",")
+            jilu_rows.append({
+                "heguishixiang_shili_id": renwu.shili_id,
+                "heguishixiang_tixing_id": renwu.tixing_id,
+                "tixing_bianhao": code,
+                "tixing_leixing": renwu.tixing_leixing,
+                "jieshou_ren_id": renwu.jieshou_ren_id,
+                "jieshou_ren_leixing": renwu.jieshou_ren_leixing,
+                "tixing_biaoti": renwu.biaoti,
+                "tixing_neirong": renwu.neirong,
+                "fasong_fangshi": renwu.fasong_fangshi,
+                "jihua_fasong_shijian": renwu.jihua_fasong_shijian,
+                # 站内消息在此直接送达，其他渠道留给对应渠道发送
+                "shiji_fasong_shijian": now if in_app else None,
+                "fasong_zhuangtai": "sent" if in_app else "pending",
+                "youxian_ji": renwu.youxian_ji,
+            })
+            shili_counts[renwu.shili_id] = shili_counts.get(renwu.shili_id, 0) + 1
+            counts = tixing_counts.setdefault(renwu.tixing_id, [0, 0])
+            counts[0] += 1
+            counts[1] += in_app
+
+        self.db.execute(insert(TixingJilu), jilu_rows)
+        notifications = [
+            self._build_notification(jieshou_ren_id, group, now)
+            for jieshou_ren_id, group in by_recipient.items()
+            if any("system" in renwu.fasong_fangshi.split(",") for renwu in group)
+        ]
+        if notifications:
+            self.db.execute(insert(ZhifuTongzhi), notifications)
+
+        connection = self.db.connection()
+        shili = HeguishixiangShili.__table__
+        connection.execute(
+            update(shili).where(shili.c.id == bindparam("b_id")).values(
+                tixing_cishu=shili.c.tixing_cishu + bindparam("b_count"),
+                zuijin_tixing_shijian=bindparam("b_time")
+            ),
+            [{"b_id": shili_id, "b_count": count, "b_time": now} for shili_id, count in shili_counts.items()]
+        )
+        tixing = HeguishixiangTixing.__table__
+        connection.execute(
+            update(tixing).where(tixing.c.id == bindparam("b_id")).values(
+                fasong_cishu=tixing.c.fasong_cishu + bindparam("b_count"),
+                chenggong_cishu=tixing.c.chenggong_cishu + bindparam("b_success"),
+                zuijin_fasong_shijian=bindparam("b_time")
+            ),
+            [
+                {"b_id": tixing_id, "b_count": count, "b_success": success, "b_time": now}
+                for tixing_id, (count, success) in tixing_counts.items()
+            ]
+        )
+        self.db.commit()
+        return len(sent)
+
+    @staticmethod
+    def _build_notification(jieshou_ren_id: str, group: List[TixingRenwu], now: datetime) -> dict:
+        """同一接收人本批提醒合并为一条站内通知"""
+        if len(group) == 1:
+            biaoti, neirong = group[0].biaoti, group[0].neirong
+        else:
+            biaoti = f"您有 {len(group)} 项合规事项提醒"
+            neirong = "\n".join(f"{index}. {renwu.biaoti}" for index, renwu in enumerate(group, 1))
+        return {
+            "jieshou_ren_id": jieshou_ren_id,
+            "tongzhi_leixing": "compliance_reminder",
+            "tongzhi_biaoti": biaoti,
+            "tongzhi_neirong": neirong,
+            "tongzhi_zhuangtai": "unread",
+            "youxian_ji": max((renwu.youxian_ji for renwu in group), key=lambda value: PRIORITY_ORDER.get(value, 1)),
+            "fasong_shijian": now,
+            "fasong_qudao": "system",
+            "kuozhan_shuju": json.dumps({"shili_ids": sorted({renwu.shili_id for renwu in group})}),
+        }
@@ -0,0 +1,176 @@
+"""
+合规事项截止时间规则
+
+模板的 jiezhi_shijian_guize（客户配置的 teshu_jiezhi_shijian 可整体覆盖）为 JSON 对象，周期取模板的 shenbao_zhouqi：
+- monthly / quarterly / annually：截止日期为申报期间结束后第 month_offset 个月的第 day 日（默认次月 15 日），
+  day 超过当月天数时取月末；年度事项也可用 month 指定次年的截止月份，如 {"month": 5, "day": 31}
+- custom：dates 列出每年的截止日期（MM-DD），每个日期为一个申报期间
+- roll_forward：截止日期遇节假日、周末是否顺延到下一个工作日，默认顺延
+
+例如：{"type": "monthly", "day": 15, "description": "每月15日前申报"}
+
+同一规则只编译一次，编译结果按截止日期区间展开为申报期间，供所有使用该规则的客户共用。
+"""
+import json
+from calendar import monthrange
+from datetime import date, timedelta
+from functools import lru_cache
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from models.xitong_guanli.jiejiari import Jiejiari
+
+# 申报周期 -> 每个申报期间的月数
+PERIOD_MONTHS = {
+    "monthly": 1,
+    "quarterly": 3,
+    "annually": 12,
+}
+ZHOUQI_CUSTOM = "custom"
+
+class ShenbaoQijian(NamedTuple):
+    """申报期间"""
+    mingcheng: str               # 如 2024年1月、2024年第1季度、2024年度
+    kaishi: Optional[date]       # 可开始办理的日期（申报期间结束后次日）
+    jiezhi: date                 # 名义截止日期（未顺延）
+
+def _month_date(month_index: int, day: int) -> date:
+    """month_index = 年 * 12 + 月 - 1，day 超过当月天数时取月末"""
+    year, month = divmod(month_index, 12)
+    month += 1
+    return date(year, month, min(day, monthrange(year, month)[1]))
+
+class DeadlineRule:
+    """编译后的截止时间规则"""
+
+    __slots__ = ("zhouqi", "day", "month_offset", "dates", "roll_forward")
+
+    def __init__(self, zhouqi: str, day: int = 15, month_offset: int = 1,
+                 dates: Tuple[Tuple[int, int], ...] = (), roll_forward: bool = True):
+        self.zhouqi = zhouqi
+        self.day = day
+        self.month_offset = month_offset
+        self.dates = dates
+        self.roll_forward = roll_forward
+
+    def periods(self, start: date, end: date) -> List[ShenbaoQijian]:
+        """名义截止日期在 [start, end) 内的申报期间"""
+        if self.zhouqi == ZHOUQI_CUSTOM:
+            return [
+                ShenbaoQijian(f"{deadline.year}年{deadline.month}月{deadline.day}日", None, deadline)
+                for year in range(start.year, end.year + 1)
+                for month, day in self.dates
+                for deadline in (_month_date(year * 12 + month - 1, day),)
+                if start <= deadline < end
+            ]
+
+        step = PERIOD_MONTHS[self.zhouqi]
+        first = start.year * 12 + start.month - 1 - self.month_offset
+        last = end.year * 12 + end.month - 1 - self.month_offset
+        result = []
+        # end_index 为申报期间最后一个月
+        for end_index in range(first, last + 1):
+            year, month = divmod(end_index, 12)
+            month += 1
+            if month % step:
+                continue
+            deadline = _month_date(end_index + self.month_offset, self.day)
+            if not start <= deadline < end:
+                continue
+            if step == 1:
+                mingcheng = f"{year}年{month}月"
+            elif step == 3:
+                mingcheng = f"{year}年第{month // 3}季度"
+            else:
+                mingcheng = f"{year}年度"
+            result.append(ShenbaoQijian(mingcheng, _month_date(end_index + 1, 1), deadline))
+        return result
+
+def _parse_dates(values: Iterable[str]) -> Tuple[Tuple[int, int], ...]:
+    dates = []
+    for value in values:
+        month, day = (int(part) for part in str(value).split("-"))
+        # 校验日期合法（按闰年校验，2 月 29 日在平年取月末）
+        date(2000, month, day)
+        dates.append((month, day))
+    return tuple(sorted(set(dates)))
+
+@lru_cache(maxsize=1024)
+def compile_deadline_rule(shenbao_zhouqi: str, guize: Optional[str]) -> DeadlineRule:
+    """
+    编译截止时间规则（按规则文本缓存）
+
+    Args:
+        shenbao_zhouqi: 申报周期
+        guize: 规则 JSON
+
+    Returns:
+        DeadlineRule: 编译后的规则
+
+    Raises:
+        ValueError: 规则无效
+    """
+    try:
+        data = json.loads(guize) if guize else {}
+    except ValueError as e:
+        raise ValueError(f"截止时间规则不是有效的JSON: {e}")
+    if not isinstance(data, dict):
+        raise ValueError("截止时间规则必须是JSON对象")
+
+    roll_forward = bool(data.get("roll_forward", True))
+    try:
+        if shenbao_zhouqi == ZHOUQI_CUSTOM:
+            dates = _parse_dates(data.get("dates") or [])
+            if not dates:
+                raise ValueError("自定义周期需配置截止日期 dates")
+            return DeadlineRule(shenbao_zhouqi, dates=dates, roll_forward=roll_forward)
+
+        if shenbao_zhouqi not in PERIOD_MONTHS:
+            raise ValueError(f"不支持的申报周期: {shenbao_zhouqi}")
+
+        day = int(data.get("day", 15))
+        if shenbao_zhouqi == "annually" and "month" in data:
+            month_offset = int(data["month"])
+        else:
+            month_offset = int(data.get("month_offset", 1))
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"截止时间规则无效: {e}")
+
+    if not 1 <= day <= 31:
+        raise ValueError(f"截止日 day 应在 1-31 之间: {day}")
+    if month_offset < 0:
+        raise ValueError(f"month_offset 不能为负数: {month_offset}")
+    return DeadlineRule(shenbao_zhouqi, day=day, month_offset=month_offset, roll_forward=roll_forward)
+
+class WorkdayCalendar:
+    """工作日日历（节假日日历表 + 周末）"""
+
+    def __init__(self, holidays: Dict[date, bool]):
+        # 日期 -> 是否工作日（只包含节假日日历表中登记的日期）
+        self._holidays = holidays
+        self._rolled: Dict[date, date] = {}
+
+    @classmethod
+    def load(cls, db: Session, start: date, end: date) -> "WorkdayCalendar":
+        """加载 [start, end] 内登记的节假日与调休工作日"""
+        rows = db.query(Jiejiari.riqi, Jiejiari.shifou_gongzuori).filter(
+            Jiejiari.riqi >= start,
+            Jiejiari.riqi <= end
+        ).all()
+        return cls({riqi: bool(shifou_gongzuori) for riqi, shifou_gongzuori in rows})
+
+    def is_workday(self, day: date) -> bool:
+        if day in self._holidays:
+            return self._holidays[day]
+        return day.weekday() < 5
+
+    def roll_forward(self, day: date) -> date:
+        """顺延到当天或之后的第一个工作日"""
+        rolled = self._rolled.get(day)
+        if rolled is None:
+            rolled = day
+            while not self.is_workday(rolled):
+                rolled += timedelta(days=1)
+            self._rolled[day] = rolled
+        return rolled
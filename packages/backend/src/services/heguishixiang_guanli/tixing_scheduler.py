@@ -0,0 +1,196 @@
+"""
+合规事项提醒调度器
+
+应用启动后作为后台任务运行（HEGUISHIXIANG_TIXING_ENABLED 开启时），多个 worker 中只有持有 Redis 锁的一个调度：
+- 每个刻度续期锁，刻度在线程中执行期间定期续期；锁丢失后清空本进程的待发送提醒，由新的持有者重新加载
+- 提醒按时间窗口分批加载到分层时间轮（core/timing_wheel），窗口过半时加载下一个窗口；
+  首次加载从当天零点开始，补发调度器未运行期间错过的提醒（已有提醒记录的不重复发送）
+- 每个刻度取出到期的提醒，最多 HEGUISHIXIANG_TIXING_BATCH_SIZE 条为一批发送，其余留到下一刻度
+- 合规事项实例或提醒配置的写入提交后递增变更版本号（Redis，同时记录在本进程），
+  调度者发现版本变化时清空已加载的提醒，从当天零点重新加载当前窗口（新建实例、截止时间调整、提醒配置修改）
+
+每个刻度的开销只与到期的提醒数量有关；数据库查询每个窗口一次，与提醒配置、实例总数无关。
+Redis 不可用时无法保证只有一个调度者，调度器不运行。
+"""
+import asyncio
+import logging
+import threading
+import uuid
+from datetime import datetime, time, timedelta
+from typing import Any, Callable, List, Optional, Set
+
+from sqlalchemy.orm import Session
+
+from core.commit_hooks import invalidate_on_commit
+from core.config import settings
+from core.database import SessionLocal
+from core.redis_client import redis_client
+from core.timing_wheel import TimingWheel
+from models.heguishixiang_guanli import HeguishixiangShili, HeguishixiangTixing
+from services.heguishixiang_guanli.heguishixiang_tixing_service import HeguishixiangTixingService, TixingRenwu
+
+logger = logging.getLogger(__name__)
+
+# 调度锁
+TIXING_LOCK_KEY = "heguishixiang:tixing:scheduler"
+# 实例/提醒配置变更版本号
+TIXING_VERSION_KEY = "heguishixiang:tixing:version"
+
+# 本进程提交的变更次数（Redis 递增失败时同进程的调度者仍能发现变更）
+_local_changes = 0
+_local_changes_lock = threading.Lock()
+_pending_bumps: Set[asyncio.Task] = set()
+
+def _on_tixing_changed(session: Optional[Session] = None) -> None:
+    """实例或提醒配置变更提交后递增版本号"""
+    global _local_changes
+    with _local_changes_lock:
+        _local_changes += 1
+    if not redis_client.is_connected:
+        return
+
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        loop = None
+    if loop is not None:
+        task = loop.create_task(redis_client.incr(TIXING_VERSION_KEY))
+        _pending_bumps.add(task)
+        task.add_done_callback(_pending_bumps.discard)
+        return
+
+    # 同步接口运行在线程池中，借助 anyio 回到事件循环执行
+    try:
+        import anyio.from_thread
+        anyio.from_thread.run(redis_client.incr, TIXING_VERSION_KEY)
+    except Exception as e:
+        logger.warning("合规事项提醒变更版本号递增失败: %s", e)
+
+# 实例、提醒配置的 ORM 写入提交后通知调度者；批量生成等 Core 写入调用 mark_tixing_changed(db) 标记
+mark_tixing_changed = invalidate_on_commit((HeguishixiangShili, HeguishixiangTixing), _on_tixing_changed)
+
+class TixingScheduler:
+    """合规事项提醒调度器"""
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session] = SessionLocal,
+        tick_seconds: float = settings.HEGUISHIXIANG_TIXING_TICK_SECONDS,
+        window_seconds: int = settings.HEGUISHIXIANG_TIXING_WINDOW_SECONDS,
+        batch_size: int = settings.HEGUISHIXIANG_TIXING_BATCH_SIZE
+    ):
+        self.session_factory = session_factory
+        self.tick_seconds = tick_seconds
+        self.window = timedelta(seconds=window_seconds)
+        self.batch_size = batch_size
+        self.token = uuid.uuid4().hex
+        self.wheel: Optional[TimingWheel] = None
+        self._loaded_until: Optional[datetime] = None
+        self._backlog: List[TixingRenwu] = []
+        self._version: Any = None
+        self._running: Optional[asyncio.Future] = None
+
+    def reset(self) -> None:
+        """清空已加载的提醒（失去调度锁时调用）"""
+        self.wheel = None
+        self._backlog = []
+        self._loaded_until = None
+
+    def check_changes(self, remote_version: Any = None) -> bool:
+        """
+        加载后实例或提醒配置有变更时清空已加载的提醒，下一刻度重新加载
+
+        Args:
+            remote_version: Redis 中的变更版本号
+
+        Returns:
+            bool: 是否清空了已加载的提醒
+        """
+        version = (remote_version, _local_changes)
+        changed = version != self._version and self._loaded_until is not None
+        self._version = version
+        if changed:
+            logger.debug("合规事项实例或提醒配置已变更，重新加载提醒")
+            self.reset()
+        return changed
+
+    def tick(self, now: Optional[datetime] = None) -> int:
+        """
+        推进一个刻度：按需加载下一个窗口，发送到期的提醒
+
+        Returns:
+            int: 本刻度发送的提醒数量
+        """
+        now = now or datetime.now()
+        if self._loaded_until is None:
+            # 第 0 层 60 个刻度，三层覆盖 60^3 个刻度，远大于加载窗口
+            self.wheel = TimingWheel(tick=self.tick_seconds, slots=60, levels=3, start=now.timestamp())
+            self._load(datetime.combine(now.date(), time.min), now + self.window)
+        elif now + self.window / 2 >= self._loaded_until:
+            self._load(self._loaded_until, now + self.window)
+
+        self._backlog.extend(self.wheel.advance(now.timestamp()))
+        if not self._backlog:
+            return 0
+        batch, self._backlog = self._backlog[:self.batch_size], self._backlog[self.batch_size:]
+
+        db = self.session_factory()
+        try:
+            return HeguishixiangTixingService(db).dispatch(batch, now)
+        except Exception:
+            db.rollback()
+            # 发送失败的提醒放回队列，下一刻度重试
+            self._backlog[:0] = batch
+            raise
+        finally:
+            db.close()
+
+    def _load(self, start: datetime, end: datetime) -> None:
+        db = self.session_factory()
+        try:
+            renwu_list = HeguishixiangTixingService(db).load_due(start, end)
+        finally:
+            db.close()
+        for renwu in renwu_list:
+            self.wheel.add(renwu.jihua_fasong_shijian.timestamp(), renwu)
+        self._loaded_until = end
+        logger.debug(f"合规事项提醒已加载: {start} ~ {end}, {len(renwu_list)} 条")
+
+    async def run(self) -> None:
+        """持有调度锁时按刻度调度，直到任务被取消"""
+        lock_ttl = max(int(self.tick_seconds * 10), 30)
+        try:
+            while True:
+                try:
+                    if await redis_client.acquire_lock(TIXING_LOCK_KEY, self.token, lock_ttl):
+                        self.check_changes(await redis_client.get(TIXING_VERSION_KEY))
+                        await self._tick_holding_lock(lock_ttl)
+                    elif self._loaded_until is not None:
+                        logger.info("合规事项提醒调度锁已由其他进程持有，停止本进程调度")
+                        self.reset()
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.exception("合规事项提醒调度失败: %s", e)
+                await asyncio.sleep(self.tick_seconds)
+        finally:
+            # 等待线程中的刻度结束后再释放锁，避免新的持有者与其同时发送
+            if self._running is not None:
+                await asyncio.wait({self._running})
+            await redis_client.release_lock(TIXING_LOCK_KEY, self.token)
+
+    async def _tick_holding_lock(self, lock_ttl: int) -> None:
+        """在线程中执行一个刻度（数据库操作为同步调用），执行期间定期续期调度锁"""
+        self._running = asyncio.ensure_future(asyncio.to_thread(self.tick))
+        while True:
+            done, _ = await asyncio.wait({self._running}, timeout=lock_ttl / 3)
+            if done:
+                break
+            if not await redis_client.acquire_lock(TIXING_LOCK_KEY, self.token, lock_ttl):
+                logger.warning("合规事项提醒调度锁续期失败，当前批次发送完成后停止调度")
+        running, self._running = self._running, None
+        running.result()
+
+async def run_tixing_scheduler() -> None:
+    """提醒调度后台任务（应用启动时创建）"""
+    await TixingScheduler().run()
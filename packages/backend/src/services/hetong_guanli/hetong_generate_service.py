@@ -1,9 +1,11 @@
 """
 合同生成服务
 """
-from typing import List, Dict, Any, Optional
-from sqlalchemy.orm import Session
-from sqlalchemy import and_
+import logging
+import uuid
+from typing import List, Dict, Any, Iterator, Optional
+from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import and_, insert
 from fastapi import HTTPException
 from datetime import datetime, timedelta
 
@@ -11,7 +13,21 @@ from models.hetong_guanli.hetong import Hetong
 from models.hetong_guanli.hetong_moban import HetongMoban
 from models.xiansuo_guanli.xiansuo_baojia import XiansuoBaojia
 from models.kehu_guanli.kehu import Kehu
+from models.hetong_guanli.hetong_yifang_zhuti import HetongYifangZhuti
 from schemas.hetong_guanli.hetong_schemas import HetongResponse
+from services.hetong_guanli.hetong_template_renderer import render_preview, render_template_content
+from core.sequence import next_daily_code, reserve_daily_codes
+
+logger = logging.getLogger(__name__)
+
+# 批量生成时合同名称后缀
+CONTRACT_NAME_SUFFIX = {
+    "daili_jizhang": "代理记账服务合同",
+    "zengzhi_fuwu": "增值服务合同",
+}
+
+# 批量生成时每渲染多少份合同报告一次进度
+BULK_PROGRESS_STEP = 20
 
 class HetongGenerateService:
     """合同生成服务类"""
@@ -183,8 +199,14 @@ class HetongGenerateService:
             logger.info(f"找到客户: {customer.gongsi_mingcheng}")
 
             # 渲染模板
-            logger.info(f"开始渲染模板，变量: {variables}")
-            content = self.render_template(template.moban_neirong, customer, variables)
+            if not template.moban_neirong:
+                raise ValueError("模板内容为空")
+            content = render_preview(
+                template.moban_neirong,
+                self._build_render_values(customer, variables),
+                moban_id=template.id,
+                updated_at=template.updated_at
+            )
             logger.info("模板渲染成功")
 
             return content
@@ -247,6 +269,158 @@ class HetongGenerateService:
             for template in templates
         ]
     
+    def generate_contracts_bulk(
+        self,
+        baojia_ids: List[str],
+        contract_type: str,
+        created_by: str,
+        yifang_zhuti_id: Optional[str] = None,
+        initial_status: str = "active"
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        基于多个报价批量生成合同（如年底批量续签），以事件流的形式返回进度
+
+        - 报价（含线索）、客户、模板、乙方主体各用一次查询预取
+        - 一次预留连续的合同编号段
+        - 合同内容逐个渲染，只使用预取的数据和编译缓存后的模板（纯 Python 计算，不使用线程池）
+        - 所有合同用一条批量 INSERT 写入，并在同一事务中提交
+
+        Args:
+            baojia_ids: 报价ID列表
+            contract_type: 合同类型（daili_jizhang、zengzhi_fuwu）
+            created_by: 创建人ID
+            yifang_zhuti_id: 乙方主体ID
+            initial_status: 合同初始状态
+
+        Yields:
+            Dict[str, Any]: 进度事件，event 为 prepared（校验完成）、progress（渲染进度）、
+            completed（写入完成）或 error（整批失败）
+        """
+        baojia_ids = list(dict.fromkeys(baojia_ids))
+        failed: List[Dict[str, str]] = []
+
+        template = self.db.query(HetongMoban).filter(
+            and_(
+                HetongMoban.hetong_leixing == contract_type,
+                HetongMoban.moban_zhuangtai == "active",
+                HetongMoban.is_deleted == "N"
+            )
+        ).first()
+        if not template or not template.moban_neirong:
+            yield {"event": "error", "message": f"未找到{contract_type}类型的合同模板"}
+            return
+
+        yifang_zhuti = None
+        if yifang_zhuti_id:
+            yifang_zhuti = self.db.query(HetongYifangZhuti).filter(
+                HetongYifangZhuti.id == yifang_zhuti_id,
+                HetongYifangZhuti.is_deleted == "N"
+            ).first()
+
+        # 预取报价（连同线索）与客户
+        quotes = {
+            quote.id: quote
+            for quote in self.db.query(XiansuoBaojia).options(
+                joinedload(XiansuoBaojia.xiansuo)
+            ).filter(
+                XiansuoBaojia.id.in_(baojia_ids),
+                XiansuoBaojia.is_deleted == "N"
+            )
+        }
+        kehu_ids = {quote.xiansuo.kehu_id for quote in quotes.values() if quote.xiansuo and quote.xiansuo.kehu_id}
+        customers = {
+            kehu.id: kehu
+            for kehu in self.db.query(Kehu).filter(Kehu.id.in_(kehu_ids))
+        } if kehu_ids else {}
+
+        now = datetime.now()
+        valid = []
+        for baojia_id in baojia_ids:
+            quote = quotes.get(baojia_id)
+            if not quote:
+                reason = "报价不存在"
+            elif quote.baojia_zhuangtai != "accepted":
+                reason = "只能基于已接受的报价生成合同"
+            elif quote.youxiao_qi and quote.youxiao_qi < now:
+                reason = "报价已过期，无法生成合同"
+            elif not quote.xiansuo or quote.xiansuo.kehu_id not in customers:
+                reason = "客户不存在"
+            else:
+                valid.append(quote)
+                continue
+            failed.append({"baojia_id": baojia_id, "reason": reason})
+
+        yield {"event": "prepared", "total": len(baojia_ids), "valid": len(valid), "failed": len(failed)}
+        if not valid:
+            yield {"event": "completed", "created": [], "failed": failed}
+            return
+
+        try:
+            bianhao_list = self._reserve_hetong_bianhao_block(len(valid))
+            mingcheng_suffix = CONTRACT_NAME_SUFFIX.get(contract_type, "服务合同")
+            daoqi_riqi = now + timedelta(days=365)
+
+            items = []
+            for quote, hetong_bianhao in zip(valid, bianhao_list):
+                hetong_jine = float(quote.zongji_jine or 0)
+                contract_data = {
+                    "kehu_id": quote.xiansuo.kehu_id,
+                    "baojia_id": quote.id,
+                    "hetong_moban_id": template.id,
+                    "yifang_zhuti_id": yifang_zhuti.id if yifang_zhuti else None,
+                    "hetong_bianhao": hetong_bianhao,
+                    "hetong_mingcheng": f"{quote.xiansuo.gongsi_mingcheng}{mingcheng_suffix}",
+                    "hetong_jine": hetong_jine,
+                    "hetong_leixing": contract_type
+                }
+                items.append((contract_data, customers[quote.xiansuo.kehu_id]))
+
+            rows = []
+            for index, (contract_data, customer) in enumerate(items, 1):
+                try:
+                    variables = self._build_contract_variables(customer, contract_data, yifang_zhuti)
+                    content = self.render_template(template.moban_neirong, customer, variables, template)
+                except Exception as e:
+                    failed.append({"baojia_id": contract_data["baojia_id"], "reason": f"渲染合同失败: {str(e)}"})
+                else:
+                    rows.append({
+                        "id": str(uuid.uuid4()),
+                        "kehu_id": contract_data["kehu_id"],
+                        "hetong_moban_id": contract_data["hetong_moban_id"],
+                        "baojia_id": contract_data["baojia_id"],
+                        "yifang_zhuti_id": contract_data["yifang_zhuti_id"],
+                        "hetong_bianhao": contract_data["hetong_bianhao"],
+                        "hetong_mingcheng": contract_data["hetong_mingcheng"],
+                        "hetong_neirong": content,
+                        "hetong_zhuangtai": initial_status,
+                        "daoqi_riqi": daoqi_riqi,
+                        "hetong_laiyuan": "auto_from_quote",
+                        "zidong_shengcheng": "Y",
+                        "payment_amount": str(contract_data["hetong_jine"]) if contract_data["hetong_jine"] else None,
+                        "created_by": created_by
+                    })
+                if index % BULK_PROGRESS_STEP == 0 or index == len(items):
+                    yield {"event": "progress", "rendered": index, "total": len(items)}
+
+            if rows:
+                self.db.execute(insert(Hetong), rows)
+            self.db.commit()
+
+        except Exception as e:
+            self.db.rollback()
+            logger.error(f"批量生成合同失败: {str(e)}", exc_info=True)
+            yield {"event": "error", "message": f"批量生成合同失败: {str(e)}"}
+            return
+
+        yield {
+            "event": "completed",
+            "created": [
+                {"baojia_id": row["baojia_id"], "hetong_id": row["id"], "hetong_bianhao": row["hetong_bianhao"]}
+                for row in rows
+            ],
+            "failed": failed
+        }
+
     def _generate_hetong_bianhao(self) -> str:
         """
         生成合同编号
@@ -254,18 +428,19 @@ class HetongGenerateService:
         Returns:
             str: 合同编号
         """
-        # 获取当前日期
-        today = datetime.now()
-        date_str = today.strftime("%Y%m%d")
-        
-        # 查询当天已有的合同数量
-        count = self.db.query(Hetong).filter(
-            Hetong.hetong_bianhao.like(f"HT{date_str}%")
-        ).count()
-        
-        # 生成编号：HT + 日期 + 4位序号
-        sequence = str(count + 1).zfill(4)
-        return f"HT{date_str}{sequence}"
+        return next_daily_code(self.db, Hetong.hetong_bianhao, "HT")
+
+    def _reserve_hetong_bianhao_block(self, count: int) -> List[str]:
+        """
+        预留序号连续的合同编号：HT + 日期 + 4位序号
+
+        Args:
+            count: 编号数量
+
+        Returns:
+            List[str]: 连续的合同编号
+        """
+        return reserve_daily_codes(self.db, Hetong.hetong_bianhao, "HT", count)
     
     def _generate_contract_content(
         self,
@@ -287,12 +462,33 @@ class HetongGenerateService:
         # 获取乙方主题信息
         yifang_zhuti = None
         if contract_data.get("yifang_zhuti_id"):
-            from models.hetong_guanli.hetong_yifang_zhuti import HetongYifangZhuti
             yifang_zhuti = self.db.query(HetongYifangZhuti).filter(
                 HetongYifangZhuti.id == contract_data.get("yifang_zhuti_id"),
                 HetongYifangZhuti.is_deleted == "N"
             ).first()
 
+        variables = self._build_contract_variables(customer, contract_data, yifang_zhuti)
+
+        # 渲染模板
+        return self.render_template(template.moban_neirong, customer, variables, template)
+
+    def _build_contract_variables(
+        self,
+        customer: Kehu,
+        contract_data: Dict[str, Any],
+        yifang_zhuti: Optional[HetongYifangZhuti]
+    ) -> Dict[str, Any]:
+        """
+        准备合同模板变量（不访问数据库，可在线程池中调用）
+
+        Args:
+            customer: 客户信息
+            contract_data: 合同数据
+            yifang_zhuti: 乙方主体
+
+        Returns:
+            Dict[str, Any]: 模板变量
+        """
         # 计算服务日期
         fuwu_kaishi_riqi = datetime.now()
         fuwu_jieshu_riqi = fuwu_kaishi_riqi + timedelta(days=365)
@@ -348,8 +544,7 @@ class HetongGenerateService:
             "zhifu_fangshi": "银行转账",  # 默认支付方式
         }
 
-        # 渲染模板
-        return self.render_template(template.moban_neirong, customer, variables)
+        return variables
     
     @staticmethod
     def _number_to_chinese(num: float) -> str:
@@ -426,7 +621,13 @@ class HetongGenerateService:
 
         return result
 
-    def render_template(self, template_content: str, customer: Kehu, variables: Dict[str, Any]) -> str:
+    def render_template(
+        self,
+        template_content: str,
+        customer: Kehu,
+        variables: Dict[str, Any],
+        template: Optional[HetongMoban] = None
+    ) -> str:
         """
         渲染模板内容
 
@@ -434,6 +635,7 @@ class HetongGenerateService:
             template_content: 模板内容
             customer: 客户信息
             variables: 模板变量
+            template: 模板对象，提供时按 (模板ID, 更新时间) 缓存编译结果
 
         Returns:
             str: 渲染后的内容
@@ -445,118 +647,96 @@ class HetongGenerateService:
             if not template_content:
                 raise ValueError("模板内容为空")
 
-            content = template_content
-
-            # 🔧 修复：自动填充常用的合同变量
-            logger.info("自动填充常用合同变量")
-
-            # 获取合同金额（从用户变量中获取，如果没有则为0）
-            hetong_jine = float(variables.get("hetong_jine", 0))
-
-            # 计算服务日期（默认1年）
-            today = datetime.now()
-            fuwu_kaishi = today
-            fuwu_jieshu = today + timedelta(days=365)
+            return render_template_content(
+                template_content,
+                self._build_render_values(customer, variables),
+                moban_id=template.id if template else None,
+                updated_at=template.updated_at if template else None
+            )
 
-            # 自动填充的变量
-            auto_vars = {
-                # 合同编号（预览时使用临时编号）
-                "hetong_bianhao": variables.get("hetong_bianhao", "预览-待生成"),
+        except Exception as e:
+            logger.error(f"渲染模板时发生错误: {str(e)}", exc_info=True)
+            raise
 
-                # 甲方信息（客户）
-                "jiafang_mingcheng": customer.gongsi_mingcheng or "",
-                "jiafang_qianming": "",  # 预览时为空
-                "jiafang_qianyue_riqi": "",  # 预览时为空
+    def _build_render_values(self, customer: Kehu, variables: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        合并模板变量：用户变量 > 自动填充的合同变量 > 客户变量
 
-                # 乙方信息（需要从乙方主体表查询，预览时使用默认值）
-                "yifang_mingcheng": variables.get("yifang_mingcheng", "上海XX财务咨询有限公司"),
-                "yifang_qianming": "",  # 预览时为空
-                "yifang_qianyue_riqi": "",  # 预览时为空
+        Args:
+            customer: 客户信息
+            variables: 用户提供的模板变量
 
-                # 服务日期
-                "fuwu_kaishi_riqi": fuwu_kaishi.strftime("%Y年%m月%d日"),
-                "fuwu_jieshu_riqi": fuwu_jieshu.strftime("%Y年%m月%d日"),
+        Returns:
+            Dict[str, Any]: 变量名到变量值的映射
+        """
+        # 获取合同金额（从用户变量中获取，如果没有则为0）
+        hetong_jine = float(variables.get("hetong_jine", 0))
 
-                # 服务套餐
-                "fuwu_taocan": variables.get("fuwu_taocan", "标准财税服务套餐"),
+        # 计算服务日期（默认1年）
+        today = datetime.now()
+        fuwu_kaishi = today
+        fuwu_jieshu = today + timedelta(days=365)
 
-                # 合同金额
-                "hetong_zongjine": f"{hetong_jine:.2f}",
-                "hetong_zongjine_daxie": self._number_to_chinese(hetong_jine),
-                "hetong_jine": f"{hetong_jine:.2f}",  # 兼容性
+        # 自动填充的变量
+        auto_vars = {
+            # 合同编号（预览时使用临时编号）
+            "hetong_bianhao": variables.get("hetong_bianhao", "预览-待生成"),
 
-                # 首付金额（默认为合同总金额）
-                "shoufu_jine": f"{hetong_jine:.2f}",
+            # 甲方信息（客户）
+            "jiafang_mingcheng": customer.gongsi_mingcheng or "",
+            "jiafang_qianming": "",  # 预览时为空
+            "jiafang_qianyue_riqi": "",  # 预览时为空
 
-                # 收款信息（需要从乙方主体表查询，预览时使用默认值）
-                "shoukuan_zhanghu_ming": variables.get("shoukuan_zhanghu_ming", "上海XX财务咨询有限公司"),
-                "shoukuan_zhanghao": variables.get("shoukuan_zhanghao", "1234567890123456789"),
-                "shoukuan_kaihuhang": variables.get("shoukuan_kaihuhang", "中国XX银行上海XX支行"),
+            # 乙方信息（需要从乙方主体表查询，预览时使用默认值）
+            "yifang_mingcheng": variables.get("yifang_mingcheng", "上海XX财务咨询有限公司"),
+            "yifang_qianming": "",  # 预览时为空
+            "yifang_qianyue_riqi": "",  # 预览时为空
 
-                # 增值服务合同和税务咨询合同专用变量
-                "kaishi_riqi": variables.get("kaishi_riqi", fuwu_kaishi.strftime("%Y年%m月%d日")),
-                "jieshu_riqi": variables.get("jieshu_riqi", fuwu_jieshu.strftime("%Y年%m月%d日")),
-                "fuwu_feiyong": variables.get("fuwu_feiyong", f"{hetong_jine:.2f}"),
-                "zhifu_fangshi": variables.get("zhifu_fangshi", "银行转账"),
-            }
+            # 服务日期
+            "fuwu_kaishi_riqi": fuwu_kaishi.strftime("%Y年%m月%d日"),
+            "fuwu_jieshu_riqi": fuwu_jieshu.strftime("%Y年%m月%d日"),
 
-            # 合并自动变量和用户变量（用户变量优先）
-            all_vars = {**auto_vars, **variables}
-
-            # 替换所有变量（支持有空格和没有空格的格式）
-            logger.info(f"替换变量: {list(all_vars.keys())}")
-            for key, value in all_vars.items():
-                # 安全地转换值为字符串
-                str_value = str(value) if value is not None else ""
-
-                # 替换 {{key}} 格式（没有空格）
-                placeholder1 = f"{{{{{key}}}}}"
-                content = content.replace(placeholder1, str_value)
-
-                # 替换 {{ key }} 格式（有空格）
-                placeholder2 = f"{{{{ {key} }}}}"
-                content = content.replace(placeholder2, str_value)
-
-                logger.debug(f"替换变量 {key}: {placeholder1} 和 {placeholder2} -> {str_value}")
-
-            # 处理客户相关变量
-            logger.info(f"处理客户变量，客户: {customer.gongsi_mingcheng}")
-            customer_vars = {
-                "kehu_mingcheng": customer.gongsi_mingcheng or "",
-                "kehu_lianxiren": customer.faren_xingming or "",  # 使用法人姓名作为联系人
-                "kehu_dianhua": customer.lianxi_dianhua or "",
-                "kehu_youxiang": customer.lianxi_youxiang or "",
-                "kehu_dizhi": customer.lianxi_dizhi or "",  # 使用联系地址
-                "kehu_tongyi_shehui_xinyong_daima": customer.tongyi_shehui_xinyong_daima or "",
-                # 添加模板中使用的其他变量
-                "faren_daibiao": customer.faren_xingming or "",  # 法定代表人
-                "lianxi_dizhi": customer.lianxi_dizhi or "",  # 联系地址
-                "lianxi_dianhua": customer.lianxi_dianhua or "",  # 联系电话
-                "gongsi_mingcheng": customer.gongsi_mingcheng or "",  # 公司名称
-                "zhuce_dizhi": customer.zhuce_dizhi or "",  # 注册地址
-                "faren_xingming": customer.faren_xingming or "",  # 法人姓名
-                "faren_shenfenzheng": customer.faren_shenfenzheng or "",  # 法人身份证
-                "faren_lianxi": customer.faren_lianxi or "",  # 法人联系方式
-                "chengli_riqi": customer.chengli_riqi.strftime("%Y年%m月%d日") if customer.chengli_riqi else "",  # 成立日期
-            }
+            # 服务套餐
+            "fuwu_taocan": variables.get("fuwu_taocan", "标准财税服务套餐"),
 
-            for key, value in customer_vars.items():
-                # 安全地转换值为字符串
-                str_value = str(value) if value is not None else ""
+            # 合同金额
+            "hetong_zongjine": f"{hetong_jine:.2f}",
+            "hetong_zongjine_daxie": self._number_to_chinese(hetong_jine),
+            "hetong_jine": f"{hetong_jine:.2f}",  # 兼容性
 
-                # 替换 {{key}} 格式（没有空格）
-                placeholder1 = f"{{{{{key}}}}}"
-                content = content.replace(placeholder1, str_value)
+            # 首付金额（默认为合同总金额）
+            "shoufu_jine": f"{hetong_jine:.2f}",
 
-                # 替换 {{ key }} 格式（有空格）
-                placeholder2 = f"{{{{ {key} }}}}"
-                content = content.replace(placeholder2, str_value)
+            # 收款信息（需要从乙方主体表查询，预览时使用默认值）
+            "shoukuan_zhanghu_ming": variables.get("shoukuan_zhanghu_ming", "上海XX财务咨询有限公司"),
+            "shoukuan_zhanghao": variables.get("shoukuan_zhanghao", "1234567890123456789"),
+            "shoukuan_kaihuhang": variables.get("shoukuan_kaihuhang", "中国XX银行上海XX支行"),
 
-                logger.debug(f"替换客户变量 {key}: {placeholder1} 和 {placeholder2} -> {str_value}")
+            # 增值服务合同和税务咨询合同专用变量
+            "kaishi_riqi": variables.get("kaishi_riqi", fuwu_kaishi.strftime("%Y年%m月%d日")),
+            "jieshu_riqi": variables.get("jieshu_riqi", fuwu_jieshu.strftime("%Y年%m月%d日")),
+            "fuwu_feiyong": variables.get("fuwu_feiyong", f"{hetong_jine:.2f}"),
+            "zhifu_fangshi": variables.get("zhifu_fangshi", "银行转账"),
+        }
 
-            logger.info("模板变量替换完成")
-            return content
+        # 客户相关变量
+        customer_vars = {
+            "kehu_mingcheng": customer.gongsi_mingcheng or "",
+            "kehu_lianxiren": customer.faren_xingming or "",  # 使用法人姓名作为联系人
+            "kehu_dianhua": customer.lianxi_dianhua or "",
+            "kehu_youxiang": customer.lianxi_youxiang or "",
+            "kehu_dizhi": customer.lianxi_dizhi or "",  # 使用联系地址
+            "kehu_tongyi_shehui_xinyong_daima": customer.tongyi_shehui_xinyong_daima or "",
+            # 添加模板中使用的其他变量
+            "faren_daibiao": customer.faren_xingming or "",  # 法定代表人
+            "lianxi_dizhi": customer.lianxi_dizhi or "",  # 联系地址
+            "lianxi_dianhua": customer.lianxi_dianhua or "",  # 联系电话
+            "gongsi_mingcheng": customer.gongsi_mingcheng or "",  # 公司名称
+            "zhuce_dizhi": customer.zhuce_dizhi or "",  # 注册地址
+            "faren_xingming": customer.faren_xingming or "",  # 法人姓名
+            "faren_shenfenzheng": customer.faren_shenfenzheng or "",  # 法人身份证
+            "faren_lianxi": customer.faren_lianxi or "",  # 法人联系方式
+            "chengli_riqi": customer.chengli_riqi.strftime("%Y年%m月%d日") if customer.chengli_riqi else "",  # 成立日期
+        }
 
-        except Exception as e:
-            logger.error(f"渲染模板时发生错误: {str(e)}", exc_info=True)
-            raise
+        return {**customer_vars, **auto_vars, **variables}
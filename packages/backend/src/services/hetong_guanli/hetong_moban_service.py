@@ -2,7 +2,6 @@
 合同模板管理服务
 """
 import json
-import re
 from typing import Optional, List, Dict, Any
 from sqlalchemy.orm import Session
 from sqlalchemy import or_, desc
@@ -15,6 +14,7 @@ from schemas.hetong_guanli.hetong_moban_schemas import (
     HetongMobanResponse,
     HetongMobanListResponse
 )
+from services.hetong_guanli.hetong_template_renderer import render_preview
 
 class HetongMobanService:
     """合同模板管理服务类"""
@@ -184,18 +184,14 @@ class HetongMobanService:
         if not moban:
             raise HTTPException(status_code=404, detail="合同模板不存在")
         
-        # 替换模板中的变量
-        content = moban.moban_neirong
-        
-        # 使用正则表达式查找并替换变量占位符 {{变量名}}
-        def replace_variable(match):
-            var_name = match.group(1).strip()
-            return str(bianliang_zhis.get(var_name, f"{{{{ {var_name} }}}}"))
-        
-        # 替换变量
-        content = re.sub(r'\{\{\s*([^}]+)\s*\}\}', replace_variable, content)
-        
-        return content
+        # 替换模板中的变量占位符 {{变量名}}，未提供的变量保留为 {{ 变量名 }}
+        return render_preview(
+            moban.moban_neirong or "",
+            bianliang_zhis,
+            moban_id=moban.id,
+            updated_at=moban.updated_at,
+            missing="{{{{ {name} }}}}"
+        )
     
     def get_moban_bianliang(self, moban_id: str) -> Dict[str, Any]:
         """获取模板变量配置"""
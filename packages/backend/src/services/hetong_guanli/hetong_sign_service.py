@@ -343,48 +343,7 @@ class HetongSignService:
                 detail=f"未找到可用的{peizhi_leixing}支付配置，请联系管理员配置支付方式"
             )
 
-        logger.info(f"找到支付配置: {zhifu_peizhi.peizhi_mingcheng}, APPID原始值={zhifu_peizhi.zhifubao_appid if peizhi_leixing == 'zhifubao' else zhifu_peizhi.weixin_appid}")
-        logger.info(f"私钥原始值前50字符: {(zhifu_peizhi.zhifubao_shanghu_siyao if peizhi_leixing == 'zhifubao' else zhifu_peizhi.weixin_shanghu_siyao)[:50] if (zhifu_peizhi.zhifubao_shanghu_siyao if peizhi_leixing == 'zhifubao' else zhifu_peizhi.weixin_shanghu_siyao) else 'None'}")
-
-        # 解密支付配置中的敏感字段(如果已加密)
-        from core.security.encryption import encryption
-
-        def safe_decrypt(value: str) -> str:
-            """安全解密,如果解密失败则返回原值(可能是明文)"""
-            if not value:
-                return value
-            try:
-                return encryption.decrypt(value)
-            except Exception:
-                # 解密失败,可能是明文数据,直接返回
-                return value
-
-        # 解密支付宝配置
-        if peizhi_leixing == "zhifubao":
-            if zhifu_peizhi.zhifubao_appid:
-                zhifu_peizhi.zhifubao_appid = safe_decrypt(zhifu_peizhi.zhifubao_appid)
-                logger.info(f"解密后APPID: {zhifu_peizhi.zhifubao_appid}")
-            if zhifu_peizhi.zhifubao_shanghu_siyao:
-                zhifu_peizhi.zhifubao_shanghu_siyao = safe_decrypt(zhifu_peizhi.zhifubao_shanghu_siyao)
-                logger.info(f"解密后私钥长度: {len(zhifu_peizhi.zhifubao_shanghu_siyao) if zhifu_peizhi.zhifubao_shanghu_siyao else 0}")
-                logger.info(f"解密后私钥是否为None: {zhifu_peizhi.zhifubao_shanghu_siyao is None}")
-            if zhifu_peizhi.zhifubao_zhifubao_gongyao:
-                zhifu_peizhi.zhifubao_zhifubao_gongyao = safe_decrypt(zhifu_peizhi.zhifubao_zhifubao_gongyao)
-                logger.info(f"解密后公钥长度: {len(zhifu_peizhi.zhifubao_zhifubao_gongyao) if zhifu_peizhi.zhifubao_zhifubao_gongyao else 0}")
-
-        # 解密微信配置
-        elif peizhi_leixing == "weixin":
-            if zhifu_peizhi.weixin_appid:
-                zhifu_peizhi.weixin_appid = safe_decrypt(zhifu_peizhi.weixin_appid)
-            if zhifu_peizhi.weixin_shanghu_hao:
-                zhifu_peizhi.weixin_shanghu_hao = safe_decrypt(zhifu_peizhi.weixin_shanghu_hao)
-            if zhifu_peizhi.weixin_shanghu_siyao:
-                zhifu_peizhi.weixin_shanghu_siyao = safe_decrypt(zhifu_peizhi.weixin_shanghu_siyao)
-            if zhifu_peizhi.weixin_zhengshu_xuliehao:
-                zhifu_peizhi.weixin_zhengshu_xuliehao = safe_decrypt(zhifu_peizhi.weixin_zhengshu_xuliehao)
-            if zhifu_peizhi.weixin_api_v3_miyao:
-                zhifu_peizhi.weixin_api_v3_miyao = safe_decrypt(zhifu_peizhi.weixin_api_v3_miyao)
-
+        # 密钥由支付客户端注册表解密并保存在内存中，不修改配置对象（避免提交时写回明文）
         logger.info(f"支付配置准备完成: {zhifu_peizhi.peizhi_mingcheng}")
 
         # 创建支付订单，关联乙方主体和支付方式
@@ -420,7 +379,8 @@ class HetongSignService:
             payment_result = zhifu_api_service.create_payment(
                 dingdan_id=zhifu_dingdan.id,
                 zhifu_pingtai=peizhi_leixing,
-                zhifu_fangshi=zhifu_fangshi
+                zhifu_fangshi=zhifu_fangshi,
+                zhifu_peizhi_id=zhifu_peizhi.id
             )
 
             # 更新合同支付信息 - 存储支付订单ID而不是订单编号
@@ -0,0 +1,104 @@
+"""
+合同模板渲染器
+
+模板按 {{ 变量名 }} 占位符切分为片段列表（编译）后缓存，每次渲染只需逐个占位符查值并一次 join，
+不再对全文逐变量执行 str.replace：
+- 编译结果按 (模板ID, 更新时间) 缓存在进程内有界 LRU 中，模板修改后 updated_at 变化即自然失效；
+  没有模板ID时按内容哈希缓存
+- 预览结果按 (模板, 模板用到的变量值哈希) 缓存，同一模板相同变量的重复预览直接返回
+"""
+import hashlib
+import json
+import re
+from datetime import datetime
+from typing import Any, List, Mapping, Optional
+
+from core.config import settings
+from core.local_cache import LocalCache
+
+# 占位符 {{变量名}}，变量名两侧允许空白
+PLACEHOLDER_PATTERN = re.compile(r"\{\{\s*([^{}]+?)\s*\}\}")
+
+class CompiledTemplate:
+    """编译后的模板"""
+
+    __slots__ = ("segments", "placeholders", "variables")
+
+    def __init__(self, content: str):
+        # split 结果依次为：原文、变量名、原文、变量名……、原文
+        self.segments: List[str] = PLACEHOLDER_PATTERN.split(content)
+        # 占位符原文，变量未提供时原样保留
+        self.placeholders: List[str] = [match.group(0) for match in PLACEHOLDER_PATTERN.finditer(content)]
+        self.variables = frozenset(self.segments[1::2])
+
+    def render(self, values: Mapping[str, Any], missing: Optional[str] = None) -> str:
+        """
+        渲染模板
+
+        Args:
+            values: 变量值，None 渲染为空字符串
+            missing: 未提供变量的渲染格式（如 "{{{{ {name} }}}}"），默认保留原占位符
+
+        Returns:
+            str: 渲染后的内容
+        """
+        parts = self.segments.copy()
+        for index in range(1, len(parts), 2):
+            name = parts[index]
+            if name in values:
+                value = values[name]
+                parts[index] = "" if value is None else str(value)
+            elif missing is not None:
+                parts[index] = missing.format(name=name)
+            else:
+                parts[index] = self.placeholders[index // 2]
+        return "".join(parts)
+
+# 编译后的模板、渲染后的预览
+_compiled_templates = LocalCache(max_size=settings.HETONG_TEMPLATE_CACHE_SIZE)
+_rendered_previews = LocalCache(max_size=settings.HETONG_PREVIEW_CACHE_SIZE)
+
+def _template_key(content: str, moban_id: Optional[str], updated_at: Optional[datetime]) -> str:
+    if moban_id:
+        return f"{moban_id}:{updated_at.isoformat() if updated_at else ''}"
+    return "sha1:" + hashlib.sha1(content.encode("utf-8")).hexdigest()
+
+def _get_compiled(template_key: str, content: str) -> CompiledTemplate:
+    compiled = _compiled_templates.get(template_key)
+    if compiled is None:
+        compiled = CompiledTemplate(content)
+        _compiled_templates.set(template_key, compiled, settings.CACHE_LONG_TTL)
+    return compiled
+
+def get_compiled_template(content: str, moban_id: Optional[str] = None,
+                          updated_at: Optional[datetime] = None) -> CompiledTemplate:
+    """获取编译后的模板（优先使用缓存）"""
+    return _get_compiled(_template_key(content, moban_id, updated_at), content)
+
+def render_template_content(content: str, values: Mapping[str, Any], moban_id: Optional[str] = None,
+                            updated_at: Optional[datetime] = None, missing: Optional[str] = None) -> str:
+    """渲染模板（不缓存渲染结果，用于生成正式合同）"""
+    return get_compiled_template(content, moban_id, updated_at).render(values, missing)
+
+def render_preview(content: str, values: Mapping[str, Any], moban_id: Optional[str] = None,
+                   updated_at: Optional[datetime] = None, missing: Optional[str] = None) -> str:
+    """渲染预览，按模板与模板用到的变量值缓存渲染结果"""
+    template_key = _template_key(content, moban_id, updated_at)
+    compiled = _get_compiled(template_key, content)
+
+    used_values = {name: values[name] for name in compiled.variables if name in values}
+    digest = hashlib.sha1(
+        json.dumps(used_values, sort_keys=True, ensure_ascii=False, default=str).encode("utf-8")
+    ).hexdigest()
+    preview_key = f"{template_key}:{missing or ''}:{digest}"
+
+    content = _rendered_previews.get(preview_key)
+    if content is None:
+        content = compiled.render(values, missing)
+        _rendered_previews.set(preview_key, content, settings.CACHE_DEFAULT_TTL)
+    return content
+
+def clear_template_cache() -> None:
+    """清空编译模板与预览缓存"""
+    _compiled_templates.clear()
+    _rendered_previews.clear()
@@ -0,0 +1,590 @@
+"""
+审核条件表达式引擎
+
+审核规则触发条件与审核步骤条件统一编译为条件树后求值，编译结果按条件内容缓存
+（内容不变即规则版本不变），审核引擎、规则测试与批量回填共用同一套语义。
+
+条件的 JSON 形式：
+    {"field": "amount", "op": ">=", "value": 50000}
+    {"field": "payment_type", "op": "in", "value": ["cash", "bank"]}
+    {"field": "amount", "op": "range", "value": [10000, 50000]}    # 闭区间，端点可为 null
+    {"and": [...]} / {"or": [...]} / {"not": {...}}
+
+条件的字符串形式（审核步骤 condition 字段及规则的 expression 字段）：
+    amount >= 50000 and (payment_type in ["cash", "bank"] or percentage >= 10)
+    amount between 10000 and 50000
+
+除触发数据中的字段外，还可以使用派生字段：
+    decrease_amount      原金额 - 新金额
+    decrease_percentage  金额下调百分比（原金额需大于 0），别名 percentage
+    change_percentage    金额变动百分比的绝对值
+
+字段缺失或类型无法比较时，该比较结果为 False。
+审核步骤条件例外：条件引用的字段（含派生字段，如原金额不大于 0 时的 percentage）缺失时保留该步骤，
+宁可多审不漏审（见 step_condition_applies）。
+"""
+import json
+import operator
+import re
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from decimal import Decimal, InvalidOperation
+from typing import Any, Callable, Dict, FrozenSet, Iterable, List, Optional, Sequence
+
+class ConditionError(ValueError):
+    """条件格式错误"""
+
+# ==================== 派生字段 ====================
+
+def _to_number(value: Any) -> Optional[float]:
+    if value is None or isinstance(value, bool):
+        return None
+    try:
+        return float(Decimal(str(value)))
+    except (InvalidOperation, ValueError):
+        return None
+
+def _decrease_amount(record: "RecordView") -> Optional[float]:
+    original_amount = _to_number(record["original_amount"])
+    new_amount = _to_number(record["new_amount"])
+    if original_amount is None or new_amount is None:
+        return None
+    return original_amount - new_amount
+
+def _decrease_percentage(record: "RecordView") -> Optional[float]:
+    original_amount = _to_number(record["original_amount"])
+    decrease_amount = record["decrease_amount"]
+    if not original_amount or original_amount <= 0 or decrease_amount is None:
+        return None
+    return decrease_amount / original_amount * 100
+
+def _change_percentage(record: "RecordView") -> Optional[float]:
+    percentage = record["decrease_percentage"]
+    return abs(percentage) if percentage is not None else None
+
+DERIVED_FIELDS: Dict[str, Callable[["RecordView"], Any]] = {
+    "decrease_amount": _decrease_amount,
+    "decrease_percentage": _decrease_percentage,
+    "percentage": _decrease_percentage,
+    "change_percentage": _change_percentage,
+}
+
+class RecordView(dict):
+    """触发数据视图：派生字段在首次访问时计算并缓存，缺失字段返回 None"""
+
+    def __missing__(self, key: str) -> Any:
+        compute = DERIVED_FIELDS.get(key)
+        value = compute(self) if compute else None
+        self[key] = value
+        return value
+
+# ==================== 条件树 ====================
+
+def _in(value: Any, target: Any) -> bool:
+    return value in target
+
+def _not_in(value: Any, target: Any) -> bool:
+    return value not in target
+
+_COMPARATORS: Dict[str, Callable[[Any, Any], bool]] = {
+    "==": operator.eq,
+    "!=": operator.ne,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "<": operator.lt,
+    "<=": operator.le,
+    "in": _in,
+    "not_in": _not_in,
+}
+
+_OPERATOR_ALIASES = {
+    "=": "==",
+    "eq": "==",
+    "ne": "!=",
+    "gt": ">",
+    "gte": ">=",
+    "lt": "<",
+    "lte": "<=",
+    "between": "range",
+}
+
+class Condition(ABC):
+    """条件节点"""
+
+    __slots__ = ()
+
+    @abstractmethod
+    def evaluate(self, record: RecordView) -> bool:
+        """求值（短路）"""
+
+    @abstractmethod
+    def explain(self, record: RecordView, details: List[Dict[str, Any]]) -> bool:
+        """求值并记录每个比较条件的结果（供规则测试展示），不短路"""
+
+    @abstractmethod
+    def describe(self) -> str:
+        """条件的字符串形式"""
+
+    @abstractmethod
+    def fields(self) -> FrozenSet[str]:
+        """条件引用的字段名"""
+
+    def __call__(self, record: Dict[str, Any]) -> bool:
+        return self.evaluate(record if isinstance(record, RecordView) else RecordView(record))
+
+class Compare(Condition):
+    """字段比较"""
+
+    __slots__ = ("field", "op", "value", "_compare", "_target")
+
+    def __init__(self, field: str, op: str, value: Any):
+        op = _OPERATOR_ALIASES.get(op, op)
+        if not isinstance(field, str) or not field:
+            raise ConditionError("条件缺少字段名")
+        if op == "range":
+            if not isinstance(value, (list, tuple)) or len(value) != 2:
+                raise ConditionError(f"range 条件需要 [最小值, 最大值]: {field}")
+            low, high = value
+            self._compare = lambda v, t: (low is None or v >= low) and (high is None or v <= high)
+            self._target = None
+        elif op in ("in", "not_in"):
+            if not isinstance(value, (list, tuple, set, frozenset)):
+                raise ConditionError(f"{op} 条件需要列表: {field}")
+            try:
+                self._target = frozenset(value)
+            except TypeError:
+                self._target = tuple(value)
+            self._compare = _COMPARATORS[op]
+        elif op in _COMPARATORS:
+            self._compare = _COMPARATORS[op]
+            self._target = value
+        else:
+            raise ConditionError(f"不支持的运算符: {op}")
+        self.field = field
+        self.op = op
+        self.value = value
+
+    def evaluate(self, record: RecordView) -> bool:
+        actual = record[self.field]
+        if actual is None:
+            return False
+        try:
+            return bool(self._compare(actual, self._target))
+        except TypeError:
+            return False
+
+    def explain(self, record: RecordView, details: List[Dict[str, Any]]) -> bool:
+        met = self.evaluate(record)
+        details.append({
+            "type": "condition",
+            "field": self.field,
+            "operator": self.op,
+            "expected": self.value,
+            "actual": record[self.field],
+            "met": met
+        })
+        return met
+
+    def describe(self) -> str:
+        if self.op == "range":
+            return f"{self.field} between {self.value[0]} and {self.value[1]}"
+        return f"{self.field} {self.op} {json.dumps(self.value, ensure_ascii=False, default=str)}"
+
+    def fields(self) -> FrozenSet[str]:
+        return frozenset((self.field,))
+
+class And(Condition):
+    __slots__ = ("children",)
+
+    def __init__(self, children: Sequence[Condition]):
+        self.children = tuple(children)
+
+    def evaluate(self, record: RecordView) -> bool:
+        return all(child.evaluate(record) for child in self.children)
+
+    def explain(self, record: RecordView, details: List[Dict[str, Any]]) -> bool:
+        return all([child.explain(record, details) for child in self.children])
+
+    def describe(self) -> str:
+        return " and ".join(_wrap(child) for child in self.children)
+
+    def fields(self) -> FrozenSet[str]:
+        return frozenset().union(*(child.fields() for child in self.children))
+
+class Or(Condition):
+    __slots__ = ("children",)
+
+    def __init__(self, children: Sequence[Condition]):
+        self.children = tuple(children)
+
+    def evaluate(self, record: RecordView) -> bool:
+        return any(child.evaluate(record) for child in self.children)
+
+    def explain(self, record: RecordView, details: List[Dict[str, Any]]) -> bool:
+        return any([child.explain(record, details) for child in self.children])
+
+    def describe(self) -> str:
+        return " or ".join(_wrap(child) for child in self.children)
+
+    def fields(self) -> FrozenSet[str]:
+        return frozenset().union(*(child.fields() for child in self.children))
+
+class Not(Condition):
+    __slots__ = ("child",)
+
+    def __init__(self, child: Condition):
+        self.child = child
+
+    def evaluate(self, record: RecordView) -> bool:
+        return not self.child.evaluate(record)
+
+    def explain(self, record: RecordView, details: List[Dict[str, Any]]) -> bool:
+        return not self.child.explain(record, details)
+
+    def describe(self) -> str:
+        return f"not {_wrap(self.child)}"
+
+    def fields(self) -> FrozenSet[str]:
+        return self.child.fields()
+
+def _wrap(condition: Condition) -> str:
+    text = condition.describe()
+    return f"({text})" if isinstance(condition, (And, Or)) else text
+
+# ==================== 编译 ====================
+
+def compile_condition(spec: Any) -> Condition:
+    """将 JSON 形式或字符串形式的条件编译为条件树"""
+    if isinstance(spec, Condition):
+        return spec
+    if isinstance(spec, str):
+        return _ExpressionParser(spec).parse()
+    if not isinstance(spec, dict):
+        raise ConditionError(f"无法识别的条件: {spec!r}")
+
+    if "and" in spec or "or" in spec:
+        key = "and" if "and" in spec else "or"
+        children = spec[key]
+        if not isinstance(children, list) or not children:
+            raise ConditionError(f"{key} 条件需要非空列表")
+        compiled = [compile_condition(child) for child in children]
+        return And(compiled) if key == "and" else Or(compiled)
+    if "not" in spec:
+        return Not(compile_condition(spec["not"]))
+    if "field" in spec:
+        return Compare(spec["field"], spec.get("op", "=="), spec.get("value"))
+    raise ConditionError(f"无法识别的条件: {spec!r}")
+
+_TOKEN_RE = re.compile(
+    r"\s*(?:"
+    r"(?P<number>-?\d+(?:\.\d+)?)"
+    r"|(?P<string>\"(?:[^\"\\]|\\.)*\"|'(?:[^'\\]|\\.)*')"
+    r"|(?P<op>>=|<=|==|!=|>|<|=)"
+    r"|(?P<punct>[()\[\],])"
+    r"|(?P<name>[A-Za-z_][A-Za-z0-9_.]*)"
+    r")"
+)
+
+_KEYWORDS = {"and", "or", "not", "in", "between", "true", "false", "null"}
+
+class _ExpressionParser:
+    """条件字符串的递归下降解析器（只产生条件树，不执行任何代码）"""
+
+    def __init__(self, text: str):
+        self.text = text
+        self.tokens = self._tokenize(text)
+        self.pos = 0
+
+    @staticmethod
+    def _tokenize(text: str) -> List[tuple]:
+        tokens = []
+        pos = 0
+        text = text.rstrip()
+        while pos < len(text):
+            match = _TOKEN_RE.match(text, pos)
+            if not match or match.end() == pos:
+                raise ConditionError(f"条件表达式无法解析: {text!r}（位置 {pos}）")
+            kind = match.lastgroup
+            value = match.group(kind)
+            if kind == "name" and value.lower() in _KEYWORDS:
+                kind, value = "keyword", value.lower()
+            tokens.append((kind, value))
+            pos = match.end()
+        return tokens
+
+    def _peek(self) -> Optional[tuple]:
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else None
+
+    def _next(self) -> tuple:
+        token = self._peek()
+        if token is None:
+            raise ConditionError(f"条件表达式不完整: {self.text!r}")
+        self.pos += 1
+        return token
+
+    def _accept(self, kind: str, value: Optional[str] = None) -> bool:
+        token = self._peek()
+        if token and token[0] == kind and (value is None or token[1] == value):
+            self.pos += 1
+            return True
+        return False
+
+    def _expect(self, kind: str, value: Optional[str] = None) -> None:
+        if not self._accept(kind, value):
+            raise ConditionError(f"条件表达式缺少 {value or kind}: {self.text!r}")
+
+    def parse(self) -> Condition:
+        if not self.tokens:
+            raise ConditionError("条件表达式为空")
+        condition = self._parse_or()
+        if self._peek() is not None:
+            raise ConditionError(f"条件表达式存在多余内容: {self.text!r}")
+        return condition
+
+    def _parse_or(self) -> Condition:
+        children = [self._parse_and()]
+        while self._accept("keyword", "or"):
+            children.append(self._parse_and())
+        return children[0] if len(children) == 1 else Or(children)
+
+    def _parse_and(self) -> Condition:
+        children = [self._parse_not()]
+        while self._accept("keyword", "and"):
+            children.append(self._parse_not())
+        return children[0] if len(children) == 1 else And(children)
+
+    def _parse_not(self) -> Condition:
+        if self._accept("keyword", "not"):
+            return Not(self._parse_not())
+        if self._accept("punct", "("):
+            condition = self._parse_or()
+            self._expect("punct", ")")
+            return condition
+        return self._parse_comparison()
+
+    def _parse_comparison(self) -> Condition:
+        kind, field = self._next()
+        if kind != "name":
+            raise ConditionError(f"条件表达式需要字段名: {self.text!r}")
+
+        if self._accept("keyword", "not"):
+            self._expect("keyword", "in")
+            return Compare(field, "not_in", self._parse_list())
+        if self._accept("keyword", "in"):
+            return Compare(field, "in", self._parse_list())
+        if self._accept("keyword", "between"):
+            low = self._parse_value()
+            self._expect("keyword", "and")
+            return Compare(field, "range", [low, self._parse_value()])
+
+        kind, op = self._next()
+        if kind != "op":
+            raise ConditionError(f"条件表达式需要比较运算符: {self.text!r}")
+        return Compare(field, op, self._parse_value())
+
+    def _parse_list(self) -> List[Any]:
+        self._expect("punct", "[")
+        values = []
+        if not self._accept("punct", "]"):
+            values.append(self._parse_value())
+            while self._accept("punct", ","):
+                values.append(self._parse_value())
+            self._expect("punct", "]")
+        return values
+
+    def _parse_value(self) -> Any:
+        kind, value = self._next()
+        if kind == "number":
+            return float(value) if "." in value else int(value)
+        if kind == "string":
+            if value[0] == "'":
+                return value[1:-1].replace("\\'", "'")
+            return json.loads(value)
+        if kind == "keyword" and value in ("true", "false", "null"):
+            return {"true": True, "false": False, "null": None}[value]
+        if kind == "name":
+            # 未加引号的标识符按字符串处理，如 payment_type == cash
+            return value
+        raise ConditionError(f"条件表达式需要取值: {self.text!r}")
+
+# ==================== 规则条件 ====================
+
+# 阈值类规则：规则类型 -> 阈值字段对应的比较字段
+THRESHOLD_FIELDS = {
+    "hetong_jine_xiuzheng": ("percentage", "decrease_percentage"),
+    "baojia_shenhe": ("amount", "amount"),
+}
+
+def _numeric(value: Any) -> Any:
+    """配置中的数字可能以字符串保存，能转换时按数字比较"""
+    number = _to_number(value)
+    return number if number is not None else value
+
+def _threshold_value(threshold: Any, key: str) -> Optional[float]:
+    if not isinstance(threshold, dict):
+        return None
+    return _to_number(threshold.get(key, 0))
+
+def _thresholds_condition(thresholds: Iterable[Any], threshold_key: str, field: str) -> Optional[Condition]:
+    """满足任一阈值即触发"""
+    children = []
+    for threshold in thresholds or []:
+        value = _threshold_value(threshold, threshold_key)
+        if value is not None:
+            children.append(Compare(field, ">=", value))
+    if not children:
+        return None
+    return children[0] if len(children) == 1 else Or(children)
+
+def rule_condition_spec(guize_leixing: str, conditions: Dict[str, Any]) -> Optional[Condition]:
+    """
+    将规则的触发条件配置转换为条件树，无可判断的条件时返回 None
+
+    支持：
+    - expression（字符串）/ when（JSON 条件树）
+    - thresholds：合同金额修正按下调百分比、报价审核按金额，满足任一阈值即触发；
+      其他类型按下调百分比与下调金额（大于 0 的阈值）同时满足
+    - 前端配置格式 condition_type：amount_decrease_value / amount_decrease_percent /
+      amount_threshold / percentage_change / quote_approval
+    """
+    if "expression" in conditions:
+        return compile_condition(conditions["expression"])
+    if "when" in conditions:
+        return compile_condition(conditions["when"])
+
+    condition_type = conditions.get("condition_type", "")
+    operator_name = conditions.get("operator", ">=")
+
+    if condition_type == "amount_decrease_value":
+        return And([
+            Compare("original_amount", ">", 0),
+            Compare("decrease_amount", operator_name, _numeric(conditions.get("threshold_value", 0)))
+        ])
+    if condition_type == "amount_decrease_percent":
+        return Compare("decrease_percentage", operator_name, _numeric(conditions.get("threshold_value", 0)))
+    if condition_type == "amount_threshold":
+        return Compare("amount", operator_name, _numeric(conditions.get("threshold", 0)))
+    if condition_type == "percentage_change":
+        return Compare("change_percentage", ">=", _numeric(conditions.get("threshold", 0)))
+    if condition_type == "quote_approval":
+        return _thresholds_condition(conditions.get("thresholds"), "amount", "amount")
+
+    if "thresholds" in conditions and guize_leixing in THRESHOLD_FIELDS:
+        threshold_key, field = THRESHOLD_FIELDS[guize_leixing]
+        return _thresholds_condition(conditions["thresholds"], threshold_key, field)
+
+    if "thresholds" in conditions and not conditions.get("type"):
+        children = []
+        for threshold in conditions["thresholds"] or []:
+            if not isinstance(threshold, dict):
+                continue
+            parts = [Compare("original_amount", ">", 0)]
+            percentage = _threshold_value(threshold, "percentage") or 0
+            amount = _threshold_value(threshold, "amount") or 0
+            if percentage > 0:
+                parts.append(Compare("decrease_percentage", ">=", percentage))
+            if amount > 0:
+                parts.append(Compare("decrease_amount", ">=", amount))
+            children.append(And(parts))
+        return Or(children) if children else None
+
+    return None
+
+# 编译缓存：(规则类型, 条件内容) -> 条件树（None 表示无条件，ConditionError 表示格式错误）
+# 同步接口在线程池中并发编译，读写都在锁内进行
+_RULE_CACHE: "OrderedDict[tuple, Any]" = OrderedDict()
+_RULE_CACHE_SIZE = 1024
+_RULE_CACHE_LOCK = threading.Lock()
+
+def _cache_get(key: tuple, build: Callable[[], Any]) -> Any:
+    with _RULE_CACHE_LOCK:
+        value = _RULE_CACHE.get(key, _RULE_CACHE_LOCK)
+        if value is not _RULE_CACHE_LOCK:
+            _RULE_CACHE.move_to_end(key)
+            return value
+    try:
+        value = build()
+    except ConditionError as e:
+        value = e
+    with _RULE_CACHE_LOCK:
+        _RULE_CACHE[key] = value
+        if len(_RULE_CACHE) > _RULE_CACHE_SIZE:
+            _RULE_CACHE.popitem(last=False)
+    return value
+
+def compile_rule(rule: Any) -> Optional[Condition]:
+    """
+    编译规则（ShenheGuize）的触发条件，按规则类型与条件内容缓存
+
+    Raises:
+        ConditionError: 条件配置格式错误
+    """
+    raw = rule.chufa_tiaojian
+    key = ("rule", rule.guize_leixing, raw if isinstance(raw, str) else json.dumps(raw, sort_keys=True, default=str))
+
+    def build():
+        try:
+            conditions = json.loads(raw) if isinstance(raw, str) else raw
+        except (TypeError, ValueError):
+            raise ConditionError("触发条件不是有效的 JSON")
+        if not isinstance(conditions, dict):
+            raise ConditionError("触发条件必须是 JSON 对象")
+        return rule_condition_spec(rule.guize_leixing, conditions)
+
+    result = _cache_get(key, build)
+    if isinstance(result, ConditionError):
+        raise result
+    return result
+
+def compile_step_condition(condition: Any) -> Optional[Condition]:
+    """
+    编译审核步骤条件（字符串或 JSON 条件树），空条件返回 None
+
+    Raises:
+        ConditionError: 条件格式错误
+    """
+    if not condition:
+        return None
+    key = ("step", condition if isinstance(condition, str) else json.dumps(condition, sort_keys=True, default=str))
+    result = _cache_get(key, lambda: compile_condition(condition))
+    if isinstance(result, ConditionError):
+        raise result
+    return result
+
+def step_condition_applies(condition: Optional[Condition], record: Dict[str, Any]) -> bool:
+    """
+    审核步骤是否适用：无条件时适用；条件引用的字段任一缺失（为 None）时保留该步骤，否则按条件求值
+
+    例如原金额不大于 0 时 percentage 无法计算，"percentage >= 10" 的步骤仍然需要审核
+    """
+    if condition is None:
+        return True
+    view = record if isinstance(record, RecordView) else RecordView(record)
+    if any(view[field] is None for field in condition.fields()):
+        return True
+    return condition.evaluate(view)
+
+def evaluate_many(rules: Sequence[Any], records: Iterable[Dict[str, Any]]) -> List[List[bool]]:
+    """
+    批量求值：每条规则只编译一次，每条记录的派生字段只计算一次
+
+    Args:
+        rules: 规则列表（ShenheGuize），条件缺失或格式错误的规则视为不触发
+        records: 触发数据列表
+
+    Returns:
+        List[List[bool]]: results[i][j] 表示第 i 条记录是否触发第 j 条规则
+    """
+    compiled = []
+    for rule in rules:
+        try:
+            compiled.append(compile_rule(rule))
+        except ConditionError:
+            compiled.append(None)
+
+    results = []
+    for record in records:
+        view = RecordView(record)
+        results.append([condition is not None and condition.evaluate(view) for condition in compiled])
+    return results
@@ -8,6 +8,14 @@ from sqlalchemy.orm import Session
 from fastapi import HTTPException
 
 from models.shenhe_guanli import ShenheGuize
+from services.shenhe_guanli.condition_engine import (
+    ConditionError,
+    RecordView,
+    compile_rule,
+    compile_step_condition,
+    evaluate_many,
+    step_condition_applies,
+)
 
 class RuleTestService:
     """规则测试服务"""
@@ -35,32 +43,7 @@ class RuleTestService:
         if not rule:
             raise HTTPException(status_code=404, detail="规则不存在")
 
-        # 解析触发条件
-        try:
-            trigger_conditions = json.loads(rule.chufa_tiaojian) if isinstance(rule.chufa_tiaojian, str) else rule.chufa_tiaojian
-        except (json.JSONDecodeError, TypeError, ValueError):
-            trigger_conditions = {}
-
-        # 🔍 调试日志
-
-        # 执行规则测试
-        test_result = self._evaluate_trigger_conditions(trigger_conditions, test_data)
-
-        # 如果触发，模拟流程创建
-        workflow_preview = None
-        if test_result["triggered"]:
-            workflow_preview = self._generate_workflow_preview(rule, test_data)
-
-        return {
-            "rule_id": rule_id,
-            "rule_name": rule.guize_mingcheng,
-            "test_data": test_data,
-            "triggered": test_result["triggered"],
-            "trigger_reason": test_result["reason"],
-            "conditions_met": test_result["conditions_met"],
-            "workflow_preview": workflow_preview,
-            "test_timestamp": "2024-01-15T12:00:00"
-        }
+        return self._build_test_result(rule, test_data)
     
     def test_multiple_rules(self, rule_type: str, test_data: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -73,22 +56,20 @@ class RuleTestService:
         Returns:
             测试结果
         """
-        # 获取指定类型的所有启用规则
-        rules = self.db.query(ShenheGuize).filter(
-            ShenheGuize.guize_leixing == rule_type,
-            ShenheGuize.shi_qiyong == "Y",
-            ShenheGuize.is_deleted == "N"
-        ).order_by(ShenheGuize.paixu).all()
-        
+        # 获取指定类型的所有启用规则，批量求值是否触发（派生字段只计算一次）
+        rules = self._get_active_rules(rule_type)
+        view = RecordView(test_data)
+        triggered_flags = evaluate_many(rules, [view])[0]
+
         test_results = []
         triggered_rules = []
-        
-        for rule in rules:
+
+        for rule, triggered in zip(rules, triggered_flags):
             try:
-                result = self.test_rule_trigger(rule.id, test_data)
+                result = self._build_test_result(rule, test_data, view, triggered)
                 test_results.append(result)
-                
-                if result["triggered"]:
+
+                if triggered:
                     triggered_rules.append({
                         "rule_id": rule.id,
                         "rule_name": rule.guize_mingcheng,
@@ -110,226 +91,87 @@ class RuleTestService:
             "triggered_rules": triggered_rules,
             "detailed_results": test_results
         }
-    
-    @staticmethod
-    def _evaluate_trigger_conditions(conditions: Dict[str, Any], test_data: Dict[str, Any]) -> Dict[str, Any]:
-        """评估触发条件"""
-        if not conditions:
-            return {
-                "triggered": False,
-                "reason": "无触发条件配置",
-                "conditions_met": []
-            }
-
-        conditions_met = []
-        triggered = False
-        reason = ""
-
-        # 获取条件类型
-        condition_type = conditions.get("condition_type", "")  # 前端格式
-        type_field = conditions.get("type", "")  # 后端格式
-
-        # 🔧 修复：支持前端配置的条件类型（condition_type字段）
-        if condition_type in ["amount_decrease_value", "amount_decrease_percent"]:
-            # 前端配置的合同金额修正规则
-            original_amount = test_data.get("original_amount", 0)
-            new_amount = test_data.get("new_amount", 0)
-            threshold_value = conditions.get("threshold_value", 0)
-            operator = conditions.get("operator", "gte")
-
-            if original_amount <= 0:
-                return {
-                    "triggered": False,
-                    "reason": "原始金额为0或负数，无法计算变更",
-                    "conditions_met": []
-                }
-
-            # 计算金额变化
-            amount_change = original_amount - new_amount
-            decrease_percentage = (amount_change / original_amount) * 100
-
-            # 根据条件类型判断
-            if condition_type == "amount_decrease_value":
-                # 金额减少数值
-                actual_value = amount_change
-                threshold_desc = f"{threshold_value} 元"
-
-                # 判断操作符
-                if operator in ("gte", ">="):
-                    triggered = actual_value >= threshold_value
-                elif operator in ("gt", ">"):
-                    triggered = actual_value > threshold_value
-                elif operator in ("lte", "<="):
-                    triggered = actual_value <= threshold_value
-                elif operator in ("lt", "<"):
-                    triggered = actual_value < threshold_value
-
-                if triggered:
-                    reason = f"金额从 {original_amount} 降至 {new_amount}，降低 {amount_change:.2f} 元，满足条件（{operator} {threshold_value}）"
-                else:
-                    reason = f"金额从 {original_amount} 降至 {new_amount}，降低 {amount_change:.2f} 元，不满足条件（{operator} {threshold_value}）"
-
-                conditions_met.append({
-                    "type": "amount_decrease_value",
-                    "original_amount": original_amount,
-                    "new_amount": new_amount,
-                    "decrease_amount": amount_change,
-                    "operator": operator,
-                    "threshold": threshold_value,
-                    "met": triggered
-                })
-
-            elif condition_type == "amount_decrease_percent":
-                # 金额减少百分比
-                actual_value = decrease_percentage
-                threshold_desc = f"{threshold_value}%"
-
-                # 判断操作符
-                if operator in ("gte", ">="):
-                    triggered = actual_value >= threshold_value
-                elif operator in ("gt", ">"):
-                    triggered = actual_value > threshold_value
-                elif operator in ("lte", "<="):
-                    triggered = actual_value <= threshold_value
-                elif operator in ("lt", "<"):
-                    triggered = actual_value < threshold_value
-
-                if triggered:
-                    reason = f"金额从 {original_amount} 降至 {new_amount}，降低 {decrease_percentage:.2f}%，满足条件（{operator} {threshold_value}%）"
-                else:
-                    reason = f"金额从 {original_amount} 降至 {new_amount}，降低 {decrease_percentage:.2f}%，不满足条件（{operator} {threshold_value}%）"
 
-                conditions_met.append({
-                    "type": "amount_decrease_percent",
-                    "original_amount": original_amount,
-                    "new_amount": new_amount,
-                    "decrease_percentage": f"{decrease_percentage:.2f}%",
-                    "operator": operator,
-                    "threshold": f"{threshold_value}%",
-                    "met": triggered
-                })
-
-        # 🔧 支持后端格式的 thresholds 数组（用于兼容旧数据）
-        elif "thresholds" in conditions and not type_field:
-            # 合同金额修正规则格式
-            original_amount = test_data.get("original_amount", 0)
-            new_amount = test_data.get("new_amount", 0)
-
-            if original_amount <= 0:
-                return {
-                    "triggered": False,
-                    "reason": "原始金额为0或负数，无法计算变更",
-                    "conditions_met": []
-                }
-
-            # 计算金额变化
-            amount_change = original_amount - new_amount
-            decrease_percentage = (amount_change / original_amount) * 100
-            decrease_amount = amount_change
-
-            # 检查阈值条件
-            thresholds = conditions.get("thresholds", [])
-            for threshold in thresholds:
-                threshold_percentage = threshold.get("percentage", 0)
-                threshold_amount = threshold.get("amount", 0)
-
-                # 检查是否满足百分比或金额阈值
-                percentage_met = decrease_percentage >= threshold_percentage if threshold_percentage > 0 else True
-                amount_met = decrease_amount >= threshold_amount if threshold_amount > 0 else True
-
-                if percentage_met and amount_met:
-                    triggered = True
-                    reason = f"金额从 {original_amount} 降至 {new_amount}，降低 {decrease_amount:.2f} 元（{decrease_percentage:.2f}%），触发审核"
-                    conditions_met.append({
-                        "type": "contract_amount_change",
-                        "original_amount": original_amount,
-                        "new_amount": new_amount,
-                        "decrease_amount": decrease_amount,
-                        "decrease_percentage": f"{decrease_percentage:.2f}%",
-                        "threshold_percentage": f"{threshold_percentage}%",
-                        "threshold_amount": threshold_amount,
-                        "met": True
-                    })
-                    break
+    def score_records(self, rule_type: str, records: List[Dict[str, Any]]) -> List[List[str]]:
+        """
+        批量计算每条记录触发的规则（用于历史数据回填等场景）
 
-            if not triggered:
-                reason = f"金额从 {original_amount} 降至 {new_amount}，降低 {decrease_amount:.2f} 元（{decrease_percentage:.2f}%），未达到触发阈值"
-                conditions_met.append({
-                    "type": "contract_amount_change",
-                    "original_amount": original_amount,
-                    "new_amount": new_amount,
-                    "decrease_amount": decrease_amount,
-                    "decrease_percentage": f"{decrease_percentage:.2f}%",
-                    "met": False
-                })
+        Args:
+            rule_type: 规则类型
+            records: 触发数据列表
 
-        elif condition_type == "amount_threshold":
-            # 金额阈值条件
-            threshold = conditions.get("threshold", 0)
-            amount = test_data.get("amount", 0)
-            operator = conditions.get("operator", ">=")
+        Returns:
+            List[List[str]]: 与 records 一一对应，为该记录触发的规则ID（按优先级排列）
+        """
+        rules = self._get_active_rules(rule_type)
+        return [
+            [rule.id for rule, triggered in zip(rules, row) if triggered]
+            for row in evaluate_many(rules, records)
+        ]
 
-            if operator == ">=" and amount >= threshold:
-                triggered = True
-                reason = f"金额 {amount} 大于等于阈值 {threshold}"
-            elif operator == ">" and amount > threshold:
-                triggered = True
-                reason = f"金额 {amount} 大于阈值 {threshold}"
-            elif operator == "<=" and amount <= threshold:
-                triggered = True
-                reason = f"金额 {amount} 小于等于阈值 {threshold}"
-            elif operator == "<" and amount < threshold:
-                triggered = True
-                reason = f"金额 {amount} 小于阈值 {threshold}"
-            else:
-                reason = f"金额 {amount} 不满足条件 {operator} {threshold}"
+    def _get_active_rules(self, rule_type: str) -> List[ShenheGuize]:
+        return self.db.query(ShenheGuize).filter(
+            ShenheGuize.guize_leixing == rule_type,
+            ShenheGuize.shi_qiyong == "Y",
+            ShenheGuize.is_deleted == "N"
+        ).order_by(ShenheGuize.paixu).all()
 
-            conditions_met.append({
-                "type": "amount_threshold",
-                "expected": f"{operator} {threshold}",
-                "actual": amount,
-                "met": triggered
-            })
+    def _build_test_result(
+        self,
+        rule: ShenheGuize,
+        test_data: Dict[str, Any],
+        view: Optional[RecordView] = None,
+        triggered: Optional[bool] = None
+    ) -> Dict[str, Any]:
+        """
+        评估规则触发条件并生成测试结果
 
-        elif condition_type == "percentage_change":
-            # 百分比变更条件
-            threshold = conditions.get("threshold", 0)
-            original_amount = test_data.get("original_amount", 0)
-            new_amount = test_data.get("new_amount", 0)
+        Args:
+            view: 多条规则共用的触发数据视图
+            triggered: 已批量求值的触发结果，为空时按条件逐项说明的结果
+        """
+        test_result = self._evaluate_trigger_conditions(rule, view if view is not None else RecordView(test_data))
+        if triggered is None:
+            triggered = test_result["triggered"]
 
-            if original_amount > 0:
-                change_percentage = abs((new_amount - original_amount) / original_amount) * 100
-                if change_percentage >= threshold:
-                    triggered = True
-                    reason = f"变更百分比 {change_percentage:.2f}% 大于等于阈值 {threshold}%"
-                else:
-                    reason = f"变更百分比 {change_percentage:.2f}% 小于阈值 {threshold}%"
+        # 如果触发，模拟流程创建
+        workflow_preview = None
+        if triggered:
+            workflow_preview = self._generate_workflow_preview(rule, test_data)
 
-                conditions_met.append({
-                    "type": "percentage_change",
-                    "expected": f">= {threshold}%",
-                    "actual": f"{change_percentage:.2f}%",
-                    "met": triggered
-                })
-            else:
-                reason = "原始金额为0，无法计算变更百分比"
+        return {
+            "rule_id": rule.id,
+            "rule_name": rule.guize_mingcheng,
+            "test_data": test_data,
+            "triggered": triggered,
+            "trigger_reason": test_result["reason"],
+            "conditions_met": test_result["conditions_met"],
+            "workflow_preview": workflow_preview,
+            "test_timestamp": "2024-01-15T12:00:00"
+        }
+    
+    @staticmethod
+    def _evaluate_trigger_conditions(rule: ShenheGuize, view: RecordView) -> Dict[str, Any]:
+        """逐项说明触发条件（与审核引擎使用同一条件编译结果，见 condition_engine）"""
+        try:
+            condition = compile_rule(rule)
+        except ConditionError as e:
+            return {
+                "triggered": False,
+                "reason": f"触发条件配置错误: {e}",
+                "conditions_met": []
+            }
 
-        elif condition_type == "quote_approval":
-            # 报价审核条件
-            thresholds = conditions.get("thresholds", [])
-            amount = test_data.get("amount", 0)
+        if condition is None:
+            return {
+                "triggered": False,
+                "reason": "无触发条件配置",
+                "conditions_met": []
+            }
 
-            for threshold_config in thresholds:
-                threshold_amount = threshold_config.get("amount", 0)
-                if amount >= threshold_amount:
-                    triggered = True
-                    reason = f"报价金额 {amount} 触发 {threshold_config.get('approver_level', '')} 审核"
-                    conditions_met.append({
-                        "type": "quote_approval",
-                        "level": threshold_config.get("approver_level", ""),
-                        "threshold": threshold_amount,
-                        "met": True
-                    })
+        conditions_met: List[Dict[str, Any]] = []
+        triggered = condition.explain(view, conditions_met)
+        reason = f"{'满足' if triggered else '不满足'}触发条件：{condition.describe()}"
 
         return {
             "triggered": triggered,
@@ -346,19 +188,12 @@ class RuleTestService:
             
             preview_steps = []
             for step in steps:
-                # 检查步骤条件
-                step_condition = step.get("condition", "")
-                step_applicable = True
-                
-                if step_condition:
-                    # 简单的条件检查
-                    amount = test_data.get("amount", 0)
-                    if "amount >=" in step_condition:
-                        threshold = int(step_condition.split(">=")[1].strip())
-                        step_applicable = amount >= threshold
-                    elif "amount <" in step_condition:
-                        threshold = int(step_condition.split("<")[1].strip())
-                        step_applicable = amount < threshold
+                # 检查步骤条件（与审核引擎一致，格式错误时视为适用）
+                try:
+                    step_condition = compile_step_condition(step.get("condition"))
+                except ConditionError:
+                    step_condition = None
+                step_applicable = step_condition_applies(step_condition, test_data)
                 
                 if step_applicable:
                     preview_steps.append({
@@ -0,0 +1,210 @@
+"""
+审核规则匹配索引
+
+触发审核时不再逐次加载全部规则并解析 JSON，而是按以下结构缓存在进程内：
+- 阈值类规则（合同金额修正、报价审核）：按规则类型分组，每条规则只需满足最小阈值即触发，
+  各规则按最小阈值排序并预先计算“前缀中优先级最高的规则”，查找时一次 bisect 即可
+- 其他条件格式（表达式、前端配置的 condition_type 等）：预编译为条件树（condition_engine），
+  按优先级依次求值
+- 工作流模板：按 chufa_tiaojian.audit_type 建立映射，取优先级最高的模板
+
+审核规则在事务提交时失效（ShenheGuizeService 的创建/更新/删除、工作流模板的维护等
+所有 ORM 写入），其他进程修改的规则最迟在 TTL 到期后生效。
+"""
+import json
+import threading
+import time
+from bisect import bisect_right
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from core.commit_hooks import invalidate_on_commit
+from core.config import settings
+from models.shenhe_guanli import ShenheGuize
+from services.shenhe_guanli.condition_engine import (
+    THRESHOLD_FIELDS,
+    Condition,
+    ConditionError,
+    RecordView,
+    compile_rule,
+)
+
+# 简化审核类型 -> 规则类型
+RULE_TYPE_MAP = {
+    "hetong": "hetong_jine_xiuzheng",
+    "baojia": "baojia_shenhe",
+}
+
+WORKFLOW_TEMPLATE = "workflow_template"
+
+def _load_json(value: Any) -> Optional[Dict[str, Any]]:
+    """解析 JSON 字段，格式错误或不是对象时返回 None"""
+    try:
+        data = json.loads(value) if isinstance(value, str) else value
+    except (TypeError, ValueError):
+        return None
+    return data if isinstance(data, dict) else None
+
+class ThresholdRuleSet:
+    """同一类型阈值规则的有序索引"""
+
+    def __init__(self, entries: List[Tuple[float, int, str]]):
+        """
+        Args:
+            entries: (规则最小阈值, 优先级序号, 规则ID)，序号越小优先级越高
+        """
+        entries = sorted(entries, key=lambda entry: entry[0])
+        self.thresholds = [entry[0] for entry in entries]
+        # best[i]：阈值最小的前 i+1 条规则中优先级最高的 (序号, 规则ID)
+        self.best: List[Tuple[int, str]] = []
+        for _, rank, rule_id in entries:
+            if not self.best or rank < self.best[-1][0]:
+                self.best.append((rank, rule_id))
+            else:
+                self.best.append(self.best[-1])
+
+    def match(self, value: float) -> Optional[Tuple[int, str]]:
+        """比较值达到阈值的规则中优先级最高的 (序号, 规则ID)"""
+        index = bisect_right(self.thresholds, value)
+        return self.best[index - 1] if index else None
+
+class ShenheGuizeIndex:
+    """启用中的审核规则索引（只保存规则ID，规则本身由调用方按主键加载）"""
+
+    def __init__(self, rules: List[ShenheGuize]):
+        """
+        Args:
+            rules: 启用且未删除的规则，按 paixu 升序
+        """
+        # 规则类型 -> 优先级最高的规则ID（不校验触发条件的类型，如直接传入 workflow_template）
+        self.first_by_type: Dict[str, str] = {}
+        self.threshold_sets: Dict[str, ThresholdRuleSet] = {}
+        # 规则类型 -> [(优先级序号, 规则ID, 条件树)]，按优先级排列
+        self.predicates: Dict[str, List[Tuple[int, str, Condition]]] = {}
+        # 审核类型 -> 工作流模板ID
+        self.templates: Dict[str, str] = {}
+
+        threshold_entries: Dict[str, List[Tuple[float, int, str]]] = {}
+        for rank, rule in enumerate(rules):
+            condition = _load_json(rule.chufa_tiaojian)
+            if condition is None:
+                continue
+
+            if rule.guize_leixing == WORKFLOW_TEMPLATE:
+                self.first_by_type.setdefault(WORKFLOW_TEMPLATE, rule.id)
+                audit_type = condition.get("audit_type")
+                if isinstance(audit_type, str):
+                    self.templates.setdefault(audit_type, rule.id)
+                continue
+
+            if not self._is_plain_thresholds(rule.guize_leixing, condition):
+                try:
+                    compiled = compile_rule(rule)
+                except ConditionError:
+                    continue
+                if compiled is not None:
+                    self.predicates.setdefault(rule.guize_leixing, []).append((rank, rule.id, compiled))
+                continue
+
+            threshold_key, _ = THRESHOLD_FIELDS[rule.guize_leixing]
+            thresholds = []
+            for threshold in condition.get("thresholds") or []:
+                try:
+                    thresholds.append(float(threshold.get(threshold_key, 0)))
+                except (AttributeError, TypeError, ValueError):
+                    continue
+            # 满足任一阈值即触发，等价于达到最小阈值
+            if thresholds:
+                threshold_entries.setdefault(rule.guize_leixing, []).append((min(thresholds), rank, rule.id))
+
+        for rule_type, entries in threshold_entries.items():
+            self.threshold_sets[rule_type] = ThresholdRuleSet(entries)
+
+    @staticmethod
+    def _is_plain_thresholds(guize_leixing: str, condition: Dict[str, Any]) -> bool:
+        """只包含 thresholds 的合同金额修正/报价审核规则，可走阈值索引"""
+        return (
+            guize_leixing in THRESHOLD_FIELDS
+            and "thresholds" in condition
+            and not any(condition.get(key) for key in ("expression", "when", "condition_type"))
+        )
+
+    def match(self, audit_type: str, trigger_data: Dict[str, Any]) -> Optional[str]:
+        """
+        查找匹配的规则ID
+
+        先按规则类型（audit_type 或其映射）匹配，未命中时按 audit_type 匹配工作流模板
+        """
+        rule_type = RULE_TYPE_MAP.get(audit_type, audit_type)
+        if not rule_type:
+            return None
+
+        rule_id = self._match_rule_type(rule_type, trigger_data)
+        if rule_id:
+            return rule_id
+        return self.templates.get(audit_type)
+
+    def _match_rule_type(self, rule_type: str, trigger_data: Dict[str, Any]) -> Optional[str]:
+        if rule_type == WORKFLOW_TEMPLATE:
+            return self.first_by_type.get(WORKFLOW_TEMPLATE)
+
+        record = RecordView(trigger_data)
+        best: Optional[Tuple[int, str]] = None
+
+        rule_set = self.threshold_sets.get(rule_type)
+        if rule_set is not None:
+            _, field = THRESHOLD_FIELDS[rule_type]
+            value = record[field]
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                best = rule_set.match(value)
+
+        for rank, rule_id, condition in self.predicates.get(rule_type, ()):
+            if best is not None and rank > best[0]:
+                break
+            if condition.evaluate(record):
+                best = (rank, rule_id)
+                break
+
+        return best[1] if best else None
+
+class ShenheGuizeIndexCache:
+    """进程内的规则索引缓存"""
+
+    def __init__(self, ttl: int = settings.CACHE_SHORT_TTL):
+        self.ttl = ttl
+        self._index: Optional[ShenheGuizeIndex] = None
+        self._expires_at = 0.0
+        self._version = 0
+        self._lock = threading.Lock()
+
+    def get(self, db: Session) -> ShenheGuizeIndex:
+        """获取规则索引，不存在或已过期时从数据库重建（一次查询）"""
+        with self._lock:
+            if self._index is not None and self._expires_at > time.monotonic():
+                return self._index
+            version = self._version
+
+        rules = db.query(ShenheGuize).filter(
+            ShenheGuize.shi_qiyong == "Y",
+            ShenheGuize.is_deleted == "N"
+        ).order_by(ShenheGuize.paixu).all()
+        index = ShenheGuizeIndex(rules)
+
+        with self._lock:
+            # 构建期间规则被修改时不缓存本次结果
+            if version == self._version:
+                self._index = index
+                self._expires_at = time.monotonic() + self.ttl
+        return index
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._version += 1
+            self._index = None
+
+# 全局规则索引缓存
+shenhe_guize_index = ShenheGuizeIndexCache()
+
+# 审核规则变更提交后失效
+invalidate_on_commit((ShenheGuize,), lambda session: shenhe_guize_index.invalidate())
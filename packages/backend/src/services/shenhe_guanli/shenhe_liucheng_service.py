@@ -11,7 +11,8 @@ from models.shenhe_guanli import ShenheLiucheng, ShenheJilu
 from schemas.shenhe_guanli import (
     ShenheLiuchengResponse,
     ShenheLiuchengListParams,
-    ShenheActionRequest
+    ShenheActionRequest,
+    ShenheBatchActionRequest
 )
 
 class ShenheLiuchengService:
@@ -129,6 +130,25 @@ class ShenheLiuchengService:
         
         return engine.process_audit_action(workflow_id, step_id, action_dict, auditor_id)
     
+    def process_audit_actions_bulk(self, request: ShenheBatchActionRequest, auditor_id: str) -> List[Dict[str, Any]]:
+        """批量处理审核操作，返回每项的处理结果"""
+        from .shenhe_workflow_engine import ShenheWorkflowEngine
+        
+        engine = ShenheWorkflowEngine(self.db)
+        actions = [
+            {
+                "workflow_id": item.liucheng_id,
+                "step_id": item.step_id,
+                "shenhe_jieguo": item.shenhe_jieguo,
+                "shenhe_yijian": item.shenhe_yijian,
+                "fujian_lujing": item.fujian_lujing,
+                "fujian_miaoshu": item.fujian_miaoshu
+            }
+            for item in request.items
+        ]
+        
+        return engine.process_audit_actions_bulk(actions, auditor_id)
+    
     def get_audit_history_by_related_id(self, audit_type: str, related_id: str) -> List[ShenheLiuchengResponse]:
         """根据关联ID获取审核历史"""
         workflows = self.db.query(ShenheLiucheng).options(
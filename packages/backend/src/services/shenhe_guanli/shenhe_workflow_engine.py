@@ -2,8 +2,9 @@
 审核工作流引擎
 """
 import json
+import logging
 import uuid
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Tuple
 from datetime import datetime, timedelta
 from sqlalchemy.orm import Session
 from fastapi import HTTPException
@@ -11,6 +12,21 @@ from fastapi import HTTPException
 from models.shenhe_guanli import ShenheGuize, ShenheLiucheng, ShenheJilu
 from models.zhifu_guanli import ZhifuTongzhi
 from models.yonghu_guanli import Yonghu
+from services.shenhe_guanli.condition_engine import ConditionError, compile_step_condition, step_condition_applies
+from services.shenhe_guanli.shenhe_guize_index import shenhe_guize_index
+
+logger = logging.getLogger(__name__)
+
+# 审核类型名称（用于通知内容）
+AUDIT_TYPE_NAMES = {
+    "hetong": "合同审核",
+    "hetong_jine_xiuzheng": "合同金额修正审核",
+    "baojia": "报价审核",
+    "yinhang_huikuan": "银行汇款审核"
+}
+
+# 已结束的流程状态
+FINISHED_STATUSES = ("tongguo", "jujue", "chexiao")
 
 class ShenheWorkflowEngine:
     """审核工作流引擎"""
@@ -89,141 +105,173 @@ class ShenheWorkflowEngine:
         if current_step.shenhe_ren_id != auditor_id:
             raise HTTPException(status_code=403, detail="无权限进行此审核")
         
-        # 更新审核记录
-        current_step.shenhe_jieguo = action_data.get("shenhe_jieguo")
-        current_step.shenhe_yijian = action_data.get("shenhe_yijian")
-        current_step.shenhe_shijian = datetime.now()
-        current_step.fujian_lujing = action_data.get("fujian_lujing")
-        current_step.fujian_miaoshu = action_data.get("fujian_miaoshu")
-        current_step.jilu_zhuangtai = "yichuli"
-        current_step.updated_at = datetime.now()
-        
-        # 根据审核结果决定下一步
-        if action_data.get("shenhe_jieguo") == "jujue":
-            # 拒绝，结束流程
-            workflow.shenhe_zhuangtai = "jujue"
-            workflow.wancheng_shijian = datetime.now()
-            workflow.updated_at = datetime.now()
-            self.db.commit()
+        outcome = self._apply_audit_action(workflow, current_step, action_data)
+        self.db.commit()
 
+        if outcome == "jujue":
             # 发送拒绝通知给申请人
             self._send_rejection_notification(workflow_id, auditor_id, action_data.get("shenhe_yijian"))
+            return True
 
+        if outcome == "tongguo":
+            # 发送审核通过通知给申请人
+            self._send_approval_notification(workflow_id, auditor_id)
             return True
 
-        elif action_data.get("shenhe_jieguo") == "tongguo":
-            # 通过，检查是否还有下一步
-            if workflow.dangqian_buzhou >= workflow.zonggong_buzhou:
-                # 所有步骤完成
-                workflow.shenhe_zhuangtai = "tongguo"
-                workflow.wancheng_shijian = datetime.now()
-                workflow.updated_at = datetime.now()
-                self.db.commit()
+        if outcome == "next":
+            # 发送通知给下一个审核人
+            self._send_next_step_notification(workflow_id, auditor_id)
 
-                # 发送审核通过通知给申请人
-                self._send_approval_notification(workflow_id, auditor_id)
+        return False
 
-                return True
-            else:
-                # 进入下一步
-                workflow.dangqian_buzhou += 1
-                workflow.updated_at = datetime.now()
-                self.db.commit()
+    def process_audit_actions_bulk(self, actions: List[Dict[str, Any]], auditor_id: str) -> List[Dict[str, Any]]:
+        """
+        批量处理审核操作
 
-                # 发送通知给下一个审核人
-                self._send_next_step_notification(workflow_id, auditor_id)
+        用一条 SELECT ... FOR UPDATE SKIP LOCKED 锁定涉及的审核步骤及其流程，在同一事务中
+        依次应用审核结果后一次提交，再按各流程的最终状态批量写入通知。
+        已被其他事务锁定的步骤直接跳过并报告失败，不阻塞整批操作。
 
-                return False
+        Args:
+            actions: 审核操作列表，每项包含 workflow_id、step_id 以及审核操作数据
+            auditor_id: 审核人ID
 
-        self.db.commit()
-        return False
-    
-    def _find_matching_rule(self, audit_type: str, trigger_data: Dict[str, Any]) -> Optional[ShenheGuize]:
-        """查找匹配的审核规则"""
-        # 审核类型可以直接使用，也可以通过映射转换
-        # 支持两种格式：
-        # 1. 直接传入规则类型，如 "hetong_jine_xiuzheng"
-        # 2. 传入简化类型，如 "hetong"，会映射到 "hetong_jine_xiuzheng"
-        # 3. 工作流模板类型，如 "yinhang_huikuan"，通过 chufa_tiaojian 中的 audit_type 匹配
-        rule_type_map = {
-            "hetong": "hetong_jine_xiuzheng",
-            "baojia": "baojia_shenhe"
-        }
-
-        # 如果 audit_type 在映射表中，使用映射值；否则直接使用 audit_type
-        rule_type = rule_type_map.get(audit_type, audit_type)
-        if not rule_type:
-            return None
+        Returns:
+            与 actions 一一对应的处理结果，包含 success、is_completed、message
+        """
+        step_ids = {action.get("step_id") for action in actions if action.get("step_id")}
 
-        # 先查询传统规则类型（按 guize_leixing 匹配）
-        rules = self.db.query(ShenheGuize).filter(
-            ShenheGuize.guize_leixing == rule_type,
-            ShenheGuize.shi_qiyong == "Y",
-            ShenheGuize.is_deleted == "N"
-        ).order_by(ShenheGuize.paixu).all()
-
-        # 检查每个规则的触发条件
-        for rule in rules:
-            if self._check_trigger_condition(rule, trigger_data):
-                return rule
-
-        # 如果没有找到传统规则，查询工作流模板类型（按 audit_type 匹配）
-        workflow_templates = self.db.query(ShenheGuize).filter(
-            ShenheGuize.guize_leixing == "workflow_template",
-            ShenheGuize.shi_qiyong == "Y",
-            ShenheGuize.is_deleted == "N"
-        ).order_by(ShenheGuize.paixu).all()
-
-        for template in workflow_templates:
-            try:
-                condition = json.loads(template.chufa_tiaojian) if isinstance(template.chufa_tiaojian, str) else template.chufa_tiaojian
-                # 检查 audit_type 是否匹配
-                if condition.get("audit_type") == audit_type:
-                    return template
-            except Exception:
+        locked: Dict[str, Tuple[ShenheJilu, ShenheLiucheng]] = {}
+        if step_ids:
+            rows = self.db.query(ShenheJilu, ShenheLiucheng).join(
+                ShenheLiucheng, ShenheJilu.liucheng_id == ShenheLiucheng.id
+            ).filter(
+                ShenheJilu.id.in_(step_ids),
+                ShenheJilu.is_deleted == "N",
+                ShenheLiucheng.is_deleted == "N"
+            ).order_by(ShenheJilu.id).with_for_update(skip_locked=True).all()
+            locked = {step.id: (step, workflow) for step, workflow in rows}
+
+        # 未锁定到的步骤区分“不存在”和“正被其他操作处理”
+        busy_ids = set()
+        missing_ids = step_ids - locked.keys()
+        if missing_ids:
+            busy_ids = {
+                row.id for row in self.db.query(ShenheJilu.id).filter(
+                    ShenheJilu.id.in_(missing_ids),
+                    ShenheJilu.is_deleted == "N"
+                )
+            }
+
+        results = []
+        # 流程ID -> 流程对象，用于提交后按最终状态发送通知
+        touched: Dict[str, ShenheLiucheng] = {}
+        for action in actions:
+            workflow_id = action.get("workflow_id")
+            step_id = action.get("step_id")
+            result = {
+                "workflow_id": workflow_id,
+                "step_id": step_id,
+                "success": False,
+                "is_completed": False,
+                "message": ""
+            }
+            results.append(result)
+
+            step, workflow = locked.get(step_id, (None, None))
+            if step is None or workflow.id != workflow_id:
+                result["message"] = "审核步骤正在被其他操作处理" if step_id in busy_ids else "审核步骤不存在"
+                continue
+            if step.shenhe_ren_id != auditor_id:
+                result["message"] = "无权限进行此审核"
+                continue
+            if step.jilu_zhuangtai != "daichuli":
+                result["message"] = "审核步骤已处理"
+                continue
+            if workflow.shenhe_zhuangtai in FINISHED_STATUSES:
+                result["message"] = "审核流程已结束"
                 continue
 
-        return None
-    
-    @staticmethod
-    def _check_trigger_condition(rule: ShenheGuize, trigger_data: Dict[str, Any]) -> bool:
-        """检查触发条件是否满足"""
-        try:
-            condition = json.loads(rule.chufa_tiaojian) if isinstance(rule.chufa_tiaojian, str) else rule.chufa_tiaojian
+            outcome = self._apply_audit_action(workflow, step, action)
+            touched[workflow.id] = workflow
+            result["success"] = True
+            result["is_completed"] = outcome in ("jujue", "tongguo")
+            result["message"] = "审核操作处理成功"
+
+        self.db.commit()
 
-            # 工作流模板类型：无需检查触发条件，直接返回 True
-            if rule.guize_leixing == "workflow_template":
-                return True
+        if touched:
+            rejection_reasons = {
+                action.get("workflow_id"): action.get("shenhe_yijian")
+                for action in actions if action.get("shenhe_jieguo") == "jujue"
+            }
+            self._send_bulk_notifications(list(touched.values()), auditor_id, rejection_reasons)
 
-            if rule.guize_leixing == "hetong_jine_xiuzheng":
-                # 合同金额修正规则
-                original_amount = trigger_data.get("original_amount", 0)
-                new_amount = trigger_data.get("new_amount", 0)
+        return results
+
+    @staticmethod
+    def _apply_audit_action(workflow: ShenheLiucheng, step: ShenheJilu, action_data: Dict[str, Any]) -> Optional[str]:
+        """
+        将审核结果写入审核记录并推进流程（不提交）
 
-                if original_amount <= 0:
-                    return False
+        Returns:
+            jujue（流程被拒绝）、tongguo（流程全部通过）、next（进入下一步），其他结果返回 None
+        """
+        now = datetime.now()
+
+        # 更新审核记录
+        step.shenhe_jieguo = action_data.get("shenhe_jieguo")
+        step.shenhe_yijian = action_data.get("shenhe_yijian")
+        step.shenhe_shijian = now
+        step.fujian_lujing = action_data.get("fujian_lujing")
+        step.fujian_miaoshu = action_data.get("fujian_miaoshu")
+        step.jilu_zhuangtai = "yichuli"
+        step.updated_at = now
 
-                decrease_percentage = ((original_amount - new_amount) / original_amount) * 100
+        # 根据审核结果决定下一步
+        if action_data.get("shenhe_jieguo") == "jujue":
+            # 拒绝，结束流程
+            workflow.shenhe_zhuangtai = "jujue"
+            workflow.wancheng_shijian = now
+            workflow.updated_at = now
+            return "jujue"
 
-                # 检查是否满足阈值条件
-                thresholds = condition.get("thresholds", [])
-                for threshold in thresholds:
-                    if decrease_percentage >= threshold.get("percentage", 0):
-                        return True
+        if action_data.get("shenhe_jieguo") == "tongguo":
+            # 通过，检查是否还有下一步
+            if workflow.dangqian_buzhou >= workflow.zonggong_buzhou:
+                # 所有步骤完成
+                workflow.shenhe_zhuangtai = "tongguo"
+                workflow.wancheng_shijian = now
+                workflow.updated_at = now
+                return "tongguo"
 
-            elif rule.guize_leixing == "baojia_shenhe":
-                # 报价审核规则
-                amount = trigger_data.get("amount", 0)
+            # 进入下一步
+            workflow.dangqian_buzhou += 1
+            workflow.updated_at = now
+            return "next"
 
-                thresholds = condition.get("thresholds", [])
-                for threshold in thresholds:
-                    if amount >= threshold.get("amount", 0):
-                        return True
+        return None
+    
+    def _find_matching_rule(self, audit_type: str, trigger_data: Dict[str, Any]) -> Optional[ShenheGuize]:
+        """查找匹配的审核规则"""
+        # 审核类型可以直接使用，也可以通过映射转换
+        # 支持两种格式：
+        # 1. 直接传入规则类型，如 "hetong_jine_xiuzheng"
+        # 2. 传入简化类型，如 "hetong"，会映射到 "hetong_jine_xiuzheng"
+        # 3. 工作流模板类型，如 "yinhang_huikuan"，通过 chufa_tiaojian 中的 audit_type 匹配
+        # 匹配在进程内的规则索引上完成（见 shenhe_guize_index），命中后按主键加载规则
+        rule_id = shenhe_guize_index.get(self.db).match(audit_type, trigger_data)
+        if not rule_id:
+            return None
 
-            return False
+        rule = self.db.get(ShenheGuize, rule_id)
+        if rule is not None and rule.shi_qiyong == "Y" and rule.is_deleted == "N":
+            return rule
 
-        except Exception:
-            return False
+        # 规则已被其他进程停用或删除而本地索引尚未过期，重建后再匹配一次
+        shenhe_guize_index.invalidate()
+        rule_id = shenhe_guize_index.get(self.db).match(audit_type, trigger_data)
+        return self.db.get(ShenheGuize, rule_id) if rule_id else None
     
     def _create_audit_workflow(self, audit_type: str, related_id: str, rule: ShenheGuize,
                              trigger_data: Dict[str, Any], applicant_id: str) -> str:
@@ -337,26 +385,15 @@ class ShenheWorkflowEngine:
     
     @staticmethod
     def _check_step_condition(step_config: Dict[str, Any], trigger_data: Dict[str, Any]) -> bool:
-        """检查步骤条件"""
-        condition = step_config.get("condition")
-        if not condition:
+        """检查步骤条件（条件表达式见 condition_engine，如 "amount >= 50000"）"""
+        try:
+            condition = compile_step_condition(step_config.get("condition"))
+        except ConditionError as e:
+            # 条件配置有误时保留该步骤，宁可多审不漏审
+            logger.warning("审核步骤条件格式错误，按无条件处理: %s", e)
             return True
-        
-        # 简化的条件检查逻辑
-        if "percentage" in condition:
-            original_amount = trigger_data.get("original_amount", 0)
-            new_amount = trigger_data.get("new_amount", 0)
-            if original_amount > 0:
-                decrease_percentage = ((original_amount - new_amount) / original_amount) * 100
-                required_percentage = float(condition.split(">=")[1].strip())
-                return decrease_percentage >= required_percentage
-        
-        if "amount" in condition:
-            amount = trigger_data.get("amount", 0)
-            required_amount = float(condition.split(">=")[1].strip())
-            return amount >= required_amount
-        
-        return True
+
+        return step_condition_applies(condition, trigger_data)
     
     def _find_auditor_by_role(self, role: str) -> Optional[str]:
         """根据角色查找审核人"""
@@ -427,14 +464,7 @@ class ShenheWorkflowEngine:
             applicant_name = applicant.xingming if applicant else "未知用户"
 
             # 构建通知内容
-            audit_type_map = {
-                "hetong": "合同审核",
-                "hetong_jine_xiuzheng": "合同金额修正审核",
-                "baojia": "报价审核",
-                "yinhang_huikuan": "银行汇款审核"
-            }
-
-            audit_type_name = audit_type_map.get(workflow.shenhe_leixing, workflow.shenhe_leixing)
+            audit_type_name = AUDIT_TYPE_NAMES.get(workflow.shenhe_leixing, workflow.shenhe_leixing)
 
             tongzhi_biaoti = f"【待审核】{audit_type_name} - {workflow.liucheng_bianhao}"
             tongzhi_neirong = f"""
@@ -497,55 +527,9 @@ class ShenheWorkflowEngine:
             if not next_step or not next_step.shenhe_ren_id:
                 return
 
-            # 获取上一个审核人信息
-            previous_auditor = self.db.query(Yonghu).filter(
-                Yonghu.id == previous_auditor_id,
-                Yonghu.is_deleted == "N"
-            ).first()
-
-            previous_auditor_name = previous_auditor.xingming if previous_auditor else "未知用户"
-
-            # 构建通知内容
-            audit_type_map = {
-                "hetong": "合同审核",
-                "hetong_jine_xiuzheng": "合同金额修正审核",
-                "baojia": "报价审核",
-                "yinhang_huikuan": "银行汇款审核"
-            }
-
-            audit_type_name = audit_type_map.get(workflow.shenhe_leixing, workflow.shenhe_leixing)
-
-            tongzhi_biaoti = f"【待审核】{audit_type_name} - {workflow.liucheng_bianhao}"
-            tongzhi_neirong = f"""
-您有一个新的审核任务需要处理：
-
-审核类型：{audit_type_name}
-流程编号：{workflow.liucheng_bianhao}
-当前步骤：第 {workflow.dangqian_buzhou} 步（共 {workflow.zonggong_buzhou} 步）
-上一审核人：{previous_auditor_name}（已通过）
-
-请及时登录系统进行审核。
-            """.strip()
-
-            # 创建通知
-            notification = ZhifuTongzhi(
-                jieshou_ren_id=next_step.shenhe_ren_id,
-                tongzhi_leixing="audit_pending",
-                tongzhi_biaoti=tongzhi_biaoti,
-                tongzhi_neirong=tongzhi_neirong,
-                youxian_ji="high",
-                fasong_shijian=datetime.now(),
-                tongzhi_zhuangtai="unread",
-                lianjie_url="/audit/tasks",  # 跳转到审核任务列表
-                kuozhan_shuju=json.dumps({
-                    "workflow_id": workflow_id,
-                    "audit_type": workflow.shenhe_leixing,
-                    "step_id": next_step.id,
-                    "step_number": next_step.buzhou_bianhao
-                }),
-                created_by="system"
+            notification = self._build_next_step_notification(
+                workflow, next_step, self._get_user_names([previous_auditor_id]).get(previous_auditor_id, "未知用户")
             )
-
             self.db.add(notification)
             self.db.commit()
 
@@ -565,55 +549,9 @@ class ShenheWorkflowEngine:
             if not workflow or not workflow.shenqing_ren_id:
                 return
 
-            # 获取最终审核人信息
-            final_auditor = self.db.query(Yonghu).filter(
-                Yonghu.id == final_auditor_id,
-                Yonghu.is_deleted == "N"
-            ).first()
-
-            final_auditor_name = final_auditor.xingming if final_auditor else "未知用户"
-
-            # 构建通知内容
-            audit_type_map = {
-                "hetong": "合同审核",
-                "hetong_jine_xiuzheng": "合同金额修正审核",
-                "baojia": "报价审核",
-                "yinhang_huikuan": "银行汇款审核"
-            }
-
-            audit_type_name = audit_type_map.get(workflow.shenhe_leixing, workflow.shenhe_leixing)
-
-            tongzhi_biaoti = f"【审核通过】{audit_type_name} - {workflow.liucheng_bianhao}"
-            tongzhi_neirong = f"""
-您的审核申请已通过：
-
-审核类型：{audit_type_name}
-流程编号：{workflow.liucheng_bianhao}
-申请时间：{workflow.shenqing_shijian.strftime('%Y-%m-%d %H:%M:%S')}
-完成时间：{workflow.wancheng_shijian.strftime('%Y-%m-%d %H:%M:%S') if workflow.wancheng_shijian else '刚刚'}
-最终审核人：{final_auditor_name}
-
-您的申请已全部审核通过，可以继续后续操作。
-            """.strip()
-
-            # 创建通知
-            notification = ZhifuTongzhi(
-                jieshou_ren_id=workflow.shenqing_ren_id,
-                tongzhi_leixing="audit_approved",
-                tongzhi_biaoti=tongzhi_biaoti,
-                tongzhi_neirong=tongzhi_neirong,
-                youxian_ji="normal",
-                fasong_shijian=datetime.now(),
-                tongzhi_zhuangtai="unread",
-                lianjie_url="/audit/tasks",  # 跳转到审核任务列表
-                kuozhan_shuju=json.dumps({
-                    "workflow_id": workflow_id,
-                    "audit_type": workflow.shenhe_leixing,
-                    "result": "approved"
-                }),
-                created_by="system"
+            notification = self._build_approval_notification(
+                workflow, self._get_user_names([final_auditor_id]).get(final_auditor_id, "未知用户")
             )
-
             self.db.add(notification)
             self.db.commit()
 
@@ -633,26 +571,147 @@ class ShenheWorkflowEngine:
             if not workflow or not workflow.shenqing_ren_id:
                 return
 
-            # 获取审核人信息
-            auditor = self.db.query(Yonghu).filter(
-                Yonghu.id == auditor_id,
-                Yonghu.is_deleted == "N"
-            ).first()
+            notification = self._build_rejection_notification(
+                workflow, self._get_user_names([auditor_id]).get(auditor_id, "未知用户"), rejection_reason
+            )
+            self.db.add(notification)
+            self.db.commit()
 
-            auditor_name = auditor.xingming if auditor else "未知用户"
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
 
-            # 构建通知内容
-            audit_type_map = {
-                "hetong": "合同审核",
-                "hetong_jine_xiuzheng": "合同金额修正审核",
-                "baojia": "报价审核",
-                "yinhang_huikuan": "银行汇款审核"
-            }
+    def _send_bulk_notifications(self, workflows: List[ShenheLiucheng], auditor_id: str,
+                                 rejection_reasons: Dict[str, Optional[str]]):
+        """
+        按流程最终状态批量发送通知（批量审核后调用）
 
-            audit_type_name = audit_type_map.get(workflow.shenhe_leixing, workflow.shenhe_leixing)
+        同一流程在一批中推进多步时只通知最终停留步骤的审核人；
+        审核人姓名与下一步审核记录各一次查询，通知一次写入。
+        """
+        try:
+            auditor_name = self._get_user_names([auditor_id]).get(auditor_id, "未知用户")
+
+            pending_ids = [w.id for w in workflows if w.shenhe_zhuangtai not in FINISHED_STATUSES]
+            next_steps: Dict[Tuple[str, int], ShenheJilu] = {}
+            if pending_ids:
+                for step in self.db.query(ShenheJilu).filter(
+                    ShenheJilu.liucheng_id.in_(pending_ids),
+                    ShenheJilu.jilu_zhuangtai == "daichuli",
+                    ShenheJilu.is_deleted == "N"
+                ):
+                    next_steps.setdefault((step.liucheng_id, step.buzhou_bianhao), step)
+
+            notifications = []
+            for workflow in workflows:
+                if workflow.shenhe_zhuangtai == "jujue":
+                    if workflow.shenqing_ren_id:
+                        notifications.append(self._build_rejection_notification(
+                            workflow, auditor_name, rejection_reasons.get(workflow.id)
+                        ))
+                elif workflow.shenhe_zhuangtai == "tongguo":
+                    if workflow.shenqing_ren_id:
+                        notifications.append(self._build_approval_notification(workflow, auditor_name))
+                else:
+                    next_step = next_steps.get((workflow.id, workflow.dangqian_buzhou))
+                    if next_step and next_step.shenhe_ren_id:
+                        notifications.append(self._build_next_step_notification(workflow, next_step, auditor_name))
 
-            tongzhi_biaoti = f"【审核拒绝】{audit_type_name} - {workflow.liucheng_bianhao}"
-            tongzhi_neirong = f"""
+            if notifications:
+                self.db.add_all(notifications)
+                self.db.commit()
+
+        except Exception as e:
+            logger.exception("批量审核通知发送失败: %s", e)
+            self.db.rollback()
+
+    def _get_user_names(self, user_ids: List[str]) -> Dict[str, str]:
+        """批量获取用户姓名"""
+        rows = self.db.query(Yonghu.id, Yonghu.xingming).filter(
+            Yonghu.id.in_(set(user_ids)),
+            Yonghu.is_deleted == "N"
+        ).all()
+        return {row.id: row.xingming for row in rows}
+
+    @staticmethod
+    def _build_next_step_notification(workflow: ShenheLiucheng, next_step: ShenheJilu,
+                                      previous_auditor_name: str) -> ZhifuTongzhi:
+        """构建待审核通知（发给下一个审核人）"""
+        audit_type_name = AUDIT_TYPE_NAMES.get(workflow.shenhe_leixing, workflow.shenhe_leixing)
+
+        tongzhi_biaoti = f"【待审核】{audit_type_name} - {workflow.liucheng_bianhao}"
+        tongzhi_neirong = f"""
+您有一个新的审核任务需要处理：
+
+审核类型：{audit_type_name}
+流程编号：{workflow.liucheng_bianhao}
+当前步骤：第 {workflow.dangqian_buzhou} 步（共 {workflow.zonggong_buzhou} 步）
+上一审核人：{previous_auditor_name}（已通过）
+
+请及时登录系统进行审核。
+        """.strip()
+
+        return ZhifuTongzhi(
+            jieshou_ren_id=next_step.shenhe_ren_id,
+            tongzhi_leixing="audit_pending",
+            tongzhi_biaoti=tongzhi_biaoti,
+            tongzhi_neirong=tongzhi_neirong,
+            youxian_ji="high",
+            fasong_shijian=datetime.now(),
+            tongzhi_zhuangtai="unread",
+            lianjie_url="/audit/tasks",  # 跳转到审核任务列表
+            kuozhan_shuju=json.dumps({
+                "workflow_id": workflow.id,
+                "audit_type": workflow.shenhe_leixing,
+                "step_id": next_step.id,
+                "step_number": next_step.buzhou_bianhao
+            }),
+            created_by="system"
+        )
+
+    @staticmethod
+    def _build_approval_notification(workflow: ShenheLiucheng, final_auditor_name: str) -> ZhifuTongzhi:
+        """构建审核通过通知（发给申请人）"""
+        audit_type_name = AUDIT_TYPE_NAMES.get(workflow.shenhe_leixing, workflow.shenhe_leixing)
+
+        tongzhi_biaoti = f"【审核通过】{audit_type_name} - {workflow.liucheng_bianhao}"
+        tongzhi_neirong = f"""
+您的审核申请已通过：
+
+审核类型：{audit_type_name}
+流程编号：{workflow.liucheng_bianhao}
+申请时间：{workflow.shenqing_shijian.strftime('%Y-%m-%d %H:%M:%S')}
+完成时间：{workflow.wancheng_shijian.strftime('%Y-%m-%d %H:%M:%S') if workflow.wancheng_shijian else '刚刚'}
+最终审核人：{final_auditor_name}
+
+您的申请已全部审核通过，可以继续后续操作。
+        """.strip()
+
+        return ZhifuTongzhi(
+            jieshou_ren_id=workflow.shenqing_ren_id,
+            tongzhi_leixing="audit_approved",
+            tongzhi_biaoti=tongzhi_biaoti,
+            tongzhi_neirong=tongzhi_neirong,
+            youxian_ji="normal",
+            fasong_shijian=datetime.now(),
+            tongzhi_zhuangtai="unread",
+            lianjie_url="/audit/tasks",  # 跳转到审核任务列表
+            kuozhan_shuju=json.dumps({
+                "workflow_id": workflow.id,
+                "audit_type": workflow.shenhe_leixing,
+                "result": "approved"
+            }),
+            created_by="system"
+        )
+
+    @staticmethod
+    def _build_rejection_notification(workflow: ShenheLiucheng, auditor_name: str,
+                                      rejection_reason: Optional[str] = None) -> ZhifuTongzhi:
+        """构建审核拒绝通知（发给申请人）"""
+        audit_type_name = AUDIT_TYPE_NAMES.get(workflow.shenhe_leixing, workflow.shenhe_leixing)
+
+        tongzhi_biaoti = f"【审核拒绝】{audit_type_name} - {workflow.liucheng_bianhao}"
+        tongzhi_neirong = f"""
 您的审核申请已被拒绝：
 
 审核类型：{audit_type_name}
@@ -663,30 +722,22 @@ class ShenheWorkflowEngine:
 拒绝原因：{rejection_reason or '无'}
 
 如有疑问，请联系审核人了解详情。
-            """.strip()
-
-            # 创建通知
-            notification = ZhifuTongzhi(
-                jieshou_ren_id=workflow.shenqing_ren_id,
-                tongzhi_leixing="audit_rejected",
-                tongzhi_biaoti=tongzhi_biaoti,
-                tongzhi_neirong=tongzhi_neirong,
-                youxian_ji="high",
-                fasong_shijian=datetime.now(),
-                tongzhi_zhuangtai="unread",
-                lianjie_url="/audit/tasks",  # 跳转到审核任务列表
-                kuozhan_shuju=json.dumps({
-                    "workflow_id": workflow_id,
-                    "audit_type": workflow.shenhe_leixing,
-                    "result": "rejected",
-                    "rejection_reason": rejection_reason
-                }),
-                created_by="system"
-            )
-
-            self.db.add(notification)
-            self.db.commit()
-
-        except Exception as e:
-            import traceback
-            traceback.print_exc()
+        """.strip()
+
+        return ZhifuTongzhi(
+            jieshou_ren_id=workflow.shenqing_ren_id,
+            tongzhi_leixing="audit_rejected",
+            tongzhi_biaoti=tongzhi_biaoti,
+            tongzhi_neirong=tongzhi_neirong,
+            youxian_ji="high",
+            fasong_shijian=datetime.now(),
+            tongzhi_zhuangtai="unread",
+            lianjie_url="/audit/tasks",  # 跳转到审核任务列表
+            kuozhan_shuju=json.dumps({
+                "workflow_id": workflow.id,
+                "audit_type": workflow.shenhe_leixing,
+                "result": "rejected",
+                "rejection_reason": rejection_reason
+            }),
+            created_by="system"
+        )
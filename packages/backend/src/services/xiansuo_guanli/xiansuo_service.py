@@ -1,13 +1,16 @@
 """
 线索管理服务
 """
-from typing import Optional
+from typing import Any, List, Optional, Union
 from datetime import datetime
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import or_
+from sqlalchemy import or_, select
 from fastapi import HTTPException
 from decimal import Decimal
 
+from core.sequence import next_daily_code
+from core.pagination import TOTAL_MODE_EXACT, count_total, count_total_async, paginate, split_page
 from models.xiansuo_guanli import Xiansuo, XiansuoLaiyuan, XiansuoGenjin
 from schemas.xiansuo_guanli import (
     XiansuoCreate,
@@ -23,50 +26,21 @@ from schemas.xiansuo_guanli import (
 class XiansuoService:
     """线索管理服务类"""
     
-    def __init__(self, db: Session):
+    def __init__(self, db: Union[Session, AsyncSession]):
         self.db = db
     
     def _generate_xiansuo_bianma(self) -> str:
         """
-        生成线索编码（带重试机制避免并发冲突）
+        生成线索编码
 
         Returns:
             str: 线索编码，格式：XS + 日期 + 3位序号
         """
-        import random
-        import string
-
-        max_retries = 10
-        for attempt in range(max_retries):
-            today = datetime.now().strftime("%Y%m%d")
-
-            # 查询今天已有的线索数量
-            count = self.db.query(Xiansuo).filter(
-                Xiansuo.xiansuo_bianma.like(f"XS{today}%"),
-                Xiansuo.is_deleted == "N"
-            ).count()
-
-            # 生成编码：XS + 日期 + 3位序号
-            sequence = count + 1 + attempt  # 每次重试增加序号
-            xiansuo_bianma = f"XS{today}{sequence:03d}"
-
-            # 检查是否已存在（双重检查）
-            existing = self.db.query(Xiansuo).filter(
-                Xiansuo.xiansuo_bianma == xiansuo_bianma,
-                Xiansuo.is_deleted == "N"
-            ).first()
-
-            if not existing:
-                return xiansuo_bianma
-
-        # 如果重试失败，使用时间戳+随机后缀
-        timestamp = datetime.now().strftime('%Y%m%d%H%M%S')
-        random_suffix = ''.join(random.choices(string.digits, k=3))
-        return f"XS{timestamp}{random_suffix}"
+        return next_daily_code(self.db, Xiansuo.xiansuo_bianma, "XS", width=3)
     
     def create_xiansuo(self, xiansuo_data: XiansuoCreate, created_by: str) -> XiansuoResponse:
         """
-        创建线索（带重试机制处理并发冲突）
+        创建线索
 
         Args:
             xiansuo_data: 线索创建数据
@@ -89,59 +63,50 @@ class XiansuoService:
         if not laiyuan:
             raise HTTPException(status_code=404, detail="线索来源不存在")
 
-        # 重试机制处理并发冲突
-        max_retries = 3
-        for retry in range(max_retries):
+        try:
+            # 生成线索编码
+            xiansuo_bianma = self._generate_xiansuo_bianma()
+
+            # 创建线索
+            xiansuo = Xiansuo(
+                xiansuo_bianma=xiansuo_bianma,
+                **xiansuo_data.model_dump(),
+                created_by=created_by
+            )
+
+            # 自动创建关联的客户记录
+            logger.info(f"开始为线索 {xiansuo_bianma} 创建关联客户...")
             try:
-                # 生成线索编码
-                xiansuo_bianma = self._generate_xiansuo_bianma()
-
-                # 创建线索
-                xiansuo = Xiansuo(
-                    xiansuo_bianma=xiansuo_bianma,
-                    **xiansuo_data.model_dump(),
-                    created_by=created_by
-                )
-
-                # 自动创建关联的客户记录
-                logger.info(f"开始为线索 {xiansuo_bianma} 创建关联客户...")
-                try:
-                    kehu_id = self._create_or_get_kehu_for_xiansuo(xiansuo_data, created_by)
-                    logger.info(f"客户创建结果: kehu_id={kehu_id}")
-                    if kehu_id:
-                        xiansuo.kehu_id = kehu_id
-                        logger.info(f"✅ 为线索 {xiansuo_bianma} 创建/关联客户: {kehu_id}")
-                    else:
-                        logger.warning("⚠️  客户创建返回None，线索将不关联客户")
-                except Exception as e:
-                    logger.error(f"❌ 为线索创建客户失败，将继续创建线索: {str(e)}", exc_info=True)
-                    # 即使客户创建失败，也继续创建线索
-
-                self.db.add(xiansuo)
-
-                # 更新来源的线索数量
-                laiyuan.xiansuo_shuliang = (laiyuan.xiansuo_shuliang or 0) + 1
-
-                self.db.commit()
-                self.db.refresh(xiansuo)
-
-                logger.info(f"✅ 线索创建成功: {xiansuo_bianma}")
-                return XiansuoResponse.model_validate(xiansuo)
-
-            except IntegrityError as e:
-                self.db.rollback()
-                if "xiansuo_xiansuo_bianma_key" in str(e) and retry < max_retries - 1:
-                    logger.warning(f"线索编号冲突，重试 {retry + 1}/{max_retries}")
-                    continue
+                kehu_id = self._create_or_get_kehu_for_xiansuo(xiansuo_data, created_by)
+                logger.info(f"客户创建结果: kehu_id={kehu_id}")
+                if kehu_id:
+                    xiansuo.kehu_id = kehu_id
+                    logger.info(f"✅ 为线索 {xiansuo_bianma} 创建/关联客户: {kehu_id}")
                 else:
-                    logger.error(f"创建线索失败: {str(e)}")
-                    raise HTTPException(status_code=500, detail="创建线索失败: 编号生成冲突")
+                    logger.warning("⚠️  客户创建返回None，线索将不关联客户")
             except Exception as e:
-                self.db.rollback()
-                logger.error(f"创建线索失败: {str(e)}", exc_info=True)
-                raise HTTPException(status_code=500, detail=f"创建线索失败: {str(e)}")
+                logger.error(f"❌ 为线索创建客户失败，将继续创建线索: {str(e)}", exc_info=True)
+                # 即使客户创建失败，也继续创建线索
+
+            self.db.add(xiansuo)
+
+            # 更新来源的线索数量
+            laiyuan.xiansuo_shuliang = (laiyuan.xiansuo_shuliang or 0) + 1
+
+            self.db.commit()
+            self.db.refresh(xiansuo)
 
-        raise HTTPException(status_code=500, detail="创建线索失败: 超过最大重试次数")
+            logger.info(f"✅ 线索创建成功: {xiansuo_bianma}")
+            return XiansuoResponse.model_validate(xiansuo)
+
+        except IntegrityError as e:
+            self.db.rollback()
+            logger.error(f"创建线索失败: {str(e)}")
+            raise HTTPException(status_code=500, detail="创建线索失败: 编号生成冲突")
+        except Exception as e:
+            self.db.rollback()
+            logger.error(f"创建线索失败: {str(e)}", exc_info=True)
+            raise HTTPException(status_code=500, detail=f"创建线索失败: {str(e)}")
     
     def get_xiansuo_by_id(self, xiansuo_id: str, current_user_id: Optional[str] = None, has_read_all_permission: bool = False) -> Optional[XiansuoResponse]:
         """根据ID获取线索"""
@@ -200,10 +165,8 @@ class XiansuoService:
         
         return detail
     
-    def get_xiansuo_list(
+    def _build_list_conditions(
         self,
-        page: int = 1,
-        size: int = 20,
         search: Optional[str] = None,
         xiansuo_zhuangtai: Optional[str] = None,
         laiyuan_id: Optional[str] = None,
@@ -214,66 +177,151 @@ class XiansuoService:
         end_date: Optional[datetime] = None,
         current_user_id: Optional[str] = None,
         has_read_all_permission: bool = False
-    ) -> XiansuoListResponse:
-        """获取线索列表"""
-        query = self.db.query(Xiansuo).filter(Xiansuo.is_deleted == "N")
+    ) -> List[Any]:
+        """构建线索列表的过滤条件（同步/异步查询共用）"""
+        conditions = [Xiansuo.is_deleted == "N"]
 
         # 数据隔离：如果没有全局查看权限，只能查看自己创建的线索
         if current_user_id and not has_read_all_permission:
-            query = query.filter(Xiansuo.created_by == current_user_id)
+            conditions.append(Xiansuo.created_by == current_user_id)
         
         # 搜索条件
         if search:
-            search_filter = or_(
+            conditions.append(or_(
                 Xiansuo.xiansuo_bianma.contains(search),
                 Xiansuo.gongsi_mingcheng.contains(search),
                 Xiansuo.lianxi_ren.contains(search),
                 Xiansuo.lianxi_dianhua.contains(search),
                 Xiansuo.lianxi_youxiang.contains(search)
-            )
-            query = query.filter(search_filter)
+            ))
         
         # 状态筛选
         if xiansuo_zhuangtai:
-            query = query.filter(Xiansuo.xiansuo_zhuangtai == xiansuo_zhuangtai)
+            conditions.append(Xiansuo.xiansuo_zhuangtai == xiansuo_zhuangtai)
         
         # 来源筛选
         if laiyuan_id:
-            query = query.filter(Xiansuo.laiyuan_id == laiyuan_id)
+            conditions.append(Xiansuo.laiyuan_id == laiyuan_id)
         
         # 分配人筛选
         if fenpei_ren_id:
-            query = query.filter(Xiansuo.fenpei_ren_id == fenpei_ren_id)
+            conditions.append(Xiansuo.fenpei_ren_id == fenpei_ren_id)
         
         # 质量评估筛选
         if zhiliang_pinggu:
-            query = query.filter(Xiansuo.zhiliang_pinggu == zhiliang_pinggu)
+            conditions.append(Xiansuo.zhiliang_pinggu == zhiliang_pinggu)
         
         # 行业类型筛选
         if hangye_leixing:
-            query = query.filter(Xiansuo.hangye_leixing == hangye_leixing)
+            conditions.append(Xiansuo.hangye_leixing == hangye_leixing)
         
         # 时间范围筛选
         if start_date:
-            query = query.filter(Xiansuo.created_at >= start_date)
+            conditions.append(Xiansuo.created_at >= start_date)
         if end_date:
-            query = query.filter(Xiansuo.created_at <= end_date)
-        
-        # 排序
-        query = query.order_by(Xiansuo.created_at.desc())
-        
+            conditions.append(Xiansuo.created_at <= end_date)
+
+        return conditions
+
+    def get_xiansuo_list(
+        self,
+        page: int = 1,
+        size: int = 20,
+        search: Optional[str] = None,
+        xiansuo_zhuangtai: Optional[str] = None,
+        laiyuan_id: Optional[str] = None,
+        fenpei_ren_id: Optional[str] = None,
+        zhiliang_pinggu: Optional[str] = None,
+        hangye_leixing: Optional[str] = None,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        current_user_id: Optional[str] = None,
+        has_read_all_permission: bool = False,
+        cursor: Optional[str] = None,
+        total_mode: str = TOTAL_MODE_EXACT
+    ) -> XiansuoListResponse:
+        """获取线索列表"""
+        conditions = self._build_list_conditions(
+            search=search,
+            xiansuo_zhuangtai=xiansuo_zhuangtai,
+            laiyuan_id=laiyuan_id,
+            fenpei_ren_id=fenpei_ren_id,
+            zhiliang_pinggu=zhiliang_pinggu,
+            hangye_leixing=hangye_leixing,
+            start_date=start_date,
+            end_date=end_date,
+            current_user_id=current_user_id,
+            has_read_all_permission=has_read_all_permission
+        )
         # 获取总数
-        total = query.count()
+        total = count_total(self.db, Xiansuo, conditions, total_mode, filtered=len(conditions) > 1)
         
-        # 分页查询
-        skip = (page - 1) * size
-        xiansuo_list = query.offset(skip).limit(size).all()
+        # 分页查询（传入游标时按 keyset 翻页）
+        query = paginate(
+            self.db.query(Xiansuo).filter(*conditions),
+            Xiansuo.created_at, Xiansuo.id,
+            page, size, cursor
+        )
+        xiansuo_list, next_cursor = split_page(query.all(), size, "created_at")
         
         return XiansuoListResponse(
             items=[XiansuoResponse.model_validate(xiansuo) for xiansuo in xiansuo_list],
             total=total,
             page=page,
-            size=size
+            size=size,
+            next_cursor=next_cursor
+        )
+
+    async def get_xiansuo_list_async(
+        self,
+        page: int = 1,
+        size: int = 20,
+        search: Optional[str] = None,
+        xiansuo_zhuangtai: Optional[str] = None,
+        laiyuan_id: Optional[str] = None,
+        fenpei_ren_id: Optional[str] = None,
+        zhiliang_pinggu: Optional[str] = None,
+        hangye_leixing: Optional[str] = None,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        current_user_id: Optional[str] = None,
+        has_read_all_permission: bool = False,
+        cursor: Optional[str] = None,
+        total_mode: str = TOTAL_MODE_EXACT
+    ) -> XiansuoListResponse:
+        """获取线索列表（异步版本，self.db 需为 AsyncSession）"""
+        conditions = self._build_list_conditions(
+            search=search,
+            xiansuo_zhuangtai=xiansuo_zhuangtai,
+            laiyuan_id=laiyuan_id,
+            fenpei_ren_id=fenpei_ren_id,
+            zhiliang_pinggu=zhiliang_pinggu,
+            hangye_leixing=hangye_leixing,
+            start_date=start_date,
+            end_date=end_date,
+            current_user_id=current_user_id,
+            has_read_all_permission=has_read_all_permission
+        )
+
+        # 获取总数
+        total = await count_total_async(self.db, Xiansuo, conditions, total_mode, filtered=len(conditions) > 1)
+
+        # 分页查询（传入游标时按 keyset 翻页）
+        result = await self.db.execute(
+            paginate(
+                select(Xiansuo).where(*conditions),
+                Xiansuo.created_at, Xiansuo.id,
+                page, size, cursor
+            )
+        )
+        xiansuo_list, next_cursor = split_page(result.scalars().all(), size, "created_at")
+
+        return XiansuoListResponse(
+            items=[XiansuoResponse.model_validate(xiansuo) for xiansuo in xiansuo_list],
+            total=total,
+            page=page,
+            size=size,
+            next_cursor=next_cursor
         )
     
     def update_xiansuo(self, xiansuo_id: str, xiansuo_data: XiansuoUpdate, updated_by: str, has_update_all_permission: bool = False) -> XiansuoResponse:
@@ -146,10 +146,8 @@ class SystemConfigService:
             cleared = 0
             if redis_client.is_connected:
                 if pattern:
-                    # 查找匹配的键
-                    keys = await redis_client.redis.keys(pattern)
-                    if keys:
-                        cleared = await redis_client.redis.delete(*keys)
+                    # 手动清理需覆盖未登记标签的键，按 SCAN 匹配
+                    cleared = await redis_client.delete_pattern(pattern, use_tags=False)
                 else:
                     # 清除所有缓存
                     await redis_client.redis.flushdb()
@@ -6,6 +6,7 @@ from typing import List, Optional
 from datetime import datetime
 from sqlalchemy.orm import Session
 from sqlalchemy import text
+from core.security.permission_cache import permission_cache
 from schemas.yonghu_guanli.jiaose_schemas import (
     JiaoseCreate,
     JiaoseUpdate,
@@ -265,6 +266,8 @@ class JiaoseService:
             
             db.execute(text(query), params)
             db.commit()
+            # 原生 SQL 不触发 ORM 事件，角色/权限变更后需显式使权限缓存失效
+            permission_cache.invalidate(db)
         
         return await JiaoseService.get_jiaose_by_id(db, jiaose_id)
 
@@ -282,6 +285,7 @@ class JiaoseService:
             "updated_at": datetime.now()
         })
         db.commit()
+        permission_cache.invalidate(db)
 
     @staticmethod
     async def get_jiaose_user_count(db: Session, jiaose_id: str) -> int:
@@ -321,6 +325,7 @@ class JiaoseService:
         })
 
         db.commit()
+        permission_cache.invalidate(db)
         return await JiaoseService.get_jiaose_by_id(db, jiaose_id)
 
     @staticmethod
@@ -390,3 +395,4 @@ class JiaoseService:
                 })
 
         db.commit()
+        permission_cache.invalidate(db)
@@ -6,6 +6,7 @@ from typing import List, Optional
 from datetime import datetime
 from sqlalchemy.orm import Session
 from sqlalchemy import text
+from core.security.permission_cache import permission_cache
 from schemas.yonghu_guanli.quanxian_schemas import (
     QuanxianCreate,
     QuanxianUpdate,
@@ -322,6 +323,8 @@ class QuanxianService:
             
             db.execute(text(query), params)
             db.commit()
+            # 原生 SQL 不触发 ORM 事件，角色/权限变更后需显式使权限缓存失效
+            permission_cache.invalidate(db)
         
         return await QuanxianService.get_quanxian_by_id(db, quanxian_id)
 
@@ -339,6 +342,7 @@ class QuanxianService:
             "updated_at": datetime.now()
         })
         db.commit()
+        permission_cache.invalidate(db)
 
     @staticmethod
     async def get_quanxian_role_count(db: Session, quanxian_id: str) -> int:
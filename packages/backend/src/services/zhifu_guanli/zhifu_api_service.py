@@ -1,6 +1,8 @@
 """
 第三方支付API服务
 集成微信支付和支付宝
+
+支付客户端从进程内注册表获取（见 zhifu_kehuduan_registry.py），不再每次解密配置、创建客户端。
 """
 from typing import Optional, Dict, Any
 from sqlalchemy.orm import Session
@@ -9,10 +11,7 @@ from datetime import datetime, timedelta
 import logging
 
 from models.zhifu_guanli import ZhifuDingdan
-from services.zhifu_guanli.zhifu_peizhi_service import ZhifuPeizhiService
-from utils.payment.weixin_pay import WeixinPayUtil
-from utils.payment.weixin_pay_sandbox import WeixinPaySandboxUtil
-from utils.payment.alipay import AlipayUtil
+from services.zhifu_guanli.zhifu_kehuduan_registry import ZhifuKehuduan, zhifu_kehuduan_registry
 from core.events import publish, EventNames
 
 logger = logging.getLogger(__name__)
@@ -22,7 +21,6 @@ class ZhifuApiService:
     
     def __init__(self, db: Session):
         self.db = db
-        self.peizhi_service = ZhifuPeizhiService(db)
     
     def create_payment(
         self,
@@ -31,7 +29,8 @@ class ZhifuApiService:
         zhifu_fangshi: str,
         openid: Optional[str] = None,
         return_url: Optional[str] = None,
-        quit_url: Optional[str] = None
+        quit_url: Optional[str] = None,
+        zhifu_peizhi_id: Optional[str] = None
     ) -> Dict[str, Any]:
         """
         创建第三方支付订单
@@ -43,6 +42,7 @@ class ZhifuApiService:
             openid: 微信用户openid（JSAPI支付必填）
             return_url: 支付成功返回URL（支付宝必填）
             quit_url: 支付取消返回URL（支付宝可选）
+            zhifu_peizhi_id: 指定使用的支付配置ID，为空时使用该平台的启用配置
         
         Returns:
             支付参数字典
@@ -63,16 +63,19 @@ class ZhifuApiService:
                 detail=f"订单状态为{dingdan.zhifu_zhuangtai}，无法发起支付"
             )
         
-        # 获取支付配置
-        peizhi = self.peizhi_service.get_active_config_by_type(zhifu_pingtai)
-        if not peizhi:
+        # 获取支付客户端
+        if zhifu_peizhi_id:
+            kehuduan = zhifu_kehuduan_registry.get(self.db, zhifu_peizhi_id)
+        else:
+            kehuduan = zhifu_kehuduan_registry.get_active(self.db, zhifu_pingtai)
+        if not kehuduan:
             raise HTTPException(
                 status_code=404,
                 detail=f"未找到启用的{zhifu_pingtai}支付配置"
             )
         
         # 更新订单信息
-        dingdan.zhifu_peizhi_id = peizhi.id
+        dingdan.zhifu_peizhi_id = kehuduan.peizhi.id
         dingdan.zhifu_pingtai = zhifu_pingtai
         dingdan.zhifu_fangshi_mingxi = zhifu_fangshi
         dingdan.zhifu_zhuangtai = "paying"
@@ -81,9 +84,9 @@ class ZhifuApiService:
         try:
             # 根据支付平台调用不同的支付接口
             if zhifu_pingtai == "weixin":
-                result = self._create_weixin_payment(dingdan, peizhi, zhifu_fangshi, openid)
+                result = self._create_weixin_payment(dingdan, kehuduan, zhifu_fangshi, openid)
             elif zhifu_pingtai == "zhifubao":
-                result = self._create_alipay_payment(dingdan, peizhi, zhifu_fangshi, return_url, quit_url)
+                result = self._create_alipay_payment(dingdan, kehuduan, zhifu_fangshi, return_url, quit_url)
             else:
                 raise HTTPException(status_code=400, detail="不支持的支付平台")
             
@@ -128,28 +131,23 @@ class ZhifuApiService:
     @staticmethod
     def _create_weixin_payment(
         dingdan: ZhifuDingdan,
-        peizhi: Any,
+        kehuduan: ZhifuKehuduan,
         zhifu_fangshi: str,
         openid: Optional[str] = None
     ) -> Dict[str, Any]:
         """创建微信支付订单"""
         # 检查是否为沙箱环境
-        is_sandbox = peizhi.huanjing == "shachang"
+        is_sandbox = kehuduan.is_sandbox
 
         # 订单参数
         out_trade_no = dingdan.dingdan_bianhao
         description = dingdan.dingdan_mingcheng
         amount = int(float(dingdan.yingfu_jine) * 100)  # 转换为分
 
-        if is_sandbox:
-            # 使用沙箱环境工具类 (API v2)
-            weixin_pay = WeixinPaySandboxUtil(
-                appid=peizhi.weixin_appid,
-                mch_id=peizhi.weixin_shanghu_hao,
-                api_key=peizhi.weixin_api_v3_miyao,  # 沙箱环境使用API密钥
-                notify_url=peizhi.tongzhi_url
-            )
+        # 沙箱环境为 API v2 工具类，正式环境为 API v3 工具类
+        weixin_pay = kehuduan.weixin()
 
+        if is_sandbox:
             # 沙箱环境目前只支持Native支付
             if zhifu_fangshi != "native":
                 raise HTTPException(
@@ -166,16 +164,6 @@ class ZhifuApiService:
                 spbill_create_ip="127.0.0.1"
             )
         else:
-            # 使用正式环境工具类 (API v3)
-            weixin_pay = WeixinPayUtil(
-                appid=peizhi.weixin_appid,
-                mchid=peizhi.weixin_shanghu_hao,
-                private_key=peizhi.weixin_shanghu_siyao,
-                cert_serial_no=peizhi.weixin_zhengshu_xuliehao,
-                apiv3_key=peizhi.weixin_api_v3_miyao,
-                notify_url=peizhi.tongzhi_url
-            )
-
             # 根据支付方式调用不同的接口
             if zhifu_fangshi == "jsapi":
                 if not openid:
@@ -197,32 +185,13 @@ class ZhifuApiService:
     @staticmethod
     def _create_alipay_payment(
         dingdan: ZhifuDingdan,
-        peizhi: Any,
+        kehuduan: ZhifuKehuduan,
         zhifu_fangshi: str,
         return_url: Optional[str] = None,
         quit_url: Optional[str] = None
     ) -> Dict[str, Any]:
         """创建支付宝订单"""
-        # 初始化支付宝工具
-        # 判断是否为沙箱环境
-        is_sandbox = peizhi.huanjing == "shachang"
-
-        # 调试日志
-        logger.info("_create_alipay_payment 收到的配置:")
-        logger.info(f"  APPID: {peizhi.zhifubao_appid}")
-        logger.info(f"  私钥: {peizhi.zhifubao_shanghu_siyao[:50] if peizhi.zhifubao_shanghu_siyao else 'None'}")
-        logger.info(f"  公钥: {peizhi.zhifubao_zhifubao_gongyao[:50] if peizhi.zhifubao_zhifubao_gongyao else 'None'}")
-        logger.info(f"  网关: {peizhi.zhifubao_wangguan}")
-
-        alipay = AlipayUtil(
-            appid=peizhi.zhifubao_appid,
-            app_private_key=peizhi.zhifubao_shanghu_siyao,
-            alipay_public_key=peizhi.zhifubao_zhifubao_gongyao,
-            notify_url=peizhi.tongzhi_url,
-            return_url=return_url,
-            debug=is_sandbox,
-            gateway_url=peizhi.zhifubao_wangguan  # 使用配置的网关地址
-        )
+        alipay = kehuduan.alipay()
         
         # 订单参数
         out_trade_no = dingdan.dingdan_bianhao
@@ -243,7 +212,7 @@ class ZhifuApiService:
             # 手机网页支付
             if not return_url:
                 raise HTTPException(status_code=400, detail="手机网页支付需要提供return_url")
-            return alipay.create_wap_pay(out_trade_no, subject, total_amount, body, quit_url)
+            return alipay.create_wap_pay(out_trade_no, subject, total_amount, body, return_url=return_url, quit_url=quit_url)
 
         elif zhifu_fangshi == "app":
             # APP支付
@@ -266,15 +235,15 @@ class ZhifuApiService:
         if not dingdan.zhifu_peizhi_id or not dingdan.zhifu_pingtai:
             raise HTTPException(status_code=400, detail="订单未发起第三方支付")
         
-        # 获取支付配置
-        peizhi = self.peizhi_service.get_zhifu_peizhi_detail(dingdan.zhifu_peizhi_id)
+        # 获取支付客户端
+        kehuduan = zhifu_kehuduan_registry.get(self.db, dingdan.zhifu_peizhi_id)
         
         try:
             # 根据支付平台查询订单
             if dingdan.zhifu_pingtai == "weixin":
-                result = self._query_weixin_payment(dingdan, peizhi)
+                result = self._query_weixin_payment(dingdan, kehuduan)
             elif dingdan.zhifu_pingtai == "zhifubao":
-                result = self._query_alipay_payment(dingdan, peizhi)
+                result = self._query_alipay_payment(dingdan, kehuduan)
             else:
                 raise HTTPException(status_code=400, detail="不支持的支付平台")
             
@@ -298,47 +267,14 @@ class ZhifuApiService:
             )
     
     @staticmethod
-    def _query_weixin_payment(dingdan: ZhifuDingdan, peizhi: Any) -> Dict[str, Any]:
+    def _query_weixin_payment(dingdan: ZhifuDingdan, kehuduan: ZhifuKehuduan) -> Dict[str, Any]:
         """查询微信支付订单"""
-        # 检查是否为沙箱环境
-        is_sandbox = peizhi.huanjing == "shachang"
-
-        if is_sandbox:
-            # 使用沙箱环境工具类
-            weixin_pay = WeixinPaySandboxUtil(
-                appid=peizhi.weixin_appid,
-                mch_id=peizhi.weixin_shanghu_hao,
-                api_key=peizhi.weixin_api_v3_miyao,
-                notify_url=peizhi.tongzhi_url
-            )
-        else:
-            # 使用正式环境工具类
-            weixin_pay = WeixinPayUtil(
-                appid=peizhi.weixin_appid,
-                mchid=peizhi.weixin_shanghu_hao,
-                private_key=peizhi.weixin_shanghu_siyao,
-                cert_serial_no=peizhi.weixin_zhengshu_xuliehao,
-                apiv3_key=peizhi.weixin_api_v3_miyao,
-                notify_url=peizhi.tongzhi_url
-            )
-
-        return weixin_pay.query_order(dingdan.dingdan_bianhao)
+        return kehuduan.weixin().query_order(dingdan.dingdan_bianhao)
     
     @staticmethod
-    def _query_alipay_payment(dingdan: ZhifuDingdan, peizhi: Any) -> Dict[str, Any]:
+    def _query_alipay_payment(dingdan: ZhifuDingdan, kehuduan: ZhifuKehuduan) -> Dict[str, Any]:
         """查询支付宝订单"""
-        is_sandbox = peizhi.huanjing == "shachang"
-
-        alipay = AlipayUtil(
-            appid=peizhi.zhifubao_appid,
-            app_private_key=peizhi.zhifubao_shanghu_siyao,
-            alipay_public_key=peizhi.zhifubao_zhifubao_gongyao,
-            notify_url=peizhi.tongzhi_url,
-            debug=is_sandbox,
-            gateway_url=peizhi.zhifubao_wangguan
-        )
-        
-        return alipay.query_order(dingdan.dingdan_bianhao)
+        return kehuduan.alipay().query_order(dingdan.dingdan_bianhao)
     
     def close_payment(self, dingdan_id: str) -> Dict[str, Any]:
         """关闭支付订单"""
@@ -363,15 +299,15 @@ class ZhifuApiService:
             self.db.commit()
             return {"message": "订单已关闭"}
         
-        # 获取支付配置
-        peizhi = self.peizhi_service.get_zhifu_peizhi_detail(dingdan.zhifu_peizhi_id)
+        # 获取支付客户端
+        kehuduan = zhifu_kehuduan_registry.get(self.db, dingdan.zhifu_peizhi_id)
         
         try:
             # 根据支付平台关闭订单
             if dingdan.zhifu_pingtai == "weixin":
-                result = self._close_weixin_payment(dingdan, peizhi)
+                result = self._close_weixin_payment(dingdan, kehuduan)
             elif dingdan.zhifu_pingtai == "zhifubao":
-                result = self._close_alipay_payment(dingdan, peizhi)
+                result = self._close_alipay_payment(dingdan, kehuduan)
             else:
                 raise HTTPException(status_code=400, detail="不支持的支付平台")
             
@@ -388,44 +324,11 @@ class ZhifuApiService:
             )
     
     @staticmethod
-    def _close_weixin_payment(dingdan: ZhifuDingdan, peizhi: Any) -> Dict[str, Any]:
+    def _close_weixin_payment(dingdan: ZhifuDingdan, kehuduan: ZhifuKehuduan) -> Dict[str, Any]:
         """关闭微信支付订单"""
-        # 检查是否为沙箱环境
-        is_sandbox = peizhi.huanjing == "shachang"
-
-        if is_sandbox:
-            # 使用沙箱环境工具类
-            weixin_pay = WeixinPaySandboxUtil(
-                appid=peizhi.weixin_appid,
-                mch_id=peizhi.weixin_shanghu_hao,
-                api_key=peizhi.weixin_api_v3_miyao,
-                notify_url=peizhi.tongzhi_url
-            )
-        else:
-            # 使用正式环境工具类
-            weixin_pay = WeixinPayUtil(
-                appid=peizhi.weixin_appid,
-                mchid=peizhi.weixin_shanghu_hao,
-                private_key=peizhi.weixin_shanghu_siyao,
-                cert_serial_no=peizhi.weixin_zhengshu_xuliehao,
-                apiv3_key=peizhi.weixin_api_v3_miyao,
-                notify_url=peizhi.tongzhi_url
-            )
-
-        return weixin_pay.close_order(dingdan.dingdan_bianhao)
+        return kehuduan.weixin().close_order(dingdan.dingdan_bianhao)
     
     @staticmethod
-    def _close_alipay_payment(dingdan: ZhifuDingdan, peizhi: Any) -> Dict[str, Any]:
+    def _close_alipay_payment(dingdan: ZhifuDingdan, kehuduan: ZhifuKehuduan) -> Dict[str, Any]:
         """关闭支付宝订单"""
-        is_sandbox = peizhi.huanjing == "shachang"
-
-        alipay = AlipayUtil(
-            appid=peizhi.zhifubao_appid,
-            app_private_key=peizhi.zhifubao_shanghu_siyao,
-            alipay_public_key=peizhi.zhifubao_zhifubao_gongyao,
-            notify_url=peizhi.tongzhi_url,
-            debug=is_sandbox,
-            gateway_url=peizhi.zhifubao_wangguan
-        )
-        
-        return alipay.close_order(dingdan.dingdan_bianhao)
+        return kehuduan.alipay().close_order(dingdan.dingdan_bianhao)
@@ -1,9 +1,10 @@
 """
 支付订单管理服务
 """
-from typing import Optional, List
+from typing import Any, Dict, Optional, List, Union
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from sqlalchemy import or_, func, desc
+from sqlalchemy import or_, func, select
 from fastapi import HTTPException
 from datetime import datetime
 from decimal import Decimal
@@ -20,12 +21,14 @@ from schemas.zhifu_guanli.zhifu_dingdan_schemas import (
     ZhifuDingdanListParams,
     ZhifuDingdanStatistics
 )
+from core.batch_loader import load_by_ids, load_by_ids_async
 from core.events import publish, EventNames
+from core.pagination import count_total, count_total_async, paginate, split_page
 
 class ZhifuDingdanService:
     """支付订单管理服务类"""
     
-    def __init__(self, db: Session):
+    def __init__(self, db: Union[Session, AsyncSession]):
         self.db = db
     
     def create_zhifu_dingdan(self, dingdan_data: ZhifuDingdanCreate, created_by: str) -> ZhifuDingdanResponse:
@@ -133,14 +136,15 @@ class ZhifuDingdanService:
         
         return ZhifuDingdanResponse.model_validate(zhifu_dingdan)
     
-    def get_zhifu_dingdan_list(self, params: ZhifuDingdanListParams) -> ZhifuDingdanListResponse:
-        """获取支付订单列表"""
-        query = self.db.query(ZhifuDingdan).filter(ZhifuDingdan.is_deleted == "N")
+    @staticmethod
+    def _build_list_conditions(params: ZhifuDingdanListParams) -> List[Any]:
+        """构建支付订单列表的过滤条件（同步/异步查询共用）"""
+        conditions = [ZhifuDingdan.is_deleted == "N"]
 
         # 搜索条件
         if params.search:
             search_pattern = f"%{params.search}%"
-            query = query.filter(
+            conditions.append(
                 or_(
                     ZhifuDingdan.dingdan_bianhao.ilike(search_pattern),
                     ZhifuDingdan.dingdan_mingcheng.ilike(search_pattern)
@@ -149,79 +153,139 @@ class ZhifuDingdanService:
 
         # 筛选条件
         if params.hetong_id:
-            query = query.filter(ZhifuDingdan.hetong_id == params.hetong_id)
+            conditions.append(ZhifuDingdan.hetong_id == params.hetong_id)
 
         if params.kehu_id:
-            query = query.filter(ZhifuDingdan.kehu_id == params.kehu_id)
+            conditions.append(ZhifuDingdan.kehu_id == params.kehu_id)
 
         if params.zhifu_leixing:
-            query = query.filter(ZhifuDingdan.zhifu_leixing == params.zhifu_leixing)
+            conditions.append(ZhifuDingdan.zhifu_leixing == params.zhifu_leixing)
 
         if params.zhifu_zhuangtai:
-            query = query.filter(ZhifuDingdan.zhifu_zhuangtai == params.zhifu_zhuangtai)
+            conditions.append(ZhifuDingdan.zhifu_zhuangtai == params.zhifu_zhuangtai)
 
         if params.start_date:
-            query = query.filter(ZhifuDingdan.chuangjian_shijian >= params.start_date)
+            conditions.append(ZhifuDingdan.chuangjian_shijian >= params.start_date)
 
         if params.end_date:
-            query = query.filter(ZhifuDingdan.chuangjian_shijian <= params.end_date)
+            conditions.append(ZhifuDingdan.chuangjian_shijian <= params.end_date)
 
-        # 总数
-        total = query.count()
+        return conditions
+
+    @staticmethod
+    def _build_list_item(
+        item: ZhifuDingdan,
+        hetong: Optional[Hetong],
+        kehu: Optional[Kehu],
+        yifang_zhuti: Optional[HetongYifangZhuti]
+    ) -> ZhifuDingdanResponse:
+        """组装包含合同、客户、乙方主体信息的列表项"""
+        item_dict = ZhifuDingdanResponse.model_validate(item).model_dump()
+
+        if hetong:
+            item_dict['hetong_bianhao'] = hetong.hetong_bianhao
+            item_dict['hetong_mingcheng'] = hetong.hetong_mingcheng
+
+        if kehu:
+            item_dict['kehu_mingcheng'] = kehu.gongsi_mingcheng
+
+        if yifang_zhuti:
+            item_dict['yifang_zhuti_mingcheng'] = yifang_zhuti.zhuti_mingcheng
+            item_dict['yifang_kaihuhang'] = yifang_zhuti.kaihuhang
+            item_dict['yifang_yinhangzhanghu'] = yifang_zhuti.yinhangzhanghu
 
-        # 分页和排序
-        items = query.order_by(desc(ZhifuDingdan.chuangjian_shijian)).offset(
-            (params.page - 1) * params.size
-        ).limit(params.size).all()
+        return ZhifuDingdanResponse(**item_dict)
 
-        # 构建响应，包含合同和客户信息
-        response_items = []
+    @staticmethod
+    def _resolve_yifang_zhuti_ids(items: List[ZhifuDingdan], hetong_map: Dict[str, Hetong]) -> Dict[str, Optional[str]]:
+        """确定每个订单的乙方主体ID：优先使用订单的乙方主体ID，如果没有则使用合同的乙方主体ID"""
+        yifang_zhuti_ids = {}
         for item in items:
-            item_dict = ZhifuDingdanResponse.model_validate(item).model_dump()
-
-            # 查询关联的合同信息
-            hetong = self.db.query(Hetong).filter(
-                Hetong.id == item.hetong_id,
-                Hetong.is_deleted == "N"
-            ).first()
-
-            if hetong:
-                item_dict['hetong_bianhao'] = hetong.hetong_bianhao
-                item_dict['hetong_mingcheng'] = hetong.hetong_mingcheng
-
-            # 查询关联的客户信息
-            kehu = self.db.query(Kehu).filter(
-                Kehu.id == item.kehu_id,
-                Kehu.is_deleted == "N"
-            ).first()
-
-            if kehu:
-                item_dict['kehu_mingcheng'] = kehu.gongsi_mingcheng
-
-            # 查询关联的乙方主体信息（收款方）
-            # 优先使用订单的乙方主体ID，如果没有则使用合同的乙方主体ID
-            yifang_zhuti_id = item.yifang_zhuti_id
-            if not yifang_zhuti_id and hetong:
-                yifang_zhuti_id = hetong.yifang_zhuti_id
-
-            if yifang_zhuti_id:
-                yifang_zhuti = self.db.query(HetongYifangZhuti).filter(
-                    HetongYifangZhuti.id == yifang_zhuti_id,
-                    HetongYifangZhuti.is_deleted == "N"
-                ).first()
-
-                if yifang_zhuti:
-                    item_dict['yifang_zhuti_mingcheng'] = yifang_zhuti.zhuti_mingcheng
-                    item_dict['yifang_kaihuhang'] = yifang_zhuti.kaihuhang
-                    item_dict['yifang_yinhangzhanghu'] = yifang_zhuti.yinhangzhanghu
-
-            response_items.append(ZhifuDingdanResponse(**item_dict))
+            hetong = hetong_map.get(item.hetong_id)
+            yifang_zhuti_ids[item.id] = item.yifang_zhuti_id or (hetong.yifang_zhuti_id if hetong else None)
+        return yifang_zhuti_ids
+
+    def _build_list_items(
+        self,
+        items: List[ZhifuDingdan],
+        hetong_map: Dict[str, Hetong],
+        kehu_map: Dict[str, Kehu],
+        yifang_zhuti_ids: Dict[str, Optional[str]],
+        yifang_zhuti_map: Dict[str, HetongYifangZhuti]
+    ) -> List[ZhifuDingdanResponse]:
+        """用批量加载的关联数据组装列表项"""
+        return [
+            self._build_list_item(
+                item,
+                hetong_map.get(item.hetong_id),
+                kehu_map.get(item.kehu_id),
+                yifang_zhuti_map.get(yifang_zhuti_ids[item.id])
+            )
+            for item in items
+        ]
+
+    def get_zhifu_dingdan_list(self, params: ZhifuDingdanListParams) -> ZhifuDingdanListResponse:
+        """获取支付订单列表"""
+        conditions = self._build_list_conditions(params)
+
+        # 总数
+        total = count_total(self.db, ZhifuDingdan, conditions, params.total_mode, filtered=len(conditions) > 1)
+
+        # 分页和排序（传入游标时按 keyset 翻页）
+        query = paginate(
+            self.db.query(ZhifuDingdan).filter(*conditions),
+            ZhifuDingdan.chuangjian_shijian, ZhifuDingdan.id,
+            params.page, params.size, params.cursor
+        )
+        items, next_cursor = split_page(query.all(), params.size, "chuangjian_shijian")
+
+        # 关联数据按页批量加载，每种实体一次 IN 查询
+        hetong_map = load_by_ids(self.db, Hetong, (item.hetong_id for item in items))
+        kehu_map = load_by_ids(self.db, Kehu, (item.kehu_id for item in items))
+        yifang_zhuti_ids = self._resolve_yifang_zhuti_ids(items, hetong_map)
+        yifang_zhuti_map = load_by_ids(self.db, HetongYifangZhuti, yifang_zhuti_ids.values())
+
+        response_items = self._build_list_items(items, hetong_map, kehu_map, yifang_zhuti_ids, yifang_zhuti_map)
+
+        return ZhifuDingdanListResponse(
+            total=total,
+            items=response_items,
+            page=params.page,
+            size=params.size,
+            next_cursor=next_cursor
+        )
+
+    async def get_zhifu_dingdan_list_async(self, params: ZhifuDingdanListParams) -> ZhifuDingdanListResponse:
+        """获取支付订单列表（异步版本，self.db 需为 AsyncSession）"""
+        conditions = self._build_list_conditions(params)
+
+        # 总数
+        total = await count_total_async(self.db, ZhifuDingdan, conditions, params.total_mode, filtered=len(conditions) > 1)
+
+        # 分页和排序（传入游标时按 keyset 翻页）
+        result = await self.db.execute(
+            paginate(
+                select(ZhifuDingdan).where(*conditions),
+                ZhifuDingdan.chuangjian_shijian, ZhifuDingdan.id,
+                params.page, params.size, params.cursor
+            )
+        )
+        items, next_cursor = split_page(result.scalars().all(), params.size, "chuangjian_shijian")
+
+        # 关联数据按页批量加载，每种实体一次 IN 查询
+        hetong_map = await load_by_ids_async(self.db, Hetong, (item.hetong_id for item in items))
+        kehu_map = await load_by_ids_async(self.db, Kehu, (item.kehu_id for item in items))
+        yifang_zhuti_ids = self._resolve_yifang_zhuti_ids(items, hetong_map)
+        yifang_zhuti_map = await load_by_ids_async(self.db, HetongYifangZhuti, yifang_zhuti_ids.values())
+
+        response_items = self._build_list_items(items, hetong_map, kehu_map, yifang_zhuti_ids, yifang_zhuti_map)
 
         return ZhifuDingdanListResponse(
             total=total,
             items=response_items,
             page=params.page,
-            size=params.size
+            size=params.size,
+            next_cursor=next_cursor
         )
     
     def get_zhifu_dingdan_statistics(self) -> ZhifuDingdanStatistics:
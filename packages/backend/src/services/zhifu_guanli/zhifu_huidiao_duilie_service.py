@@ -0,0 +1,280 @@
+"""
+支付回调处理队列服务
+
+支付平台的回调通知在接口中只做验签和入队（见 api/api_v1/endpoints/zhifu_guanli/zhifu_huidiao.py），
+订单状态与支付流水由后台 worker 批量更新（见 zhifu_huidiao_worker.py）：
+- 入队按幂等键（平台:商户订单号:第三方订单号）去重，支付平台重复通知直接返回成功，不会重复处理
+- 每批领取一组待处理回调（PostgreSQL 下 FOR UPDATE SKIP LOCKED，多个 worker 互不阻塞），
+  订单、已有流水各一次查询加载，流水编号按批预留（core/sequence），全部更新后提交一次
+- 批量处理出错时回滚并逐条重新处理，出错的回调计入重试次数，超过 ZHIFU_HUIDIAO_MAX_RETRIES 后标记失败
+"""
+import json
+import logging
+import uuid
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from core.config import settings
+from core.events import EventNames, publish
+from core.sequence import reserve_daily_codes
+from models.zhifu_guanli.zhifu_dingdan import ZhifuDingdan
+from models.zhifu_guanli.zhifu_huidiao_renwu import ZhifuHuidiaoRenwu
+from models.zhifu_guanli.zhifu_huidiao_rizhi import ZhifuHuidiaoRizhi
+from models.zhifu_guanli.zhifu_liushui import ZhifuLiushui
+
+logger = logging.getLogger(__name__)
+
+_UPSERT_INSERTS = {
+    "postgresql": pg_insert,
+    "sqlite": sqlite_insert,
+}
+
+# (事件名称, 事件数据)，提交后发布
+Event = Tuple[str, Dict[str, Any]]
+
+def build_mideng_jian(zhifu_pingtai: str, dingdan_hao: str, disanfang_dingdan_hao: Optional[str]) -> str:
+    """回调幂等键"""
+    return f"{zhifu_pingtai}:{dingdan_hao}:{disanfang_dingdan_hao or ''}"
+
+class ZhifuHuidiaoDuilieService:
+    """支付回调处理队列服务"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def enqueue(
+        self,
+        huidiao_rizhi_id: str,
+        zhifu_pingtai: str,
+        dingdan_hao: str,
+        disanfang_dingdan_hao: Optional[str],
+        jiaoyi_jine: Decimal,
+        zhifu_zhanghu: Optional[str],
+        huidiao_shuju: Dict[str, Any]
+    ) -> bool:
+        """
+        签名验证通过的支付成功通知入队，与回调日志的验签结果一起提交
+
+        Returns:
+            bool: 是否新入队，False 表示重复通知（回调日志直接记为处理成功）
+        """
+        now = datetime.now()
+        row = {
+            "id": str(uuid.uuid4()),
+            "mideng_jian": build_mideng_jian(zhifu_pingtai, dingdan_hao, disanfang_dingdan_hao),
+            "huidiao_rizhi_id": huidiao_rizhi_id,
+            "zhifu_pingtai": zhifu_pingtai,
+            "dingdan_hao": dingdan_hao,
+            "disanfang_dingdan_hao": disanfang_dingdan_hao,
+            "jiaoyi_jine": jiaoyi_jine,
+            "zhifu_zhanghu": zhifu_zhanghu,
+            "huidiao_shuju": json.dumps(huidiao_shuju, ensure_ascii=False),
+            "jieshou_shijian": now,
+        }
+
+        table = ZhifuHuidiaoRenwu.__table__
+        connection = self.db.connection()
+        insert = _UPSERT_INSERTS.get(connection.dialect.name)
+        if insert is None:
+            # 其他数据库不支持 ON CONFLICT，先查询再写入
+            exists = connection.execute(
+                select(table.c.id).where(table.c.mideng_jian == row["mideng_jian"])
+            ).first()
+            if exists is None:
+                connection.execute(table.insert(), row)
+            queued = exists is None
+        else:
+            queued = connection.execute(
+                insert(table).on_conflict_do_nothing(index_elements=["mideng_jian"]).returning(table.c.id),
+                row
+            ).first() is not None
+
+        values = {"qianming_yanzheng": "chenggong"}
+        if not queued:
+            values.update(chuli_zhuangtai="chenggong", chuli_jieguo="重复通知，已忽略", chuli_shijian=now)
+        self.db.execute(update(ZhifuHuidiaoRizhi).where(ZhifuHuidiaoRizhi.id == huidiao_rizhi_id).values(**values))
+        self.db.commit()
+        return queued
+
+    def process_batch(self, limit: int) -> int:
+        """
+        领取并处理一批待处理回调
+
+        Returns:
+            int: 领取的回调数量
+        """
+        renwu_list = self.db.execute(
+            select(ZhifuHuidiaoRenwu)
+            .where(ZhifuHuidiaoRenwu.renwu_zhuangtai == "daichuli")
+            .order_by(ZhifuHuidiaoRenwu.created_at, ZhifuHuidiaoRenwu.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        ).scalars().all()
+        if not renwu_list:
+            self.db.commit()
+            return 0
+
+        renwu_ids = [renwu.id for renwu in renwu_list]
+        try:
+            events = self._apply(renwu_list)
+            self.db.commit()
+        except Exception as e:
+            self.db.rollback()
+            logger.warning(f"支付回调批量处理失败，逐条重新处理: {e}")
+            events = []
+            for renwu_id in renwu_ids:
+                events.extend(self._process_one(renwu_id))
+
+        for event_name, payload in events:
+            publish(event_name, payload)
+        return len(renwu_ids)
+
+    def _process_one(self, renwu_id: str) -> List[Event]:
+        renwu = self.db.execute(
+            select(ZhifuHuidiaoRenwu)
+            .where(ZhifuHuidiaoRenwu.id == renwu_id, ZhifuHuidiaoRenwu.renwu_zhuangtai == "daichuli")
+            .with_for_update(skip_locked=True)
+        ).scalar_one_or_none()
+        if renwu is None:
+            self.db.commit()
+            return []
+        try:
+            events = self._apply([renwu])
+            self.db.commit()
+            return events
+        except Exception as e:
+            self.db.rollback()
+            error = str(e)
+            logger.error(f"支付回调处理失败: {renwu_id}, {error}")
+
+        renwu = self.db.get(ZhifuHuidiaoRenwu, renwu_id)
+        renwu.chongshi_cishu += 1
+        renwu.cuowu_xinxi = error
+        if renwu.chongshi_cishu >= settings.ZHIFU_HUIDIAO_MAX_RETRIES:
+            renwu.renwu_zhuangtai = "shibai"
+            renwu.chuli_shijian = datetime.now()
+            self._finish_logs([(renwu.huidiao_rizhi_id, "shibai", error)], renwu.chuli_shijian)
+        self.db.commit()
+        return []
+
+    def _apply(self, renwu_list: Sequence[ZhifuHuidiaoRenwu]) -> List[Event]:
+        """更新订单状态、写入支付流水（不提交），返回提交后需要发布的事件"""
+        now = datetime.now()
+        dingdan_map = {
+            dingdan.dingdan_bianhao: dingdan
+            for dingdan in self.db.execute(
+                select(ZhifuDingdan).where(
+                    ZhifuDingdan.dingdan_bianhao.in_({renwu.dingdan_hao for renwu in renwu_list}),
+                    ZhifuDingdan.is_deleted == "N"
+                )
+            ).scalars()
+        }
+        disanfang_list = {renwu.disanfang_dingdan_hao for renwu in renwu_list if renwu.disanfang_dingdan_hao}
+        existing_liushui = {
+            tuple(row) for row in self.db.execute(
+                select(ZhifuLiushui.zhifu_dingdan_id, ZhifuLiushui.disanfang_dingdan_hao).where(
+                    ZhifuLiushui.disanfang_dingdan_hao.in_(disanfang_list),
+                    ZhifuLiushui.is_deleted == "N"
+                )
+            )
+        } if disanfang_list else set()
+
+        events: List[Event] = []
+        log_results = []
+        new_liushui: List[Tuple[ZhifuHuidiaoRenwu, ZhifuDingdan]] = []
+        for renwu in renwu_list:
+            renwu.chuli_shijian = now
+            dingdan = dingdan_map.get(renwu.dingdan_hao)
+            if dingdan is None:
+                # 订单不存在不会因重试而改变，直接标记失败
+                renwu.renwu_zhuangtai = "shibai"
+                renwu.cuowu_xinxi = f"订单不存在: {renwu.dingdan_hao}"
+                log_results.append((renwu.huidiao_rizhi_id, "shibai", renwu.cuowu_xinxi))
+                continue
+
+            if dingdan.zhifu_zhuangtai != "paid":
+                dingdan.zhifu_zhuangtai = "paid"
+                dingdan.zhifu_shijian = renwu.jieshou_shijian
+                dingdan.shifu_jine = dingdan.yingfu_jine
+                events.append((EventNames.PAYMENT_SUCCESS, {
+                    "zhifu_dingdan_id": dingdan.id,
+                    "hetong_id": dingdan.hetong_id,
+                    "kehu_id": dingdan.kehu_id,
+                    "dingdan_jine": float(dingdan.dingdan_jine),
+                    "zhifu_shijian": dingdan.zhifu_shijian.isoformat(),
+                    "updated_by": "system"
+                }))
+            if renwu.disanfang_dingdan_hao:
+                dingdan.disanfang_dingdan_hao = renwu.disanfang_dingdan_hao
+            dingdan.huidiao_zhuangtai = "success"
+            dingdan.huidiao_shijian = renwu.jieshou_shijian
+
+            # 同一订单、同一第三方订单号只记一笔流水（不同幂等键的通知可能对应同一笔交易）
+            liushui_key = (dingdan.id, renwu.disanfang_dingdan_hao)
+            if liushui_key not in existing_liushui:
+                existing_liushui.add(liushui_key)
+                new_liushui.append((renwu, dingdan))
+
+            renwu.renwu_zhuangtai = "chenggong"
+            renwu.cuowu_xinxi = None
+            log_results.append((renwu.huidiao_rizhi_id, "chenggong", renwu.huidiao_shuju))
+
+        if new_liushui:
+            codes = reserve_daily_codes(self.db, ZhifuLiushui.liushui_bianhao, "LS", len(new_liushui), width=6)
+            for (renwu, dingdan), code in zip(new_liushui, codes):
+                liushui = self._build_liushui(renwu, dingdan, code)
+                self.db.add(liushui)
+                events.append((EventNames.FINANCIAL_RECORD_CREATED, {
+                    "liushui_id": liushui.id,
+                    "zhifu_dingdan_id": dingdan.id,
+                    "kehu_id": dingdan.kehu_id,
+                    "liushui_leixing": liushui.liushui_leixing,
+                    "jiaoyijine": float(liushui.jiaoyijine),
+                    "zhifu_fangshi": liushui.zhifu_fangshi,
+                    "created_by": "system"
+                }))
+
+        self._finish_logs(log_results, now)
+        return events
+
+    @staticmethod
+    def _build_liushui(renwu: ZhifuHuidiaoRenwu, dingdan: ZhifuDingdan, liushui_bianhao: str) -> ZhifuLiushui:
+        # 订单实付金额已按应付金额更新，流水不再累加到订单
+        return ZhifuLiushui(
+            id=str(uuid.uuid4()),
+            zhifu_dingdan_id=dingdan.id,
+            kehu_id=dingdan.kehu_id,
+            guanlian_leixing="zhifu_dingdan",
+            liushui_bianhao=liushui_bianhao,
+            liushui_leixing="income",
+            jiaoyijine=renwu.jiaoyi_jine,
+            shouxufei=Decimal("0.00"),  # 手续费通常在结算时扣除
+            shiji_shouru=renwu.jiaoyi_jine,
+            zhifu_fangshi=renwu.zhifu_pingtai,
+            zhifu_zhanghu=renwu.zhifu_zhanghu or "",
+            disanfang_liushui_hao=renwu.disanfang_dingdan_hao,
+            disanfang_dingdan_hao=renwu.disanfang_dingdan_hao,
+            jiaoyishijian=renwu.jieshou_shijian,
+            liushui_zhuangtai="success",
+            duizhang_zhuangtai="pending",
+            created_by="system"
+        )
+
+    def _finish_logs(self, results: List[Tuple[Optional[str], str, Optional[str]]], now: datetime) -> None:
+        """按主键批量更新回调日志的处理结果"""
+        rows = []
+        for rizhi_id, zhuangtai, xinxi in results:
+            if rizhi_id is None:
+                continue
+            row = {"id": rizhi_id, "chuli_zhuangtai": zhuangtai, "chuli_shijian": now,
+                   "chuli_jieguo": None, "cuowu_xinxi": None}
+            row["chuli_jieguo" if zhuangtai == "chenggong" else "cuowu_xinxi"] = xinxi
+            rows.append(row)
+        if rows:
+            self.db.execute(update(ZhifuHuidiaoRizhi), rows)
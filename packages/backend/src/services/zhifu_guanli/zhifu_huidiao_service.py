@@ -2,11 +2,11 @@
 支付回调日志服务类
 """
 from sqlalchemy.orm import Session
-from sqlalchemy import desc
 from typing import Optional, Dict, Any
 from datetime import datetime
 import json
 
+from core.pagination import TOTAL_MODE_EXACT, count_total, paginate, split_page
 from models.zhifu_guanli.zhifu_huidiao_rizhi import ZhifuHuidiaoRizhi
 from schemas.zhifu_guanli.zhifu_huidiao_schemas import (
     ZhifuHuidiaoRizhiResponse,
@@ -145,7 +145,9 @@ class ZhifuHuidiaoService:
         huidiao_leixing: Optional[str] = None,
         zhifu_pingtai: Optional[str] = None,
         qianming_yanzheng: Optional[str] = None,
-        chuli_zhuangtai: Optional[str] = None
+        chuli_zhuangtai: Optional[str] = None,
+        cursor: Optional[str] = None,
+        total_mode: str = TOTAL_MODE_EXACT
     ) -> ZhifuHuidiaoRizhiListResponse:
         """
         获取回调日志列表
@@ -157,35 +159,41 @@ class ZhifuHuidiaoService:
             zhifu_pingtai: 支付平台筛选
             qianming_yanzheng: 签名验证筛选
             chuli_zhuangtai: 处理状态筛选
+            cursor: 分页游标（上一页返回的 next_cursor，传入后忽略页码）
+            total_mode: 总数模式，exact-精确计数，estimate-统计信息估算
         
         Returns:
             回调日志列表响应
         """
-        query = self.db.query(ZhifuHuidiaoRizhi)
+        conditions = []
         
         # 筛选条件
         if huidiao_leixing:
-            query = query.filter(ZhifuHuidiaoRizhi.huidiao_leixing == huidiao_leixing)
+            conditions.append(ZhifuHuidiaoRizhi.huidiao_leixing == huidiao_leixing)
         if zhifu_pingtai:
-            query = query.filter(ZhifuHuidiaoRizhi.zhifu_pingtai == zhifu_pingtai)
+            conditions.append(ZhifuHuidiaoRizhi.zhifu_pingtai == zhifu_pingtai)
         if qianming_yanzheng:
-            query = query.filter(ZhifuHuidiaoRizhi.qianming_yanzheng == qianming_yanzheng)
+            conditions.append(ZhifuHuidiaoRizhi.qianming_yanzheng == qianming_yanzheng)
         if chuli_zhuangtai:
-            query = query.filter(ZhifuHuidiaoRizhi.chuli_zhuangtai == chuli_zhuangtai)
+            conditions.append(ZhifuHuidiaoRizhi.chuli_zhuangtai == chuli_zhuangtai)
         
         # 总数
-        total = query.count()
+        total = count_total(self.db, ZhifuHuidiaoRizhi, conditions, total_mode, filtered=bool(conditions))
         
-        # 分页
-        logs = query.order_by(desc(ZhifuHuidiaoRizhi.created_at)).offset(
-            (page - 1) * page_size
-        ).limit(page_size).all()
+        # 分页（传入游标时按 keyset 翻页）
+        query = paginate(
+            self.db.query(ZhifuHuidiaoRizhi).filter(*conditions),
+            ZhifuHuidiaoRizhi.created_at, ZhifuHuidiaoRizhi.id,
+            page, page_size, cursor
+        )
+        logs, next_cursor = split_page(query.all(), page_size, "created_at")
         
         return ZhifuHuidiaoRizhiListResponse(
             total=total,
             items=[ZhifuHuidiaoRizhiResponse.from_orm(log) for log in logs],
             page=page,
-            page_size=page_size
+            page_size=page_size,
+            next_cursor=next_cursor
         )
     
     def get_log_by_id(self, log_id: str) -> Optional[ZhifuHuidiaoRizhi]:
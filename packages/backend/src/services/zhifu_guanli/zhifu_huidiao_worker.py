@@ -0,0 +1,76 @@
+"""
+支付回调处理 worker
+
+应用启动后作为后台任务运行，循环处理支付回调队列（见 zhifu_huidiao_duilie_service.py）：
+- 回调接口入队后唤醒本进程的 worker 立即处理；其他进程的 worker 按 ZHIFU_HUIDIAO_POLL_SECONDS 轮询
+- 每批最多 ZHIFU_HUIDIAO_BATCH_SIZE 条，队列积压时连续处理直到取空
+
+多个进程同时运行时由数据库行锁（SKIP LOCKED）分配回调，不需要 Redis。
+"""
+import asyncio
+import logging
+from typing import Callable
+
+from sqlalchemy.orm import Session
+
+from core.config import settings
+from core.database import SessionLocal
+from services.zhifu_guanli.zhifu_huidiao_duilie_service import ZhifuHuidiaoDuilieService
+
+logger = logging.getLogger(__name__)
+
+class ZhifuHuidiaoWorker:
+    """支付回调处理 worker"""
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session] = SessionLocal,
+        poll_seconds: float = settings.ZHIFU_HUIDIAO_POLL_SECONDS,
+        batch_size: int = settings.ZHIFU_HUIDIAO_BATCH_SIZE
+    ):
+        self.session_factory = session_factory
+        self.poll_seconds = poll_seconds
+        self.batch_size = batch_size
+        self._wakeup = asyncio.Event()
+
+    def wake(self) -> None:
+        """有新回调入队时唤醒 worker"""
+        self._wakeup.set()
+
+    def drain(self) -> int:
+        """
+        连续处理待处理回调直到队列取空
+
+        Returns:
+            int: 处理的回调数量
+        """
+        total = 0
+        while True:
+            db = self.session_factory()
+            try:
+                count = ZhifuHuidiaoDuilieService(db).process_batch(self.batch_size)
+            finally:
+                db.close()
+            total += count
+            if count < self.batch_size:
+                return total
+
+    async def run(self) -> None:
+        """处理队列直到任务被取消"""
+        while True:
+            self._wakeup.clear()
+            try:
+                # 数据库操作为同步调用，放到线程中执行避免阻塞事件循环
+                processed = await asyncio.to_thread(self.drain)
+                if processed:
+                    logger.info(f"支付回调处理完成: {processed} 条")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.exception("支付回调处理失败: %s", e)
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+
+huidiao_worker = ZhifuHuidiaoWorker()
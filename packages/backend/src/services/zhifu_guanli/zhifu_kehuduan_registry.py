@@ -0,0 +1,202 @@
+"""
+支付客户端注册表
+
+发起支付、查询/关闭订单、退款以及每一次支付回调验签都需要支付配置对应的客户端。
+原来每次都重新查询支付配置、AES 解密私钥与密钥，并重新创建 WeixinPayUtil / AlipayUtil
+（解析 PEM 密钥，微信支付还会下载平台证书）。注册表在进程内保存解密后的配置与已初始化的客户端：
+- 按 (配置ID, updated_at) 缓存：使用前只按主键查询配置的 updated_at（不读取密钥字段），
+  配置被修改（包括在其他进程中修改）后 updated_at 变化，下次使用时重建
+- 本进程修改、删除配置后由 ZhifuPeizhiService 主动失效
+- 应用启动时预热所有启用的配置
+- 解密后的密钥只保存在进程内存中，不写回数据库、不写入日志
+"""
+import logging
+import threading
+from datetime import datetime
+from typing import Callable, Dict, Optional, Union
+
+from fastapi import HTTPException
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from models.zhifu_guanli import ZhifuPeizhi
+from schemas.zhifu_guanli.zhifu_peizhi_schemas import ZhifuPeizhiDetail
+from services.zhifu_guanli.zhifu_peizhi_service import ZhifuPeizhiService
+from utils.payment.alipay import AlipayUtil
+from utils.payment.weixin_pay import WeixinPayUtil
+from utils.payment.weixin_pay_sandbox import WeixinPaySandboxUtil
+
+logger = logging.getLogger(__name__)
+
+# 需要创建客户端的配置类型（银行汇款配置没有客户端）
+KEHUDUAN_LEIXING = ("weixin", "zhifubao")
+
+class ZhifuKehuduan:
+    """一个支付配置的解密配置与客户端（客户端首次使用时创建）"""
+
+    def __init__(self, peizhi: ZhifuPeizhiDetail):
+        self.peizhi = peizhi
+        self.updated_at: datetime = peizhi.updated_at
+        self._lock = threading.Lock()
+        self._weixin: Optional[Union[WeixinPayUtil, WeixinPaySandboxUtil]] = None
+        self._alipay: Optional[AlipayUtil] = None
+
+    @property
+    def is_sandbox(self) -> bool:
+        return self.peizhi.huanjing == "shachang"
+
+    def weixin(self) -> Union[WeixinPayUtil, WeixinPaySandboxUtil]:
+        """微信支付客户端（沙箱环境为 API v2 工具类，正式环境为 API v3 工具类）"""
+        if self._weixin is None:
+            with self._lock:
+                if self._weixin is None:
+                    peizhi = self.peizhi
+                    if self.is_sandbox:
+                        self._weixin = WeixinPaySandboxUtil(
+                            appid=peizhi.weixin_appid,
+                            mch_id=peizhi.weixin_shanghu_hao,
+                            api_key=peizhi.weixin_api_v3_miyao,  # 沙箱环境使用API密钥
+                            notify_url=peizhi.tongzhi_url
+                        )
+                    else:
+                        self._weixin = WeixinPayUtil({
+                            'weixin_appid': peizhi.weixin_appid,
+                            'weixin_shanghu_hao': peizhi.weixin_shanghu_hao,
+                            'weixin_shanghu_siyao': peizhi.weixin_shanghu_siyao,
+                            'weixin_zhengshu_xuliehao': peizhi.weixin_zhengshu_xuliehao,
+                            'weixin_api_v3_miyao': peizhi.weixin_api_v3_miyao,
+                            'tongzhi_url': peizhi.tongzhi_url
+                        })
+        return self._weixin
+
+    def alipay(self) -> AlipayUtil:
+        """支付宝客户端（同步返回地址在调用时传入）"""
+        if self._alipay is None:
+            with self._lock:
+                if self._alipay is None:
+                    peizhi = self.peizhi
+                    self._alipay = AlipayUtil(
+                        appid=peizhi.zhifubao_appid,
+                        app_private_key=peizhi.zhifubao_shanghu_siyao,
+                        alipay_public_key=peizhi.zhifubao_zhifubao_gongyao,
+                        notify_url=peizhi.tongzhi_url,
+                        debug=self.is_sandbox,
+                        gateway_url=peizhi.zhifubao_wangguan
+                    )
+        return self._alipay
+
+    def prepare(self) -> None:
+        """创建该配置类型对应的客户端（预热时调用）"""
+        if self.peizhi.peizhi_leixing == "weixin":
+            self.weixin()
+        elif self.peizhi.peizhi_leixing == "zhifubao":
+            self.alipay()
+
+class ZhifuKehuduanRegistry:
+    """进程内支付客户端注册表"""
+
+    def __init__(self):
+        # 配置ID -> 客户端（版本为创建时配置的 updated_at）
+        self._entries: Dict[str, ZhifuKehuduan] = {}
+        self._lock = threading.Lock()
+
+    def get(self, db: Session, peizhi_id: str) -> ZhifuKehuduan:
+        """
+        获取指定配置的客户端
+
+        Raises:
+            HTTPException: 配置不存在或已删除
+        """
+        updated_at = db.scalar(
+            select(ZhifuPeizhi.updated_at).where(
+                ZhifuPeizhi.id == peizhi_id,
+                ZhifuPeizhi.is_deleted == "N"
+            )
+        )
+        if updated_at is None:
+            self.invalidate(peizhi_id)
+            raise HTTPException(status_code=404, detail="支付配置不存在")
+        return self._get_version(db, peizhi_id, updated_at)
+
+    def get_active(self, db: Session, peizhi_leixing: str) -> Optional[ZhifuKehuduan]:
+        """获取指定类型最新创建的启用配置的客户端，没有启用的配置时返回 None"""
+        row = db.execute(
+            select(ZhifuPeizhi.id, ZhifuPeizhi.updated_at).where(
+                ZhifuPeizhi.peizhi_leixing == peizhi_leixing,
+                ZhifuPeizhi.zhuangtai == "qiyong",
+                ZhifuPeizhi.is_deleted == "N"
+            ).order_by(ZhifuPeizhi.created_at.desc()).limit(1)
+        ).first()
+        if row is None:
+            return None
+        return self._get_version(db, row.id, row.updated_at)
+
+    def _get_version(self, db: Session, peizhi_id: str, updated_at: datetime) -> ZhifuKehuduan:
+        entry = self._entries.get(peizhi_id)
+        if entry is not None and entry.updated_at == updated_at:
+            return entry
+        return self._load(db, peizhi_id)
+
+    def _load(self, db: Session, peizhi_id: str) -> ZhifuKehuduan:
+        """读取并解密配置，替换旧版本"""
+        peizhi = db.scalar(
+            select(ZhifuPeizhi).where(
+                ZhifuPeizhi.id == peizhi_id,
+                ZhifuPeizhi.is_deleted == "N"
+            )
+        )
+        if peizhi is None:
+            self.invalidate(peizhi_id)
+            raise HTTPException(status_code=404, detail="支付配置不存在")
+        entry = ZhifuKehuduan(ZhifuPeizhiService._to_detail(peizhi))
+        with self._lock:
+            current = self._entries.get(peizhi_id)
+            # 并发加载同一版本时保留先完成的一个，避免重复创建客户端
+            if current is not None and current.updated_at == entry.updated_at:
+                return current
+            self._entries[peizhi_id] = entry
+        logger.info(f"支付客户端已加载: {peizhi.peizhi_mingcheng}")
+        return entry
+
+    def invalidate(self, peizhi_id: Optional[str] = None) -> None:
+        """淘汰指定配置（为空时淘汰全部）的客户端"""
+        with self._lock:
+            if peizhi_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(peizhi_id, None)
+
+    def warm(self, session_factory: Callable[[], Session]) -> int:
+        """
+        加载所有启用的支付配置并创建客户端（应用启动时调用）
+
+        单个配置无效（如密钥格式错误）只记录警告，使用时再报错。
+
+        Returns:
+            int: 预热成功的配置数量
+        """
+        db = session_factory()
+        try:
+            peizhi_ids = db.scalars(
+                select(ZhifuPeizhi.id).where(
+                    ZhifuPeizhi.peizhi_leixing.in_(KEHUDUAN_LEIXING),
+                    ZhifuPeizhi.zhuangtai == "qiyong",
+                    ZhifuPeizhi.is_deleted == "N"
+                )
+            ).all()
+            warmed = 0
+            for peizhi_id in peizhi_ids:
+                try:
+                    self._load(db, peizhi_id).prepare()
+                    warmed += 1
+                except Exception as e:
+                    self.invalidate(peizhi_id)
+                    logger.warning(f"支付客户端预热失败: {peizhi_id}, {e}")
+            return warmed
+        finally:
+            db.close()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+zhifu_kehuduan_registry = ZhifuKehuduanRegistry()
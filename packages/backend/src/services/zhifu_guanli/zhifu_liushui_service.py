@@ -1,9 +1,9 @@
 """
 支付流水管理服务
 """
-from typing import Optional, List
+from typing import Any, Optional, List
 from sqlalchemy.orm import Session
-from sqlalchemy import or_, desc
+from sqlalchemy import or_
 from fastapi import HTTPException
 from datetime import datetime
 from decimal import Decimal
@@ -19,6 +19,7 @@ from schemas.zhifu_guanli.zhifu_liushui_schemas import (
     ZhifuLiushuiListParams
 )
 from core.events import publish, EventNames
+from core.pagination import count_total, paginate, split_page
 
 class ZhifuLiushuiService:
     """支付流水管理服务类"""
@@ -133,14 +134,15 @@ class ZhifuLiushuiService:
         
         return ZhifuLiushuiResponse.model_validate(zhifu_liushui)
     
-    def get_zhifu_liushui_list(self, params: ZhifuLiushuiListParams) -> ZhifuLiushuiListResponse:
-        """获取支付流水列表"""
-        query = self.db.query(ZhifuLiushui).filter(ZhifuLiushui.is_deleted == "N")
+    @staticmethod
+    def _build_list_conditions(params: ZhifuLiushuiListParams) -> List[Any]:
+        """构建支付流水列表的过滤条件"""
+        conditions = [ZhifuLiushui.is_deleted == "N"]
         
         # 搜索条件
         if params.search:
             search_pattern = f"%{params.search}%"
-            query = query.filter(
+            conditions.append(
                 or_(
                     ZhifuLiushui.liushui_bianhao.ilike(search_pattern),
                     ZhifuLiushui.disanfang_liushui_hao.ilike(search_pattern),
@@ -150,42 +152,52 @@ class ZhifuLiushuiService:
         
         # 筛选条件
         if params.zhifu_dingdan_id:
-            query = query.filter(ZhifuLiushui.zhifu_dingdan_id == params.zhifu_dingdan_id)
+            conditions.append(ZhifuLiushui.zhifu_dingdan_id == params.zhifu_dingdan_id)
         
         if params.kehu_id:
-            query = query.filter(ZhifuLiushui.kehu_id == params.kehu_id)
+            conditions.append(ZhifuLiushui.kehu_id == params.kehu_id)
         
         if params.liushui_leixing:
-            query = query.filter(ZhifuLiushui.liushui_leixing == params.liushui_leixing)
+            conditions.append(ZhifuLiushui.liushui_leixing == params.liushui_leixing)
         
         if params.zhifu_fangshi:
-            query = query.filter(ZhifuLiushui.zhifu_fangshi == params.zhifu_fangshi)
+            conditions.append(ZhifuLiushui.zhifu_fangshi == params.zhifu_fangshi)
         
         if params.liushui_zhuangtai:
-            query = query.filter(ZhifuLiushui.liushui_zhuangtai == params.liushui_zhuangtai)
+            conditions.append(ZhifuLiushui.liushui_zhuangtai == params.liushui_zhuangtai)
         
         if params.duizhang_zhuangtai:
-            query = query.filter(ZhifuLiushui.duizhang_zhuangtai == params.duizhang_zhuangtai)
+            conditions.append(ZhifuLiushui.duizhang_zhuangtai == params.duizhang_zhuangtai)
         
         if params.start_date:
-            query = query.filter(ZhifuLiushui.jiaoyishijian >= params.start_date)
+            conditions.append(ZhifuLiushui.jiaoyishijian >= params.start_date)
         
         if params.end_date:
-            query = query.filter(ZhifuLiushui.jiaoyishijian <= params.end_date)
+            conditions.append(ZhifuLiushui.jiaoyishijian <= params.end_date)
+        
+        return conditions
+    
+    def get_zhifu_liushui_list(self, params: ZhifuLiushuiListParams) -> ZhifuLiushuiListResponse:
+        """获取支付流水列表"""
+        conditions = self._build_list_conditions(params)
         
         # 总数
-        total = query.count()
+        total = count_total(self.db, ZhifuLiushui, conditions, params.total_mode, filtered=len(conditions) > 1)
         
-        # 分页和排序
-        items = query.order_by(desc(ZhifuLiushui.jiaoyishijian)).offset(
-            (params.page - 1) * params.size
-        ).limit(params.size).all()
+        # 分页和排序（传入游标时按 keyset 翻页）
+        query = paginate(
+            self.db.query(ZhifuLiushui).filter(*conditions),
+            ZhifuLiushui.jiaoyishijian, ZhifuLiushui.id,
+            params.page, params.size, params.cursor
+        )
+        items, next_cursor = split_page(query.all(), params.size, "jiaoyishijian")
         
         return ZhifuLiushuiListResponse(
             total=total,
             items=[ZhifuLiushuiResponse.model_validate(item) for item in items],
             page=params.page,
-            size=params.size
+            size=params.size,
+            next_cursor=next_cursor
         )
     
     def confirm_liushui_by_finance(self, liushui_id: str, confirmed_by: str) -> ZhifuLiushuiResponse:
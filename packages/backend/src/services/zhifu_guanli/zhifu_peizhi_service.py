@@ -55,6 +55,13 @@ class ZhifuPeizhiService:
                     pass
         return decrypted_data
     
+    @staticmethod
+    def _invalidate_kehuduan(peizhi_id: str) -> None:
+        """淘汰本进程中该配置的支付客户端（其他进程在下次使用时按 updated_at 发现变化）"""
+        # 延迟导入避免循环依赖
+        from services.zhifu_guanli.zhifu_kehuduan_registry import zhifu_kehuduan_registry
+        zhifu_kehuduan_registry.invalidate(peizhi_id)
+    
     @staticmethod
     def _mask_sensitive_data(value: Optional[str]) -> Optional[str]:
         """脱敏显示敏感数据"""
@@ -207,6 +214,7 @@ class ZhifuPeizhiService:
         
         self.db.commit()
         self.db.refresh(zhifu_peizhi)
+        self._invalidate_kehuduan(peizhi_id)
         
         return self._to_response(zhifu_peizhi)
     
@@ -228,6 +236,7 @@ class ZhifuPeizhiService:
         zhifu_peizhi.updated_at = datetime.now()
         
         self.db.commit()
+        self._invalidate_kehuduan(peizhi_id)
         
         return True
     
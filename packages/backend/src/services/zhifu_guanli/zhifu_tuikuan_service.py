@@ -17,9 +17,8 @@ from schemas.zhifu_guanli.zhifu_tuikuan_schemas import (
     ZhifuTuikuanResponse,
     ZhifuTuikuanListResponse
 )
-from services.zhifu_guanli.zhifu_peizhi_service import ZhifuPeizhiService
-from utils.payment.weixin_pay import WeixinPayUtil
-from utils.payment.alipay import AlipayUtil, ALIPAY_SDK_AVAILABLE
+from services.zhifu_guanli.zhifu_kehuduan_registry import zhifu_kehuduan_registry
+from utils.payment.alipay import ALIPAY_SDK_AVAILABLE
 from core.events import publish, EventNames
 
 logger = logging.getLogger(__name__)
@@ -29,7 +28,6 @@ class ZhifuTuikuanService:
     
     def __init__(self, db: Session):
         self.db = db
-        self.peizhi_service = ZhifuPeizhiService(db)
     
     def create_refund(
         self,
@@ -149,18 +147,14 @@ class ZhifuTuikuanService:
         tuikuan: ZhifuTuikuan
     ) -> Dict[str, Any]:
         """处理微信退款"""
-        # 获取支付配置
-        peizhi = self.peizhi_service.get_detail(dingdan.zhifu_peizhi_id)
-        
-        # 初始化微信支付工具
-        weixin_util = WeixinPayUtil({
-            'weixin_appid': peizhi.weixin_appid,
-            'weixin_shanghu_hao': peizhi.weixin_shanghu_hao,
-            'weixin_shanghu_siyao': peizhi.weixin_shanghu_siyao,
-            'weixin_zhengshu_xuliehao': peizhi.weixin_zhengshu_xuliehao,
-            'weixin_api_v3_miyao': peizhi.weixin_api_v3_miyao,
-            'tongzhi_url': peizhi.tongzhi_url
-        })
+        # 获取支付客户端
+        kehuduan = zhifu_kehuduan_registry.get(self.db, dingdan.zhifu_peizhi_id)
+        if kehuduan.is_sandbox:
+            return {
+                'success': False,
+                'message': '微信支付沙箱环境不支持退款'
+            }
+        weixin_util = kehuduan.weixin()
         
         # 调用退款接口
         result = weixin_util.refund(
@@ -197,17 +191,8 @@ class ZhifuTuikuanService:
                 'message': '支付宝SDK不可用'
             }
         
-        # 获取支付配置
-        peizhi = self.peizhi_service.get_detail(dingdan.zhifu_peizhi_id)
-        
-        # 初始化支付宝工具
-        alipay_util = AlipayUtil(
-            appid=peizhi.zhifubao_appid,
-            app_private_key=peizhi.zhifubao_shanghu_siyao,
-            alipay_public_key=peizhi.zhifubao_zhifubao_gongyao,
-            notify_url=peizhi.tongzhi_url,
-            debug=peizhi.huanjing == 'shachang'
-        )
+        # 获取支付客户端
+        alipay_util = zhifu_kehuduan_registry.get(self.db, dingdan.zhifu_peizhi_id).alipay()
         
         # 调用退款接口
         result = alipay_util.refund(
@@ -2,6 +2,7 @@
 微信支付工具类
 封装微信支付API v3的常用功能
 """
+import threading
 from typing import Dict, Any, Optional
 from wechatpayv3 import WeChatPay, WeChatPayType
 import logging
@@ -32,19 +33,35 @@ class WeixinPayUtil:
         self.apiv3_key = config.get('weixin_api_v3_miyao')
         self.notify_url = config.get('tongzhi_url')
         
-        # 初始化微信支付客户端
-        self.wxpay = None
-        self._init_client()
+        # 各支付类型的客户端（创建时解析私钥、下载平台证书，创建后复用）
+        self._clients: Dict[WeChatPayType, WeChatPay] = {}
+        self._lock = threading.Lock()
+        # 默认客户端，用于查询、关闭、退款与回调验签
+        self.wxpay = self._init_client()
     
-    def _init_client(self, pay_type: WeChatPayType = WeChatPayType.JSAPI):
+    def _init_client(self, pay_type: WeChatPayType = WeChatPayType.JSAPI) -> WeChatPay:
         """
-        初始化微信支付客户端
+        获取指定支付类型的微信支付客户端（首次使用时初始化）
+        
+        实例可能被多个请求共享（见支付客户端注册表），各支付类型使用各自的客户端，不修改共享状态
         
         Args:
             pay_type: 支付类型
         """
+        client = self._clients.get(pay_type)
+        if client is not None:
+            return client
+        with self._lock:
+            client = self._clients.get(pay_type)
+            if client is None:
+                client = self._create_client(pay_type)
+                self._clients[pay_type] = client
+        return client
+    
+    def _create_client(self, pay_type: WeChatPayType) -> WeChatPay:
+        """创建微信支付客户端"""
         try:
-            self.wxpay = WeChatPay(
+            client = WeChatPay(
                 wechatpay_type=pay_type,
                 mchid=self.mchid,
                 private_key=self.private_key,
@@ -54,6 +71,7 @@ class WeixinPayUtil:
                 notify_url=self.notify_url
             )
             logger.info(f"微信支付客户端初始化成功，商户号：{self.mchid}")
+            return client
         except Exception as e:
             logger.error(f"微信支付客户端初始化失败：{str(e)}")
             raise
@@ -80,9 +98,7 @@ class WeixinPayUtil:
             支付参数字典
         """
         try:
-            self._init_client(WeChatPayType.JSAPI)
-            
-            code, message = self.wxpay.pay(
+            code, message = self._init_client(WeChatPayType.JSAPI).pay(
                 description=description,
                 out_trade_no=out_trade_no,
                 amount={'total': amount, 'currency': 'CNY'},
@@ -131,9 +147,7 @@ class WeixinPayUtil:
             支付参数字典
         """
         try:
-            self._init_client(WeChatPayType.APP)
-            
-            code, message = self.wxpay.pay(
+            code, message = self._init_client(WeChatPayType.APP).pay(
                 description=description,
                 out_trade_no=out_trade_no,
                 amount={'total': amount, 'currency': 'CNY'},
@@ -183,9 +197,7 @@ class WeixinPayUtil:
             支付参数字典
         """
         try:
-            self._init_client(WeChatPayType.H5)
-            
-            code, message = self.wxpay.pay(
+            code, message = self._init_client(WeChatPayType.H5).pay(
                 description=description,
                 out_trade_no=out_trade_no,
                 amount={'total': amount, 'currency': 'CNY'},
@@ -234,9 +246,7 @@ class WeixinPayUtil:
             支付参数字典（包含二维码链接）
         """
         try:
-            self._init_client(WeChatPayType.NATIVE)
-            
-            code, message = self.wxpay.pay(
+            code, message = self._init_client(WeChatPayType.NATIVE).pay(
                 description=description,
                 out_trade_no=out_trade_no,
                 amount={'total': amount, 'currency': 'CNY'},
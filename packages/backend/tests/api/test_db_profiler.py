@@ -0,0 +1,67 @@
+"""SQL 语句统计中间件测试"""
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from src.core.database import get_db
+from src.core.db_profiler import normalize_statement
+from src.core.middleware import DBProfilerMiddleware
+from src.core.monitoring import MetricsCollector
+
+
+def _build_app(db_session: Session, **options) -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(DBProfilerMiddleware, **options)
+
+    def override_get_db():
+        yield db_session
+
+    @app.get("/items/{item_id}")
+    def get_item(item_id: int, db: Session = Depends(get_db)):
+        for i in range(item_id):
+            db.execute(text("SELECT :value"), {"value": i}).scalar()
+        return {"ok": True}
+
+    app.dependency_overrides[get_db] = override_get_db
+    return app
+
+
+def test_normalize_statement_groups_same_shape():
+    """参数值与 IN 列表长度不同的同类语句归为同一形状"""
+    a = normalize_statement("SELECT * FROM kehu WHERE id IN (?, ?) AND zhuangtai = 'active' LIMIT 10")
+    b = normalize_statement("SELECT *  FROM kehu\nWHERE id IN (?, ?, ?) AND zhuangtai = 'inactive' LIMIT 20")
+    assert a == b
+
+
+def test_db_profiler_headers_and_budget_warning(db_session, caplog):
+    """响应头返回 SQL 条数，超出路由预算与重复语句时记录警告"""
+    app = _build_app(
+        db_session,
+        default_budget=100,
+        route_budgets={"GET /items/{item_id}": 3},
+        repeated_threshold=4,
+    )
+    client = TestClient(app)
+
+    response = client.get("/items/2")
+    assert response.headers["X-DB-Queries"] == "2"
+    assert response.headers["X-DB-Time"].endswith("ms")
+    assert "SQL 语句超出预算" not in caplog.text
+
+    response = client.get("/items/5")
+    assert response.headers["X-DB-Queries"] == "5"
+    assert "SQL 语句超出预算" in caplog.text
+    assert "疑似 N+1 查询" in caplog.text
+
+
+def test_db_metrics_prometheus_format():
+    """SQL 统计按路由模板导出为 Prometheus 指标"""
+    collector = MetricsCollector()
+    collector.record_db_queries("GET", "/items/{item_id}", 2, 1.5, budget_exceeded=False, repeated=False)
+    collector.record_db_queries("GET", "/items/{item_id}", 5, 3.0, budget_exceeded=True, repeated=True)
+
+    output = collector.to_prometheus_format()
+    assert 'db_queries_total{method="GET",route="/items/{item_id}"} 7' in output
+    assert 'db_time_ms_total{method="GET",route="/items/{item_id}"} 4.50' in output
+    assert 'db_query_budget_exceeded_total{method="GET",route="/items/{item_id}"} 1' in output
@@ -0,0 +1,86 @@
+"""任务项 API 测试"""
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+from src.core.database import get_db
+from src.core.redis_client import redis_client
+from src.core.security import get_current_user
+from src.main import app
+from src.models import FuwuGongdan, FuwuGongdanXiangmu, Kehu
+
+
+class TestMyTaskItemsAPI:
+    """我的任务项列表"""
+
+    @pytest.fixture
+    def client(self, db_session: Session, test_user, monkeypatch) -> TestClient:
+        """组合测试客户端，当前用户固定为 test_user 并禁用 Redis"""
+        def override_get_db():
+            try:
+                yield db_session
+            finally:
+                pass
+
+        app.dependency_overrides[get_db] = override_get_db
+        app.dependency_overrides[get_current_user] = lambda: test_user
+        monkeypatch.setattr(redis_client, "_connected", False)
+        monkeypatch.setattr(redis_client, "redis", None)
+        client = TestClient(app)
+        yield client
+        app.dependency_overrides.clear()
+
+    @staticmethod
+    def _create_task_items(db_session: Session, zhixing_ren_id: str, gongdan_count: int, items_per_gongdan: int) -> None:
+        for i in range(gongdan_count):
+            kehu = Kehu(
+                gongsi_mingcheng=f"任务项测试公司{i}",
+                tongyi_shehui_xinyong_daima=f"91310000TASK{i:06d}",
+                faren_xingming="张三",
+                kehu_zhuangtai="active"
+            )
+            db_session.add(kehu)
+            db_session.flush()
+
+            gongdan = FuwuGongdan(
+                hetong_id=f"hetong-{i}",
+                kehu_id=kehu.id,
+                gongdan_bianhao=f"WO-TASK-{i}",
+                gongdan_biaoti=f"任务项测试工单{i}",
+                fuwu_leixing="daili_jizhang",
+                jihua_jieshu_shijian=datetime.now() + timedelta(days=7),
+                created_by=zhixing_ren_id
+            )
+            db_session.add(gongdan)
+            db_session.flush()
+
+            for j in range(items_per_gongdan):
+                db_session.add(FuwuGongdanXiangmu(
+                    gongdan_id=gongdan.id,
+                    xiangmu_mingcheng=f"任务项{i}-{j}",
+                    paixu=j,
+                    zhixing_ren_id=zhixing_ren_id
+                ))
+        db_session.commit()
+
+    def test_my_tasks_bounded_statement_count(self, client: TestClient, db_session: Session, sql_statements, test_user):
+        """任务项列表的 SQL 语句数与页大小无关（无 N+1）"""
+        user_id = test_user.id
+        self._create_task_items(db_session, user_id, gongdan_count=4, items_per_gongdan=5)
+        db_session.refresh(test_user)
+
+        statements = sql_statements()
+
+        response = client.get("/api/v1/task-items/my-tasks", params={"size": 20})
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["total"] == 20
+        assert len(data["items"]) == 20
+        assert all(item["gongdan"]["gongdan_bianhao"] for item in data["items"])
+        assert all(item["kehu"]["kehu_mingcheng"] for item in data["items"])
+        assert all(item["zhixing_ren"]["id"] == user_id for item in data["items"])
+        # 总数 1 条 + 分页（含工单、客户、执行人）1 条
+        assert len(statements) <= 2
@@ -4,20 +4,22 @@
 import pytest
 import uuid
 from typing import Tuple
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import StaticPool
+from sqlalchemy.pool import NullPool, StaticPool
 
 from src.models.yonghu_guanli import Yonghu, Jiaose, Quanxian
 from src.core.security import get_password_hash, create_access_token
-from src.core.database import Base, get_db
+from src.core.database import Base, get_db, get_async_db
 from src.main import app
 # 导入所有模型以确保表被创建
 from src.models import *
 
 
-# 创建测试数据库引擎
-SQLALCHEMY_DATABASE_URL = "sqlite:///:memory:"
+# 创建测试数据库引擎（共享缓存的内存数据库，异步引擎连接同一个库）
+SQLALCHEMY_DATABASE_URL = "sqlite:///file:test_db?mode=memory&cache=shared&uri=true"
+SQLALCHEMY_ASYNC_DATABASE_URL = "sqlite+aiosqlite:///file:test_db?mode=memory&cache=shared&uri=true"
 
 engine = create_engine(
     SQLALCHEMY_DATABASE_URL,
@@ -29,6 +31,16 @@ engine = create_engine(
 
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# 异步连接不跨事件循环复用；内存库由同步引擎的常驻连接保持
+async_engine = create_async_engine(SQLALCHEMY_ASYNC_DATABASE_URL, poolclass=NullPool)
+
+TestingAsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False,
+)
+
 
 def get_test_db():
     """获取测试数据库会话"""
@@ -72,10 +84,24 @@ def create_test_user() -> Tuple[dict, str]:
         db.close()
 
 
+async def get_test_async_db():
+    """获取测试异步数据库会话"""
+    async with TestingAsyncSessionLocal() as db:
+        yield db
+
+
 # 覆盖应用的数据库依赖
 app.dependency_overrides[get_db] = get_test_db
 
 
+@pytest.fixture(autouse=True)
+def override_async_db():
+    """每个测试覆盖异步数据库依赖（部分测试结束时会清空 dependency_overrides）"""
+    app.dependency_overrides[get_async_db] = get_test_async_db
+    yield
+    app.dependency_overrides.pop(get_async_db, None)
+
+
 @pytest.fixture(scope="function")
 def db_session():
     """创建测试数据库会话"""
@@ -93,6 +119,27 @@ def db_session():
         Base.metadata.drop_all(bind=engine)
 
 
+@pytest.fixture
+def sql_statements(db_session):
+    """记录执行的 SQL 语句：调用返回的函数开始记录，测试结束时移除监听"""
+    bind = db_session.get_bind()
+    listeners = []
+
+    def start():
+        statements = []
+
+        def listener(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(bind, "before_cursor_execute", listener)
+        listeners.append(listener)
+        return statements
+
+    yield start
+    for listener in listeners:
+        event.remove(bind, "before_cursor_execute", listener)
+
+
 @pytest.fixture
 def test_user(db_session):
     """创建测试用户"""
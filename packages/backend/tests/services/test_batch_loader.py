@@ -0,0 +1,23 @@
+"""列表关联数据批量加载相关测试"""
+from src.core.batch_loader import load_by_ids
+from src.models.yonghu_guanli import Jiaose
+
+
+def test_load_by_ids_single_query(db_session, sql_statements, test_role):
+    """重复、空值与不存在的主键只产生一次 IN 查询"""
+    statements = sql_statements()
+
+    result = load_by_ids(db_session, Jiaose, [test_role.id, test_role.id, None, "missing"])
+
+    assert list(result) == [test_role.id]
+    assert len(statements) == 1
+
+
+def test_load_by_ids_skips_soft_deleted(db_session, test_role):
+    """默认不加载已软删除的记录"""
+    test_role.is_deleted = "Y"
+    db_session.commit()
+
+    assert load_by_ids(db_session, Jiaose, [test_role.id]) == {}
+    assert test_role.id in load_by_ids(db_session, Jiaose, [test_role.id], include_deleted=True)
+    assert load_by_ids(db_session, Jiaose, []) == {}
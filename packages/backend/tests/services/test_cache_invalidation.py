@@ -0,0 +1,56 @@
+"""缓存标签失效相关测试"""
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from src.core.cache_decorator import cache_invalidate
+from src.core.redis_client import TAG_KEY_PREFIX, RedisClient, redis_client
+
+
+def test_key_tags_and_pattern_to_tag():
+    """缓存键按前缀生成标签，仅 "<前缀>:*" 模式可按标签删除"""
+    assert RedisClient.key_tags("xiansuo:detail:1") == ["xiansuo", "xiansuo:detail"]
+    assert RedisClient.pattern_to_tag("xiansuo:list:*") == "xiansuo:list"
+    assert RedisClient.pattern_to_tag("xiansuo:*:1") is None
+    assert RedisClient.pattern_to_tag("xiansuo*:*") is None
+
+
+@pytest.mark.asyncio
+async def test_cache_invalidate_deletes_by_tag_without_keys(monkeypatch):
+    """写操作失效缓存时按标签集合删除，不调用 KEYS/SCAN"""
+    fake_redis = MagicMock()
+    fake_redis.zrangebyscore = AsyncMock(return_value=["xiansuo:list:a", "xiansuo:list:b"])
+    fake_redis.delete = AsyncMock(side_effect=[2, 1])
+    monkeypatch.setattr(redis_client, "_connected", True)
+    monkeypatch.setattr(redis_client, "redis", fake_redis)
+
+    @cache_invalidate("xiansuo:list:*")
+    async def update():
+        return "ok"
+
+    assert await update() == "ok"
+
+    assert fake_redis.zrangebyscore.await_args.args[0] == f"{TAG_KEY_PREFIX}xiansuo:list"
+    assert fake_redis.delete.await_args_list[-1].args == (f"{TAG_KEY_PREFIX}xiansuo:list",)
+    fake_redis.keys.assert_not_called()
+    fake_redis.scan_iter.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_set_with_tags_prunes_expired_members(monkeypatch):
+    """带标签写入时按过期时间登记成员，并移除标签集合中已过期的成员"""
+    pipe = MagicMock()
+    pipe.execute = AsyncMock(return_value=[True])
+    fake_redis = MagicMock()
+    fake_redis.pipeline.return_value.__aenter__.return_value = pipe
+    monkeypatch.setattr(redis_client, "_connected", True)
+    monkeypatch.setattr(redis_client, "redis", fake_redis)
+    monkeypatch.setattr("src.core.redis_client.time.time", lambda: 1000.0)
+
+    assert await redis_client.set("xiansuo:detail:1", {"id": 1}, 60, tags=["xiansuo", "xiansuo:detail"])
+
+    tag_key = f"{TAG_KEY_PREFIX}xiansuo:detail"
+    pipe.zadd.assert_any_call(tag_key, {"xiansuo:detail:1": 1060.0})
+    pipe.zremrangebyscore.assert_any_call(tag_key, "-inf", 1000.0)
+    assert pipe.zremrangebyscore.call_count == 2
+    pipe.sadd.assert_not_called()
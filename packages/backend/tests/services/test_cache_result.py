@@ -0,0 +1,161 @@
+"""cache_result 两级缓存相关测试"""
+import asyncio
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from src.core.cache_decorator import cache_invalidate, cache_result
+from src.core import local_cache as local_cache_module
+from src.core.local_cache import LocalCache, local_cache, run_invalidation_listener
+from src.core.monitoring import metrics_collector
+from src.core.redis_client import redis_client
+
+
+@pytest.fixture
+def no_redis(monkeypatch):
+    """禁用 Redis，只使用进程内缓存"""
+    monkeypatch.setattr(redis_client, "_connected", False)
+    monkeypatch.setattr(redis_client, "redis", None)
+    local_cache.clear()
+    yield
+    local_cache.clear()
+
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_execute_once(no_redis):
+    """同一键并发未命中只执行一次原函数，之后命中进程内缓存"""
+    calls = []
+
+    @cache_result("test:single_flight", ttl=60)
+    async def load(value):
+        calls.append(value)
+        await asyncio.sleep(0.01)
+        return {"value": value}
+
+    results = await asyncio.gather(*(load(1) for _ in range(5)))
+
+    assert results == [{"value": 1}] * 5
+    assert len(calls) == 1
+
+    assert await load(1) == {"value": 1}
+    assert len(calls) == 1
+    assert metrics_collector.cache_events[("test:single_flight", "l1_hit")] >= 1
+
+
+@pytest.mark.asyncio
+async def test_invalidate_evicts_local_cache(no_redis):
+    """失效后进程内缓存被淘汰，下次调用重新执行原函数"""
+    calls = []
+
+    @cache_result("test:evict", ttl=60)
+    async def load(kehu_id):
+        calls.append(kehu_id)
+        return len(calls)
+
+    @cache_invalidate("test:evict:*")
+    async def update():
+        return None
+
+    assert await load("k1") == 1
+    assert await load("k1") == 1
+
+    await update()
+
+    assert await load("k1") == 2
+
+
+@pytest.mark.asyncio
+async def test_cancelled_leader_does_not_fail_waiters(no_redis):
+    """执行者被取消时，等待方由其中一个接替执行并共享结果"""
+    calls = []
+    started = asyncio.Event()
+
+    @cache_result("test:leader_cancel", ttl=60)
+    async def load(value):
+        calls.append(value)
+        started.set()
+        await asyncio.sleep(0.05)
+        return {"value": value}
+
+    leader = asyncio.create_task(load(1))
+    await started.wait()
+    waiters = [asyncio.create_task(load(1)) for _ in range(3)]
+    await asyncio.sleep(0)
+    leader.cancel()
+
+    assert await asyncio.gather(*waiters) == [{"value": 1}] * 3
+    assert leader.cancelled()
+    assert len(calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_invalidation_listener_resubscribes(monkeypatch):
+    """订阅中断后重新订阅，继续接收失效广播"""
+    class FakePubSub:
+        def __init__(self, messages):
+            self.messages = messages
+
+        async def subscribe(self, channel):
+            pass
+
+        async def listen(self):
+            for message in self.messages:
+                if isinstance(message, Exception):
+                    raise message
+                yield message
+            await asyncio.Event().wait()
+
+        async def close(self):
+            pass
+
+    received = asyncio.Event()
+    pubsubs = [
+        FakePubSub([ConnectionError("连接断开")]),
+        FakePubSub([{"type": "message", "data": "test:listener:*"}]),
+    ]
+
+    class FakeRedis:
+        def pubsub(self, **kwargs):
+            return pubsubs.pop(0)
+
+    def delete_pattern(pattern):
+        received.set()
+        return 0
+
+    monkeypatch.setattr(redis_client, "_connected", True)
+    monkeypatch.setattr(redis_client, "redis", FakeRedis())
+    monkeypatch.setattr(local_cache_module, "_LISTENER_RETRY_MIN_SECONDS", 0)
+    monkeypatch.setattr(local_cache, "delete_pattern", delete_pattern)
+
+    task = asyncio.create_task(run_invalidation_listener())
+    try:
+        await asyncio.wait_for(received.wait(), 1)
+    finally:
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+    assert pubsubs == []
+
+
+def test_local_cache_is_thread_safe():
+    """线程池并发读写（过期删除、LRU 淘汰、清空）不会破坏内部状态"""
+    switch_interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    cache = LocalCache(max_size=4)
+
+    def worker(n):
+        for i in range(2000):
+            key = f"k{(n + i) % 8}"
+            cache.set(key, i, 0.0001 if i % 3 else 60)
+            cache.get(key)
+            if i % 97 == 0:
+                cache.delete_pattern("k1*")
+            if i % 501 == 0:
+                cache.clear()
+
+    try:
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            list(pool.map(worker, range(8)))
+    finally:
+        sys.setswitchinterval(switch_interval)
+    assert len(cache) <= cache.max_size
@@ -0,0 +1,157 @@
+"""审核条件表达式引擎相关测试"""
+import json
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from src.models.shenhe_guanli import ShenheGuize
+from src.services.shenhe_guanli import condition_engine, rule_test_service
+from src.services.shenhe_guanli.shenhe_workflow_engine import ShenheWorkflowEngine
+from src.services.shenhe_guanli.condition_engine import (
+    Condition,
+    ConditionError,
+    compile_condition,
+    compile_rule,
+    compile_step_condition,
+    evaluate_many,
+    step_condition_applies,
+)
+
+
+def _rule(guize_leixing, chufa_tiaojian):
+    return SimpleNamespace(guize_leixing=guize_leixing, chufa_tiaojian=json.dumps(chufa_tiaojian))
+
+
+def test_expression_supports_logic_in_and_range():
+    """字符串条件支持 and/or/not、in 与 between，并可使用派生字段"""
+    condition = compile_step_condition(
+        "amount between 10000 and 50000 and (payment_type in ['cash', 'bank'] or percentage >= 10)"
+    )
+
+    assert condition({"amount": 20000, "payment_type": "cash"})
+    assert condition({"amount": 20000, "payment_type": "wechat", "original_amount": 100, "new_amount": 80})
+    assert not condition({"amount": 60000, "payment_type": "cash"})
+    assert not condition({"payment_type": "cash"})
+
+    json_condition = compile_condition({"not": {"field": "amount", "op": "gte", "value": 100}})
+    assert json_condition({"amount": 50})
+
+    with pytest.raises(ConditionError):
+        compile_step_condition("amount >=")
+
+
+def test_legacy_rule_formats_compile_to_same_semantics():
+    """阈值与前端 condition_type 配置编译为等价条件"""
+    hetong = compile_rule(_rule("hetong_jine_xiuzheng", {"thresholds": [{"percentage": 20}, {"percentage": 10}]}))
+    assert hetong({"original_amount": 1000, "new_amount": 880})
+    assert not hetong({"original_amount": 1000, "new_amount": 950})
+    assert not hetong({"original_amount": 0, "new_amount": 0})
+
+    decrease = compile_rule(_rule(
+        "hetong_jine_xiuzheng",
+        {"condition_type": "amount_decrease_value", "operator": "gte", "threshold_value": "500"}
+    ))
+    assert decrease({"original_amount": 1000, "new_amount": 400})
+    assert not decrease({"original_amount": 1000, "new_amount": 600})
+
+
+def test_evaluate_many_scores_records_against_all_rules():
+    """批量求值返回每条记录对每条规则的结果，格式错误的规则视为不触发"""
+    rules = [
+        _rule("zhifu_shenhe", {"expression": "amount >= 100000"}),
+        _rule("zhifu_shenhe", {"when": {"field": "payment_type", "op": "in", "value": ["cash"]}}),
+        _rule("zhifu_shenhe", {"expression": "amount >>= 1"}),
+    ]
+    records = [
+        {"amount": 200000, "payment_type": "bank"},
+        {"amount": 100, "payment_type": "cash"},
+    ]
+
+    assert evaluate_many(rules, records) == [
+        [True, False, False],
+        [False, True, False],
+    ]
+
+
+def test_condition_base_is_abstract():
+    """条件节点基类不能直接实例化，子类需实现全部抽象方法"""
+    with pytest.raises(TypeError):
+        Condition()
+
+    class Partial(Condition):
+        __slots__ = ()
+
+        def evaluate(self, record):
+            return True
+
+    with pytest.raises(TypeError):
+        Partial()
+
+
+def test_multiple_rules_evaluated_in_one_batch(db_session, monkeypatch):
+    """多规则测试通过 evaluate_many 一次求值，逐项说明与批量结果一致"""
+    for paixu, expression in enumerate(["amount >= 100000", "payment_type in ['cash']", "amount >>= 1"]):
+        db_session.add(ShenheGuize(
+            guize_mingcheng=f"规则{paixu}",
+            guize_leixing="zhifu_shenhe",
+            chufa_tiaojian=json.dumps({"expression": expression}),
+            shenhe_liucheng_peizhi=json.dumps({"steps": [{"step": 1, "name": "财务审核", "role": "caiwu"}]}),
+            shi_qiyong="Y",
+            paixu=paixu,
+            is_deleted="N",
+        ))
+    db_session.commit()
+    batches = []
+
+    def counting_evaluate_many(rules, records):
+        batches.append(len(rules))
+        return evaluate_many(rules, records)
+
+    monkeypatch.setattr(rule_test_service, "evaluate_many", counting_evaluate_many)
+    result = rule_test_service.RuleTestService(db_session).test_multiple_rules(
+        "zhifu_shenhe", {"amount": 200000, "payment_type": "cash"}
+    )
+
+    assert batches == [3]
+    assert [rule["rule_name"] for rule in result["triggered_rules"]] == ["规则0", "规则1"]
+    assert [detail["triggered"] for detail in result["detailed_results"]] == [True, True, False]
+    assert result["detailed_results"][0]["workflow_preview"]["total_steps"] == 1
+    assert result["detailed_results"][2]["trigger_reason"].startswith("触发条件配置错误")
+
+
+def test_step_condition_kept_when_operand_missing():
+    """步骤条件引用的字段缺失（如原金额为 0 时的 percentage）时保留该审核步骤，与旧逻辑一致"""
+    check = ShenheWorkflowEngine._check_step_condition
+    step = {"condition": "percentage >= 10"}
+    assert check(step, {"original_amount": 0, "new_amount": 0})
+    assert check(step, {"original_amount": -100, "new_amount": 50})
+    assert check(step, {"original_amount": 1000, "new_amount": 850})
+    assert not check(step, {"original_amount": 1000, "new_amount": 950})
+
+    assert check({"condition": "amount >= 50000"}, {})
+    assert not check({"condition": "amount >= 50000"}, {"amount": 100})
+    assert step_condition_applies(compile_step_condition("not (amount >= 5)"), {"amount": None})
+    assert step_condition_applies(None, {})
+
+
+def test_compile_cache_is_thread_safe(monkeypatch):
+    """多线程并发编译并淘汰缓存条目时不出错"""
+    monkeypatch.setattr(condition_engine, "_RULE_CACHE_SIZE", 8)
+    errors = []
+
+    def compile_many(offset):
+        try:
+            for i in range(2000):
+                compile_step_condition(f"amount >= {(i + offset) % 50}")
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=compile_many, args=(n,)) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert len(condition_engine._RULE_CACHE) <= 8
@@ -0,0 +1,161 @@
+"""上传文件存储相关测试"""
+import errno
+import hashlib
+import io
+import os
+import time
+
+import pytest
+from fastapi import APIRouter, FastAPI, File, HTTPException, UploadFile
+from fastapi.testclient import TestClient
+
+from src.core import file_storage as file_storage_module
+from src.core.config import settings
+from src.core.file_storage import FileStorage, UploadSizeLimitRoute
+
+
+async def _stream(*chunks):
+    for chunk in chunks:
+        yield chunk
+
+
+def _storage(tmp_path):
+    return FileStorage(root=str(tmp_path / "uploads"), temp_dir=str(tmp_path / "tmp"), chunk_size=4)
+
+
+@pytest.mark.asyncio
+async def test_save_upload_deduplicates_and_enforces_size(tmp_path):
+    """分块保存按内容去重，超出大小上限时中止且不留下临时文件"""
+    storage = _storage(tmp_path)
+    content = b"voucher-image-bytes"
+    sha256 = hashlib.sha256(content).hexdigest()
+
+    first = await storage.save_upload(UploadFile(io.BytesIO(content), filename="a.JPG"), "images", 1024)
+    second = await storage.save_upload(UploadFile(io.BytesIO(content), filename="b.jpg"), "images", 1024)
+    assert first.url == second.url == f"/uploads/images/{sha256[:2]}/{sha256}.jpg"
+    assert (first.deduplicated, second.deduplicated) == (False, True)
+    assert (tmp_path / "uploads" / "images" / sha256[:2] / f"{sha256}.jpg").read_bytes() == content
+
+    with pytest.raises(HTTPException) as exc_info:
+        await storage.save_upload(UploadFile(io.BytesIO(b"x" * 10), filename="big.pdf"), "files", 8)
+    assert exc_info.value.status_code == 400
+    assert list((tmp_path / "tmp").iterdir()) == []
+
+
+@pytest.mark.asyncio
+async def test_resumable_session_continues_from_offset(tmp_path):
+    """断点续传：偏移量不一致返回 409，中断的数据块被丢弃，接收完毕后按内容保存"""
+    storage = _storage(tmp_path)
+    content = b"0123456789abcdef"
+    session = storage.create_session("user-1", "huikuan.pdf", len(content), "application/pdf", "files", 1024)
+    session_id = session["session_id"]
+
+    assert (await storage.append_session(session_id, "user-1", 0, _stream(content[:6])))["offset"] == 6
+
+    with pytest.raises(HTTPException) as exc_info:
+        await storage.append_session(session_id, "user-1", 0, _stream(content[:6]))
+    assert exc_info.value.status_code == 409
+
+    async def interrupted():
+        yield content[6:10]
+        raise ConnectionError("客户端断开")
+
+    with pytest.raises(ConnectionError):
+        await storage.append_session(session_id, "user-1", 6, interrupted())
+    assert storage.get_session(session_id, "user-1")["offset"] == 6
+
+    with pytest.raises(HTTPException) as exc_info:
+        storage.get_session(session_id, "user-2")
+    assert exc_info.value.status_code == 404
+
+    result = await storage.append_session(session_id, "user-1", 6, _stream(content[6:12], content[12:]))
+    sha256 = hashlib.sha256(content).hexdigest()
+    assert result["completed"] is True
+    assert result["url"] == f"/uploads/files/{sha256[:2]}/{sha256}.pdf"
+    assert (tmp_path / "uploads" / "files" / sha256[:2] / f"{sha256}.pdf").read_bytes() == content
+
+    with pytest.raises(HTTPException):
+        storage.get_session(session_id, "user-1")
+
+
+@pytest.mark.asyncio
+async def test_commit_across_devices_stages_inside_upload_dir(tmp_path, monkeypatch):
+    """临时目录在其他文件系统时先复制到 UPLOAD_DIR 下暂存，再原子重命名到正式路径"""
+    storage = _storage(tmp_path)
+    temp_dir = str(tmp_path / "tmp")
+    real_replace = os.replace
+    renames = []
+
+    def replace(src, dst):
+        if src.startswith(temp_dir):
+            raise OSError(errno.EXDEV, "Invalid cross-device link")
+        renames.append(src)
+        real_replace(src, dst)
+
+    monkeypatch.setattr(file_storage_module.os, "replace", replace)
+    stored = await storage.save_stream(_stream(b"cross-", b"device"), "files", ".pdf", 1024)
+
+    assert (tmp_path / stored.url.lstrip("/")).read_bytes() == b"cross-device"
+    assert [os.path.dirname(path) for path in renames] == [str(tmp_path / "uploads" / ".staging")]
+    assert list((tmp_path / "uploads" / ".staging").iterdir()) == []
+    assert list((tmp_path / "tmp").iterdir()) == []
+
+
+@pytest.mark.asyncio
+async def test_session_expires_after_last_activity(tmp_path):
+    """会话按最后一次上传数据的时间过期，持续上传的会话不会因创建时间过早被清理"""
+    storage = _storage(tmp_path)
+    session = storage.create_session("user-1", "huikuan.pdf", 8, "application/pdf", "files", 1024)
+    session_id = session["session_id"]
+    meta_path, part_path = storage._session_paths(session_id)
+    stale = time.time() - settings.UPLOAD_SESSION_TTL - 60
+    os.utime(meta_path, (stale, stale))
+
+    result = await storage.append_session(session_id, "user-1", 0, _stream(b"0123"))
+    assert result["expires_at"] > time.time() + settings.UPLOAD_SESSION_TTL - 60
+    assert storage.purge_expired_sessions() == 0
+    assert storage.get_session(session_id, "user-1")["offset"] == 4
+
+    os.utime(meta_path, (stale, stale))
+    assert storage.purge_expired_sessions() == 1
+    assert not os.path.exists(part_path)
+
+
+def test_multipart_upload_rejected_before_body_is_parsed():
+    """multipart 请求体超过上限时在解析前返回 413，接口函数不会被调用"""
+
+    class SmallUploadRoute(UploadSizeLimitRoute):
+        max_size = 1024
+
+    called = []
+    router = APIRouter(route_class=SmallUploadRoute)
+
+    @router.post("/upload")
+    async def upload(file: UploadFile = File(...)):
+        called.append(file.filename)
+        return {"size": file.size}
+
+    app = FastAPI()
+    app.include_router(router)
+    client = TestClient(app)
+    limit = SmallUploadRoute.max_size + file_storage_module._MULTIPART_OVERHEAD
+
+    assert client.post("/upload", files={"file": ("a.pdf", b"x" * 100)}).json() == {"size": 100}
+
+    response = client.post("/upload", files={"file": ("big.pdf", b"x" * (limit + 1))})
+    assert response.status_code == 413
+
+    # 分块传输（没有 Content-Length）时边接收边计数
+    body = b"x" * (limit + 1)
+
+    def chunked():
+        for start in range(0, len(body), 8192):
+            yield body[start:start + 8192]
+
+    response = client.post(
+        "/upload",
+        content=chunked(),
+        headers={"content-type": "multipart/form-data; boundary=xyz"}
+    )
+    assert response.status_code == 413
+    assert called == ["a.pdf"]
@@ -0,0 +1,76 @@
+"""服务工单统计相关测试"""
+from datetime import datetime, timedelta
+
+from src.core.config import settings
+from src.models.fuwu_guanli import FuwuGongdan, FuwuGongdanTongji
+from src.services.fuwu_guanli.fuwu_gongdan_service import FuwuGongdanService
+from src.services.fuwu_guanli.gongdan_tongji_rollup import rebuild_gongdan_rollup
+
+
+def _add_gongdan(db_session, index, zhuangtai, zhixing_ren_id="zhixing-1", **kwargs):
+    gongdan = FuwuGongdan(
+        hetong_id="hetong-1",
+        kehu_id="kehu-1",
+        zhixing_ren_id=zhixing_ren_id,
+        gongdan_bianhao=f"WO-TEST-{index}",
+        gongdan_biaoti=f"测试工单{index}",
+        fuwu_leixing="daili_jizhang",
+        created_by="tester",
+        gongdan_zhuangtai=zhuangtai,
+        jihua_jieshu_shijian=kwargs.pop("jihua_jieshu_shijian", datetime.now() + timedelta(days=7)),
+        **kwargs
+    )
+    db_session.add(gongdan)
+    return gongdan
+
+
+def _rollup_rows(db_session):
+    return sorted(
+        (row.weidu_leixing, row.weidu_id, row.gongdan_zhuangtai, row.gongdan_shuliang, row.wancheng_tianshu_zonghe)
+        for row in db_session.query(FuwuGongdanTongji)
+        if row.gongdan_shuliang
+    )
+
+
+def test_statistics_single_query(db_session, sql_statements):
+    """统计信息由单条分组查询得出"""
+    now = datetime.now()
+    _add_gongdan(db_session, 1, "created", jihua_jieshu_shijian=now - timedelta(days=1))
+    _add_gongdan(db_session, 2, "in_progress")
+    _add_gongdan(db_session, 3, "completed", shiji_kaishi_shijian=now - timedelta(days=5), shiji_jieshu_shijian=now - timedelta(days=1))
+    _add_gongdan(db_session, 4, "completed", shiji_kaishi_shijian=now - timedelta(days=3), shiji_jieshu_shijian=now - timedelta(days=1))
+    _add_gongdan(db_session, 5, "cancelled", is_deleted="Y")
+    db_session.commit()
+
+    statements = sql_statements()
+
+    statistics = FuwuGongdanService(db_session).get_gongdan_statistics()
+
+    assert len(statements) == 1
+    assert statistics.total_count == 4
+    assert statistics.completed_count == 2
+    assert statistics.cancelled_count == 0
+    assert statistics.overdue_count == 1
+    assert statistics.avg_completion_days == 3.0
+    assert statistics.completion_rate == 50.0
+
+
+def test_rollup_refreshed_on_status_change(db_session, monkeypatch):
+    """启用汇总表后工单状态变更增量维护汇总结果，与全量重建一致"""
+    monkeypatch.setattr(settings, "FUWU_GONGDAN_ROLLUP_ENABLED", True)
+    service = FuwuGongdanService(db_session)
+    gongdan = _add_gongdan(db_session, 1, "created")
+    _add_gongdan(db_session, 2, "assigned", zhixing_ren_id="zhixing-2")
+    db_session.commit()
+
+    service.start_gongdan(gongdan.id, "operator")
+    service.complete_gongdan(gongdan.id, "已完成", None, "operator")
+
+    statistics = service.get_gongdan_statistics(zhixing_ren_id="zhixing-1")
+    assert statistics.total_count == 1
+    assert statistics.completed_count == 1
+
+    incremental = _rollup_rows(db_session)
+    rebuild_gongdan_rollup(db_session)
+    db_session.commit()
+    assert incremental == _rollup_rows(db_session)
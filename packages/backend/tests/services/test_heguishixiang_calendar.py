@@ -0,0 +1,52 @@
+"""合规日历分桶相关测试"""
+import json
+from datetime import datetime
+
+from src.core.config import settings
+from src.models.heguishixiang_guanli import HeguishixiangMoban, HeguishixiangRili, HeguishixiangShili
+from src.models.kehu_guanli.kehu import Kehu
+from src.services.heguishixiang_guanli.heguishixiang_calendar_service import HeguishixiangCalendarService
+
+
+def _bucket_ids(db_session, nian, yue, kehu_id):
+    bucket = db_session.get(HeguishixiangRili, (nian, yue, kehu_id))
+    return [entry["id"] for entry in json.loads(bucket.shixiang_liebiao)] if bucket else []
+
+
+def test_buckets_follow_instance_changes(db_session, monkeypatch):
+    """实例新增、状态变更、改期以及客户改名时只重算相关分桶，日历读取分桶结果与联表查询一致"""
+    monkeypatch.setattr(settings, "HEGUISHIXIANG_RILI_ENABLED", True)
+    kehu = Kehu(gongsi_mingcheng="示例公司", tongyi_shehui_xinyong_daima="91310000TEST", faren_xingming="张三")
+    moban = HeguishixiangMoban(shixiang_mingcheng="增值税申报", shixiang_bianma="ZZS", shixiang_leixing="shuiwu_shenbao",
+                               shenbao_zhouqi="monthly", jiezhi_shijian_guize="{}")
+    db_session.add_all([kehu, moban])
+    db_session.flush()
+    shili_list = [
+        HeguishixiangShili(kehu_id=kehu.id, heguishixiang_moban_id=moban.id, shili_bianhao=f"SL{i}",
+                           shili_mingcheng=f"2024年{i}月增值税申报", shenbao_qijian=f"2024年{i}月",
+                           jihua_jieshu_shijian=datetime(2024, 3, 15 - i), shili_zhuangtai="pending")
+        for i in range(1, 3)
+    ]
+    db_session.add_all(shili_list)
+    db_session.commit()
+    assert _bucket_ids(db_session, 2024, 3, kehu.id) == [shili_list[1].id, shili_list[0].id]
+
+    shili_list[0].shili_zhuangtai = "completed"
+    shili_list[1].jihua_jieshu_shijian = datetime(2024, 4, 15)
+    kehu.gongsi_mingcheng = "示例公司（更名）"
+    db_session.commit()
+
+    assert _bucket_ids(db_session, 2024, 3, kehu.id) == [shili_list[0].id]
+    assert _bucket_ids(db_session, 2024, 4, kehu.id) == [shili_list[1].id]
+
+    service = HeguishixiangCalendarService(db_session)
+    from_buckets = service.get_calendar_data(2024)
+    monkeypatch.setattr(settings, "HEGUISHIXIANG_RILI_ENABLED", False)
+    assert from_buckets == service.get_calendar_data(2024)
+
+    march = from_buckets["calendar_data"]["2024-03-14"][0]
+    assert march["shili_zhuangtai"] == "completed"
+    assert march["kehu_mingcheng"] == "示例公司（更名）"
+    assert march["status_info"]["status"] == "completed"
+    assert from_buckets["summary"]["total_count"] == 2
+    assert from_buckets["summary"]["completed_count"] == 1
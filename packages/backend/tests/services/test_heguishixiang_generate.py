@@ -0,0 +1,67 @@
+"""合规事项实例批量生成相关测试"""
+from datetime import date, datetime
+
+from src.core.config import settings
+from src.models.heguishixiang_guanli import HeguishixiangMoban, HeguishixiangRili, HeguishixiangShili, KehuHeguishixiang
+from src.models.kehu_guanli.kehu import Kehu
+from src.models.xitong_guanli.jiejiari import Jiejiari
+from src.services.heguishixiang_guanli.heguishixiang_shengcheng_service import HeguishixiangShengchengService
+from src.services.heguishixiang_guanli.jiezhi_guize import compile_deadline_rule
+
+
+def test_deadline_rules_expand_periods():
+    """月度、季度、年度、自定义规则按截止日期区间展开申报期间"""
+    start, end = date(2025, 1, 1), date(2026, 1, 1)
+
+    monthly = compile_deadline_rule("monthly", '{"type": "monthly", "day": 15}').periods(start, end)
+    assert [(p.mingcheng, p.jiezhi) for p in monthly[:2]] == [
+        ("2024年12月", date(2025, 1, 15)),
+        ("2025年1月", date(2025, 2, 15)),
+    ]
+    assert len(monthly) == 12
+
+    quarterly = compile_deadline_rule("quarterly", "{}").periods(start, end)
+    assert [p.mingcheng for p in quarterly] == ["2024年第4季度", "2025年第1季度", "2025年第2季度", "2025年第3季度"]
+
+    annually = compile_deadline_rule("annually", '{"month": 5, "day": 31}').periods(start, end)
+    assert [(p.mingcheng, p.jiezhi) for p in annually] == [("2024年度", date(2025, 5, 31))]
+
+    custom = compile_deadline_rule("custom", '{"dates": ["02-29"]}').periods(start, end)
+    assert [p.jiezhi for p in custom] == [date(2025, 2, 28)]
+
+
+def test_generate_instances_is_idempotent_and_rolls_forward(db_session, monkeypatch):
+    """批量生成按节假日顺延截止日期、同步日历分桶，重复执行不会生成重复实例"""
+    monkeypatch.setattr(settings, "HEGUISHIXIANG_RILI_ENABLED", True)
+    moban = HeguishixiangMoban(shixiang_mingcheng="增值税申报", shixiang_bianma="ZZS", shixiang_leixing="shuiwu_shenbao",
+                               shenbao_zhouqi="monthly", jiezhi_shijian_guize='{"type": "monthly", "day": 15}')
+    kehu_list = [
+        Kehu(gongsi_mingcheng=f"客户{i}", tongyi_shehui_xinyong_daima=f"9131000{i}", faren_xingming="张三")
+        for i in range(3)
+    ]
+    db_session.add_all([moban, *kehu_list])
+    db_session.flush()
+    db_session.add_all([
+        KehuHeguishixiang(kehu_id=kehu_list[0].id, heguishixiang_moban_id=moban.id),
+        KehuHeguishixiang(kehu_id=kehu_list[1].id, heguishixiang_moban_id=moban.id),
+        KehuHeguishixiang(kehu_id=kehu_list[2].id, heguishixiang_moban_id=moban.id, teshu_jiezhi_shijian="not json"),
+        # 2025-06-15 为周日，06-16 登记为节假日，截止日期顺延到 06-17
+        Jiejiari(riqi=date(2025, 6, 16), shifou_gongzuori=False, mingcheng="测试假日"),
+    ])
+    db_session.commit()
+
+    service = HeguishixiangShengchengService(db_session)
+    result = service.generate_instances(date(2025, 6, 1), date(2025, 7, 1))
+    assert result["created"] == 2
+    assert result["existing"] == 0
+    assert [item["peizhi_id"] for item in result["invalid"]] and "JSON" in result["invalid"][0]["reason"]
+
+    shili = db_session.query(HeguishixiangShili).filter(HeguishixiangShili.kehu_id == kehu_list[0].id).one()
+    assert shili.shenbao_qijian == "2025年5月"
+    assert shili.shili_mingcheng == "2025年5月增值税申报"
+    assert shili.jihua_jieshu_shijian == datetime(2025, 6, 17, 23, 59, 59)
+    assert db_session.get(HeguishixiangRili, (2025, 6, kehu_list[0].id)).shixiang_shuliang == 1
+
+    again = service.generate_instances(date(2025, 6, 1), date(2025, 7, 1))
+    assert (again["created"], again["existing"]) == (0, 2)
+    assert db_session.query(HeguishixiangShili).count() == 2
@@ -0,0 +1,134 @@
+"""合规事项提醒调度相关测试"""
+import random
+import time
+from datetime import datetime
+
+import pytest
+
+from src.core.redis_client import redis_client
+from src.core.timing_wheel import TimingWheel
+from src.models.heguishixiang_guanli import HeguishixiangMoban, HeguishixiangShili, HeguishixiangTixing, TixingJilu
+from src.models.kehu_guanli.kehu import Kehu
+from src.models.zhifu_guanli import ZhifuTongzhi
+from src.services.heguishixiang_guanli.tixing_scheduler import TIXING_LOCK_KEY, TixingScheduler
+
+
+def test_timing_wheel_fires_each_entry_at_its_tick():
+    """条目跨越各层与溢出范围时，都在到期刻度被取出且只取出一次"""
+    wheel = TimingWheel(tick=1, slots=8, levels=2, start=0)
+    rng = random.Random(7)
+    due_at = {index: rng.randint(-3, 200) for index in range(500)}
+    for index, when in due_at.items():
+        wheel.add(when + 0.5, index)
+
+    fired = {}
+    for now in range(0, 202):
+        for index in wheel.advance(now + 0.9):
+            assert index not in fired
+            fired[index] = now
+    assert fired == {index: max(when, 0) for index, when in due_at.items()}
+    assert len(wheel) == 0
+
+
+def test_scheduler_dispatches_due_reminders_once(db_session, test_user):
+    """到期提醒按接收人合并通知并累加实例提醒次数，已结束的实例与重启后的重复加载不再提醒"""
+    fuzeren_id = test_user.id
+    kehu = Kehu(gongsi_mingcheng="示例公司", tongyi_shehui_xinyong_daima="91310000TEST", faren_xingming="张三")
+    moban = HeguishixiangMoban(shixiang_mingcheng="增值税申报", shixiang_bianma="ZZS", shixiang_leixing="shuiwu_shenbao",
+                               shenbao_zhouqi="monthly", jiezhi_shijian_guize="{}")
+    db_session.add_all([kehu, moban])
+    db_session.flush()
+    shili_list = [
+        HeguishixiangShili(kehu_id=kehu.id, heguishixiang_moban_id=moban.id, shili_bianhao=f"SL{i}",
+                           shili_mingcheng=f"2025年{i}月增值税申报", shenbao_qijian=f"2025年{i}月",
+                           jihua_jieshu_shijian=datetime(2025, 6, 20, 23, 59, 59), fuzeren_id=fuzeren_id,
+                           shili_zhuangtai=zhuangtai)
+        for i, zhuangtai in ((4, "pending"), (5, "in_progress"), (3, "completed"))
+    ]
+    db_session.add_all(shili_list)
+    db_session.add(HeguishixiangTixing(
+        heguishixiang_moban_id=moban.id, tixing_mingcheng="申报截止提醒", tixing_leixing="deadline_reminder",
+        tiqian_tianshu=3, tixing_shijian="09:00", jieshou_ren_leixing="accountant",
+        tixing_biaoti_moban="{kehu_mingcheng}{shili_mingcheng}还剩{shengyu_tianshu}天",
+        tixing_neirong_moban="请在{jiezhi_riqi}前完成申报", chongfu_tixing=True, chongfu_jiangetianshu=1,
+        zuida_chongfu_cishu=2
+    ))
+    db_session.commit()
+    ids = [shili.id for shili in shili_list]
+
+    scheduler = TixingScheduler(session_factory=lambda: db_session, tick_seconds=1, window_seconds=86400)
+    assert scheduler.tick(datetime(2025, 6, 17, 8, 59, 59)) == 0
+    assert scheduler.tick(datetime(2025, 6, 17, 9, 0, 0)) == 2
+
+    jilu = db_session.query(TixingJilu).order_by(TixingJilu.tixing_bianhao).all()
+    assert {item.heguishixiang_shili_id for item in jilu} == set(ids[:2])
+    assert jilu[0].tixing_biaoti == "示例公司2025年4月增值税申报还剩3天"
+    assert jilu[0].tixing_neirong == "请在2025-06-20前完成申报"
+    assert {item.fasong_zhuangtai for item in jilu} == {"sent"}
+
+    tongzhi = db_session.query(ZhifuTongzhi).one()
+    assert tongzhi.jieshou_ren_id == fuzeren_id
+    assert tongzhi.tongzhi_biaoti == "您有 2 项合规事项提醒"
+    assert [db_session.get(HeguishixiangShili, shili_id).tixing_cishu for shili_id in ids] == [1, 1, 0]
+
+    # 重启后从当天零点重新加载，已发送的提醒不重复发送
+    restarted = TixingScheduler(session_factory=lambda: db_session, tick_seconds=1, window_seconds=86400)
+    assert restarted.tick(datetime(2025, 6, 17, 9, 30)) == 0
+
+    db_session.get(HeguishixiangShili, ids[1]).shili_zhuangtai = "completed"
+    db_session.commit()
+    assert restarted.tick(datetime(2025, 6, 18, 9, 0, 0)) == 1
+    shili = db_session.get(HeguishixiangShili, ids[0])
+    assert shili.tixing_cishu == 2
+    assert shili.zuijin_tixing_shijian == datetime(2025, 6, 18, 9, 0, 0)
+    assert db_session.query(HeguishixiangTixing).one().fasong_cishu == 3
+
+
+def test_scheduler_reloads_after_instance_created(db_session, test_user):
+    """已加载窗口内新建的实例提交后，调度者重新加载并按时发送提醒"""
+    kehu = Kehu(gongsi_mingcheng="示例公司", tongyi_shehui_xinyong_daima="91310000TEST", faren_xingming="张三")
+    moban = HeguishixiangMoban(shixiang_mingcheng="增值税申报", shixiang_bianma="ZZS", shixiang_leixing="shuiwu_shenbao",
+                               shenbao_zhouqi="monthly", jiezhi_shijian_guize="{}")
+    db_session.add_all([kehu, moban])
+    db_session.flush()
+    db_session.add(HeguishixiangTixing(
+        heguishixiang_moban_id=moban.id, tixing_mingcheng="申报截止提醒", tixing_leixing="deadline_reminder",
+        tiqian_tianshu=3, tixing_shijian="09:00", jieshou_ren_leixing="accountant",
+        tixing_biaoti_moban="{shili_mingcheng}", tixing_neirong_moban="请及时申报"
+    ))
+    db_session.commit()
+    kehu_id, moban_id, fuzeren_id = kehu.id, moban.id, test_user.id
+
+    scheduler = TixingScheduler(session_factory=lambda: db_session, tick_seconds=1, window_seconds=86400)
+    assert not scheduler.check_changes()
+    assert scheduler.tick(datetime(2025, 6, 17, 8, 0, 0)) == 0
+    assert not scheduler.check_changes()
+
+    db_session.add(HeguishixiangShili(
+        kehu_id=kehu_id, heguishixiang_moban_id=moban_id, shili_bianhao="SL6", shili_mingcheng="2025年5月增值税申报",
+        shenbao_qijian="2025年5月", jihua_jieshu_shijian=datetime(2025, 6, 20, 23, 59, 59), fuzeren_id=fuzeren_id,
+        shili_zhuangtai="pending"
+    ))
+    db_session.commit()
+
+    assert scheduler.check_changes()
+    assert scheduler.tick(datetime(2025, 6, 17, 9, 0, 0)) == 1
+
+
+@pytest.mark.asyncio
+async def test_scheduler_renews_lock_during_slow_tick(monkeypatch):
+    """刻度在线程中执行期间定期续期调度锁"""
+    renewals = []
+
+    async def acquire_lock(key, token, ttl):
+        renewals.append(key)
+        return True
+
+    monkeypatch.setattr(redis_client, "acquire_lock", acquire_lock)
+    scheduler = TixingScheduler(session_factory=lambda: None, tick_seconds=1)
+    monkeypatch.setattr(scheduler, "tick", lambda: time.sleep(0.5))
+
+    await scheduler._tick_holding_lock(lock_ttl=0.3)
+
+    assert renewals.count(TIXING_LOCK_KEY) >= 2
+    assert scheduler._running is None
@@ -0,0 +1,82 @@
+"""批量生成合同相关测试"""
+from datetime import datetime, timedelta
+
+import pytest
+from pydantic import ValidationError
+
+from src.api.api_v1.endpoints.hetong_guanli.hetong_generate import ContractBulkGenerateRequest
+from src.core.sequence import sequence_allocator
+from src.models.hetong_guanli.hetong import Hetong
+from src.models.hetong_guanli.hetong_moban import HetongMoban
+from src.models.kehu_guanli.kehu import Kehu
+from src.models.xiansuo_guanli.xiansuo import Xiansuo
+from src.models.xiansuo_guanli.xiansuo_baojia import XiansuoBaojia
+from src.services.hetong_guanli.hetong_generate_service import HetongGenerateService
+
+
+def _add_quote(db_session, index, baojia_zhuangtai="accepted"):
+    kehu = Kehu(gongsi_mingcheng=f"客户{index}", tongyi_shehui_xinyong_daima=f"9131{index:04d}", faren_xingming="张三")
+    db_session.add(kehu)
+    db_session.flush()
+    xiansuo = Xiansuo(
+        xiansuo_bianma=f"XS{index:04d}",
+        gongsi_mingcheng=f"客户{index}",
+        lianxi_ren="张三",
+        laiyuan_id="laiyuan",
+        kehu_id=kehu.id,
+    )
+    db_session.add(xiansuo)
+    db_session.flush()
+    baojia = XiansuoBaojia(
+        xiansuo_id=xiansuo.id,
+        baojia_bianma=f"BJ{index:04d}",
+        baojia_mingcheng=f"报价{index}",
+        zongji_jine=1000 + index,
+        youxiao_qi=datetime.now() + timedelta(days=15),
+        baojia_zhuangtai=baojia_zhuangtai,
+    )
+    db_session.add(baojia)
+    db_session.flush()
+    return baojia
+
+
+def test_bulk_generation_streams_progress_and_numbers_contracts(db_session, test_user):
+    """批量生成预留连续编号、逐项报告失败原因，并以事件流返回进度"""
+    sequence_allocator.reset()
+    db_session.add(HetongMoban(
+        moban_mingcheng="代理记账合同",
+        moban_bianma="DLJZ",
+        hetong_leixing="daili_jizhang",
+        moban_neirong="编号：{{ hetong_bianhao }}，甲方：{{jiafang_mingcheng}}，金额：{{ hetong_zongjine }}",
+        moban_zhuangtai="active",
+    ))
+    quotes = [_add_quote(db_session, i) for i in range(3)]
+    rejected = _add_quote(db_session, 3, baojia_zhuangtai="sent")
+    db_session.commit()
+
+    events = list(HetongGenerateService(db_session).generate_contracts_bulk(
+        [quote.id for quote in quotes] + [rejected.id, "missing"], "daili_jizhang", test_user.id
+    ))
+
+    assert [event["event"] for event in events] == ["prepared", "progress", "completed"]
+    assert events[0] == {"event": "prepared", "total": 5, "valid": 3, "failed": 2}
+    completed = events[-1]
+    assert {item["baojia_id"]: item["reason"] for item in completed["failed"]} == {
+        rejected.id: "只能基于已接受的报价生成合同",
+        "missing": "报价不存在",
+    }
+
+    prefix = f"HT{datetime.now().strftime('%Y%m%d')}"
+    assert [item["hetong_bianhao"] for item in completed["created"]] == [f"{prefix}000{i}" for i in (1, 2, 3)]
+
+    contract = db_session.query(Hetong).filter(Hetong.baojia_id == quotes[1].id).one()
+    assert contract.hetong_neirong == f"编号：{prefix}0002，甲方：客户1，金额：1001.00"
+    assert HetongGenerateService(db_session)._generate_hetong_bianhao() == f"{prefix}0004"
+
+
+def test_bulk_request_rejects_unknown_initial_status():
+    """批量生成只允许以草稿、待审批、已审批或已生效状态创建合同"""
+    assert ContractBulkGenerateRequest(baojia_ids=["q1"], initial_status="draft").initial_status == "draft"
+    for status in ("signed", "cancelled", "anything"):
+        with pytest.raises(ValidationError):
+            ContractBulkGenerateRequest(baojia_ids=["q1"], initial_status=status)
@@ -0,0 +1,29 @@
+"""合同模板渲染器相关测试"""
+from datetime import datetime
+
+from src.services.hetong_guanli.hetong_template_renderer import (
+    clear_template_cache,
+    render_preview,
+    render_template_content,
+)
+
+
+def test_render_replaces_both_placeholder_styles():
+    """{{key}} 与 {{ key }} 均被替换，未提供的变量按需保留或规范化"""
+    content = "甲方：{{jiafang_mingcheng}}，金额：{{ hetong_jine }} 元，备注：{{beizhu}}"
+    values = {"jiafang_mingcheng": "示例公司", "hetong_jine": "100.00"}
+
+    assert render_template_content(content, values) == "甲方：示例公司，金额：100.00 元，备注：{{beizhu}}"
+    assert render_template_content(content, values, missing="{{{{ {name} }}}}").endswith("备注：{{ beizhu }}")
+    assert render_template_content(content, {**values, "beizhu": None}).endswith("备注：")
+
+
+def test_preview_cache_follows_template_version_and_variables():
+    """预览按模板版本与变量缓存，模板更新或变量变化后重新渲染"""
+    clear_template_cache()
+    version1 = datetime(2024, 1, 1)
+    version2 = datetime(2024, 1, 2)
+
+    assert render_preview("金额：{{ jine }}", {"jine": 1}, moban_id="m1", updated_at=version1) == "金额：1"
+    assert render_preview("金额：{{ jine }}", {"jine": 2}, moban_id="m1", updated_at=version1) == "金额：2"
+    assert render_preview("总价：{{ jine }}", {"jine": 2}, moban_id="m1", updated_at=version2) == "总价：2"
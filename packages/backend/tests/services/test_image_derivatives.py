@@ -0,0 +1,87 @@
+"""上传图片缩略图/预览图相关测试"""
+import asyncio
+import hashlib
+import logging
+
+import pytest
+from PIL import Image
+
+from src.core.image_derivatives import ImageDeriver, derivative_url
+
+
+def _save_image(path, size):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    Image.new("RGB", size, (200, 120, 40)).save(path, "JPEG")
+
+
+@pytest.mark.asyncio
+async def test_ensure_derives_webp_variants_by_content_hash(tmp_path):
+    """按文件名中的哈希派生缩略图与预览图，已生成的不再重复派生"""
+    sha256 = "ab" + "0" * 62
+    relative = f"images/ab/{sha256}.jpg"
+    _save_image(tmp_path / relative, (3000, 2000))
+    deriver = ImageDeriver(root=str(tmp_path), workers=1)
+    try:
+        thumb = await deriver.ensure(relative, "thumb")
+        assert thumb == str(tmp_path / "derived" / "ab" / f"{sha256}_thumb.webp")
+        preview = tmp_path / "derived" / "ab" / f"{sha256}_preview.webp"
+        assert preview.exists()
+
+        with Image.open(thumb) as image:
+            assert (image.format, image.size) == ("WEBP", (256, 171))
+        with Image.open(preview) as image:
+            assert image.size == (1280, 853)
+
+        mtime = preview.stat().st_mtime_ns
+        assert await deriver.ensure(relative, "preview") == str(preview)
+        assert preview.stat().st_mtime_ns == mtime
+    finally:
+        deriver.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_ensure_legacy_path_and_missing_source(tmp_path):
+    """早期按日期保存的图片以路径哈希为键；原图不存在或越出上传目录时返回 None"""
+    relative = "images/20240101/voucher.png"
+    _save_image(tmp_path / relative, (100, 50))
+    key = hashlib.sha256(relative.encode("utf-8")).hexdigest()
+    deriver = ImageDeriver(root=str(tmp_path), workers=1)
+    try:
+        thumb = await deriver.ensure(relative, "thumb")
+        assert thumb == str(tmp_path / "derived" / key[:2] / f"{key}_thumb.webp")
+        with Image.open(thumb) as image:
+            assert image.size == (100, 50)
+
+        assert await deriver.ensure("images/20240101/missing.png", "thumb") is None
+        assert await deriver.ensure("../outside.png", "thumb") is None
+    finally:
+        deriver.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_schedule_keeps_task_and_logs_failure(tmp_path, monkeypatch, caplog):
+    """上传后提交的派生任务在完成前保持引用，完成后移除，异常记录日志"""
+    deriver = ImageDeriver(root=str(tmp_path), workers=1)
+    started = asyncio.Event()
+
+    async def failing_ensure(relative_path, variant=None):
+        started.set()
+        await asyncio.sleep(0)
+        raise OSError("磁盘已满")
+
+    monkeypatch.setattr(deriver, "ensure", failing_ensure)
+    deriver.schedule("/uploads/images/ab/photo.jpg")
+    assert len(deriver._pending_tasks) == 1
+
+    with caplog.at_level(logging.WARNING):
+        await asyncio.gather(*deriver._pending_tasks, return_exceptions=True)
+        await asyncio.sleep(0)
+    assert started.is_set()
+    assert deriver._pending_tasks == set()
+    assert "磁盘已满" in caplog.text
+
+
+def test_derivative_url_only_for_uploaded_images():
+    assert derivative_url("/uploads/images/ab/x.jpg", "thumb") == "/api/v1/upload/derived/thumb/images/ab/x.jpg"
+    assert derivative_url("/uploads/files/ab/x.pdf", "thumb") is None
+    assert derivative_url(None, "preview") is None
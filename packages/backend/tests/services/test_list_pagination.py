@@ -0,0 +1,58 @@
+"""列表游标分页相关测试"""
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+
+from src.models.fuwu_guanli import FuwuGongdan
+from src.schemas.fuwu_guanli.fuwu_gongdan_schemas import FuwuGongdanListParams
+from src.services.fuwu_guanli.fuwu_gongdan_service import FuwuGongdanService
+
+
+def _add_gongdan_list(db_session, count):
+    created_at = datetime.now()
+    for index in range(count):
+        db_session.add(FuwuGongdan(
+            hetong_id="hetong-1",
+            kehu_id="kehu-1",
+            gongdan_bianhao=f"WO-PAGE-{index}",
+            gongdan_biaoti=f"分页工单{index}",
+            fuwu_leixing="daili_jizhang",
+            jihua_jieshu_shijian=created_at + timedelta(days=7),
+            # 每 3 条共用同一创建时间，验证 id 作为次级排序键
+            created_at=created_at - timedelta(minutes=index // 3),
+            created_by="tester"
+        ))
+    db_session.commit()
+
+
+def test_cursor_pages_match_offset_pages(db_session):
+    """游标翻页结果与 OFFSET 翻页一致，且不重复、不遗漏"""
+    _add_gongdan_list(db_session, 11)
+    service = FuwuGongdanService(db_session)
+
+    offset_ids = [
+        item.id
+        for page in (1, 2, 3)
+        for item in service.get_gongdan_list(FuwuGongdanListParams(page=page, size=4)).items
+    ]
+
+    cursor_ids, cursor = [], None
+    while True:
+        response = service.get_gongdan_list(FuwuGongdanListParams(size=4, cursor=cursor))
+        cursor_ids.extend(item.id for item in response.items)
+        cursor = response.next_cursor
+        if not cursor:
+            break
+
+    assert response.total == 11
+    assert cursor_ids == offset_ids
+    assert len(set(cursor_ids)) == 11
+
+
+def test_invalid_cursor_rejected(db_session):
+    """无法解析的游标返回 400"""
+    with pytest.raises(HTTPException) as exc_info:
+        FuwuGongdanService(db_session).get_gongdan_list(FuwuGongdanListParams(cursor="not-a-cursor"))
+
+    assert exc_info.value.status_code == 400
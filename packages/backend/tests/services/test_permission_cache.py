@@ -0,0 +1,112 @@
+"""用户权限集合缓存相关测试"""
+import asyncio
+import threading
+
+import pytest
+
+from src.core.redis_client import CacheKeys, redis_client
+from src.core.security import permission_cache as permission_cache_module
+from src.core.security.permission_cache import PermissionCache, load_user_permission_set, permission_cache
+from src.core.security.permissions import has_permission
+from src.models.yonghu_guanli import JiaoseQuanxian, YonghuJiaose
+
+
+def _grant(db_session, user, role, permission):
+    db_session.add(JiaoseQuanxian(jiaose_id=role.id, quanxian_id=permission.id))
+    db_session.add(YonghuJiaose(yonghu_id=user.id, jiaose_id=role.id))
+    db_session.commit()
+
+
+def test_permission_set_loaded_once_per_request(db_session, sql_statements, test_user, test_role, test_permission):
+    """同一请求内多次权限检查只查询一次数据库"""
+    _grant(db_session, test_user, test_role, test_permission)
+    permission_cache.invalidate()
+    statements = sql_statements()
+
+    assert has_permission(db_session, test_user, "test_permission")
+    assert not has_permission(db_session, test_user, "other_permission")
+    assert has_permission(db_session, test_user, "test_permission")
+
+    assert len([s for s in statements if "quanxian" in s.lower()]) == 1
+
+
+def test_role_assignment_invalidates_cache(db_session, test_user, test_role, test_permission):
+    """角色关联变更提交后权限缓存失效"""
+    db_session.add(JiaoseQuanxian(jiaose_id=test_role.id, quanxian_id=test_permission.id))
+    db_session.commit()
+    permission_cache.invalidate()
+
+    assert not has_permission(db_session, test_user, "test_permission")
+
+    db_session.add(YonghuJiaose(yonghu_id=test_user.id, jiaose_id=test_role.id))
+    db_session.commit()
+
+    assert has_permission(db_session, test_user, "test_permission")
+
+
+def test_soft_deleted_role_permission_not_granted(db_session, test_user, test_role, test_permission):
+    """已软删除的角色权限关联不再授予权限"""
+    _grant(db_session, test_user, test_role, test_permission)
+    db_session.query(JiaoseQuanxian).update({JiaoseQuanxian.is_deleted: "Y"})
+    db_session.commit()
+
+    assert not has_permission(db_session, test_user, "test_permission")
+
+
+@pytest.mark.asyncio
+async def test_async_lookup_loads_off_event_loop(db_session, test_user, test_role, test_permission, monkeypatch):
+    """异步路径缓存未命中时在线程池中查询数据库，不阻塞事件循环"""
+    _grant(db_session, test_user, test_role, test_permission)
+    permission_cache.invalidate()
+    monkeypatch.setattr(redis_client, "_connected", False)
+    threads = []
+
+    def load(db, user_id):
+        threads.append(threading.get_ident())
+        return load_user_permission_set(db, user_id)
+
+    monkeypatch.setattr(permission_cache_module, "load_user_permission_set", load)
+
+    assert "test_permission" in await permission_cache.get(db_session, test_user)
+    assert threads and threads[0] != threading.get_ident()
+
+
+@pytest.mark.asyncio
+async def test_revocation_in_other_worker_applies_before_local_ttl(
+    db_session, test_user, test_role, test_permission, monkeypatch
+):
+    """进程 A 撤销权限后，进程 B 的下一个请求即按 Redis 全局版本号失效本地缓存，不等待 TTL"""
+    store = {}
+
+    async def fake_get(key):
+        return store.get(key)
+
+    async def fake_set(key, value, ttl=None, tags=None):
+        store[key] = value
+        return True
+
+    async def fake_incr(key, amount=1):
+        store[key] = store.get(key, 0) + amount
+        return store[key]
+
+    monkeypatch.setattr(redis_client, "_connected", True)
+    monkeypatch.setattr(redis_client, "redis", object())
+    monkeypatch.setattr(redis_client, "get", fake_get)
+    monkeypatch.setattr(redis_client, "set", fake_set)
+    monkeypatch.setattr(redis_client, "incr", fake_incr)
+    _grant(db_session, test_user, test_role, test_permission)
+    await asyncio.gather(*permission_cache._pending_tasks)
+    worker_a, worker_b = PermissionCache(local_ttl=3600), PermissionCache(local_ttl=3600)
+
+    assert "test_permission" in await worker_b.get(db_session, test_user)
+
+    # 进程 A 提交撤销并递增全局版本号
+    db_session.query(YonghuJiaose).update({YonghuJiaose.is_deleted: "Y"})
+    db_session.commit()
+    worker_a.invalidate()
+    await asyncio.gather(*worker_a._pending_tasks, *permission_cache._pending_tasks)
+    assert store[CacheKeys.USER_PERMISSIONS_VERSION] >= 1
+
+    # 进程 B 的新请求
+    db_session.info.pop("user_permission_sets", None)
+    assert "test_permission" not in await worker_b.get(db_session, test_user)
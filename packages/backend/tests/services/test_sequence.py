@@ -0,0 +1,32 @@
+"""业务编号分配相关测试"""
+from datetime import datetime
+
+from src.core.sequence import SequenceAllocator, next_daily_code, reserve_daily_codes, sequence_allocator
+from src.models.xiansuo_guanli.xiansuo import Xiansuo
+from src.models.xitong_guanli.bianhao_xulie import BianhaoXulie
+
+
+def test_daily_codes_continue_from_existing_and_never_repeat(db_session):
+    """序列按当天已有的最大编号初始化，之后分配的编号互不重复"""
+    sequence_allocator.reset()
+    prefix = f"XS{datetime.now().strftime('%Y%m%d')}"
+    db_session.add(Xiansuo(xiansuo_bianma=f"{prefix}007", gongsi_mingcheng="已有线索", lianxi_ren="张三",
+                           laiyuan_id="laiyuan"))
+    db_session.commit()
+
+    codes = [next_daily_code(db_session, Xiansuo.xiansuo_bianma, "XS", width=3) for _ in range(3)]
+    assert codes == [f"{prefix}008", f"{prefix}009", f"{prefix}010"]
+
+    reserved = reserve_daily_codes(db_session, Xiansuo.xiansuo_bianma, "XS", 5, width=3)
+    assert len(set(codes + reserved)) == 8
+    assert [int(code[len(prefix):]) for code in reserved] == list(range(18, 23))
+
+
+def test_allocator_reserves_blocks(db_session):
+    """块内序号在进程内发放，块用完才再访问编号序列表"""
+    allocator = SequenceAllocator(block_size=4)
+
+    values = [allocator.next_value(db_session, "test:block") for _ in range(6)]
+    assert values == [1, 2, 3, 4, 5, 6]
+    row = db_session.query(BianhaoXulie).filter(BianhaoXulie.xulie_jian == "test:block").one()
+    assert row.dangqian_zhi == 8
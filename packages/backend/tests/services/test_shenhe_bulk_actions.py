@@ -0,0 +1,80 @@
+"""批量审核操作相关测试"""
+from datetime import datetime
+
+from src.models.shenhe_guanli import ShenheGuize, ShenheJilu, ShenheLiucheng
+from src.models.zhifu_guanli import ZhifuTongzhi
+from src.services.shenhe_guanli.shenhe_workflow_engine import ShenheWorkflowEngine
+
+
+def _add_workflow(db_session, index, auditor_id, steps=1):
+    rule = ShenheGuize(
+        guize_mingcheng=f"银行汇款审核{index}",
+        guize_leixing="workflow_template",
+        chufa_tiaojian="{}",
+        shenhe_liucheng_peizhi="{}",
+        is_deleted="N",
+    )
+    db_session.add(rule)
+    db_session.flush()
+    workflow = ShenheLiucheng(
+        liucheng_bianhao=f"SH{index:04d}",
+        shenhe_leixing="yinhang_huikuan",
+        guanlian_id=f"danju-{index}",
+        shenhe_zhuangtai="shenhzhong",
+        chufa_guize_id=rule.id,
+        dangqian_buzhou=1,
+        zonggong_buzhou=steps,
+        shenqing_ren_id="applicant",
+        shenqing_shijian=datetime.now(),
+        is_deleted="N",
+    )
+    db_session.add(workflow)
+    db_session.flush()
+    step_list = []
+    for number in range(1, steps + 1):
+        step = ShenheJilu(
+            liucheng_id=workflow.id,
+            buzhou_bianhao=number,
+            buzhou_mingcheng=f"步骤{number}",
+            shenhe_ren_id=auditor_id,
+            jilu_zhuangtai="daichuli",
+            is_deleted="N",
+        )
+        db_session.add(step)
+        step_list.append(step)
+    db_session.commit()
+    return workflow, step_list
+
+
+def test_bulk_actions_report_per_item_results(db_session, test_user):
+    """批量审核在一个事务内完成，逐项返回结果并按流程最终状态发送通知"""
+    approved, (approved_step,) = _add_workflow(db_session, 1, test_user.id)
+    rejected, (rejected_step,) = _add_workflow(db_session, 2, test_user.id)
+    advanced, (first_step, _) = _add_workflow(db_session, 3, test_user.id, steps=2)
+    other, (other_step,) = _add_workflow(db_session, 4, "other-auditor")
+
+    results = ShenheWorkflowEngine(db_session).process_audit_actions_bulk([
+        {"workflow_id": approved.id, "step_id": approved_step.id, "shenhe_jieguo": "tongguo"},
+        {"workflow_id": rejected.id, "step_id": rejected_step.id, "shenhe_jieguo": "jujue", "shenhe_yijian": "金额不符"},
+        {"workflow_id": advanced.id, "step_id": first_step.id, "shenhe_jieguo": "tongguo"},
+        {"workflow_id": other.id, "step_id": other_step.id, "shenhe_jieguo": "tongguo"},
+        {"workflow_id": approved.id, "step_id": approved_step.id, "shenhe_jieguo": "tongguo"},
+        {"workflow_id": approved.id, "step_id": "missing", "shenhe_jieguo": "tongguo"},
+    ], test_user.id)
+
+    assert [(r["success"], r["is_completed"]) for r in results] == [
+        (True, True), (True, True), (True, False), (False, False), (False, False), (False, False)
+    ]
+    assert [r["message"] for r in results[3:]] == ["无权限进行此审核", "审核步骤已处理", "审核步骤不存在"]
+
+    db_session.expire_all()
+    assert db_session.get(ShenheLiucheng, approved.id).shenhe_zhuangtai == "tongguo"
+    assert db_session.get(ShenheLiucheng, rejected.id).shenhe_zhuangtai == "jujue"
+    assert db_session.get(ShenheLiucheng, advanced.id).dangqian_buzhou == 2
+    assert db_session.get(ShenheLiucheng, other.id).shenhe_zhuangtai == "shenhzhong"
+
+    notifications = {
+        n.tongzhi_leixing: n for n in db_session.query(ZhifuTongzhi).all()
+    }
+    assert set(notifications) == {"audit_approved", "audit_rejected", "audit_pending"}
+    assert "金额不符" in notifications["audit_rejected"].tongzhi_neirong
@@ -0,0 +1,52 @@
+"""审核规则匹配索引相关测试"""
+import json
+
+from src.models.shenhe_guanli import ShenheGuize
+from src.services.shenhe_guanli.shenhe_guize_index import shenhe_guize_index
+from src.services.shenhe_guanli.shenhe_workflow_engine import ShenheWorkflowEngine
+
+
+def _add_rule(db_session, name, guize_leixing, chufa_tiaojian, paixu=0):
+    rule = ShenheGuize(
+        guize_mingcheng=name,
+        guize_leixing=guize_leixing,
+        chufa_tiaojian=json.dumps(chufa_tiaojian),
+        shenhe_liucheng_peizhi=json.dumps({"steps": []}),
+        shi_qiyong="Y",
+        paixu=paixu,
+        is_deleted="N",
+    )
+    db_session.add(rule)
+    db_session.commit()
+    return rule
+
+
+def test_threshold_rule_matching_follows_priority(db_session):
+    """满足阈值的规则中按 paixu 取优先级最高者，未命中时回退到工作流模板"""
+    shenhe_guize_index.invalidate()
+    low = _add_rule(db_session, "小额报价", "baojia_shenhe", {"thresholds": [{"amount": 1000}]}, paixu=2)
+    high = _add_rule(db_session, "大额报价", "baojia_shenhe", {"thresholds": [{"amount": 5000}, {"amount": 20000}]}, paixu=1)
+    template = _add_rule(db_session, "报价模板", "workflow_template", {"audit_type": "baojia"})
+    engine = ShenheWorkflowEngine(db_session)
+
+    assert engine._find_matching_rule("baojia", {"amount": 3000}).id == low.id
+    assert engine._find_matching_rule("baojia", {"amount": 8000}).id == high.id
+    assert engine._find_matching_rule("baojia", {"amount": 500}).id == template.id
+    assert engine._find_matching_rule("hetong", {"original_amount": 0}) is None
+
+
+def test_rule_changes_invalidate_index(db_session):
+    """规则提交变更后索引失效，停用的规则不再匹配"""
+    shenhe_guize_index.invalidate()
+    rule = _add_rule(
+        db_session, "合同金额下调", "hetong_jine_xiuzheng", {"thresholds": [{"percentage": 10}]}
+    )
+    engine = ShenheWorkflowEngine(db_session)
+    trigger_data = {"original_amount": 1000, "new_amount": 800}
+
+    assert engine._find_matching_rule("hetong", trigger_data).id == rule.id
+
+    rule.shi_qiyong = "N"
+    db_session.commit()
+
+    assert engine._find_matching_rule("hetong", trigger_data) is None
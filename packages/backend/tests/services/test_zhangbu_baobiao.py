@@ -0,0 +1,100 @@
+"""账簿报表相关测试"""
+import csv
+import io
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+from fastapi import HTTPException
+
+from src.core import report_export
+from src.models.caiwu_zhangwu import Pingzheng
+from src.services.caiwu_zhangwu.zhangbu_baobiao_service import ZhangbuBaobiaoService
+from src.services.caiwu_zhangwu.zhangbu_guozhang_service import ZhangbuGuozhangService
+
+
+def _post(db_session, vouchers):
+    for index, (riqi, jiefang_kemu, daifang_kemu, jine, kehu_id) in enumerate(vouchers):
+        db_session.add(Pingzheng(
+            kehu_id=kehu_id,
+            zhizuo_ren_id="zhizuo-1",
+            pingzheng_bianhao=f"PZ-{index:03d}",
+            pingzheng_riqi=riqi,
+            zhaiyao=f"凭证{index}",
+            jiebie_kemu=jiefang_kemu,
+            jiebie_jine=Decimal(jine),
+            daifang_kemu=daifang_kemu,
+            daifang_jine=Decimal(jine),
+            pingzheng_zhuangtai="approved",
+            created_by="tester"
+        ))
+    db_session.commit()
+    ZhangbuGuozhangService(db_session).post_vouchers("kuaiji-1")
+
+
+@pytest.fixture
+def ledger(db_session):
+    _post(db_session, [
+        (datetime(2024, 1, 10), "1002 银行存款", "3001 实收资本", "1000", "kehu-1"),
+        (datetime(2024, 1, 20), "6602 管理费用", "1002 银行存款", "100", "kehu-1"),
+        (datetime(2024, 1, 12), "1002 银行存款", "3001 实收资本", "500", "kehu-2"),
+    ])
+    ZhangbuGuozhangService(db_session).close_period("2024-01")
+    _post(db_session, [
+        (datetime(2024, 2, 5), "1002 银行存款", "5001 主营业务收入", "300", "kehu-1"),
+    ])
+    return db_session
+
+
+def test_trial_balance_with_client_totals(ledger):
+    """科目余额表按客户、科目排列，每个客户后附借贷发生额合计行"""
+    baobiao = ZhangbuBaobiaoService(ledger).trial_balance("2024-02")
+    rows = list(baobiao.rows)
+
+    assert [row[:2] for row in rows] == [
+        ("kehu-1", "1002"), ("kehu-1", "3001"), ("kehu-1", "5001"), ("kehu-1", "6602"), ("kehu-1", "合计"),
+        ("kehu-2", "1002"), ("kehu-2", "3001"), ("kehu-2", "合计"),
+    ]
+    assert rows[0][3:] == ("借", 900, 300, 0, 1200)
+    assert rows[4][5:7] == (300, 300)
+    assert list(ZhangbuBaobiaoService(ledger).trial_balance("2024-02", kehu_id="kehu-2").rows)[-1][5:7] == (0, 0)
+
+
+def test_subsidiary_ledger_running_balance(ledger):
+    """明细账余额按全部历史累计，期间内每个科目前附期初余额行"""
+    baobiao = ZhangbuBaobiaoService(ledger).subsidiary_ledger("kehu-1", "2024-02", "2024-02", kemu_bianma="1002")
+    rows = list(baobiao.rows)
+
+    assert [(row[5], row[7], row[8], row[10]) for row in rows] == [
+        ("期初余额", None, None, Decimal("900")),
+        ("凭证0", Decimal("300"), Decimal("0"), Decimal("1200")),
+    ]
+    assert rows[1][4] == "PZ-000"
+
+    rows = list(ZhangbuBaobiaoService(ledger).subsidiary_ledger("kehu-1", "2024-01", "2024-02").rows)
+    assert [(row[0], row[5], row[10]) for row in rows if row[0] == "1002"] == [
+        ("1002", "期初余额", Decimal("0")),
+        ("1002", "凭证0", Decimal("1000")),
+        ("1002", "凭证1", Decimal("900")),
+        ("1002", "凭证0", Decimal("1200")),
+    ]
+
+    with pytest.raises(HTTPException):
+        ZhangbuBaobiaoService(ledger).subsidiary_ledger("kehu-1", "2024-03", "2024-02")
+
+
+def test_period_comparison_and_csv_export(ledger, monkeypatch):
+    """期间对比表取上一期间期末余额计算变动；CSV 按批次输出"""
+    baobiao = ZhangbuBaobiaoService(ledger).period_comparison("2024-01", "2024-02", kehu_id="kehu-1")
+    monkeypatch.setattr(report_export, "EXPORT_BATCH_ROWS", 2)
+    chunks = list(report_export.iter_csv(baobiao.lietou, baobiao.rows))
+
+    assert len(chunks) > 1
+    assert chunks[0].startswith("﻿".encode("utf-8"))
+    rows = list(csv.reader(io.StringIO(b"".join(chunks).decode("utf-8-sig"))))
+    assert rows[0] == baobiao.lietou
+    bank = [row for row in rows if row[1] == "1002"]
+    assert [(row[3], row[6], row[7], row[8], row[9]) for row in bank] == [
+        ("2024-01", "900.00", "0", "900.00", ""),
+        ("2024-02", "1200.00", "900.00", "300.00", "33.33"),
+    ]
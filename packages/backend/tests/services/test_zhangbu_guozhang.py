@@ -0,0 +1,188 @@
+"""凭证过账与期末结账相关测试"""
+import threading
+import time
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from src.models.caiwu_zhangwu import KemuYue, Pingzheng, Zhangbu, ZhangbuJiezhang
+from src.services.caiwu_zhangwu.zhangbu_guozhang_service import ZhangbuGuozhangService, parse_kemu
+
+
+def _add_pingzheng(db_session, bianhao, riqi, jiefang_kemu, daifang_kemu, jine, kehu_id="kehu-1", **kwargs):
+    pingzheng = Pingzheng(
+        kehu_id=kehu_id,
+        zhizuo_ren_id="zhizuo-1",
+        pingzheng_bianhao=bianhao,
+        pingzheng_riqi=riqi,
+        zhaiyao=f"凭证{bianhao}",
+        jiebie_kemu=jiefang_kemu,
+        jiebie_jine=Decimal(jine),
+        daifang_kemu=daifang_kemu,
+        daifang_jine=Decimal(kwargs.pop("daifang_jine", jine)),
+        pingzheng_zhuangtai=kwargs.pop("pingzheng_zhuangtai", "approved"),
+        created_by="tester",
+        **kwargs
+    )
+    db_session.add(pingzheng)
+    return pingzheng
+
+
+def _yue(db_session, kemu_bianma, kuaiji_qijian, kehu_id="kehu-1"):
+    row = db_session.get(KemuYue, (kehu_id, kemu_bianma, kuaiji_qijian))
+    return row and (row.qichu_yue, row.benqi_jiefang, row.benqi_daifang, row.qimo_yue)
+
+
+def test_parse_kemu():
+    assert parse_kemu("1002 银行存款") == ("1002", "银行存款")
+    assert parse_kemu("2202-应付账款") == ("2202", "应付账款")
+    assert parse_kemu("5001主营业务收入") == ("5001", "主营业务收入")
+    assert parse_kemu("银行存款") == ("银行存款", "银行存款")
+
+
+def test_post_vouchers_builds_lines_and_balances(db_session):
+    """过账生成借贷两行明细账，明细账余额按顺序滚动，科目余额增量累加"""
+    _add_pingzheng(db_session, "PZ-2", datetime(2024, 1, 20), "1002 银行存款", "5001 主营业务收入", "300")
+    _add_pingzheng(db_session, "PZ-1", datetime(2024, 1, 10), "1002 银行存款", "3001 实收资本", "1000")
+    _add_pingzheng(db_session, "PZ-D", datetime(2024, 1, 5), "1002 银行存款", "3001 实收资本", "50", pingzheng_zhuangtai="draft")
+    db_session.commit()
+
+    service = ZhangbuGuozhangService(db_session)
+    assert service.post_vouchers("kuaiji-1") == 2
+
+    lines = db_session.query(Zhangbu).filter(Zhangbu.kemu_bianma == "1002").order_by(Zhangbu.qimo_yue).all()
+    assert [(line.qichu_yue, line.qimo_yue, line.duifang_kemu) for line in lines] == [
+        (Decimal("0"), Decimal("1000"), "3001 实收资本"),
+        (Decimal("1000"), Decimal("1300"), "5001 主营业务收入"),
+    ]
+    assert db_session.query(Zhangbu).count() == 4
+    assert _yue(db_session, "1002", "2024-01") == (0, 1300, 0, 1300)
+    assert _yue(db_session, "3001", "2024-01") == (0, 0, 1000, 1000)
+    assert _yue(db_session, "5001", "2024-01") == (0, 0, 300, 300)
+    assert {p.pingzheng_bianhao: p.pingzheng_zhuangtai for p in db_session.query(Pingzheng)} == {
+        "PZ-1": "posted", "PZ-2": "posted", "PZ-D": "draft"
+    }
+
+    # 后续批次在现有余额上累加
+    _add_pingzheng(db_session, "PZ-3", datetime(2024, 1, 25), "2202 应付账款", "1002 银行存款", "200")
+    db_session.commit()
+    assert service.post_vouchers("kuaiji-1") == 1
+    assert _yue(db_session, "1002", "2024-01") == (0, 1300, 200, 1100)
+    assert _yue(db_session, "2202", "2024-01") == (0, 200, 0, -200)
+    line = db_session.query(Zhangbu).filter(Zhangbu.kemu_bianma == "1002", Zhangbu.daifang_jine == 200).one()
+    assert (line.qichu_yue, line.qimo_yue) == (1300, 1100)
+
+
+def test_concurrent_posts_to_new_kemu_roll_balances_in_order(tmp_path):
+    """两批凭证并发过账到同一个新科目：后提交的批次从先提交批次的余额开始滚动明细账余额"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'ledger.db'}", connect_args={"check_same_thread": False})
+    Pingzheng.metadata.create_all(bind=engine)
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    with SessionLocal() as db:
+        first = _add_pingzheng(db, "PZ-1", datetime(2024, 1, 10), "1002 银行存款", "3001 实收资本", "1000")
+        second = _add_pingzheng(db, "PZ-2", datetime(2024, 1, 20), "1002 银行存款", "3001 实收资本", "300")
+        db.commit()
+        first_id, second_id = first.id, second.id
+
+    loaded = threading.Event()
+
+    class SlowService(ZhangbuGuozhangService):
+        def _load_states(self, pingzheng_list):
+            states = super()._load_states(pingzheng_list)
+            loaded.set()
+            # 停留期间另一批开始过账
+            time.sleep(0.3)
+            return states
+
+    def post(service_class, pingzheng_id):
+        with SessionLocal() as db:
+            service_class(db).post_vouchers("kuaiji-1", pingzheng_ids=[pingzheng_id])
+
+    slow = threading.Thread(target=post, args=(SlowService, first_id))
+    slow.start()
+    assert loaded.wait(5)
+    post(ZhangbuGuozhangService, second_id)
+    slow.join()
+
+    try:
+        with SessionLocal() as db:
+            lines = db.query(Zhangbu).filter(Zhangbu.kemu_bianma == "1002").order_by(Zhangbu.qimo_yue).all()
+            assert [(line.qichu_yue, line.qimo_yue) for line in lines] == [
+                (Decimal("0"), Decimal("1000")),
+                (Decimal("1000"), Decimal("1300")),
+            ]
+            assert _yue(db, "1002", "2024-01") == (0, 1300, 0, 1300)
+    finally:
+        engine.dispose()
+
+
+def test_post_vouchers_skips_unbalanced_and_closed(db_session):
+    """借贷不平或日期在已结账期间的凭证跳过并列出，其余凭证照常过账"""
+    _add_pingzheng(db_session, "PZ-1", datetime(2024, 1, 10), "1002 银行存款", "3001 实收资本", "1000")
+    _add_pingzheng(db_session, "PZ-2", datetime(2024, 1, 5), "1002 银行存款", "3001 实收资本", "10", daifang_jine="20")
+    _add_pingzheng(db_session, "PZ-3", datetime(2023, 12, 20), "1002 银行存款", "3001 实收资本", "30")
+    db_session.add(ZhangbuJiezhang(kuaiji_qijian="2023-12", jiezhang_shijian=datetime.now()))
+    db_session.commit()
+    service = ZhangbuGuozhangService(db_session)
+
+    # 跳过的凭证排在最前，也不占用 limit
+    assert service.post_vouchers("kuaiji-1", limit=1) == 1
+    assert service.post_vouchers("kuaiji-1") == 0
+    assert _yue(db_session, "1002", "2024-01") == (0, 1000, 0, 1000)
+    assert _yue(db_session, "1002", "2023-12") is None
+    assert {p.pingzheng_bianhao: p.pingzheng_zhuangtai for p in db_session.query(Pingzheng)} == {
+        "PZ-1": "posted", "PZ-2": "approved", "PZ-3": "approved"
+    }
+    assert [(p.pingzheng_bianhao, yuanyin) for p, yuanyin in service.list_unpostable()] == [
+        ("PZ-3", "会计期间已结账"), ("PZ-2", "凭证借贷金额不平")
+    ]
+    assert service.list_unpostable(kehu_id="kehu-2") == []
+
+    # 取得期间锁后才发现期间已结账（查询之后另一事务结账）的凭证同样跳过
+    _add_pingzheng(db_session, "PZ-4", datetime(2024, 1, 20), "1002 银行存款", "3001 实收资本", "5")
+    db_session.commit()
+    pingzheng_list = db_session.query(Pingzheng).filter(Pingzheng.pingzheng_bianhao.in_(["PZ-1", "PZ-4"])).all()
+    db_session.add(ZhangbuJiezhang(kuaiji_qijian="2024-01", jiezhang_shijian=datetime.now()))
+    db_session.flush()
+    assert service._skip_closed(pingzheng_list) == []
+    db_session.rollback()
+
+
+def test_close_period_rolls_balances_forward(db_session):
+    """结账把期末余额结转为下一期间期初，提前过账的下一期间余额与明细账同时调整"""
+    _add_pingzheng(db_session, "PZ-1", datetime(2024, 1, 10), "1002 银行存款", "3001 实收资本", "1000")
+    _add_pingzheng(db_session, "PZ-2", datetime(2024, 1, 12), "1002 银行存款", "3001 实收资本", "500", kehu_id="kehu-2")
+    _add_pingzheng(db_session, "PZ-3", datetime(2024, 2, 3), "6602 管理费用", "1002 银行存款", "100")
+    db_session.commit()
+    service = ZhangbuGuozhangService(db_session)
+    service.post_vouchers("kuaiji-1")
+    assert _yue(db_session, "1002", "2024-02") == (0, 0, 100, -100)
+
+    # 2 月不能先于 1 月结账；1 月还有未过账凭证时不能结账
+    with pytest.raises(HTTPException):
+        service.close_period("2024-02")
+    _add_pingzheng(db_session, "PZ-4", datetime(2024, 1, 31), "1002 银行存款", "3001 实收资本", "1")
+    db_session.commit()
+    with pytest.raises(HTTPException) as exc:
+        service.close_period("2024-01")
+    assert "1 张" in exc.value.detail
+    db_session.rollback()
+    service.post_vouchers("kuaiji-1")
+
+    assert service.close_period("2024-01", "kuaiji-1") == 4
+    assert _yue(db_session, "1002", "2024-02") == (1001, 0, 100, 901)
+    assert _yue(db_session, "3001", "2024-02") == (1001, 0, 0, 1001)
+    assert _yue(db_session, "1002", "2024-02", kehu_id="kehu-2") == (500, 0, 0, 500)
+    line = db_session.query(Zhangbu).filter(Zhangbu.kuaiji_qijian == "2024-02", Zhangbu.kemu_bianma == "1002").one()
+    assert (line.qichu_yue, line.qimo_yue) == (1001, 901)
+    line = db_session.query(Zhangbu).filter(Zhangbu.kuaiji_qijian == "2024-02", Zhangbu.kemu_bianma == "6602").one()
+    assert (line.qichu_yue, line.qimo_yue) == (0, 100)
+
+    with pytest.raises(HTTPException):
+        service.close_period("2024-01")
+    assert service.close_period("2024-02") == 5
+    assert _yue(db_session, "6602", "2024-03") == (100, 0, 0, 100)
@@ -0,0 +1,108 @@
+"""支付回调处理队列相关测试"""
+from datetime import datetime
+from decimal import Decimal
+
+from src.core.config import settings
+from src.models.zhifu_guanli import ZhifuDingdan, ZhifuHuidiaoRenwu, ZhifuHuidiaoRizhi, ZhifuLiushui
+from src.services.zhifu_guanli.zhifu_huidiao_duilie_service import ZhifuHuidiaoDuilieService
+from src.services.zhifu_guanli.zhifu_huidiao_service import ZhifuHuidiaoService
+
+
+def _dingdan(db_session, bianhao):
+    dingdan = ZhifuDingdan(
+        hetong_id="hetong-1",
+        kehu_id="kehu-1",
+        dingdan_bianhao=bianhao,
+        dingdan_mingcheng="代理记账服务费",
+        dingdan_jine=Decimal("300.00"),
+        yingfu_jine=Decimal("300.00"),
+        zhifu_leixing="weixin",
+        chuangjian_shijian=datetime.now()
+    )
+    db_session.add(dingdan)
+    db_session.commit()
+    return dingdan
+
+
+def _enqueue(db_session, dingdan_hao, transaction_id):
+    log = ZhifuHuidiaoService(db_session).create_log(
+        huidiao_leixing="zhifu",
+        zhifu_pingtai="weixin",
+        qingqiu_url="/api/v1/public/payment-callback/weixin/notify",
+        qingqiu_fangfa="POST",
+        qingqiu_tou={},
+        qingqiu_shuju={"body": "{}"}
+    )
+    queued = ZhifuHuidiaoDuilieService(db_session).enqueue(
+        huidiao_rizhi_id=log.id,
+        zhifu_pingtai="weixin",
+        dingdan_hao=dingdan_hao,
+        disanfang_dingdan_hao=transaction_id,
+        jiaoyi_jine=Decimal("300.00"),
+        zhifu_zhanghu="openid-1",
+        huidiao_shuju={"out_trade_no": dingdan_hao, "transaction_id": transaction_id}
+    )
+    return log.id, queued
+
+
+def test_duplicate_notifications_are_queued_once(db_session):
+    """同一笔交易的重复通知只入队一次，重复通知的日志直接记为处理成功"""
+    first_log, first = _enqueue(db_session, "DD001", "wx-1")
+    second_log, second = _enqueue(db_session, "DD001", "wx-1")
+
+    assert (first, second) == (True, False)
+    assert db_session.query(ZhifuHuidiaoRenwu).count() == 1
+    duplicate = db_session.get(ZhifuHuidiaoRizhi, second_log)
+    assert (duplicate.qianming_yanzheng, duplicate.chuli_zhuangtai) == ("chenggong", "chenggong")
+    assert db_session.get(ZhifuHuidiaoRizhi, first_log).chuli_zhuangtai == "chuli_zhong"
+
+
+def test_process_batch_updates_orders_and_liushui(db_session):
+    """一批回调更新订单并写入流水，订单不存在的直接标记失败；已处理的交易不重复记流水"""
+    paid = _dingdan(db_session, "DD001")
+    _dingdan(db_session, "DD002")
+    log_id, _ = _enqueue(db_session, "DD001", "wx-1")
+    _enqueue(db_session, "DD002", "wx-2")
+    missing_log, _ = _enqueue(db_session, "DD404", "wx-3")
+
+    assert ZhifuHuidiaoDuilieService(db_session).process_batch(10) == 3
+    db_session.expire_all()
+
+    assert (paid.zhifu_zhuangtai, paid.shifu_jine, paid.disanfang_dingdan_hao) == ("paid", Decimal("300.00"), "wx-1")
+    assert db_session.query(ZhifuLiushui).count() == 2
+    assert db_session.get(ZhifuHuidiaoRizhi, log_id).chuli_zhuangtai == "chenggong"
+    assert db_session.get(ZhifuHuidiaoRizhi, missing_log).chuli_zhuangtai == "shibai"
+    statuses = {r.dingdan_hao: r.renwu_zhuangtai for r in db_session.query(ZhifuHuidiaoRenwu)}
+    assert statuses == {"DD001": "chenggong", "DD002": "chenggong", "DD404": "shibai"}
+
+    # 队列已空
+    assert ZhifuHuidiaoDuilieService(db_session).process_batch(10) == 0
+
+
+def test_failed_callback_retries_until_limit(db_session, monkeypatch):
+    """批量处理出错时逐条处理，出错的回调计入重试次数，达到上限后标记失败，其余回调不受影响"""
+    monkeypatch.setattr(settings, "ZHIFU_HUIDIAO_MAX_RETRIES", 2)
+    _dingdan(db_session, "DD001")
+    _dingdan(db_session, "DD002")
+    _enqueue(db_session, "DD001", "wx-1")
+    bad_log, _ = _enqueue(db_session, "DD002", "wx-2")
+
+    original = ZhifuHuidiaoDuilieService._build_liushui
+
+    def failing_build(renwu, dingdan, liushui_bianhao):
+        if renwu.dingdan_hao == "DD002":
+            raise RuntimeError("写入流水失败")
+        return original(renwu, dingdan, liushui_bianhao)
+
+    monkeypatch.setattr(ZhifuHuidiaoDuilieService, "_build_liushui", staticmethod(failing_build))
+
+    service = ZhifuHuidiaoDuilieService(db_session)
+    assert service.process_batch(10) == 2
+    bad = db_session.query(ZhifuHuidiaoRenwu).filter_by(dingdan_hao="DD002").one()
+    assert (bad.renwu_zhuangtai, bad.chongshi_cishu) == ("daichuli", 1)
+    assert db_session.query(ZhifuLiushui).count() == 1
+
+    assert service.process_batch(10) == 1
+    db_session.expire_all()
+    assert (bad.renwu_zhuangtai, bad.chongshi_cishu, bad.cuowu_xinxi) == ("shibai", 2, "写入流水失败")
+    assert db_session.get(ZhifuHuidiaoRizhi, bad_log).chuli_zhuangtai == "shibai"
@@ -0,0 +1,95 @@
+"""支付客户端注册表相关测试"""
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy.orm import sessionmaker
+
+from src.models.zhifu_guanli import ZhifuPeizhi
+from src.schemas.zhifu_guanli.zhifu_peizhi_schemas import ZhifuPeizhiCreate, ZhifuPeizhiUpdate
+from src.services.zhifu_guanli.zhifu_kehuduan_registry import ZhifuKehuduanRegistry
+from src.services.zhifu_guanli.zhifu_peizhi_service import ZhifuPeizhiService
+
+
+def _sandbox_weixin(db_session, mingcheng="微信沙箱"):
+    """沙箱环境的微信配置（创建客户端不需要访问网络）"""
+    return ZhifuPeizhiService(db_session).create_zhifu_peizhi(ZhifuPeizhiCreate(
+        peizhi_mingcheng=mingcheng,
+        peizhi_leixing="weixin",
+        huanjing="shachang",
+        weixin_appid="wx-appid",
+        weixin_shanghu_hao="1900000001",
+        weixin_api_v3_miyao="sandbox-api-key",
+        tongzhi_url="https://example.com/notify"
+    ), "admin")
+
+
+def test_client_is_reused_until_config_changes(db_session):
+    """同一版本的配置复用客户端；配置修改后（包括其他进程修改）重新创建"""
+    registry = ZhifuKehuduanRegistry()
+    peizhi = _sandbox_weixin(db_session)
+
+    first = registry.get(db_session, peizhi.id)
+    assert registry.get(db_session, peizhi.id) is first
+    assert first.weixin() is first.weixin()
+    # 内存中为解密后的值，数据库中仍为密文
+    assert first.weixin().api_key == "sandbox-api-key"
+    assert db_session.get(ZhifuPeizhi, peizhi.id).weixin_api_v3_miyao != "sandbox-api-key"
+
+    # 其他进程修改配置：本进程未收到失效通知，按 updated_at 发现变化
+    row = db_session.get(ZhifuPeizhi, peizhi.id)
+    row.tongzhi_url = "https://example.com/notify2"
+    row.updated_at = datetime.now() + timedelta(seconds=1)
+    db_session.commit()
+    second = registry.get(db_session, peizhi.id)
+    assert second is not first
+    assert second.weixin().notify_url == "https://example.com/notify2"
+
+
+def test_config_edits_invalidate_process_registry(db_session, monkeypatch):
+    """通过配置服务修改、删除配置时淘汰本进程注册表中的客户端"""
+    from src.services.zhifu_guanli import zhifu_kehuduan_registry as module
+    registry = ZhifuKehuduanRegistry()
+    monkeypatch.setattr(module, "zhifu_kehuduan_registry", registry)
+    service = ZhifuPeizhiService(db_session)
+    peizhi = _sandbox_weixin(db_session)
+
+    registry.get(db_session, peizhi.id)
+    service.update_zhifu_peizhi(peizhi.id, ZhifuPeizhiUpdate(weixin_api_v3_miyao="new-key"), "admin")
+    assert len(registry) == 0
+    assert registry.get(db_session, peizhi.id).weixin().api_key == "new-key"
+
+    service.delete_zhifu_peizhi(peizhi.id, "admin")
+    assert len(registry) == 0
+    with pytest.raises(HTTPException) as exc:
+        registry.get(db_session, peizhi.id)
+    assert exc.value.status_code == 404
+
+
+def test_warm_loads_enabled_configs(db_session, monkeypatch):
+    """预热加载启用的配置并创建客户端，无效配置只跳过"""
+    registry = ZhifuKehuduanRegistry()
+    peizhi = _sandbox_weixin(db_session)
+    ZhifuPeizhiService(db_session).create_zhifu_peizhi(ZhifuPeizhiCreate(
+        peizhi_mingcheng="微信（私钥无效）",
+        peizhi_leixing="weixin",
+        huanjing="shengchan",
+        weixin_appid="wx-appid",
+        weixin_shanghu_hao="1900000002",
+        weixin_shanghu_siyao="not-a-key",
+        weixin_zhengshu_xuliehao="serial",
+        weixin_api_v3_miyao="k" * 32
+    ), "admin")
+    ZhifuPeizhiService(db_session).create_zhifu_peizhi(ZhifuPeizhiCreate(
+        peizhi_mingcheng="微信（停用）",
+        peizhi_leixing="weixin",
+        zhuangtai="tingyong",
+        huanjing="shachang"
+    ), "admin")
+
+    assert registry.warm(sessionmaker(bind=db_session.get_bind())) == 1
+    assert len(registry) == 1
+    assert registry.get(db_session, peizhi.id).weixin().api_key == "sandbox-api-key"
+    # 回调验签使用最新创建的启用配置
+    assert registry.get_active(db_session, "weixin").peizhi.peizhi_mingcheng == "微信（私钥无效）"
+    assert registry.get_active(db_session, "yinhang") is None